@@ -1,7 +1,6 @@
 # collector/admin.py — FULL MANAGEMENT WITH REAL NOTIFICATIONS
 from django.contrib import admin
 from django.contrib.gis.admin import GISModelAdmin
-from django.template.loader import render_to_string
 from django.utils.html import format_html
 from django.urls import reverse
 from django.contrib import messages
@@ -16,13 +15,8 @@ from fleet.models import Vehicle
 from users.models import CustomUser
 from .utils.notifications import notify_collector  # Import unified notifier
 from notifications.signals import notify
-from django.http import HttpResponse
-import csv
-from weasyprint import HTML
-from io import BytesIO
-import matplotlib.pyplot as plt
-import io
-import base64
+from reports.exports import stream_export
+from .exports import CollectorExport, CollectorPDFExport
 
 
 # Custom filter (unchanged)
@@ -205,66 +199,13 @@ class CollectorAdmin(GISModelAdmin):
 
     @admin.action(description="Export selected collectors to CSV")
     def export_to_csv(self, request, queryset):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="collectors.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Name', 'Phone', 'Email', 'Rating', 'Efficiency', 'Customers'])
-        for obj in queryset:
-            writer.writerow([
-                obj.full_name,
-                obj.phone,
-                obj.email,
-                obj.rating,
-                obj.efficiency_percentage,
-                obj.total_customers
-            ])
-        return response
+        spec = CollectorExport({'ids': list(queryset.values_list('pk', flat=True))}, user=request.user)
+        return stream_export(spec, 'csv')
 
     @admin.action(description="Export selected collectors to PDF with charts")
     def export_to_pdf(self, request, queryset):
-        # Generate charts
-        efficiency_data = [c.efficiency_percentage for c in queryset]
-        names = [c.full_name for c in queryset]
-
-        # Efficiency Chart
-        plt.figure(figsize=(10, 6))
-        plt.bar(names, efficiency_data, color='#6b46c1')
-        plt.xlabel('Collectors')
-        plt.ylabel('Efficiency (%)')
-        plt.title('Collector Efficiency')
-        plt.xticks(rotation=45)
-        efficiency_img = io.BytesIO()
-        plt.savefig(efficiency_img, format='png', bbox_inches='tight')
-        efficiency_img.seek(0)
-        efficiency_chart_url = f"data:image/png;base64,{base64.b64encode(efficiency_img.getvalue()).decode()}"
-
-        # Rating Chart
-        plt.figure(figsize=(10, 6))
-        ratings = [c.rating for c in queryset]
-        plt.bar(names, ratings, color='#ec4899')
-        plt.xlabel('Collectors')
-        plt.ylabel('Rating (Stars)')
-        plt.title('Collector Ratings')
-        plt.xticks(rotation=45)
-        rating_img = io.BytesIO()
-        plt.savefig(rating_img, format='png', bbox_inches='tight')
-        rating_img.seek(0)
-        rating_chart_url = f"data:image/png;base64,{base64.b64encode(rating_img.getvalue()).decode()}"
-
-        context = {
-            'collectors': queryset,
-            'now': timezone.now(),
-            'efficiency_chart_url': efficiency_chart_url,
-            'rating_chart_url': rating_chart_url
-        }
-
-        html_string = render_to_string('admin/collector_export.html', context)
-        html = HTML(string=html_string, base_url=request.build_absolute_uri())
-        result = html.write_pdf()
-
-        response = HttpResponse(result, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="collectors_report_{timezone.now().strftime("%Y%m%d")}.pdf"'
-        return response
+        spec = CollectorPDFExport({'ids': list(queryset.values_list('pk', flat=True))}, user=request.user)
+        return stream_export(spec, 'pdf')
 
 
 # ====================================================
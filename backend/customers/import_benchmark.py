@@ -0,0 +1,74 @@
+# customers/import_benchmark.py — Customer import benchmark
+"""
+Generates a customer CSV fixture and times customers.importer on it, twice (the second
+run exercises the idempotent update path):
+
+    python manage.py shell -c "from customers.import_benchmark import main; main()"
+
+The fixture mixes what real files contain: ~10% rows without phone (placeholders), ~5%
+without email, ~1% invalid rows (bad phone, missing name, bad fee) and a few hundred
+villages, some of them new. It writes customers, so run it against a scratch database.
+"""
+import csv
+import os
+import random
+import tempfile
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .importer import CHUNK_SIZE, import_customers
+
+COLUMNS = ['name', 'phone', 'email', 'type', 'sector', 'cell', 'village', 'monthly_fee', 'unpaid_months', 'overpaid_months']
+
+
+def generate_fixture(path, rows=100_000, villages=300, seed=42):
+    """Write `rows` generated customer rows to `path`."""
+    rng = random.Random(seed)
+    places = [(f"Bench Sector {n % 10}", f"Bench Cell {n % 40}", f"Bench Village {n}") for n in range(villages)]
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(COLUMNS)
+        for n in range(rows):
+            sector, cell, village = rng.choice(places)
+            roll = rng.random()
+            phone = "" if roll < 0.10 else f"07{rng.choice('2389')}{n:07d}"
+            name = f"Bench Customer {n}"
+            fee = str(rng.choice([1000, 1500, 2000, 3000, 5000]))
+            if roll > 0.99:  # Invalid rows
+                phone, name, fee = rng.choice([("12345", name, fee), (phone, "", fee), (phone, name, "abc")])
+            writer.writerow([
+                name,
+                phone,
+                "" if rng.random() < 0.05 else f"bench{n}@example.com",
+                rng.choice(["Individual", "Individual", "Corporate"]),
+                sector,
+                cell,
+                village,
+                fee,
+                rng.choice([0, 0, 0, 1, 2, 3]),
+                rng.choice([0, 0, 0, 0, 1]),
+            ])
+
+
+def timed_import(path, chunk_size=CHUNK_SIZE):
+    with CaptureQueriesContext(connection) as queries:
+        result = import_customers(path, chunk_size=chunk_size)
+    return result, len(queries)
+
+
+def main(rows=100_000, chunk_size=CHUNK_SIZE):
+    handle, path = tempfile.mkstemp(suffix=".csv")
+    os.close(handle)
+    try:
+        generate_fixture(path, rows)
+        chunks = -(-rows // chunk_size)
+        for label in ("first run", "re-run"):
+            result, queries = timed_import(path, chunk_size)
+            print(
+                f"{label}: {rows} rows in {result.duration:.1f}s ({rows / result.duration:,.0f} rows/s) — "
+                f"{result.created} created, {result.updated} updated, {result.rejected} rejected — "
+                f"{queries} queries ({queries / chunks:.1f} per {chunk_size}-row chunk)"
+            )
+    finally:
+        os.remove(path)
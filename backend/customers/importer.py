@@ -0,0 +1,441 @@
+# customers/importer.py — Bulk customer import engine
+"""
+Streams a customer CSV in chunks and upserts it with a constant number of queries per chunk.
+
+- Each row is validated on its own (name, phone, fee, type, opening months); invalid rows
+  go to the rejects file with their row number and reason, the rest of the chunk imports.
+- Per chunk, one IN lookup each resolves sectors, cells and villages (missing ones are
+  bulk-created, new villages get the least-loaded collector), existing customers (by phone
+  and by import key) and existing users.
+- Rows without a phone get a placeholder (250780xxxxxx) outside the numbers already in
+  that range: those stored (preloaded once at start) and those in the file (scanned before
+  the first chunk when the file is seekable, else per chunk).
+- Customers are written with bulk_create(update_conflicts=True) on contract_no. Rows
+  without a contract_no get a key derived from phone/name/village, and a row matching an
+  existing customer reuses its contract_no, phone and account, so re-running a file
+  updates the same customers instead of creating duplicates. Opening balances
+  (unpaid/overpaid months) are only booked for customers the run creates.
+- bulk_create skips post_save: the user profile, ERP dashboard and role group the user
+  signals create are bulk-created here, and geographic rollups/village metrics are queued.
+"""
+import csv
+import hashlib
+import heapq
+import re
+import secrets
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from users.models import CustomUser, UserProfile
+from .models import Cell, Customer, LedgerEntry, Sector, Village
+
+CHUNK_SIZE = 2000
+PHONE_RE = re.compile(r"^250\d{9}$")
+PLACEHOLDER_PREFIX = "250780"
+PLACEHOLDER_START = 250780000001
+PLACEHOLDER_END = 250780999999
+DEFAULT_SECTOR = "Default Sector"
+DEFAULT_CELL = "Default Cell"
+CUSTOMER_TYPES = {value for value, _ in Customer.TYPE_CHOICES}
+UPDATE_FIELDS = ['name', 'phone', 'email', 'type', 'village', 'monthly_fee', 'user', 'updated_at']
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; reported in the rejects file."""
+
+
+def normalize_phone(phone):
+    """Normalize a phone number to 250XXXXXXXXX (Rwanda)."""
+    phone = re.sub(r"[^\d]", "", phone)
+    if phone.startswith("0"):
+        phone = "250" + phone[1:]
+    elif phone.startswith("7"):
+        phone = "250" + phone
+    return phone
+
+
+@dataclass(eq=False)  # Hashed by identity: rows key the per-chunk lookups
+class ImportRow:
+    number: int
+    raw: dict
+    name: str
+    phone: str
+    email: str
+    type: str
+    sector: str
+    cell: str
+    village: str
+    monthly_fee: Decimal
+    unpaid_months: int
+    overpaid_months: int
+    contract_no: str
+    used_default_phone: bool = False
+    used_default_email: bool = False
+    existing: bool = False
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    rejected: int = 0
+    defaults: int = 0
+    duration: float = 0.0
+    villages_created: list = field(default_factory=list)
+
+
+def _int(value, column):
+    try:
+        return int(value or 0)
+    except ValueError:
+        raise RowError(f"'{column}' must be a whole number, got '{value}'")
+
+
+def parse_row(number, raw):
+    """Validated ImportRow from one CSV row (phone still unassigned when missing)."""
+    name = (raw.get("name") or "").strip()
+    if not name:
+        raise RowError("Missing required field: 'name'")
+
+    phone = (raw.get("phone") or "").strip()
+    if phone:
+        phone = normalize_phone(phone)
+        if not PHONE_RE.match(phone):
+            raise RowError(f"Invalid phone number '{raw.get('phone')}' after normalization")
+
+    try:
+        monthly_fee = Decimal((raw.get("monthly_fee") or "0").strip())
+    except InvalidOperation:
+        raise RowError(f"'monthly_fee' must be a number, got '{raw.get('monthly_fee')}'")
+    if monthly_fee < 0:
+        raise RowError("'monthly_fee' cannot be negative")
+
+    customer_type = (raw.get("type") or "Individual").strip().title()
+    if customer_type not in CUSTOMER_TYPES:
+        raise RowError(f"Unknown customer type '{raw.get('type')}'")
+
+    return ImportRow(
+        number=number,
+        raw=raw,
+        name=name,
+        phone=phone,
+        email=(raw.get("email") or "").strip(),
+        type=customer_type,
+        sector=(raw.get("sector") or "").strip() or DEFAULT_SECTOR,
+        cell=(raw.get("cell") or "").strip() or DEFAULT_CELL,
+        village=(raw.get("village") or "").strip(),
+        monthly_fee=monthly_fee,
+        unpaid_months=_int(raw.get("unpaid_months"), "unpaid_months"),
+        overpaid_months=_int(raw.get("overpaid_months"), "overpaid_months"),
+        contract_no=(raw.get("contract_no") or "").strip(),
+    )
+
+
+def import_key(row):
+    """Stable contract_no for rows that don't carry one, so re-runs hit the same customer."""
+    source = f"{row.phone}|{row.name.lower()}|{row.village.lower()}"
+    return "IMP-" + hashlib.sha1(source.encode()).hexdigest()[:12].upper()
+
+
+class CustomerImporter:
+    """One import run. `rejects` is a csv.writer (or None); call run(fileobj)."""
+
+    def __init__(self, rejects=None, chunk_size=CHUNK_SIZE, log=None):
+        self.rejects = rejects
+        self.chunk_size = chunk_size
+        self.log = log or (lambda message: None)
+        self.result = ImportResult()
+        self.sectors, self.cells, self.villages = {}, {}, {}   # name(s) → id, across chunks
+        self.touched_villages = set()
+        self._load_placeholders()
+        self._load_collectors()
+
+    # ─── Preloads (once per run) ────────────────────────────────────────────
+    def _load_placeholders(self):
+        taken = set(CustomUser.objects.filter(phone__startswith=PLACEHOLDER_PREFIX).values_list('phone', flat=True))
+        taken |= set(Customer.objects.filter(phone__startswith=PLACEHOLDER_PREFIX).values_list('phone', flat=True))
+        self.placeholders_taken = taken
+        self.next_placeholder = PLACEHOLDER_START
+
+    def _load_collectors(self):
+        # (villages assigned, id) min-heap: new villages go to the least-loaded collector
+        self.collectors = [
+            (row['load'], row['id'])
+            for row in CustomUser.objects.filter(role='collector').annotate(load=Count('assigned_villages')).values('id', 'load')
+        ]
+        heapq.heapify(self.collectors)
+
+    def reserve_phones(self, phones):
+        """Keep real numbers that fall in the placeholder range out of the allocator."""
+        self.placeholders_taken.update(phone for phone in phones if phone.startswith(PLACEHOLDER_PREFIX))
+
+    def placeholder_phone(self):
+        while str(self.next_placeholder) in self.placeholders_taken:
+            self.next_placeholder += 1
+        if self.next_placeholder > PLACEHOLDER_END:
+            raise RowError("No placeholder phone numbers left")
+        phone = str(self.next_placeholder)
+        self.placeholders_taken.add(phone)
+        return phone
+
+    def next_collector(self):
+        if not self.collectors:
+            return None
+        load, collector_id = heapq.heappop(self.collectors)
+        heapq.heappush(self.collectors, (load + 1, collector_id))
+        return collector_id
+
+    # ─── Run ────────────────────────────────────────────────────────────────
+    def run(self, fileobj):
+        if fileobj.seekable():
+            self._reserve_file_phones(fileobj)
+        reader = csv.DictReader(fileobj)
+        if self.rejects is not None:
+            self.rejects.writerow(['row', 'error'] + list(reader.fieldnames or []))
+        self.fieldnames = reader.fieldnames or []
+
+        chunk = []
+        for number, raw in enumerate(reader, start=2):
+            chunk.append((number, raw))
+            if len(chunk) == self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+
+        if self.touched_villages:
+            self._queue_refreshes()
+        return self.result
+
+    def _reserve_file_phones(self, fileobj):
+        """First pass over the file: reserve every phone it carries, so no placeholder given to
+        an earlier row can equal a real number of a later chunk."""
+        start = fileobj.tell()
+        phones = ((raw.get("phone") or "").strip() for raw in csv.DictReader(fileobj))
+        self.reserve_phones(normalize_phone(phone) for phone in phones if phone)
+        fileobj.seek(start)
+
+    def reject(self, number, raw, error):
+        self.result.rejected += 1
+        if self.rejects is not None:
+            self.rejects.writerow([number, str(error)] + [raw.get(name, '') for name in self.fieldnames])
+
+    def import_chunk(self, chunk):
+        rows = []
+        for number, raw in chunk:
+            try:
+                rows.append(parse_row(number, raw))
+            except RowError as e:
+                self.reject(number, raw, e)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            village_ids = self._resolve_villages(rows)
+            customers = self._resolve_customers(rows)
+            rows = [row for row in rows if row in customers]
+            if not rows:
+                return
+            users = self._resolve_users(rows, customers)
+
+            new_rows = [row for row in rows if not row.existing]
+            for row in rows:
+                customer = customers[row]
+                customer.name = row.name
+                customer.phone = row.phone
+                customer.email = row.email
+                customer.type = row.type
+                customer.village_id = village_ids.get(row.village)
+                customer.monthly_fee = row.monthly_fee
+                customer.user_id = customer.user_id or users[row.phone]
+                if customer.village_id:
+                    self.touched_villages.add(customer.village_id)
+                if row.used_default_phone or row.used_default_email:
+                    self.result.defaults += 1
+
+            Customer.objects.bulk_create(
+                [customers[row] for row in rows],
+                update_conflicts=True,
+                unique_fields=['contract_no'],
+                update_fields=UPDATE_FIELDS,
+            )
+            self._book_opening_balances([(row, customers[row]) for row in new_rows])
+
+        self.result.created += len(new_rows)
+        self.result.updated += len(rows) - len(new_rows)
+        self.log(f"Rows up to {chunk[-1][0]}: {self.result.created} created, {self.result.updated} updated, {self.result.rejected} rejected")
+
+    # ─── Lookups (one IN query per level per chunk) ─────────────────────────
+    def _resolve_villages(self, rows):
+        """{village name: id} for the chunk, creating missing sectors, cells and villages."""
+        wanted = {row.village: (row.sector, row.cell) for row in rows if row.village and row.village not in self.villages}
+        if not wanted:
+            return self.villages
+
+        found = dict(Village.objects.filter(name__in=wanted).values_list('name', 'id'))
+        missing = {name: parents for name, parents in wanted.items() if name not in found}
+        if missing:
+            cell_ids = self._resolve_cells(set(missing.values()))
+            new_villages = Village.objects.bulk_create(
+                [Village(name=name, cell_id=cell_ids[parents]) for name, parents in missing.items()],
+                ignore_conflicts=True,
+            )
+            found.update(Village.objects.filter(name__in=missing).values_list('name', 'id'))
+            Assignment = Village.collectors.through
+            assignments = []
+            for village in new_villages:
+                collector_id = self.next_collector()
+                if collector_id:
+                    assignments.append(Assignment(village_id=found[village.name], customuser_id=collector_id))
+            Assignment.objects.bulk_create(assignments, ignore_conflicts=True)
+            self.result.villages_created += list(missing)
+        self.villages.update(found)
+        return self.villages
+
+    def _resolve_cells(self, pairs):
+        """{(sector name, cell name): cell id}, creating what is missing."""
+        sector_ids = self._resolve_sectors({sector for sector, _ in pairs})
+        wanted = {pair for pair in pairs if pair not in self.cells}
+        if wanted:
+            id_to_sector = {sector_id: name for name, sector_id in sector_ids.items()}
+            lookup = Cell.objects.filter(
+                sector_id__in={sector_ids[sector] for sector, _ in wanted}, name__in={cell for _, cell in wanted}
+            )
+            for cell_id, name, sector_id in lookup.values_list('id', 'name', 'sector_id'):
+                self.cells[(id_to_sector[sector_id], name)] = cell_id
+            missing = [pair for pair in wanted if pair not in self.cells]
+            if missing:
+                for cell in Cell.objects.bulk_create([Cell(name=cell, sector_id=sector_ids[sector]) for sector, cell in missing]):
+                    self.cells[(id_to_sector[cell.sector_id], cell.name)] = cell.pk
+        return self.cells
+
+    def _resolve_sectors(self, names):
+        wanted = names - self.sectors.keys()
+        if wanted:
+            Sector.objects.bulk_create([Sector(name=name) for name in wanted], ignore_conflicts=True)
+            self.sectors.update(Sector.objects.filter(name__in=wanted).values_list('name', 'id'))
+        return self.sectors
+
+    def _resolve_customers(self, rows):
+        """{row: Customer} — existing ones matched by phone, then by contract_no/import key."""
+        for row in rows:
+            if not row.contract_no:
+                row.contract_no = import_key(row)
+        phones = {row.phone for row in rows if row.phone}
+        keys = {row.contract_no for row in rows}
+        existing = Customer.objects.filter(Q(phone__in=phones) | Q(contract_no__in=keys)).values(
+            'id', 'phone', 'contract_no', 'payment_account', 'user_id',
+        )
+        by_phone, by_key = {}, {}
+        for customer in existing:
+            by_phone[customer['phone']] = customer
+            by_key[customer['contract_no']] = customer
+
+        self.reserve_phones(phones)
+        customers, seen = {}, {}
+        for row in rows:
+            match = by_phone.get(row.phone) if row.phone else None
+            match = match or by_key.get(row.contract_no)
+            identities = [match['id'] if match else row.contract_no] + ([row.phone] if row.phone else [])
+            duplicate = next((seen[identity] for identity in identities if identity in seen), None)
+            if duplicate:
+                self.reject(row.number, row.raw, f"Duplicate of row {duplicate}")
+                continue
+            seen.update(dict.fromkeys(identities, row.number))
+
+            if match is None:
+                if not row.phone:
+                    row.phone = self.placeholder_phone()
+                    row.used_default_phone = True
+                    seen[row.phone] = row.number
+                payment_account, user_id = f"HP{secrets.token_hex(6).upper()}", None
+            else:
+                row.existing = True
+                row.contract_no = match['contract_no']
+                row.phone = row.phone or match['phone']  # Keep the placeholder given on the first run
+                payment_account, user_id = match['payment_account'], match['user_id']
+            if not row.email:
+                row.email = f"customer{row.phone}@example.com"
+                row.used_default_email = True
+            # Existing customers hit the contract_no conflict and only get UPDATE_FIELDS written
+            customers[row] = Customer(contract_no=row.contract_no, payment_account=payment_account, user_id=user_id)
+        return customers
+
+    def _resolve_users(self, rows, customers):
+        """{phone: user id}, creating users (and their profile records) for new phones."""
+        phones = {row.phone for row in rows}
+        users = {}
+        for user_id, username, phone in CustomUser.objects.filter(Q(username__in=phones) | Q(phone__in=phones)).values_list('id', 'username', 'phone'):
+            users.setdefault(phone if phone in phones else username, user_id)
+
+        needed = [row for row in rows if row.phone not in users and not customers[row].user_id]
+        if needed:
+            created = CustomUser.objects.bulk_create([
+                CustomUser(
+                    username=row.phone,
+                    phone=row.phone,
+                    email=row.email,
+                    first_name=row.name.split(maxsplit=1)[0],
+                    last_name=row.name.split(maxsplit=1)[1] if len(row.name.split(maxsplit=1)) > 1 else 'Customer',
+                    role='customer',
+                    password=make_password(None),
+                    is_active=True,
+                )
+                for row in needed
+            ])
+            self._create_user_records(created)
+            users.update({user.phone: user.pk for user in created})
+        return users
+
+    def _create_user_records(self, users):
+        """What the CustomUser post_save handlers create for a new customer user."""
+        from erp.models import ERPDashboard
+
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in users], ignore_conflicts=True)
+        ERPDashboard.objects.bulk_create([ERPDashboard(user=user) for user in users], ignore_conflicts=True)
+        group, _ = Group.objects.get_or_create(name='Customer')
+        Membership = CustomUser.groups.through
+        Membership.objects.bulk_create(
+            [Membership(customuser_id=user.pk, group_id=group.pk) for user in users], ignore_conflicts=True,
+        )
+
+    def _book_opening_balances(self, created):
+        entries = []
+        for row, customer in created:
+            debit = row.monthly_fee * row.unpaid_months
+            credit = row.monthly_fee * row.overpaid_months
+            if debit or credit:
+                entries.append(LedgerEntry(
+                    customer_id=customer.pk,
+                    description="Opening balance (import)",
+                    debit=debit,
+                    credit=credit,
+                    balance=credit - debit,
+                ))
+        LedgerEntry.objects.bulk_create(entries)
+
+    def _queue_refreshes(self):
+        from .rollups import schedule_refresh
+        from .village_metrics import request_refresh
+
+        schedule_refresh(village_ids=sorted(self.touched_villages))
+        transaction.on_commit(request_refresh)
+
+
+def import_customers(path, rejects_path=None, chunk_size=CHUNK_SIZE, log=None):
+    """Import the CSV at `path`, writing rejected rows to `rejects_path`. Returns an ImportResult."""
+    started = timezone.now()
+    with open(path, newline="", encoding="utf-8") as source:
+        if rejects_path is None:
+            result = CustomerImporter(chunk_size=chunk_size, log=log).run(source)
+        else:
+            with open(rejects_path, "w", newline="", encoding="utf-8") as rejects:
+                result = CustomerImporter(csv.writer(rejects), chunk_size=chunk_size, log=log).run(source)
+    result.duration = (timezone.now() - started).total_seconds()
+    return result
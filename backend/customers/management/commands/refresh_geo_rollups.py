@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from customers.rollups import refresh_cells
+
+
+class Command(BaseCommand):
+    help = "Recompute every Cell and Sector rollup (run once after migrating, then nightly by Celery)"
+
+    def handle(self, *args, **kwargs):
+        refreshed = refresh_cells()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed rollups of {refreshed} cells'))
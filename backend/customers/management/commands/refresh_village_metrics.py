@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from customers.village_metrics import refresh_village_metrics
+
+
+class Command(BaseCommand):
+    help = "Recompute village collections, growth and ranks and publish a new metrics snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=int, help="Target month to rank (default: current)")
+        parser.add_argument('--year', type=int, help="Target year to rank (default: current)")
+
+    def handle(self, *args, **options):
+        version = refresh_village_metrics(options['month'], options['year'])
+        self.stdout.write(self.style.SUCCESS(f'Village metrics snapshot v{version} published'))
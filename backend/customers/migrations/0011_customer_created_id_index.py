@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0010_alter_village_target_month'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-created_at', '-id'], name='customers_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0011_customer_created_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CellRollup',
+            fields=[
+                ('village_count', models.PositiveIntegerField(default=0)),
+                ('customer_count', models.PositiveIntegerField(default=0)),
+                ('monthly_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_balance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('risk_total', models.FloatField(default=0.0)),
+                ('avg_risk', models.FloatField(default=0.0)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cell', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='customers.cell')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SectorRollup',
+            fields=[
+                ('village_count', models.PositiveIntegerField(default=0)),
+                ('customer_count', models.PositiveIntegerField(default=0)),
+                ('monthly_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_balance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('risk_total', models.FloatField(default=0.0)),
+                ('avg_risk', models.FloatField(default=0.0)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sector', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='customers.sector')),
+                ('cell_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -4,7 +4,8 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator, MinValueValidator
 from django.utils import timezone
-from django.db.models import Sum, Q
+from django.db.models import Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Trim
 from django.contrib.postgres.fields import ArrayField
 import uuid
 
@@ -236,37 +237,11 @@ class Village(TimestampedModel):
     @classmethod
     def update_all_ranks(cls, month=None, year=None):
         """
-        Run monthly (via cron) to rank all villages
+        Recompute every village's metrics and rank the villages targeting month/year
+        (customers.village_metrics; scheduled as customers.refresh_village_metrics)
         """
-        if month is None:
-            month = timezone.now().month
-        if year is None:
-            year = timezone.now().year
-
-        # Get all villages with targets for this month
-        villages = cls.objects.filter(
-            target_month=month,
-            target_year=year,
-            monthly_revenue_target__gt=0  # Only ranked if target set
-        )
-
-        # Force update performance
-        for village in villages:
-            village.update_performance_and_rank()
-
-        # Reload with fresh data
-        villages = villages.order_by('-overall_target_percentage')
-
-        # Assign ranks
-        for rank, village in enumerate(villages, start=1):
-            village.performance_rank = rank
-            village.save(update_fields=['performance_rank'])
-
-        # Clear rank for villages without target
-        cls.objects.filter(
-            Q(target_month=month, target_year=year) &
-            Q(monthly_revenue_target=0)
-        ).update(performance_rank=None)
+        from .village_metrics import refresh_village_metrics
+        refresh_village_metrics(month, year)
 
     def __str__(self):
         collectors_str = ", ".join(c.username for c in self.collectors.all()) or "Unassigned"
@@ -296,7 +271,63 @@ class Village(TimestampedModel):
             return round(sum(risk_scores) / len(risk_scores), 2)
         return 0.0
 
+# --- Geographic rollups (customers.rollups) ---
+class GeoRollup(models.Model):
+    """Stored customer totals of one geographic unit, refreshed by customers.rollups"""
+    village_count = models.PositiveIntegerField(default=0)
+    customer_count = models.PositiveIntegerField(default=0)
+    monthly_revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    risk_total = models.FloatField(default=0.0)  # Sum of risk_score, so parents can average exactly
+    avg_risk = models.FloatField(default=0.0)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        abstract = True
+
+
+class CellRollup(GeoRollup):
+    cell = models.OneToOneField(Cell, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+
+    def __str__(self): return f"Rollup of {self.cell_id}"
+
+
+class SectorRollup(GeoRollup):
+    sector = models.OneToOneField(Sector, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    cell_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self): return f"Rollup of {self.sector_id}"
+
+
 # --- Customer ---
+class CustomerQuerySet(models.QuerySet):
+    def with_account_summary(self):
+        """
+        Annotate the list columns as correlated subqueries, so a page of customers is one
+        statement: balance_due, paid_total, oldest_unpaid_due, last_paid_at and the village's
+        first collector (collector_name, collector_phone). Same rules as the properties below;
+        balance and total_paid themselves are properties, so the annotations can't reuse their names.
+        """
+        from payments.models import Invoice, Payment
+
+        unpaid = Invoice.objects.filter(customer=OuterRef('pk'), status='Unpaid').order_by().values('customer')
+        completed = Payment.objects.filter(customer=OuterRef('pk'), status='Completed').order_by().values('customer')
+        successful = Payment.objects.filter(customer=OuterRef('pk'), status='Successful').order_by().values('customer')
+        collector = User.objects.filter(assigned_villages=OuterRef('village_id')).order_by('id')
+        money = models.DecimalField(max_digits=14, decimal_places=2)
+
+        return self.annotate(
+            balance_due=Coalesce(Subquery(unpaid.annotate(total=Sum('amount')).values('total')), Value(0), output_field=money),
+            paid_total=Coalesce(Subquery(completed.annotate(total=Sum('amount')).values('total')), Value(0), output_field=money),
+            oldest_unpaid_due=Subquery(unpaid.annotate(oldest=Min('due_date')).values('oldest')),
+            last_paid_at=Subquery(successful.annotate(last=Max('completed_at')).values('last')),
+            collector_name=Subquery(collector.annotate(
+                full_name=Trim(Concat('first_name', Value(' '), 'last_name'))
+            ).values('full_name')[:1]),
+            collector_phone=Subquery(collector.values('phone')[:1]),
+        )
+
+
 class Customer(TimestampedModel):
     GENDER_CHOICES = (('M', 'Male'), ('F', 'Female'), ('O', 'Other'))
     TYPE_CHOICES = (('Individual', 'Individual'), ('Corporate', 'Corporate'))
@@ -326,12 +357,15 @@ class Customer(TimestampedModel):
     notes = models.TextField(blank=True)
     device_token = models.CharField(max_length=255, null=True, blank=True)
 
+    objects = CustomerQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=['phone']),
             models.Index(fields=['payment_account']),
             models.Index(fields=['village']),
             models.Index(fields=['status']),
+            models.Index(fields=['-created_at', '-id'], name='customers_created_id_idx'),  # List cursor
         ]
 
     def __str__(self):
@@ -368,13 +402,10 @@ class Customer(TimestampedModel):
         return max(0, days_since - 30)
 
     def update_risk_score(self):
-        score = 0
-        if self.days_delinquent > 90: score += 70
-        elif self.days_delinquent > 60: score += 50
-        elif self.days_delinquent > 30: score += 30
-        if self.balance > self.monthly_fee * 3: score += 30
-        self.risk_score = min(100, score)
-        self.save(update_fields=['risk_score'])
+        """Rescore this customer through the batch pipeline (ml.churn_model)"""
+        from ml.churn_model import score_customers
+        score_customers([self.pk])
+        self.refresh_from_db(fields=['risk_score'])
 
 # --- Smart Ledger (Replace old outstanding) ---
 class LedgerEntry(TimestampedModel):
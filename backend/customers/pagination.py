@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 class CustomerPagination(PageNumberPagination):
@@ -17,3 +17,14 @@ class CustomerPagination(PageNumberPagination):
             'current_page': self.page.number,
             'results': data
         })
+
+
+class CustomerCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (created_at, id), newest first: each page is a WHERE on the
+    cursor position instead of an OFFSET, and no COUNT(*) is run.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
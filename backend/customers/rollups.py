@@ -0,0 +1,137 @@
+# customers/rollups.py — Geographic rollups
+"""
+Customer totals per Cell and Sector, stored in CellRollup / SectorRollup.
+
+- refresh_cells() computes village/customer counts, monthly revenue, unpaid balance and
+  risk for a set of cells (or all of them) in one grouped query over Cell → Village →
+  Customer, and upserts the rows. The affected sectors are then re-summed from the cell
+  rollups in one grouped query.
+- Invoice, Payment, Customer, Village and Cell changes call schedule_refresh() (see
+  customers.signals); everything touched in one transaction is refreshed by a single
+  customers.refresh_geo_rollups task after commit. A nightly full refresh catches what
+  bypasses signals (bulk updates such as the risk-score batch, moved customers).
+- Listing cells or sectors is then one read of the rollup table joined on primary key.
+"""
+from django.db import transaction
+from django.db.models import Count, DecimalField, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from high_prosper.on_commit import on_commit_once
+from .models import Cell, CellRollup, Sector, SectorRollup
+
+MONEY = DecimalField(max_digits=15, decimal_places=2)
+ROLLUP_FIELDS = ['village_count', 'customer_count', 'monthly_revenue', 'total_balance', 'risk_total', 'avg_risk', 'refreshed_at']
+
+
+def _avg(risk_total, customer_count):
+    return round(risk_total / customer_count, 2) if customer_count else 0.0
+
+
+def refresh_cells(cell_ids=None, sector_ids=()):
+    """
+    Recompute the rollups of `cell_ids` (default: every cell) and of their sectors, plus
+    `sector_ids` (e.g. the sector of a deleted cell). Returns the number of cells refreshed.
+    """
+    from payments.models import Invoice
+
+    cells = Cell.objects.all() if cell_ids is None else Cell.objects.filter(id__in=cell_ids)
+    # Same rule as Customer.balance, summed per cell
+    unpaid = (
+        Invoice.objects.filter(customer__village__cell=OuterRef('pk'), status='Unpaid')
+        .order_by().values('customer__village__cell').annotate(total=Sum('amount')).values('total')
+    )
+    rows = cells.order_by().values('id', 'sector_id').annotate(
+        village_count=Count('villages', distinct=True),
+        customer_count=Count('villages__residents'),
+        monthly_revenue=Coalesce(Sum('villages__residents__monthly_fee'), Value(0), output_field=MONEY),
+        risk_total=Coalesce(Sum('villages__residents__risk_score'), Value(0.0), output_field=FloatField()),
+        total_balance=Coalesce(Subquery(unpaid), Value(0), output_field=MONEY),
+    )
+
+    now = timezone.now()
+    rollups, sector_ids = [], set(sector_ids)
+    for row in rows:
+        sector_ids.add(row['sector_id'])
+        rollups.append(CellRollup(
+            cell_id=row['id'],
+            village_count=row['village_count'],
+            customer_count=row['customer_count'],
+            monthly_revenue=row['monthly_revenue'],
+            total_balance=row['total_balance'],
+            risk_total=row['risk_total'],
+            avg_risk=_avg(row['risk_total'], row['customer_count']),
+            refreshed_at=now,
+        ))
+
+    with transaction.atomic():
+        CellRollup.objects.bulk_create(
+            rollups, update_conflicts=True, unique_fields=['cell'], update_fields=ROLLUP_FIELDS, batch_size=1000,
+        )
+        refresh_sectors(None if cell_ids is None else sector_ids)
+    return len(rollups)
+
+
+def refresh_sectors(sector_ids=None):
+    """Re-sum the sector rollups from the stored cell rollups."""
+    sectors = Sector.objects.all() if sector_ids is None else Sector.objects.filter(id__in=sector_ids)
+    rows = sectors.order_by().values('id').annotate(
+        cell_count=Count('cells'),
+        village_count=Coalesce(Sum('cells__rollup__village_count'), 0),
+        customer_count=Coalesce(Sum('cells__rollup__customer_count'), 0),
+        monthly_revenue=Coalesce(Sum('cells__rollup__monthly_revenue'), Value(0), output_field=MONEY),
+        total_balance=Coalesce(Sum('cells__rollup__total_balance'), Value(0), output_field=MONEY),
+        risk_total=Coalesce(Sum('cells__rollup__risk_total'), Value(0.0), output_field=FloatField()),
+    )
+
+    now = timezone.now()
+    SectorRollup.objects.bulk_create(
+        [SectorRollup(
+            sector_id=row['id'],
+            cell_count=row['cell_count'],
+            village_count=row['village_count'],
+            customer_count=row['customer_count'],
+            monthly_revenue=row['monthly_revenue'],
+            total_balance=row['total_balance'],
+            risk_total=row['risk_total'],
+            avg_risk=_avg(row['risk_total'], row['customer_count']),
+            refreshed_at=now,
+        ) for row in rows],
+        update_conflicts=True,
+        unique_fields=['sector'],
+        update_fields=ROLLUP_FIELDS + ['cell_count'],
+        batch_size=1000,
+    )
+
+
+def cells_for(cell_ids=(), village_ids=(), customer_ids=()):
+    """Ids of the cells containing any of the given cells, villages or customers (one query)."""
+    return set(
+        Cell.objects.filter(
+            Q(id__in=cell_ids) | Q(villages__id__in=village_ids) | Q(villages__residents__id__in=customer_ids)
+        ).values_list('id', flat=True).distinct()
+    )
+
+
+# ─── Incremental refresh ────────────────────────────────────────────────────
+
+ROLLUP_IDS = ('sector_ids', 'cell_ids', 'village_ids', 'customer_ids')
+
+
+def _refresh(pending):
+    """on_commit_once handler: `pending` = {(kwarg, id)} touched in one transaction"""
+    from .tasks import refresh_geo_rollups
+
+    refresh_geo_rollups.delay(**{
+        key: sorted(value for kind, value in pending if kind == key) for key in ROLLUP_IDS
+    })
+
+
+def schedule_refresh(**ids):
+    """
+    Refresh the rollups covering `sector_ids`, `cell_ids`, `village_ids` and/or
+    `customer_ids` after the current transaction commits.
+    """
+    on_commit_once('customers.refresh_geo_rollups', _refresh, (
+        (key, value) for key, values in ids.items() for value in values if value is not None
+    ))
@@ -140,9 +140,7 @@ class SectorSerializer(serializers.ModelSerializer):
     monthly_revenue = serializers.DecimalField(
         max_digits=15, decimal_places=2, read_only=True
     )
-    total_balance = serializers.DecimalField(
-        max_digits=15, decimal_places=2, read_only=True
-    )
+    total_balance = serializers.FloatField(read_only=True)
     avg_risk = serializers.FloatField(read_only=True)
 
     # Leadership
@@ -217,7 +215,7 @@ class CellSerializer(serializers.ModelSerializer):
     village_count = serializers.IntegerField(read_only=True)
     customer_count = serializers.IntegerField(read_only=True)
     monthly_revenue = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
-    total_balance = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+    total_balance = serializers.FloatField(read_only=True)
     avg_risk = serializers.FloatField(read_only=True)
 
     class Meta:
@@ -406,17 +404,34 @@ class VillageSerializer(serializers.ModelSerializer):
         instance.update_collected_and_growth()
         return instance
 
+class VillageListSerializer(VillageSerializer):
+    """
+    Village row of the metrics snapshot (customers.village_metrics) — counts, balance and
+    risk are supplied by the refresher's grouped queries instead of per-village properties
+    """
+    customer_count = None
+    total_balance = None
+    avg_risk = None
+
+    class Meta(VillageSerializer.Meta):
+        fields = [f for f in VillageSerializer.Meta.fields if f not in ('customer_count', 'total_balance', 'avg_risk')]
+
 # ========================
 # CUSTOMER SERIALIZERS — CORE
 # ========================
 class CustomerListSerializer(serializers.ModelSerializer):
+    """
+    List row read entirely from Customer.objects.with_account_summary() annotations
+    (plus select_related village) — no query per customer.
+    """
     village_name = serializers.CharField(source='village.name', read_only=True, allow_null=True)
-    village_id = serializers.IntegerField(source='village.id', read_only=True, allow_null=True)
-    collector_name = serializers.CharField(source='collector.get_full_name', read_only=True, allow_null=True)
-    collector_phone = serializers.CharField(source='collector.phone', read_only=True, allow_null=True)
+    village_id = serializers.IntegerField(read_only=True, allow_null=True)
+    collector_name = serializers.CharField(read_only=True, allow_null=True)
+    collector_phone = serializers.CharField(read_only=True, allow_null=True)
 
-    balance = serializers.SerializerMethodField()
-    total_paid = serializers.SerializerMethodField()
+    balance = serializers.FloatField(source='balance_due', read_only=True)
+    total_paid = serializers.FloatField(source='paid_total', read_only=True)
+    oldest_unpaid_due = serializers.DateField(read_only=True, allow_null=True)
     days_delinquent = serializers.SerializerMethodField()
     balance_status = serializers.SerializerMethodField()
     risk_level = serializers.SerializerMethodField()
@@ -427,24 +442,21 @@ class CustomerListSerializer(serializers.ModelSerializer):
             'id', 'uid', 'name', 'phone', 'email', 'payment_account',
             'village_name', 'village_id', 'collector_name', 'collector_phone',
             'monthly_fee', 'connection_date', 'status',
-            'balance', 'total_paid', 'days_delinquent',
+            'balance', 'total_paid', 'oldest_unpaid_due', 'days_delinquent',
             'balance_status', 'risk_score', 'risk_level', 'contract_no'
         ]
 
-    # All methods — CORRECT
-    def get_balance(self, obj):
-        return float(obj.balance or 0)
-
-    def get_total_paid(self, obj):
-        return float(obj.total_paid or 0)
-
     def get_days_delinquent(self, obj):
-        return obj.days_delinquent
+        # Customer.days_delinquent, from the last_paid_at annotation
+        today = timezone.now().date()
+        if not obj.last_paid_at:
+            return (today - (obj.connection_date or today)).days
+        return max(0, (today - obj.last_paid_at.date()).days - 30)
 
     def get_balance_status(self, obj):
-        if obj.balance > 0:
+        if obj.balance_due > 0:
             return "Owes"
-        elif obj.balance < 0:
+        elif obj.balance_due < 0:
             return "Overpaid"
         return "Up to date"
 
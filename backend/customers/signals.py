@@ -5,22 +5,24 @@ from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
-from django.core.cache import cache
+from django.db import transaction
 
 from users.models import CustomUser
 from notifications.signals import notify
 from notifications.utils import send_notification_with_fallback
+from payments.models import Invoice, Payment
 from .models import Sector, Cell, Village, Customer
+from .rollups import schedule_refresh
+from .village_metrics import request_refresh
 from .utils import send_sms
 from high_prosper import settings
 from datetime import datetime
 timestamp = datetime.now().strftime("%d %b %Y")
 
-# Cache invalidation
+# Village metrics snapshot (customers.village_metrics): queue a refresh, serve stale meanwhile
 def invalidate_village_cache(village):
     if village:
-        cache.delete_pattern(f"village_metrics_{village.id}_*")
-        cache.delete_pattern("village_metrics_list_*")
+        transaction.on_commit(request_refresh)
 
 # Get recipients based on role and object scope
 def get_recipients_for_object(obj):
@@ -197,4 +199,39 @@ def customer_deleted(sender, instance, **kwargs):
     village_name = instance.village.name if instance.village else "Unassigned"
     message = f"Customer removed:\n{instance.name} ({instance.phone})\nFrom village: {village_name}"
     send_event_notification(instance, "deleted", title, message)
-    invalidate_village_cache(instance.village)
\ No newline at end of file
+    invalidate_village_cache(instance.village)
+
+# === GEOGRAPHIC ROLLUPS (customers.rollups) ===
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=Payment)
+def billing_changed_refresh_rollups(sender, instance, **kwargs):
+    if instance.customer_id:
+        schedule_refresh(customer_ids=[instance.customer_id])
+
+@receiver(post_save, sender=Customer)
+def customer_saved_refresh_rollups(sender, instance, **kwargs):
+    schedule_refresh(customer_ids=[instance.pk])
+
+@receiver(post_delete, sender=Customer)
+def customer_deleted_refresh_rollups(sender, instance, **kwargs):
+    schedule_refresh(village_ids=[instance.village_id])
+
+@receiver(post_save, sender=Village)
+def village_saved_refresh_rollups(sender, instance, **kwargs):
+    schedule_refresh(village_ids=[instance.pk])
+
+@receiver(post_delete, sender=Village)
+def village_deleted_refresh_rollups(sender, instance, **kwargs):
+    schedule_refresh(cell_ids=[instance.cell_id])
+
+@receiver(post_save, sender=Cell)
+def cell_saved_refresh_rollups(sender, instance, **kwargs):
+    schedule_refresh(cell_ids=[instance.pk])
+
+@receiver(post_delete, sender=Cell)
+def cell_deleted_refresh_rollups(sender, instance, **kwargs):
+    schedule_refresh(sector_ids=[instance.sector_id])
+
+@receiver(post_save, sender=Sector)
+def sector_saved_refresh_rollups(sender, instance, **kwargs):
+    schedule_refresh(sector_ids=[instance.pk])
@@ -0,0 +1,49 @@
+# customers/tasks.py
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='customers.refresh_risk_scores', time_limit=60 * 60, soft_time_limit=50 * 60)
+def refresh_risk_scores():
+    """Nightly batch rescoring of every customer (ml.churn_model)"""
+    from ml.churn_model import score_customers
+
+    result = score_customers()
+    logger.info(f"Risk scores refreshed: {result['scored']} customers (model {result['model_version'] or 'rules'})")
+    return result
+
+
+@shared_task(name='customers.train_churn_model', time_limit=60 * 60, soft_time_limit=50 * 60)
+def train_churn_model():
+    """Train and store a new churn model version"""
+    from ml.churn_model import train_churn_model as train
+
+    meta = train()
+    logger.info(f"Churn model {meta['version']} trained on {meta['samples']} customers: {meta['metrics']}")
+    return meta
+
+
+@shared_task(name='customers.refresh_geo_rollups', time_limit=30 * 60, soft_time_limit=25 * 60)
+def refresh_geo_rollups(sector_ids=None, cell_ids=None, village_ids=None, customer_ids=None):
+    """Refresh the Cell/Sector rollups covering the given ids; everything when none are given"""
+    from .rollups import cells_for, refresh_cells
+
+    if not any([sector_ids, cell_ids, village_ids, customer_ids]):
+        refreshed = refresh_cells()
+    else:
+        cells = cells_for(cell_ids or (), village_ids or (), customer_ids or ())
+        refreshed = refresh_cells(cells, sector_ids or ())
+    logger.info(f"Geographic rollups refreshed: {refreshed} cells")
+    return refreshed
+
+
+@shared_task(name='customers.refresh_village_metrics', time_limit=10 * 60, soft_time_limit=8 * 60)
+def refresh_village_metrics():
+    """Recompute village collections, growth and ranks and publish a new metrics snapshot"""
+    from .village_metrics import refresh_village_metrics as refresh
+
+    version = refresh()
+    logger.info(f"Village metrics snapshot v{version} published")
+    return version
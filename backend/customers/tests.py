@@ -0,0 +1,128 @@
+import csv
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from users.models import CustomUser
+from payments.models import Invoice
+from .importer import PLACEHOLDER_START, import_customers
+from .models import Sector, Cell, Village, Customer
+
+
+class CustomerListQueriesTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="admin", password="password123", role="admin"
+        )
+        self.collector = CustomUser.objects.create_user(
+            username="collector", password="password123", role="collector",
+            first_name="Jean", last_name="Bosco", phone="250788000001"
+        )
+        sector = Sector.objects.bulk_create([Sector(name="Kimironko")])[0]
+        cell = Cell.objects.bulk_create([Cell(name="Bibare", sector=sector)])[0]
+        self.village = Village.objects.bulk_create([Village(name="Ineza", cell=cell)])[0]
+        self.village.collectors.add(self.collector)
+        self.created = 0
+        self.client.force_authenticate(user=self.user)
+
+    def add_customers(self, count):
+        customers = Customer.objects.bulk_create([
+            Customer(
+                name=f"Customer {n}", phone=f"2507{n:08d}", contract_no=f"C-{n}",
+                payment_account=f"PA-{n}", monthly_fee=1000, village=self.village
+            )
+            for n in range(self.created, self.created + count)
+        ])
+        Invoice.objects.bulk_create([
+            Invoice(customer=customer, amount=1000, due_date=date(2026, month, 5),
+                    status='Unpaid', period_month=month, period_year=2026)
+            for customer in customers for month in (1, 2)
+        ])
+        self.created += count
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("customers-list"), {"page_size": 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 100)
+        return len(queries), response.json()
+
+    def test_page_query_count_is_constant(self):
+        self.add_customers(100)
+        small, _ = self.list_queries()
+
+        self.add_customers(900)
+        large, data = self.list_queries()
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 2)
+        row = data["results"][0]
+        self.assertEqual(Decimal(str(row["balance"])), Decimal("2000"))
+        self.assertEqual(row["oldest_unpaid_due"], "2026-01-05")
+        self.assertEqual(row["collector_name"], "Jean Bosco")
+        self.assertEqual(row["collector_phone"], "250788000001")
+
+    def test_cursor_walks_every_customer_once(self):
+        self.add_customers(250)
+        url, seen = reverse("customers-list") + "?page_size=100", []
+        while url:
+            data = self.client.get(url).json()
+            seen += [row["id"] for row in data["results"]]
+            url = data["next"]
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(len(set(seen)), 250)
+
+
+class CustomerImportTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, "customers.csv")
+        self.rejects_path = os.path.join(self.directory, "rejects.csv")
+        rows = [
+            {"name": "Alice Uwase", "phone": "", "village": "Ineza", "monthly_fee": "1000"},
+            {"name": "", "phone": "0788000002", "village": "Ineza", "monthly_fee": "1000"},
+            # Real number equal to the first placeholder, in the next chunk
+            {"name": "Bob Mugisha", "phone": f"0{str(PLACEHOLDER_START)[3:]}", "village": "Ineza", "monthly_fee": "1000"},
+            {"name": "Claire Ishimwe", "phone": "12345", "village": "Ineza", "monthly_fee": "1000"},
+        ]
+        with open(self.path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=["name", "phone", "village", "monthly_fee"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def run_import(self):
+        result = import_customers(self.path, self.rejects_path, chunk_size=2)
+        with open(self.rejects_path, newline="", encoding="utf-8") as handle:
+            rejected_rows = [row[0] for row in list(csv.reader(handle))[1:]]
+        return result, rejected_rows
+
+    def test_placeholders_avoid_phones_of_the_file_and_reruns_update(self):
+        result, rejected_rows = self.run_import()
+
+        self.assertEqual((result.created, result.updated, result.rejected), (2, 0, 2))
+        self.assertEqual(rejected_rows, ["3", "5"])
+        alice = Customer.objects.get(name="Alice Uwase")
+        bob = Customer.objects.get(name="Bob Mugisha")
+        self.assertEqual(bob.phone, str(PLACEHOLDER_START))
+        self.assertTrue(alice.phone.startswith("250780"))
+        self.assertNotEqual(alice.phone, bob.phone)
+        self.assertEqual(CustomUser.objects.filter(role="customer").count(), 2)
+
+        result, rejected_rows = self.run_import()
+
+        self.assertEqual((result.created, result.updated, result.rejected), (0, 2, 2))
+        self.assertEqual(rejected_rows, ["3", "5"])
+        self.assertEqual(Customer.objects.count(), 2)
+        self.assertEqual(Customer.objects.get(name="Alice Uwase").phone, alice.phone)
+        self.assertEqual(Customer.objects.get(name="Bob Mugisha").pk, bob.pk)
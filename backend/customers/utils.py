@@ -1,15 +1,10 @@
 # utils/sms.py — HIGH PROSPER SMS ENGINE 2026
-import requests
-from django.conf import settings
+from notifications import sms
 
 def send_sms(phone_numbers: list[str], title: str, message: str, action_url: str = None, timestamp: str = None):
     """
     Professional SMS template
     """
-    if not settings.AFRICAS_TALKING_USERNAME or not settings.AFRICAS_TALKING_API_KEY:
-        print("SMS disabled: credentials missing")
-        return
-
     # Build clean message
     sms_body = f"High Prosper Alert\n\n{title}\n{message}"
     if action_url:
@@ -23,21 +18,10 @@ def send_sms(phone_numbers: list[str], title: str, message: str, action_url: str
     if len(sms_body) > 160:
         sms_body = sms_body[:157] + "..."
 
-    url = "https://api.africastalking.com/version1/messaging"
-    headers = {
-        "apiKey": settings.AFRICAS_TALKING_API_KEY,
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-    data = {
-        "username": settings.AFRICAS_TALKING_USERNAME,
-        "to": ",".join(phone_numbers),
-        "message": sms_body,
-        "from": settings.AFRICAS_TALKING_SENDER_ID or "HighProsper"
-    }
-
-    try:
-        response = requests.post(url, headers=headers, data=data)
-        response.raise_for_status()
+    # One gateway request per batch of recipients (notifications.sms)
+    summary = sms.send(phone_numbers, sms_body)
+    if summary['failed']:
+        print(f"SMS failed for {summary['failed']} of {len(phone_numbers)} recipients")
+    else:
         print(f"SMS sent to {phone_numbers}: {sms_body}")
-    except Exception as e:
-        print(f"SMS failed: {e}")
\ No newline at end of file
+    return summary
@@ -9,7 +9,8 @@ from django.contrib.auth.tokens import default_token_generator
 from django.core.cache import cache
 from django.core.mail import send_mail
 from django.db import transaction
-from django.db.models import Sum, Count, Q, Avg
+from django.db.models import Sum, Q, Avg, DecimalField, Value
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404, redirect
 from django.utils import timezone
 from django.utils.http import urlsafe_base64_encode
@@ -32,7 +33,9 @@ from .serializers import (
 from users.models import CustomUser, ChatMessage
 from payments.models import Invoice, Payment
 from payments.serializers import InvoiceSerializer, PaymentDetailSerializer
-from hr.services import MTNSMSService
+from notifications import sms
+from . import village_metrics
+from .pagination import CustomerCursorPagination
 from .permissions import IsAdminOrCollectorOrOwner
 from users.permissions import IsAdminOrManagerOrCEO, ServiceRequestPermission
 
@@ -41,6 +44,22 @@ User = get_user_model()
 
 ALLOWED_ROLES = ['admin', 'ceo', 'manager', 'collector']
 
+
+def with_rollup(queryset, cell_count=False):
+    """Annotate Cells or Sectors with their stored rollup columns (zero until first refreshed)"""
+    money = DecimalField(max_digits=15, decimal_places=2)
+    columns = {
+        'village_count': Coalesce('rollup__village_count', 0),
+        'customer_count': Coalesce('rollup__customer_count', 0),
+        'monthly_revenue': Coalesce('rollup__monthly_revenue', Value(0), output_field=money),
+        'total_balance': Coalesce('rollup__total_balance', Value(0), output_field=money),
+        'risk_total': Coalesce('rollup__risk_total', 0.0),
+        'avg_risk': Coalesce('rollup__avg_risk', 0.0),
+    }
+    if cell_count:
+        columns['cell_count'] = Coalesce('rollup__cell_count', 0)
+    return queryset.annotate(**columns)
+
 class SectorViewSet(viewsets.ModelViewSet):
     """
     Advanced Sector Management API — Vision 2026
@@ -54,94 +73,35 @@ class SectorViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """
-        Base queryset with basic counts — safe DB fields only
+        Sectors with their stored rollup (customers.rollups) — one indexed read
         """
-        return Sector.objects.annotate(
-            cell_count=Count('cells', distinct=True),
-            village_count=Count('cells__villages', distinct=True),
-            customer_count=Count('cells__villages__residents', distinct=True),
-            monthly_revenue=Sum('cells__villages__residents__monthly_fee')
-        ).prefetch_related('managers', 'supervisors').order_by('name')
+        return with_rollup(Sector.objects.all(), cell_count=True).prefetch_related('managers', 'supervisors').order_by('name')
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-
-        # Enhanced data with Python-calculated balance & risk
-        enhanced_data = []
-        for sector in queryset:
-            # Get all customers in this sector
-            customers = Customer.objects.filter(
-                village__cell__sector=sector
-            ).select_related('village')
-
-            total_balance = sum((c.balance or 0) for c in customers)
-            risk_scores = [c.risk_score for c in customers if c.risk_score is not None]
-            avg_risk = sum(risk_scores) / len(risk_scores) if risk_scores else 0.0
-
-            serializer = self.get_serializer(sector)
-            data = serializer.data
-            data.update({
-                'total_balance': float(total_balance),
-                'avg_risk': round(avg_risk, 2)
-            })
-            enhanced_data.append(data)
-
+        data = self.get_serializer(queryset, many=True).data
         return Response({
-            "count": queryset.count(),
-            "results": enhanced_data
+            "count": len(data),
+            "results": data
         })
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        customers = Customer.objects.filter(village__cell__sector=instance)
-
-        total_balance = sum((c.balance or 0) for c in customers)
-        risk_scores = [c.risk_score for c in customers if c.risk_score is not None]
-        avg_risk = sum(risk_scores) / len(risk_scores) if risk_scores else 0.0
-
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        data.update({
-            'total_balance': float(total_balance),
-            'avg_risk': round(avg_risk, 2)
-        })
-        return Response(data)
-
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Global sector analytics — matches customer_stats logic"""
-        sectors = Sector.objects.prefetch_related(
-            'cells__villages__residents', 'managers', 'supervisors'
-        )
+        """Global sector analytics — from the sector rollups"""
+        sectors = list(self.get_queryset())
+
+        total_customers = sum(sector.customer_count for sector in sectors)
+        total_risk = sum(sector.risk_total for sector in sectors)
 
-        total_customers = 0
-        total_revenue = 0
-        total_balance = 0
-        total_risk = 0
-        sector_count_with_customers = 0
-
-        sector_stats = []
-
-        for sector in sectors:
-            customers = Customer.objects.filter(village__cell__sector=sector)
-            count = customers.count()
-            if count > 0:
-                total_customers += count
-                total_revenue += sum(c.monthly_fee or 0 for c in customers)
-                total_balance += sum(c.balance or 0 for c in customers)
-                risk_scores = [c.risk_score for c in customers if c.risk_score is not None]
-                if risk_scores:
-                    total_risk += sum(risk_scores)
-                    sector_count_with_customers += 1
-
-            sector_stats.append({
+        sector_stats = [
+            {
                 "id": sector.id,
                 "name": sector.name,
                 "code": sector.code or "",
-                "customer_count": count,
-                "monthly_revenue": float(sum(c.monthly_fee or 0 for c in customers)),
-                "total_balance": float(sum(c.balance or 0 for c in customers)),
-                "avg_risk": round(sum(risk_scores)/len(risk_scores) if risk_scores else 0, 2),
+                "customer_count": sector.customer_count,
+                "monthly_revenue": float(sector.monthly_revenue),
+                "total_balance": float(sector.total_balance),
+                "avg_risk": sector.avg_risk,
                 "managers": [
                     {"id": m.id, "name": m.get_full_name() or m.username, "phone": m.phone or ""}
                     for m in sector.managers.all()
@@ -150,17 +110,17 @@ class SectorViewSet(viewsets.ModelViewSet):
                     {"id": s.id, "name": s.get_full_name() or s.username, "phone": s.phone or ""}
                     for s in sector.supervisors.all()
                 ]
-            })
-
-        avg_risk_global = (total_risk / total_customers) if total_customers > 0 else 0.0
+            }
+            for sector in sectors
+        ]
 
         return Response({
-            "total_sectors": sectors.count(),
+            "total_sectors": len(sectors),
             "total_customers": total_customers,
-            "total_monthly_revenue": float(total_revenue),
-            "total_outstanding_balance": float(total_balance),
-            "average_risk_score": round(avg_risk_global, 2),
-            "active_sectors": sector_count_with_customers,
+            "total_monthly_revenue": float(sum(sector.monthly_revenue for sector in sectors)),
+            "total_outstanding_balance": float(sum(sector.total_balance for sector in sectors)),
+            "average_risk_score": round(total_risk / total_customers, 2) if total_customers else 0.0,
+            "active_sectors": sum(1 for sector in sectors if sector.customer_count),
             "sector_details": sector_stats
         })
 
@@ -305,54 +265,18 @@ class CellViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """
-        Base queryset with basic counts
+        Cells with their stored rollup (customers.rollups) — one indexed read
         """
-        return Cell.objects.annotate(
-            village_count=Count('villages', distinct=True),
-            customer_count=Count('villages__residents', distinct=True),
-            monthly_revenue=Sum('villages__residents__monthly_fee')
-        ).select_related('sector')
+        return with_rollup(Cell.objects.select_related('sector')).order_by('sector__name', 'name')
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-
-        # Add calculated balance & risk in Python (safe)
-        enhanced_data = []
-        for cell in queryset:
-            customers = Customer.objects.filter(village__cell=cell)
-            total_balance = sum((c.balance or 0) for c in customers)
-            risk_scores = [c.risk_score for c in customers if c.risk_score is not None]
-            avg_risk = sum(risk_scores) / len(risk_scores) if risk_scores else 0.0
-
-            serializer = self.get_serializer(cell)
-            data = serializer.data
-            data.update({
-                'total_balance': float(total_balance),
-                'avg_risk': round(avg_risk, 2)
-            })
-            enhanced_data.append(data)
-
+        data = self.get_serializer(queryset, many=True).data
         return Response({
-            "count": queryset.count(),
-            "results": enhanced_data
+            "count": len(data),
+            "results": data
         })
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        customers = Customer.objects.filter(village__cell=instance)
-
-        total_balance = sum((c.balance or 0) for c in customers)
-        risk_scores = [c.risk_score for c in customers if c.risk_score is not None]
-        avg_risk = sum(risk_scores) / len(risk_scores) if risk_scores else 0.0
-
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        data.update({
-            'total_balance': float(total_balance),
-            'avg_risk': round(avg_risk, 2)
-        })
-        return Response(data)
-
     @action(detail=True, methods=['get'])
     def villages(self, request, pk=None):
         """Get all villages in this cell with analytics"""
@@ -470,7 +394,7 @@ def send_phone_otp(request):
         otp = random.randint(100000, 999999)
         cache.set(f"otp_{phone}", otp, timeout=600)
 
-        MTNSMSService.send_sms(phone, f"High Prosper OTP: {otp}. Valid 10 mins.")
+        sms.send_sms(phone, f"High Prosper OTP: {otp}. Valid 10 mins.")
         return Response({"detail": "OTP sent"})
     except User.DoesNotExist:
         return Response({"detail": "Phone not registered"}, status=404)
@@ -509,15 +433,18 @@ def verify_phone_otp(request):
 class CustomerViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsAdminOrCollectorOrOwner]
     serializer_class = CustomerSerializer
+    pagination_class = CustomerCursorPagination
     queryset = Customer.objects.select_related('village__cell__sector', 'user').prefetch_related('village__collectors')
 
     def get_queryset(self):
         user = self.request.user
         role = getattr(user, 'role', '').lower()
 
-        qs = super().get_queryset()
-
-        print(f"[DEBUG] User: {user.username} | Role: {role} | Superuser: {user.is_superuser} | Count: {qs.count()}")
+        if self.action in ('list', 'search'):
+            # CustomerListSerializer reads annotations only
+            qs = Customer.objects.select_related('village').with_account_summary()
+        else:
+            qs = super().get_queryset()
 
         if user.is_superuser or role in ['admin', 'ceo', 'manager']:
             return qs
@@ -529,16 +456,9 @@ class CustomerViewSet(viewsets.ModelViewSet):
 
     def get_serializer_class(self):
         if self.action == 'list':
-            print("[DEBUG] Using CustomerListSerializer for list")
             return CustomerListSerializer
         return CustomerSerializer
 
-    def list(self, request, *args, **kwargs):
-        print("[DEBUG] List action — forcing CustomerListSerializer")
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = CustomerListSerializer(queryset, many=True)
-        return Response(serializer.data)
-
     @action(detail=False, methods=['post'], url_path='register')
     def register(self, request):
         """Admin/Collector: Register new customer — NO PASSWORD NEEDED"""
@@ -676,150 +596,39 @@ class VillageViewSet(viewsets.ModelViewSet):
     Advanced Village Management API — Vision 2026
     - Full CRUD
     - Dual Targets: Revenue + New Customers (stored on Village)
-    - Real-time auto-calculated metrics
+    - Metrics recomputed by the scheduled refresher (customers.village_metrics);
+      list/retrieve only read its cached snapshot, stale-while-revalidate
     - GPS coordinates for Google Maps
-    - Smart Redis caching for performance
     - Only admin, CEO, manager
     """
     queryset = Village.objects.select_related('cell__sector').prefetch_related('collectors', 'residents')
     serializer_class = VillageSerializer
     permission_classes = [IsAuthenticated, IsAdminOrManagerOrCEO]
 
-    # Cache TTL (seconds) — override in settings.py if needed
-    CACHE_TTL = getattr(settings, 'VILLAGE_METRICS_CACHE_TTL', 300)  # 5 minutes default
-
     def get_queryset(self):
         return Village.objects.select_related('cell__sector').prefetch_related(
             'collectors', 'residents'
         ).order_by('cell__sector__name', 'name')
 
-    def _get_cache_key(self, suffix=""):
-        """Generate cache key with date and user"""
-        date_str = timezone.now().date().isoformat()
-        user_id = self.request.user.id
-        return f"village_viewset_{suffix}_{date_str}_{user_id}"
-
     def list(self, request, *args, **kwargs):
-        cache_key = self._get_cache_key("list")
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data)
-
-        queryset = self.filter_queryset(self.get_queryset())
-        today = timezone.now()
-        month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        enhanced_data = []
-        for village in queryset:
-            # Per-village cache
-            village_cache_key = f"village_metrics_{village.id}_{today.date().isoformat()}"
-            village_metrics = cache.get(village_cache_key)
-
-            if not village_metrics:
-                # Update real-time data
-                village.update_collected_and_growth()
-                village.refresh_from_db()
-
-                collectors_str = ", ".join(
-                    c.get_full_name() or c.username for c in village.collectors.all()
-                ) or "Unassigned"
-
-                new_today = village.residents.filter(created_at__date=today.date()).count()
-
-                collected_today = Payment.objects.filter(
-                    customer__village=village,
-                    status='Successful',
-                    completed_at__date=today.date()
-                ).aggregate(total=Sum('amount'))['total'] or 0.0
-
-                village_metrics = {
-                    'collectors': collectors_str,
-                    'customer_count': village.customer_count,
-                    'monthly_revenue': float(village.collected_this_month),
-                    'total_balance': float(village.total_balance),
-                    'avg_risk': village.avg_risk,
-                    'new_today': new_today,
-                    'new_this_month': village.new_customers_this_month,
-                    'collected_today': float(collected_today),
-                    'collected_this_month': float(village.collected_this_month),
-                    'monthly_revenue_target': float(village.monthly_revenue_target),
-                    'monthly_new_customers_target': village.monthly_new_customers_target,
-                    'target_month': village.target_month,
-                    'target_year': village.target_year,
-                    'revenue_target_percentage': village.revenue_target_percentage,
-                    'remaining_revenue_target': float(village.remaining_revenue_target),
-                    'new_customers_target_percentage': village.new_customers_target_percentage,
-                    'remaining_new_customers_target': village.remaining_new_customers_target,
-                    'overall_target_percentage': village.overall_target_percentage,
-                    'performance_rank': village.performance_rank
-                }
-
-                # Cache individual village metrics
-                cache.set(village_cache_key, village_metrics, self.CACHE_TTL)
-
-            serializer = self.get_serializer(village)
-            data = serializer.data
-            data.update(village_metrics)
-            enhanced_data.append(data)
-
-        response_data = {
-            "count": queryset.count(),
-            "results": enhanced_data
-        }
-
-        # Cache full list response
-        cache.set(cache_key, response_data, self.CACHE_TTL)
-
-        return Response(response_data)
+        snapshot = village_metrics.get_snapshot()
+        return Response({
+            "count": snapshot['count'],
+            "results": snapshot['results'],
+            "version": snapshot['version'],
+            "generated_at": snapshot['generated_at'],
+        })
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        cache_key = f"village_detail_{instance.id}_{timezone.now().date().isoformat()}"
-        cached = cache.get(cache_key)
-
-        if cached:
-            return Response(cached)
-
-        instance.update_collected_and_growth()
-        instance.refresh_from_db()
-
-        collectors_str = ", ".join(
-            c.get_full_name() or c.username for c in instance.collectors.all()
-        ) or "Unassigned"
-
-        new_today = instance.residents.filter(created_at__date=timezone.now().date()).count()
-
-        collected_today = Payment.objects.filter(
-            customer__village=instance,
-            status='Successful',
-            completed_at__date=timezone.now().date()
-        ).aggregate(total=Sum('amount'))['total'] or 0.0
-
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        data.update({
-            'collectors': collectors_str,
-            'customer_count': instance.customer_count,
-            'monthly_revenue': float(instance.collected_this_month),
-            'total_balance': float(instance.total_balance),
-            'avg_risk': instance.avg_risk,
-            'new_today': new_today,
-            'new_this_month': instance.new_customers_this_month,
-            'collected_today': float(collected_today),
-            'collected_this_month': float(instance.collected_this_month),
-            'monthly_revenue_target': float(instance.monthly_revenue_target),
-            'monthly_new_customers_target': instance.monthly_new_customers_target,
-            'revenue_target_percentage': instance.revenue_target_percentage,
-            'remaining_revenue_target': float(instance.remaining_revenue_target),
-            'new_customers_target_percentage': instance.new_customers_target_percentage,
-            'remaining_new_customers_target': instance.remaining_new_customers_target,
-            'overall_target_percentage': instance.overall_target_percentage,
-            'performance_rank': instance.performance_rank
-        })
+        snapshot = village_metrics.get_snapshot()
+        for row in snapshot['results']:
+            if row['id'] == instance.id:
+                return Response(row)
 
-        cache.set(cache_key, data, self.CACHE_TTL)
-        return Response(data)
+        # Created after the snapshot: stored fields until the next refresh
+        village_metrics.request_refresh()
+        return Response(self.get_serializer(instance).data)
 
     @action(detail=False, methods=['get'])
     def growth(self, request):
@@ -848,32 +657,21 @@ class VillageViewSet(viewsets.ModelViewSet):
         return Response(response)
 
     def perform_create(self, serializer):
-        village = serializer.save(created_by=self.request.user, updated_by=self.request.user)
-        village.update_collected_and_growth()
+        serializer.save(created_by=self.request.user, updated_by=self.request.user)
         self._invalidate_caches()
 
     def perform_update(self, serializer):
-        village = serializer.save(updated_by=self.request.user)
-        village.update_collected_and_growth()
-        self._invalidate_caches(village.id)
+        serializer.save(updated_by=self.request.user)
+        self._invalidate_caches()
 
     def perform_destroy(self, instance):
-        village_id = instance.id
         super().perform_destroy(instance)
-        self._invalidate_caches(village_id)
-
-    def _invalidate_caches(self, village_id=None):
-        """Invalidate relevant caches"""
-        patterns = [
-            "village_viewset_list_*",
-            "village_growth_*"
-        ]
-        if village_id:
-            patterns.append(f"village_detail_{village_id}_*")
-            patterns.append(f"village_metrics_{village_id}_*")
+        self._invalidate_caches()
 
-        for pattern in patterns:
-            cache.delete_pattern(pattern)
+    def _invalidate_caches(self):
+        """Growth chart cache; the metrics snapshot is refreshed, not dropped"""
+        cache.delete_pattern("village_growth_*")
+        transaction.on_commit(village_metrics.request_refresh)
 
 
 class ComplaintViewSet(viewsets.ModelViewSet):
@@ -1155,7 +953,7 @@ def chat_history(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def test_customers(request):
-    customers = Customer.objects.all()[:10]
+    customers = Customer.objects.select_related('village').with_account_summary()[:10]
     serializer = CustomerListSerializer(customers, many=True)
     return Response(serializer.data)
 
@@ -0,0 +1,179 @@
+# customers/village_metrics.py — Village metrics refresher
+"""
+Village performance metrics, recomputed off the request path.
+
+- compute_metrics() derives every village's collections (today, this and last month),
+  growth (new customers today, this and last month), customer count, unpaid balance and
+  average risk from three grouped queries, and ranks the villages of the target period by
+  overall target achievement. Nothing is written.
+- refresh_village_metrics() stores the month figures and ranks on Village with one
+  bulk_update, then caches the complete list payload as one versioned snapshot
+  (SNAPSHOT_KEY). Run by the customers.refresh_village_metrics task (beat) and the
+  refresh_village_metrics management command.
+- VillageViewSet only reads the snapshot. A snapshot older than STALE_AFTER is still
+  served while request_refresh() queues a single refresh (stale-while-revalidate).
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import Customer, Village
+
+SNAPSHOT_KEY = 'customers:village_metrics'
+REFRESH_LOCK_KEY = 'customers:village_metrics:refreshing'
+REFRESH_LOCK_TTL = 60  # At most one queued refresh per minute
+STALE_AFTER = getattr(settings, 'VILLAGE_METRICS_STALE_AFTER', 15 * 60)  # seconds
+
+STORED_FIELDS = [
+    'collected_this_month', 'previous_month_collected',
+    'new_customers_this_month', 'previous_month_new_customers',
+    'performance_rank',
+]
+
+
+def _grouped(queryset, key, **aggregates):
+    return {row[key]: row for row in queryset.order_by().values(key).annotate(**aggregates)}
+
+
+def compute_metrics(month=None, year=None):
+    """
+    (villages, {village_id: metrics}) with the stored fields of each village updated in memory.
+    Villages targeting `month`/`year` (default: current) are ranked.
+    """
+    from payments.models import Invoice, Payment
+
+    now = timezone.localtime()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today_start.replace(day=1)
+    previous_month_start = (month_start - timedelta(days=1)).replace(day=1)
+    month = month or now.month
+    year = year or now.year
+
+    payments = _grouped(
+        Payment.objects.filter(status='Successful', completed_at__gte=previous_month_start, customer__village__isnull=False),
+        'customer__village_id',
+        this_month=Sum('amount', filter=Q(completed_at__gte=month_start)),
+        previous_month=Sum('amount', filter=Q(completed_at__lt=month_start)),
+        today=Sum('amount', filter=Q(completed_at__gte=today_start)),
+    )
+    customers = _grouped(
+        Customer.objects.filter(village__isnull=False),
+        'village_id',
+        count=Count('id'),
+        new_this_month=Count('id', filter=Q(created_at__gte=month_start)),
+        new_previous_month=Count('id', filter=Q(created_at__gte=previous_month_start, created_at__lt=month_start)),
+        new_today=Count('id', filter=Q(created_at__gte=today_start)),
+        avg_risk=Avg('risk_score', filter=Q(risk_score__gt=0)),  # Same rule as Village.avg_risk
+    )
+    balances = _grouped(
+        Invoice.objects.filter(status='Unpaid', customer__village__isnull=False),
+        'customer__village_id',
+        total=Sum('amount'),
+    )
+
+    villages = list(
+        Village.objects.select_related('cell__sector').prefetch_related('collectors')
+        .order_by('cell__sector__name', 'name')
+    )
+    for village in villages:
+        paid = payments.get(village.pk, {})
+        counts = customers.get(village.pk, {})
+        village.collected_this_month = paid.get('this_month') or 0
+        village.previous_month_collected = paid.get('previous_month') or 0
+        village.new_customers_this_month = counts.get('new_this_month', 0)
+        village.previous_month_new_customers = counts.get('new_previous_month', 0)
+
+    # Rank the villages of the period by overall achievement; no rank without a revenue target
+    in_period = [village for village in villages if village.target_month == month and village.target_year == year]
+    ranked = sorted(
+        (village for village in in_period if village.monthly_revenue_target > 0),
+        key=lambda village: village.overall_target_percentage, reverse=True,
+    )
+    for rank, village in enumerate(ranked, start=1):
+        village.performance_rank = rank
+    for village in in_period:
+        if village.monthly_revenue_target == 0:
+            village.performance_rank = None
+
+    metrics = {}
+    for village in villages:
+        paid = payments.get(village.pk, {})
+        counts = customers.get(village.pk, {})
+        metrics[village.pk] = {
+            'collectors': ", ".join(c.get_full_name() or c.username for c in village.collectors.all()) or "Unassigned",
+            'customer_count': counts.get('count', 0),
+            'monthly_revenue': float(village.collected_this_month),
+            'total_balance': float(balances.get(village.pk, {}).get('total') or 0),
+            'avg_risk': round(counts['avg_risk'], 2) if counts.get('avg_risk') else 0.0,
+            'new_today': counts.get('new_today', 0),
+            'new_this_month': village.new_customers_this_month,
+            'collected_today': float(paid.get('today') or 0),
+            'collected_this_month': float(village.collected_this_month),
+            'monthly_revenue_target': float(village.monthly_revenue_target),
+            'monthly_new_customers_target': village.monthly_new_customers_target,
+            'target_month': village.target_month,
+            'target_year': village.target_year,
+            'revenue_target_percentage': village.revenue_target_percentage,
+            'remaining_revenue_target': float(village.remaining_revenue_target),
+            'new_customers_target_percentage': village.new_customers_target_percentage,
+            'remaining_new_customers_target': village.remaining_new_customers_target,
+            'overall_target_percentage': village.overall_target_percentage,
+            'performance_rank': village.performance_rank,
+        }
+    return villages, metrics
+
+
+def build_snapshot(villages, metrics, version=0):
+    from .serializers import VillageListSerializer
+
+    results = []
+    for village in villages:
+        row = dict(VillageListSerializer(village).data)
+        row.update(metrics[village.pk])
+        results.append(row)
+    return {
+        'version': version,
+        'generated_at': timezone.now().isoformat(),
+        'generated_ts': time.time(),
+        'count': len(results),
+        'results': results,
+    }
+
+
+def refresh_village_metrics(month=None, year=None):
+    """Recompute, store and cache every village's metrics. Returns the snapshot version."""
+    villages, metrics = compute_metrics(month, year)
+    Village.objects.bulk_update(villages, STORED_FIELDS, batch_size=500)
+
+    previous = cache.get(SNAPSHOT_KEY)
+    version = (previous['version'] if previous else 0) + 1
+    cache.set(SNAPSHOT_KEY, build_snapshot(villages, metrics, version), timeout=None)
+    return version
+
+
+# ─── Read path ──────────────────────────────────────────────────────────────
+
+def request_refresh():
+    """Queue one refresh unless one was queued within REFRESH_LOCK_TTL."""
+    from .tasks import refresh_village_metrics as refresh_task
+
+    if cache.add(REFRESH_LOCK_KEY, 1, timeout=REFRESH_LOCK_TTL):
+        refresh_task.delay()
+
+
+def get_snapshot():
+    """
+    The cached snapshot; a stale one is returned as is and a refresh queued. Without any
+    snapshot (cold cache) it is computed read-only for this request.
+    """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        request_refresh()
+        return build_snapshot(*compute_metrics())
+    if time.time() - snapshot['generated_ts'] > STALE_AFTER:
+        request_refresh()
+    return snapshot
@@ -15,8 +15,9 @@ class BusinessUnitAdmin(admin.ModelAdmin):
 
 @admin.register(KPI)
 class KPIAdmin(admin.ModelAdmin):
-    list_display = ['name', 'metric_type', 'business_unit', 'current_value', 'target_value', 'period']
-    list_filter = ['metric_type', 'business_unit', 'period', 'is_active']
+    list_display = ['name', 'code', 'metric_type', 'business_unit', 'current_value', 'target_value', 'period', 'computed_at']
+    list_filter = ['code', 'metric_type', 'business_unit', 'period', 'is_active']
+    readonly_fields = ['watermark', 'computed_at', 'last_alerted_at']
     search_fields = ['name']
 
 admin.site.register([ERPDashboard, Workflow, ERPNotification])
\ No newline at end of file
@@ -0,0 +1,285 @@
+# erp/kpis.py — Incremental KPI engine
+"""
+KPIs computed from their source tables and stored as a time series (KPIValue).
+
+- Each KPIDefinition declares its source queryset, the field used as watermark, how a row
+  falls into a time bucket (grain: day or month) and the per-bucket aggregates.
+- compute() only recomputes the buckets touched since the KPI's watermark: one query finds
+  the earliest bucket with a changed row, one grouped query recomputes every bucket from
+  there on. The first run computes the whole history.
+- KPI rows opt in through KPI.code; every KPI with the same code (e.g. one per business
+  unit) shares the computed series. current_value is the latest bucket's value.
+- evaluate_alerts() checks all KPIs in one query and bulk-creates the alert notifications.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from functools import cached_property
+
+from django.db import transaction
+from django.db.models import DateField, F, Func, Min, Q, Sum, Value
+from django.db.models.functions import Abs, Coalesce, TruncDay, TruncMonth
+from django.utils import timezone
+
+from .models import KPI, ERPNotification, KPIValue
+
+WATERMARK_OVERLAP = timedelta(minutes=5)  # Rows committed late by in-flight transactions
+ALERT_THRESHOLD = Decimal('0.8')          # Alert below 80% of target
+TWO_PLACES = Decimal('0.01')
+
+GRAIN_FUNCTIONS = {'day': TruncDay, 'month': TruncMonth}
+
+DEFINITIONS = {}
+
+
+def register(cls):
+    DEFINITIONS[cls.code] = cls()
+    return cls
+
+
+class KPIDefinition:
+    """
+    One computed KPI. Subclasses provide source() and aggregates(); value() turns one
+    aggregated bucket row into the KPI value.
+    """
+    code = None
+    name = None
+    unit = '%'
+    grain = 'month'
+    watermark_field = 'created_at'
+    bucket_field = 'created_at'
+    lookback = timedelta(0)     # Recompute this far behind the watermark (backdated rows)
+    scale = 1
+
+    def source(self):
+        raise NotImplementedError
+
+    def bucket(self):
+        return GRAIN_FUNCTIONS[self.grain](self.bucket_field, output_field=DateField())
+
+    def aggregates(self):
+        """{'numerator': aggregate, 'denominator': aggregate (optional)}"""
+        raise NotImplementedError
+
+    def value(self, row):
+        numerator = row['numerator'] or 0
+        if 'denominator' not in row:
+            return Decimal(numerator)
+        if not row['denominator']:
+            return None
+        return Decimal(numerator) / Decimal(row['denominator']) * self.scale
+
+    def compute(self, since=None):
+        """{bucket: value} for every bucket with rows changed at or after `since` (all when None)."""
+        queryset = self.source().annotate(bucket=self.bucket())
+        if since is not None:
+            first = (
+                queryset.filter(**{f'{self.watermark_field}__gte': since - self.lookback})
+                .aggregate(first=Min('bucket'))['first']
+            )
+            if first is None:
+                return {}
+            queryset = queryset.filter(bucket__gte=first)
+
+        rows = queryset.order_by().values('bucket').annotate(**self.aggregates())
+        series = {}
+        for row in rows:
+            value = self.value(row)
+            if value is not None:
+                series[row['bucket']] = value.quantize(TWO_PLACES)
+        return series
+
+
+# ─── Definitions ────────────────────────────────────────────────────────────
+
+@register
+class CollectionRate(KPIDefinition):
+    """Share of the invoiced amount collected, by billing period."""
+    code = 'collection_rate'
+    name = 'Collection Rate'
+    watermark_field = 'updated_at'
+    scale = 100
+
+    def source(self):
+        from payments.models import Invoice
+        return Invoice.objects.exclude(status='Waived')
+
+    def bucket(self):
+        return Func(F('period_year'), F('period_month'), Value(1), function='make_date', output_field=DateField())
+
+    def aggregates(self):
+        return {'numerator': Sum('paid_amount'), 'denominator': Sum('amount')}
+
+
+@register
+class StockTurnover(KPIDefinition):
+    """Units issued in the period per unit currently on hand."""
+    code = 'stock_turnover'
+    name = 'Stock Turnover'
+    unit = 'x'
+
+    def source(self):
+        from stock.models import StockTransaction
+        return StockTransaction.objects.filter(transaction_type='out')
+
+    def aggregates(self):
+        return {'numerator': Sum(Abs('quantity'))}
+
+    @cached_property
+    def on_hand(self):
+        from stock.models import WarehouseStock
+        return WarehouseStock.objects.aggregate(total=Coalesce(Sum('quantity'), 0))['total']
+
+    def value(self, row):
+        if not self.on_hand:
+            return None
+        return Decimal(row['numerator'] or 0) / Decimal(self.on_hand)
+
+    def compute(self, since=None):
+        self.__dict__.pop('on_hand', None)  # Fresh snapshot per run
+        return super().compute(since)
+
+
+@register
+class FleetFuelEfficiency(KPIDefinition):
+    """Kilometres driven per litre of fuel across the fleet."""
+    code = 'fleet_fuel_efficiency'
+    name = 'Fleet Fuel Efficiency'
+    unit = 'km/L'
+    # FuelEfficiencyRecord has no timestamp; records may be entered a few weeks late
+    watermark_field = 'date'
+    bucket_field = 'date'
+    lookback = timedelta(days=45)
+
+    def source(self):
+        from fleet.models import FuelEfficiencyRecord
+        return FuelEfficiencyRecord.objects.all()
+
+    def aggregates(self):
+        return {'numerator': Sum('distance_km'), 'denominator': Sum('liters')}
+
+    def compute(self, since=None):
+        return super().compute(since.date() if since is not None else None)
+
+
+@register
+class PayrollTotal(KPIDefinition):
+    """Net pay of all payrolls of the period."""
+    code = 'payroll_total'
+    name = 'Payroll Total'
+    unit = 'XAF'
+    watermark_field = 'updated_at'  # Payrolls are edited after creation (bonus, repayments)
+
+    def source(self):
+        from hr.models import Payroll
+        return Payroll.objects.all()
+
+    def bucket(self):
+        return Func(F('year'), F('month'), Value(1), function='make_date', output_field=DateField())
+
+    def aggregates(self):
+        return {'numerator': Sum('net_pay')}
+
+
+def get_definition(code):
+    if code not in DEFINITIONS:
+        raise ValueError(f"Unknown KPI code: {code}")
+    return DEFINITIONS[code]
+
+
+# ─── Engine ─────────────────────────────────────────────────────────────────
+
+def update_kpis(codes=None, full=False):
+    """
+    Recompute the series of every active KPI with a code (or only `codes`) from its
+    watermark. Returns {code: buckets written}.
+    """
+    kpis = KPI.objects.filter(is_active=True).exclude(code='')
+    if codes:
+        kpis = kpis.filter(code__in=codes)
+
+    by_code = {}
+    for kpi in kpis:
+        by_code.setdefault(kpi.code, []).append(kpi)
+
+    written = {}
+    for code, group in by_code.items():
+        started = timezone.now()
+        watermarks = [kpi.watermark for kpi in group]
+        # KPIs sharing a code are computed together, from the oldest watermark
+        since = None if full or None in watermarks else min(watermarks) - WATERMARK_OVERLAP
+        series = get_definition(code).compute(since)
+        written[code] = len(series)
+        _store(group, series, started)
+    return written
+
+
+def _store(kpis, series, computed_at):
+    """Upsert the series for every KPI of one code and move their watermarks."""
+    with transaction.atomic():
+        if series:
+            KPIValue.objects.bulk_create(
+                [KPIValue(kpi=kpi, bucket=bucket, value=value, computed_at=computed_at)
+                 for kpi in kpis for bucket, value in series.items()],
+                update_conflicts=True,
+                unique_fields=['kpi', 'bucket'],
+                update_fields=['value', 'computed_at'],
+                batch_size=1000,
+            )
+        latest = {
+            row['kpi_id']: row['value']
+            for row in KPIValue.objects.filter(kpi__in=kpis).order_by('kpi_id', '-bucket').distinct('kpi_id').values('kpi_id', 'value')
+        }
+        for kpi in kpis:
+            value = latest.get(kpi.pk, kpi.current_value)
+            if value != kpi.current_value:
+                # evaluate_alerts() alerts once per change: only a new value re-arms it
+                kpi.current_value = value
+                kpi.updated_at = computed_at
+            kpi.watermark = computed_at
+            kpi.computed_at = computed_at
+        KPI.objects.bulk_update(kpis, ['current_value', 'watermark', 'computed_at', 'updated_at'])
+
+
+def evaluate_alerts():
+    """One notification per KPI below ALERT_THRESHOLD of its target, bulk-created. Returns the count."""
+    breached = list(
+        KPI.objects.filter(is_active=True, current_value__lt=F('target_value') * ALERT_THRESHOLD)
+        # Once per change of the KPI, not on every run
+        .filter(Q(last_alerted_at__isnull=True) | Q(last_alerted_at__lt=F('updated_at')))
+        .select_related('business_unit')
+    )
+    if not breached:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        notifications = ERPNotification.objects.bulk_create([
+            ERPNotification(
+                title=f"Critical KPI Alert: {kpi.name}",
+                message=f"KPI {kpi.name} is at {kpi.current_value:.1f} vs target {kpi.target_value}",
+                notification_type='kpi_alert',
+                module_id=kpi.module_id,
+                business_unit_id=kpi.business_unit_id,
+                priority='high',
+            )
+            for kpi in breached
+        ])
+        Recipient = ERPNotification.recipients.through
+        Recipient.objects.bulk_create([
+            Recipient(erpnotification_id=notification.pk, customuser_id=kpi.business_unit.manager_id)
+            for notification, kpi in zip(notifications, breached)
+            if kpi.business_unit.manager_id
+        ])
+        KPI.objects.filter(pk__in=[kpi.pk for kpi in breached]).update(last_alerted_at=now)
+    return len(notifications)
+
+
+def series_for(kpis, since=None):
+    """{kpi_id: [{'bucket', 'value'}, ...]} for `kpis` in one query."""
+    values = KPIValue.objects.filter(kpi__in=kpis)
+    if since is not None:
+        values = values.filter(bucket__gte=since)
+    series = {}
+    for row in values.order_by('kpi_id', 'bucket').values('kpi_id', 'bucket', 'value'):
+        series.setdefault(row['kpi_id'], []).append({'bucket': row['bucket'], 'value': row['value']})
+    return series
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kpi',
+            name='code',
+            field=models.CharField(blank=True, choices=[('collection_rate', 'Collection Rate'), ('stock_turnover', 'Stock Turnover'), ('fleet_fuel_efficiency', 'Fleet Fuel Efficiency'), ('payroll_total', 'Payroll Total')], db_index=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='kpi',
+            name='watermark',
+            field=models.DateTimeField(blank=True, help_text='Source rows changed before this are already in the series', null=True),
+        ),
+        migrations.AddField(
+            model_name='kpi',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='kpi',
+            name='last_alerted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='KPIValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateField()),
+                ('value', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('computed_at', models.DateTimeField()),
+                ('kpi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='erp.kpi')),
+            ],
+            options={
+                'ordering': ['kpi', 'bucket'],
+                'constraints': [models.UniqueConstraint(fields=('kpi', 'bucket'), name='erp_kpivalue_kpi_bucket')],
+            },
+        ),
+    ]
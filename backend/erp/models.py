@@ -77,7 +77,16 @@ class KPI(models.Model):
         ('customer', 'Customer Satisfaction'),
     ]
 
+    # Computed KPIs (erp.kpis); KPIs without a code are maintained by hand
+    CODES = [
+        ('collection_rate', 'Collection Rate'),
+        ('stock_turnover', 'Stock Turnover'),
+        ('fleet_fuel_efficiency', 'Fleet Fuel Efficiency'),
+        ('payroll_total', 'Payroll Total'),
+    ]
+
     name = models.CharField(max_length=200)
+    code = models.CharField(max_length=50, choices=CODES, blank=True, db_index=True)
     module = models.ForeignKey(ERPModule, on_delete=models.CASCADE, related_name='kpis')
     metric_type = models.CharField(max_length=20, choices=METRIC_TYPES)
     target_value = models.DecimalField(max_digits=20, decimal_places=2)
@@ -86,6 +95,9 @@ class KPI(models.Model):
     business_unit = models.ForeignKey(BusinessUnit, on_delete=models.CASCADE, related_name='kpis')
     period = models.CharField(max_length=20, default='monthly')  # daily, weekly, monthly, quarterly, yearly
     is_active = models.BooleanField(default=True)
+    watermark = models.DateTimeField(null=True, blank=True, help_text="Source rows changed before this are already in the series")
+    computed_at = models.DateTimeField(null=True, blank=True)
+    last_alerted_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -95,6 +107,22 @@ class KPI(models.Model):
     def __str__(self):
         return f"{self.name} - {self.business_unit}"
 
+class KPIValue(models.Model):
+    """One time bucket of a computed KPI series"""
+    kpi = models.ForeignKey(KPI, on_delete=models.CASCADE, related_name='series')
+    bucket = models.DateField()  # Start of the day/month
+    value = models.DecimalField(max_digits=20, decimal_places=2)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['kpi', 'bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['kpi', 'bucket'], name='erp_kpivalue_kpi_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.kpi.name} {self.bucket}: {self.value}"
+
 class Workflow(models.Model):
     """Business workflows and processes"""
     STATUS_CHOICES = [
@@ -1,6 +1,6 @@
 # erp/serializers.py
 from rest_framework import serializers
-from .models import ERPModule, BusinessUnit, ERPDashboard, KPI, Workflow, ERPNotification
+from .models import ERPModule, BusinessUnit, ERPDashboard, KPI, KPIValue, Workflow, ERPNotification
 
 class ERPModuleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,6 +28,11 @@ class KPISerializer(serializers.ModelSerializer):
             return min((obj.current_value / obj.target_value) * 100, 100)
         return 0
 
+class KPIValueSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = KPIValue
+        fields = ['bucket', 'value', 'computed_at']
+
 class WorkflowSerializer(serializers.ModelSerializer):
     module_name = serializers.CharField(source='module.display_name', read_only=True)
     step_count = serializers.SerializerMethodField()
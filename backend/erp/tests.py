@@ -1,3 +1,34 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from . import kpis
+from .models import KPI, BusinessUnit, ERPModule, ERPNotification
+
+
+class KPIAlertTestCase(TestCase):
+    def setUp(self):
+        module = ERPModule.objects.create(name='hr', display_name="HR")
+        unit = BusinessUnit.objects.create(name="Head office", code="HQ", module=module)
+        self.kpi = KPI.objects.create(
+            name="Payroll", code='payroll_total', module=module, business_unit=unit,
+            metric_type='cost', target_value=Decimal('1000'),
+        )
+        self.series = {date(2026, 9, 1): Decimal('500.00')}
+
+    def run_job(self):
+        definition = kpis.get_definition('payroll_total')
+        with mock.patch.object(definition, 'compute', side_effect=lambda since: dict(self.series)):
+            kpis.update_kpis()
+        return kpis.evaluate_alerts()
+
+    def test_unchanged_value_alerts_once(self):
+        self.assertEqual(self.run_job(), 1)
+        self.assertEqual(self.run_job(), 0)
+        self.assertEqual(ERPNotification.objects.filter(notification_type='kpi_alert').count(), 1)
+
+        # A new value below the threshold is a new alert
+        self.series = {date(2026, 9, 1): Decimal('400.00')}
+        self.assertEqual(self.run_job(), 1)
@@ -4,13 +4,19 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from . import kpis as kpi_engine
 from .models import ERPModule, BusinessUnit, KPI, Workflow, ERPNotification, ERPDashboard
 from .serializers import (
     ERPModuleSerializer, BusinessUnitSerializer,
-    KPISerializer, WorkflowSerializer,
+    KPISerializer, KPIValueSerializer, WorkflowSerializer,
     ERPNotificationSerializer, ERPDashboardSerializer
 )
 
+KPI_TREND_DAYS = 365
+
 class ERPModuleViewSet(viewsets.ReadOnlyModelViewSet):
     """ERP Modules API"""
     queryset = ERPModule.objects.filter(is_active=True)
@@ -34,22 +40,42 @@ class KPIViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get KPI summary by module"""
-        from django.db.models import Sum, Avg
+        from django.db.models import Avg, Count
         module = request.query_params.get('module')
 
         kpis = self.filter_queryset(self.get_queryset())
         if module:
             kpis = kpis.filter(module__name=module)
 
+        # current_value is precomputed by erp.kpis; nothing here touches the source tables
+        by_module = kpis.order_by().values('module__name').annotate(count=Count('id'), avg_value=Avg('current_value'))
         summary = {
             'total_kpis': kpis.count(),
             'avg_progress': kpis.aggregate(avg_progress=Avg('current_value'))['avg_progress'] or 0,
             'top_performers': list(kpis.order_by('-current_value')[:5].values('name', 'current_value', 'target_value')),
-            'by_module': {}
+            'by_module': {
+                row['module__name']: {'count': row['count'], 'avg_value': row['avg_value']}
+                for row in by_module
+            }
         }
 
         return Response(summary)
 
+    @action(detail=True, methods=['get'])
+    def series(self, request, pk=None):
+        """Precomputed time series of a KPI (?since=YYYY-MM-DD)"""
+        kpi = self.get_object()
+        values = kpi.series.all()
+        since = parse_date(request.query_params.get('since', ''))
+        if since:
+            values = values.filter(bucket__gte=since)
+        return Response({
+            'kpi': kpi.id,
+            'code': kpi.code,
+            'computed_at': kpi.computed_at,
+            'series': KPIValueSerializer(values, many=True).data,
+        })
+
 class WorkflowViewSet(viewsets.ReadOnlyModelViewSet):
     """Workflows API"""
     queryset = Workflow.objects.select_related('module', 'business_unit')
@@ -99,6 +125,10 @@ class ERPDashboardViewSet(viewsets.ModelViewSet):
         overview = {
             'modules': ERPModuleSerializer(ERPModule.objects.filter(is_active=True), many=True).data,
             'kpi_summary': KPIViewSet.as_view({'get': 'summary'})(request).data,
+            'kpi_trends': kpi_engine.series_for(
+                KPI.objects.filter(is_active=True).exclude(code=''),
+                since=timezone.localdate() - timedelta(days=KPI_TREND_DAYS),
+            ),
             'recent_notifications': ERPNotificationSerializer(
                 ERPNotification.objects.filter(recipients=request.user)[:5], many=True
             ).data,
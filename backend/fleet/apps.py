@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class FleetConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "fleet"
+
+    def ready(self):
+        # Import signals only when the app is fully loaded
+        from . import signals
@@ -1,9 +1,8 @@
 import json
-import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
-from asgiref.sync import sync_to_async
 from django.utils import timezone
 from channels.db import database_sync_to_async
+from . import live
 from .models import Vehicle
 
 class FleetConsumer(AsyncWebsocketConsumer):
@@ -74,6 +73,11 @@ class VehicleTrackingConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps(event))
 
 class LiveVehicleConsumer(AsyncWebsocketConsumer):
+    """
+    Live positions: the full cached snapshot on connect, then the diffs sent by the
+    shared broadcaster (fleet.live) to the fleet_live group. No per-socket queries.
+    """
+
     async def connect(self):
         await self.accept()
 
@@ -83,61 +87,23 @@ class LiveVehicleConsumer(AsyncWebsocketConsumer):
             "timestamp": timezone.now().isoformat()
         }))
 
-        # Start live updates
-        self.task = asyncio.create_task(self.broadcast_loop())
+        await self.channel_layer.group_add(live.GROUP, self.channel_name)
+        snapshot = await database_sync_to_async(live.get_snapshot)()
+        await self.send(text_data=json.dumps(live.full_message(snapshot)))
+
+        # Start (or keep) this process's share of the broadcaster
+        live.broadcaster.join()
+        self.joined = True
 
     async def disconnect(self, close_code):
-        if hasattr(self, "task"):
-            self.task.cancel()
-
-    async def broadcast_loop(self):
-        try:
-            while True:
-                vehicles = await self.get_live_vehicles()
-                await self.send(text_data=json.dumps({
-                    "type": "live_update",
-                    "vehicles": vehicles,
-                    "total": len(vehicles),
-                    "timestamp": timezone.now().isoformat()
-                }))
-                await asyncio.sleep(5)
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            print("WebSocket error:", e)
-
-    @sync_to_async
-    def get_live_vehicles(self):
-        # Select only real DB fields + driver_id
-        qs = Vehicle.objects.filter(
-            lat__isnull=False,
-            lng__isnull=False
-        ).select_related('driver').values(
-            'id',
-            'registration_number',
-            'lat',
-            'lng',
-            'status',
-            'last_seen',
-            'driver_id'  # ← Real ForeignKey field
-        )
+        await self.channel_layer.group_discard(live.GROUP, self.channel_name)
+        if getattr(self, "joined", False):
+            live.broadcaster.leave()
 
-        vehicles = []
-        for v in qs:
-            driver_name = ""
-            if v['driver_id']:
-                # Fetch full_name safely
-                driver = Vehicle.objects.filter(id=v['id']).select_related('driver').first()
-                driver_name = driver.driver.full_name if driver and driver.driver else "No Driver"
-
-            vehicles.append({
-                "id": v['id'],
-                "registration_number": v['registration_number'],
-                "lat": v['lat'],
-                "lng": v['lng'],
-                "status": v['status'],
-                "last_seen": v['last_seen'],
-                "driver": driver_name,
-            })
-
-        return vehicles
\ No newline at end of file
+    async def live_diff(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "live_diff",
+            "vehicles": event["vehicles"],
+            "removed": event["removed"],
+            "timestamp": event["timestamp"],
+        }))
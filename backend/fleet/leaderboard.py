@@ -0,0 +1,196 @@
+# fleet/leaderboard.py — Driver leaderboard snapshots
+"""
+Monthly driver leaderboard, computed set-based and stored in DriverLeaderboardSnapshot.
+
+- compute_leaderboard() reads one grouped query per metric (collections per driver, fuel
+  liters per vehicle, driver ratings), joins them in pandas and scores every driver at
+  once: 40% collections, 35% fuel economy, 25% rating, each normalized to 0–100
+  against the month's best/worst.
+- refresh_leaderboard() upserts the month's snapshot rows (and DriverPerformanceHistory)
+  in bulk. The query count does not depend on the number of drivers.
+- Run nightly and every 15 minutes for the current month (fleet.refresh_driver_leaderboard),
+  and after commit for the months touched by WasteCollection / FuelEfficiencyRecord /
+  Driver writes (fleet.signals). Past months stay retrievable by `month`.
+"""
+from datetime import date, timedelta
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from high_prosper.on_commit import on_commit_once
+from .models import Driver, DriverLeaderboardSnapshot, DriverPerformanceHistory, FuelEfficiencyRecord, WasteCollection
+
+WEIGHTS = {'collections': 0.40, 'fuel': 0.35, 'rating': 0.25}
+MAX_RATING = 5.0
+
+
+def current_month():
+    return timezone.localdate().strftime("%Y-%m")
+
+
+def first_month():
+    """Earliest month with a stored leaderboard (the current month when none is stored yet)"""
+    first = DriverLeaderboardSnapshot.objects.order_by('month').values_list('month', flat=True).first()
+    return first or current_month()
+
+
+def month_of(day):
+    """ "YYYY-MM" of a date (or an ISO date string, as assigned from request data)"""
+    return str(day)[:7] if day else None
+
+
+def month_range(month):
+    """[first day, first day of next month) of a "YYYY-MM" month"""
+    year, number = (int(part) for part in month.split("-"))
+    start = date(year, number, 1)
+    end = date(year + number // 12, number % 12 + 1, 1)
+    return start, end
+
+
+def previous_month(month):
+    start, _ = month_range(month)
+    return month_of(start - timedelta(days=1))
+
+
+def _frame(queryset, columns):
+    return pd.DataFrame.from_records(list(queryset), columns=columns)
+
+
+def compute_leaderboard(month):
+    """DataFrame with one scored and ranked row per driver (index: driver id)"""
+    start, end = month_range(month)
+
+    drivers = _frame(Driver.objects.values_list('id', 'assigned_vehicle_id', 'rating'), ['driver_id', 'vehicle_id', 'rating'])
+    collections = _frame(
+        WasteCollection.objects.filter(date__gte=start, date__lt=end, driver__isnull=False)
+        .order_by().values('driver_id').annotate(n=Count('id')).values_list('driver_id', 'n'),
+        ['driver_id', 'collections'],
+    )
+    # Fuel is recorded per vehicle and credited to the drivers assigned to it
+    fuel = _frame(
+        FuelEfficiencyRecord.objects.filter(date__gte=start, date__lt=end)
+        .order_by().values('vehicle_id').annotate(liters=Sum('liters')).values_list('vehicle_id', 'liters'),
+        ['vehicle_id', 'fuel_consumed'],
+    )
+
+    if drivers.empty:
+        return drivers.set_index('driver_id')
+
+    board = (
+        drivers.merge(collections, on='driver_id', how='left')
+        .merge(fuel, on='vehicle_id', how='left')
+        .set_index('driver_id')
+    )
+    board['collections'] = board['collections'].fillna(0).astype(int)
+    board['fuel_consumed'] = board['fuel_consumed'].astype(float).fillna(0.0)
+    board['rating'] = board['rating'].astype(float).fillna(0.0)
+
+    max_collections = board['collections'].max() or 1
+    max_fuel = board['fuel_consumed'].max() or 1.0
+    board['collections_score'] = board['collections'] / max_collections * 100
+    board['fuel_score'] = 100 - board['fuel_consumed'] / max_fuel * 100
+    board['rating_score'] = board['rating'] / MAX_RATING * 100
+    board['score'] = (
+        WEIGHTS['collections'] * board['collections_score']
+        + WEIGHTS['fuel'] * board['fuel_score']
+        + WEIGHTS['rating'] * board['rating_score']
+    ).round(2)
+
+    board = board.sort_values(['score', 'collections'], ascending=False, kind='stable')
+    board['rank'] = range(1, len(board) + 1)
+    return board
+
+
+def refresh_leaderboard(month=None):
+    """Recompute and store the leaderboard of `month` (default: current). Returns the number of drivers."""
+    month = month or current_month()
+    board = compute_leaderboard(month)
+    now = timezone.now()
+
+    snapshots, history = [], []
+    for driver_id, row in board.iterrows():
+        snapshots.append(DriverLeaderboardSnapshot(
+            month=month,
+            driver_id=driver_id,
+            rank=int(row['rank']),
+            score=round(float(row['score']), 2),
+            collections=int(row['collections']),
+            fuel_consumed=round(float(row['fuel_consumed']), 2),
+            rating=float(row['rating']),
+            collections_score=float(row['collections_score']),
+            fuel_score=float(row['fuel_score']),
+            rating_score=float(row['rating_score']),
+            computed_at=now,
+        ))
+        history.append(DriverPerformanceHistory(
+            driver_id=driver_id,
+            month=month,
+            score=round(float(row['score']), 2),
+            collections=int(row['collections']),
+            fuel=round(float(row['fuel_consumed']), 2),
+            rating=round(float(row['rating']), 1),
+        ))
+
+    with transaction.atomic():
+        DriverLeaderboardSnapshot.objects.filter(month=month).exclude(driver_id__in=board.index.tolist()).delete()
+        DriverLeaderboardSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['month', 'driver'],
+            update_fields=['rank', 'score', 'collections', 'fuel_consumed', 'rating',
+                           'collections_score', 'fuel_score', 'rating_score', 'computed_at'],
+            batch_size=1000,
+        )
+        DriverPerformanceHistory.objects.bulk_create(
+            history,
+            update_conflicts=True,
+            unique_fields=['driver', 'month'],
+            update_fields=['score', 'collections', 'fuel', 'rating'],
+            batch_size=1000,
+        )
+    return len(snapshots)
+
+
+def leaderboard_rows(month, limit=50):
+    """Stored leaderboard of `month` as API rows (one query)"""
+    snapshots = (
+        DriverLeaderboardSnapshot.objects.filter(month=month, rank__lte=limit)
+        .select_related('driver__user', 'driver__assigned_vehicle')
+        .order_by('rank')
+    )
+    rows = []
+    for snapshot in snapshots:
+        driver = snapshot.driver
+        vehicle = driver.assigned_vehicle
+        rows.append({
+            "id": driver.id,
+            "full_name": driver.full_name,
+            "phone": driver.phone,
+            "profile_picture": driver.profile_picture,
+            "vehicle": vehicle.registration_number if vehicle else "No Vehicle",
+            "brand": vehicle.brand if vehicle else "N/A",
+            "model": vehicle.model if vehicle else "N/A",
+            "score": float(snapshot.score),
+            "collections": snapshot.collections,
+            "fuel_consumed": round(float(snapshot.fuel_consumed), 1),
+            "rating": round(snapshot.rating, 1),
+            "rank": snapshot.rank,
+        })
+    return rows
+
+
+# ─── Incremental refresh ────────────────────────────────────────────────────
+
+def _refresh(months):
+    """on_commit_once handler: the months touched in one transaction"""
+    from .tasks import refresh_driver_leaderboard
+
+    for month in sorted(months):
+        refresh_driver_leaderboard.delay(month)
+
+
+def schedule_refresh(*months):
+    """Refresh the leaderboards of `months` after the current transaction commits."""
+    on_commit_once('fleet.refresh_driver_leaderboard', _refresh, (month for month in months if month))
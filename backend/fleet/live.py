@@ -0,0 +1,162 @@
+# fleet/live.py — Shared live-position broadcaster
+"""
+One broadcaster for every /ws/fleet/live/ socket, whatever the number of viewers.
+
+- Each ASGI process with at least one live socket runs a LiveBroadcaster task. The tasks
+  compete for a Redis lock (LEADER_KEY); only the holder queries the database.
+- Every INTERVAL seconds the leader builds the snapshot of all positioned vehicles in one
+  query, stores it in the cache (SNAPSHOT_KEY) and sends only the vehicles that changed
+  (plus removed ids) to the GROUP channel-layer group joined by every socket.
+- A new socket gets the cached full snapshot on connect, then the diffs.
+- The lock expires after LEADER_TTL without renewal, so another process takes over when
+  the leader dies or loses its last viewer.
+"""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import Driver, Vehicle
+
+logger = logging.getLogger(__name__)
+
+GROUP = 'fleet_live'
+SNAPSHOT_KEY = 'fleet:live:snapshot'
+LEADER_KEY = 'fleet:live:leader'
+INTERVAL = 5  # seconds between snapshots
+LEADER_TTL = 3 * INTERVAL  # lock expiry without renewal
+SNAPSHOT_TTL = 60
+
+
+def build_snapshot():
+    """{vehicle id (str): position row} for every vehicle with a position, in one query"""
+    # Same rule as Driver.full_name, for the first driver assigned to the vehicle
+    driver_name = (
+        Driver.objects.filter(assigned_vehicle=OuterRef('pk')).order_by('pk')
+        .annotate(name=Coalesce(
+            NullIf(Trim(Concat('user__first_name', Value(' '), 'user__last_name')), Value('')),
+            'user__username',
+            output_field=CharField(),
+        ))
+        .values('name')[:1]
+    )
+    rows = (
+        Vehicle.objects.filter(lat__isnull=False, lng__isnull=False)
+        .order_by()
+        .values('id', 'registration_number', 'lat', 'lng', 'status')
+        .annotate(last_seen=Coalesce('last_location_update', 'updated_at'), driver=Subquery(driver_name))
+    )
+    return {
+        str(row['id']): {
+            'id': row['id'],
+            'registration_number': row['registration_number'],
+            'lat': float(row['lat']),
+            'lng': float(row['lng']),
+            'status': row['status'],
+            'last_seen': row['last_seen'].isoformat() if row['last_seen'] else None,
+            'driver': row['driver'] or "No Driver",
+        }
+        for row in rows
+    }
+
+
+def diff(previous, current):
+    """(changed or new rows, removed ids)"""
+    changed = [row for key, row in current.items() if previous.get(key) != row]
+    removed = [int(key) for key in previous.keys() - current.keys()]
+    return changed, removed
+
+
+def full_message(snapshot):
+    vehicles = list(snapshot['vehicles'].values())
+    return {
+        "type": "live_update",
+        "vehicles": vehicles,
+        "total": len(vehicles),
+        "timestamp": snapshot['timestamp'],
+    }
+
+
+def get_snapshot():
+    """Cached snapshot; built (not broadcast) when the cache is cold"""
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        snapshot = {'vehicles': build_snapshot(), 'timestamp': timezone.now().isoformat()}
+        cache.add(SNAPSHOT_KEY, snapshot, SNAPSHOT_TTL)
+    return snapshot
+
+
+class LiveBroadcaster:
+    """Per-process task, running while the process has live sockets"""
+
+    def __init__(self):
+        self.viewers = 0
+        self.task = None
+        self.lock = None
+        self.previous = None
+
+    def join(self):
+        self.viewers += 1
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def leave(self):
+        self.viewers = max(self.viewers - 1, 0)
+
+    def _is_leader(self):
+        """Take or renew the leader lock"""
+        if self.lock is None:
+            # thread_local=False: acquire/renew/release run on different executor threads
+            self.lock = get_redis_connection("default").lock(LEADER_KEY, timeout=LEADER_TTL, thread_local=False)
+        if self.lock.owned():
+            self.lock.reacquire()
+            return True
+        self.previous = None  # Resume from the cached snapshot after a takeover
+        return self.lock.acquire(blocking=False)
+
+    def _release(self):
+        if self.lock is not None and self.lock.owned():
+            self.lock.release()
+
+    def _refresh(self):
+        """Build and cache the new snapshot; returns (changed, removed, timestamp)"""
+        if self.previous is None:
+            cached = cache.get(SNAPSHOT_KEY)
+            self.previous = cached['vehicles'] if cached else {}
+        current = build_snapshot()
+        timestamp = timezone.now().isoformat()
+        cache.set(SNAPSHOT_KEY, {'vehicles': current, 'timestamp': timestamp}, SNAPSHOT_TTL)
+        changed, removed = diff(self.previous, current)
+        self.previous = current
+        return changed, removed, timestamp
+
+    async def run(self):
+        channel_layer = get_channel_layer()
+        try:
+            while self.viewers:
+                try:
+                    if await sync_to_async(self._is_leader, thread_sensitive=False)():
+                        changed, removed, timestamp = await database_sync_to_async(self._refresh)()
+                        if changed or removed:
+                            await channel_layer.group_send(GROUP, {
+                                "type": "live.diff",
+                                "vehicles": changed,
+                                "removed": removed,
+                                "timestamp": timestamp,
+                            })
+                except Exception:
+                    logger.exception("Fleet live broadcast failed")
+                    self.previous = None
+                await asyncio.sleep(INTERVAL)
+        finally:
+            await sync_to_async(self._release, thread_sensitive=False)()
+
+
+broadcaster = LiveBroadcaster()
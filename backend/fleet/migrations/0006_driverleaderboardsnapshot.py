@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0005_alter_vehicle_brand_alter_vehicle_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverLeaderboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(max_length=7)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('collections', models.PositiveIntegerField(default=0)),
+                ('fuel_consumed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('rating', models.FloatField(default=0.0)),
+                ('collections_score', models.FloatField(default=0.0)),
+                ('fuel_score', models.FloatField(default=0.0)),
+                ('rating_score', models.FloatField(default=0.0)),
+                ('computed_at', models.DateTimeField()),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_snapshots', to='fleet.driver')),
+            ],
+            options={
+                'ordering': ['month', 'rank'],
+                'indexes': [models.Index(fields=['month', 'rank'], name='fleet_leaderboard_month_rank')],
+                'unique_together': {('month', 'driver')},
+            },
+        ),
+    ]
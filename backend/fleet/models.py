@@ -201,6 +201,29 @@ class DriverPerformanceHistory(models.Model):
     def __str__(self):
         return f"{self.driver.full_name} - {self.month}: {self.score}"
 
+
+class DriverLeaderboardSnapshot(models.Model):
+    """One driver's ranked leaderboard row for a month (written by fleet.leaderboard)"""
+    month = models.CharField(max_length=7)  # e.g. "2025-11"
+    driver = models.ForeignKey("Driver", on_delete=models.CASCADE, related_name="leaderboard_snapshots")
+    rank = models.PositiveIntegerField()
+    score = models.DecimalField(max_digits=6, decimal_places=2)
+    collections = models.PositiveIntegerField(default=0)
+    fuel_consumed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    rating = models.FloatField(default=0.0)
+    collections_score = models.FloatField(default=0.0)
+    fuel_score = models.FloatField(default=0.0)
+    rating_score = models.FloatField(default=0.0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("month", "driver")
+        ordering = ["month", "rank"]
+        indexes = [models.Index(fields=["month", "rank"], name="fleet_leaderboard_month_rank")]
+
+    def __str__(self):
+        return f"{self.month} #{self.rank}: {self.driver_id} ({self.score})"
+
 class Branch(models.Model):
     name = models.CharField(max_length=255)
     city = models.CharField(max_length=100)
@@ -0,0 +1,19 @@
+# fleet/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .leaderboard import current_month, month_of, schedule_refresh
+from .models import Driver, FuelEfficiencyRecord, WasteCollection
+
+
+@receiver([post_save, post_delete], sender=WasteCollection)
+@receiver([post_save, post_delete], sender=FuelEfficiencyRecord)
+def refresh_leaderboard_for_record(sender, instance, **kwargs):
+    """Collections and fuel count towards the leaderboard of their own month"""
+    schedule_refresh(month_of(instance.date))
+
+
+@receiver([post_save, post_delete], sender=Driver)
+def refresh_leaderboard_for_driver(sender, instance, **kwargs):
+    """Rating and assigned vehicle feed the current month"""
+    schedule_refresh(current_month())
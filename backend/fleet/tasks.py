@@ -0,0 +1,19 @@
+# fleet/tasks.py
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='fleet.refresh_driver_leaderboard', time_limit=10 * 60, soft_time_limit=8 * 60)
+def refresh_driver_leaderboard(month=None, include_previous=False):
+    """Store the driver leaderboard of `month` (default: current), optionally also of the month before"""
+    from .leaderboard import current_month, previous_month, refresh_leaderboard
+
+    months = [month or current_month()]
+    if include_previous:
+        months.append(previous_month(months[0]))
+    for value in months:
+        drivers = refresh_leaderboard(value)
+        logger.info(f"Driver leaderboard {value} refreshed: {drivers} drivers")
+    return months
@@ -11,10 +11,11 @@ from .serializers import VehicleSerializer, RepairSerializer, ConsumptionSeriali
     FuelRecordSerializer, MaintenanceRecordSerializer, FuelEfficiencyRecordSerializer, ComplianceSerializer, \
     WorkshopRecordSerializer
 import random
+import re
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from collections import defaultdict
-from django.db.models import Sum, Count, Avg, Max
+from django.db.models import Sum, Count, Avg
 from datetime import datetime, timedelta
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -31,6 +32,7 @@ from .serializers import (
     RouteSerializer
 )
 from .analytics import fuel_consumption_report, maintenance_alerts, oversized_waste_report, route_efficiency_report
+from .leaderboard import current_month, first_month, leaderboard_rows
 from .predictive_maintenance import predict_vehicle_maintenance
 from .route_optimizer import optimize_multi_vehicle_routes, logger
 from users.models import CustomUser
@@ -38,7 +40,6 @@ from webpush import send_user_notification
 from sklearn.linear_model import LinearRegression
 import numpy as np
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.db.models import Count, Avg, Q
 from django.http import JsonResponse
 from django.views.decorators.cache import cache_page
@@ -415,104 +416,25 @@ class DriverViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     # ===================================================================
-    # 1. LEADERBOARD – TOP 50 DRIVERS (Cached + Monthly History)
+    # 1. LEADERBOARD – TOP 50 DRIVERS (Stored snapshots + Monthly History)
     # ===================================================================
     @action(detail=False, methods=['get'], url_path='leaderboard')
     def leaderboard(self, request):
-        current_month = timezone.now().strftime("%Y-%m")
-        cache_key = f"driver_leaderboard_{current_month}"
-        cached = cache.get(cache_key)
-
-        if cached:
-            return Response(cached)
-
-        drivers_data = []
-
-        # Pre-calculate max values
-        max_collections = (
-                WasteCollection.objects
-                .filter(date__year=timezone.now().year, date__month=timezone.now().month)
-                .values('driver')
-                .annotate(collections=Count('id'))
-                .aggregate(max_c=Max('collections'))['max_c'] or 1
-        )
-
-        max_fuel_result = FuelEfficiencyRecord.objects.filter(
-            vehicle__driver__isnull=False
-        ).values('vehicle__driver').annotate(
-            total_liters=Sum('liters')
-        ).aggregate(max_f=Max('total_liters'))
-
-        max_fuel = float(max_fuel_result['max_f'] or 1)  # ← CONVERT TO FLOAT
-
-        drivers = self.get_queryset()
-
-        for driver in drivers:
-            collections = WasteCollection.objects.filter(
-                driver=driver,
-                date__year=timezone.now().year,
-                date__month=timezone.now().month
-            ).count()
-
-        total_fuel = FuelEfficiencyRecord.objects.filter(
-            vehicle=driver.assigned_vehicle
-        ).aggregate(t=Sum('liters'))['t'] or 0
-
-        rating = float(driver.rating or 0)
-
-        # Normalize
-        score_collections = (collections / max_collections) * 100
-        score_fuel = 100 - ((total_fuel / max_fuel) * 100) if max_fuel else 100
-        score_rating = (rating / 5.0) * 100
-
-        performance_score = round(
-            0.40 * score_collections +
-            0.35 * score_fuel +
-            0.25 * score_rating,
-            2
-        )
-
-        # Save history
-        DriverPerformanceHistory.objects.update_or_create(
-            driver=driver,
-            month=current_month,
-            defaults={
-                "score": performance_score,
-                "collections": collections,
-                "fuel": float(total_fuel),
-                "rating": rating,
-            }
-        )
-
-        # SAFE ACCESS — brand and model are strings!
-        vehicle = driver.assigned_vehicle
-        brand_name = vehicle.brand if vehicle else "N/A"
-        model_name = vehicle.model if vehicle else "N/A"
-        reg_number = vehicle.registration_number if vehicle else "No Vehicle"
-
-        drivers_data.append({
-            "id": driver.id,
-            "full_name": driver.full_name,
-            "phone": driver.phone,
-            "profile_picture": driver.profile_picture.url if driver.profile_picture else None,
-            "vehicle": reg_number,
-            "brand": brand_name,
-            "model": model_name,
-            "score": performance_score,
-            "collections": collections,
-            "fuel_consumed": round(total_fuel, 1),
-            "rating": round(rating, 1),
-        })
-
-        # Rank
-        drivers_data.sort(key=lambda x: x["score"], reverse=True)
-        for i, d in enumerate(drivers_data):
-            d["rank"] = i + 1
-
-        result = drivers_data[:50]
-        cache.set(cache_key, result, timeout=300)
+        """
+        ?month=YYYY-MM (default: current) — read from DriverLeaderboardSnapshot (fleet.leaderboard).
+        Read-only: a month without a snapshot is empty until the scheduled refresh stores it.
+        """
+        month = request.query_params.get('month') or current_month()
+        if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", month):
+            return Response({"error": "month must be YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+        first, last = first_month(), current_month()
+        if not first <= month <= last:
+            return Response(
+                {"error": f"month must be between {first} and {last}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        return Response(result)
+        return Response(leaderboard_rows(month))
 
 
     # ===================================================================
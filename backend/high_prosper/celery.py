@@ -37,6 +37,9 @@ def safe_autodiscover_tasks():
         'procurement.tasks',
         'users.tasks',
         'notifications.tasks',  # ← ADDED: Global push tasks
+        'customers.tasks',
+        'upload.tasks',
+        'fleet.tasks',
     ]
 
     for module in TASK_MODULES:
@@ -137,6 +140,81 @@ app.conf.beat_schedule = {
         'schedule': crontab(minute='*/30'),  # every 30 minutes
         # 'schedule': crontab(minute=0, hour='*'),  # every hour
     },
+    'rebuild-search-index-nightly': {
+        'task': 'rebuild_search_index',
+        'schedule': crontab(hour=2, minute=30),  # 2:30 AM daily
+    },
+    'flush-search-events-every-minute': {
+        'task': 'flush_search_events',
+        'schedule': 60.0,  # Every minute
+    },
+    'refresh-analytics-snapshots-every-5-minutes': {
+        'task': 'refresh_analytics_snapshots',
+        'schedule': timedelta(minutes=5),
+    },
+    'rebuild-analytics-snapshots-nightly': {
+        'task': 'refresh_analytics_snapshots',
+        'schedule': crontab(hour=3, minute=15),  # 3:15 AM daily
+        'kwargs': {'full': True},
+    },
+    'purge-expired-exports-daily': {
+        'task': 'purge_expired_exports',
+        'schedule': crontab(hour=4, minute=0),  # 4:00 AM daily
+    },
+    'refresh-forecasts-every-30-minutes': {
+        'task': 'hr.tasks.refresh_forecasts',
+        'schedule': timedelta(minutes=30),
+    },
+    'rescore-changed-suppliers-hourly': {
+        'task': 'procurement.tasks.update_all_supplier_scores',
+        'schedule': crontab(minute=20),  # Incremental: suppliers with new PO/GRN activity
+    },
+    'rescore-all-suppliers-weekly': {
+        'task': 'procurement.tasks.update_all_supplier_scores',
+        'schedule': crontab(hour=2, minute=30, day_of_week=0),
+        'kwargs': {'full': True},
+    },
+    'update-kpis-every-15-minutes': {
+        'task': 'erp.tasks.update_kpis',
+        'schedule': timedelta(minutes=15),  # Incremental from each KPI's watermark
+    },
+    'train-churn-model-weekly': {
+        'task': 'customers.train_churn_model',
+        'schedule': crontab(hour=1, minute=0, day_of_week=0),
+    },
+    'refresh-risk-scores-nightly': {
+        'task': 'customers.refresh_risk_scores',
+        'schedule': crontab(hour=1, minute=45),
+    },
+    'refresh-geo-rollups-nightly': {
+        'task': 'customers.refresh_geo_rollups',
+        'schedule': crontab(hour=2, minute=15),  # After the risk-score batch
+    },
+    'refresh-village-metrics-every-5-minutes': {
+        'task': 'customers.refresh_village_metrics',
+        'schedule': timedelta(minutes=5),
+    },
+    'refresh-driver-leaderboard-every-15-minutes': {
+        'task': 'fleet.refresh_driver_leaderboard',
+        'schedule': timedelta(minutes=15),
+    },
+    'refresh-driver-leaderboards-nightly': {
+        'task': 'fleet.refresh_driver_leaderboard',
+        'schedule': crontab(hour=2, minute=30),
+        'kwargs': {'include_previous': True},  # Late-logged collections of last month
+    },
+    'requeue-stale-uploads-every-15-minutes': {
+        'task': 'upload.requeue_stale_uploads',
+        'schedule': timedelta(minutes=15),
+    },
+    'ensure-stock-transaction-partitions-daily': {
+        'task': 'stock.tasks.ensure_transaction_partitions',
+        'schedule': crontab(hour=1, minute=15),
+    },
+    'archive-stock-transaction-partitions-monthly': {
+        'task': 'stock.tasks.archive_transaction_partitions',
+        'schedule': crontab(day_of_month=2, hour=3, minute=0),
+    },
     'clean-online-every-5-minutes': {
         'task': 'users.tasks.clean_online_status',
         'schedule': timedelta(minutes=5),
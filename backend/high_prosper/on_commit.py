@@ -0,0 +1,41 @@
+# high_prosper/on_commit.py — Deduplicated after-commit work
+"""
+on_commit_once(key, handler, values): after the current transaction commits, call
+`handler(all values scheduled under key)` once, however many times it was scheduled.
+
+Values are collected per database connection (asgiref Local, like Django's own
+connections). Every call registers an on_commit callback; the first one to run pops the
+values of its key and the others find nothing left to do. In autocommit mode the handler
+runs immediately.
+
+Values scheduled in a transaction that is rolled back stay pending and are handled after
+the next commit on the same connection: handlers must be idempotent, recomputing from
+the database rather than trusting the values.
+"""
+from asgiref.local import Local
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+_local = Local()
+
+
+def _pending(using):
+    """{key: set of values} scheduled on the `using` connection of this thread/task"""
+    stores = getattr(_local, 'stores', None)
+    if stores is None:
+        stores = _local.stores = {}
+    return stores.setdefault(using, {})
+
+
+def on_commit_once(key, handler, values, using=None):
+    using = using or DEFAULT_DB_ALIAS
+    values = set(values)
+    if not values:
+        return
+    _pending(using).setdefault(key, set()).update(values)
+    transaction.on_commit(lambda: _run(using, key, handler), using=using)
+
+
+def _run(using, key, handler):
+    values = _pending(using).pop(key, None)
+    if values:
+        handler(values)
@@ -229,8 +229,8 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
-# Cache timeout: 5 minutes for real-time metrics
-VILLAGE_METRICS_CACHE_TTL = 300  # seconds
+# Village metrics snapshot (customers.village_metrics), refreshed every 5 minutes
+VILLAGE_METRICS_STALE_AFTER = 900  # seconds; older snapshots are served while a refresh is queued
 
 # Internationalization
 LANGUAGE_CODE = 'en-us'
@@ -250,6 +250,13 @@ STATICFILES_FINDERS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# ✅ UPLOAD PROCESSING (upload.pipeline, media queue)
+UPLOAD_IMAGE_VARIANTS = {'large': 1920, 'medium': 800, 'thumb': 256}  # name → max side (px)
+CLAMD_SOCKET = os.getenv('CLAMD_SOCKET')  # unix socket path, or CLAMD_HOST/CLAMD_PORT
+CLAMD_HOST = os.getenv('CLAMD_HOST')
+CLAMD_PORT = int(os.getenv('CLAMD_PORT', 3310))
+CLAMD_CHUNK_SIZE = 64 * 1024  # INSTREAM chunk size; bounded by clamd's StreamMaxLength per file
+
 # ✅ REPORTS SPECIFIC SETTINGS
 REPORTS = {
     'MAX_FILE_SIZE': 50 * 1024 * 1024,  # 50MB
@@ -359,6 +366,26 @@ CUSTOM_INVENTORY_APIS = [
     }
 ]
 
+# Monthly StockTransaction partitions (stock.partitions): created `months_ahead`, archived
+# to gzip CSV in `archive_dir` once older than `keep_months`
+STOCK_TRANSACTION_PARTITIONS = {
+    'months_ahead': 3,
+    'keep_months': 24,
+    'archive_dir': os.getenv('STOCK_ARCHIVE_DIR', str(BASE_DIR / 'archive' / 'stock_transactions')),
+}
+
+# External inventory sync engine (stock.external_sync); per-system configs may override
+# 'concurrency', 'batch_size' and 'timeout'
+EXTERNAL_SYNC = {
+    'max_connections': 20,
+    'default_concurrency': 10,
+    'timeout': 10,
+    'retries': 3,
+    'backoff': 0.5,
+    'breaker_threshold': 5,
+    'breaker_cooldown': 300,
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")  # Redis broker (install Redis: https://redis.io/download)
 CELERY_RESULT_BACKEND = 'django-db'
@@ -386,6 +413,7 @@ CELERY_TASK_ROUTES = {
     'notifications.*': {'queue': 'notifications'},
     'low_priority.*': {'queue': 'low_priority'},
     'users.tasks': {'queue': 'users'},
+    'upload.*': {'queue': 'media'},
 }
 
 CELERY_BEAT_SCHEDULE = {
@@ -410,6 +438,13 @@ MTN_CLIENT_ID = os.getenv('MTN_CLIENT_ID')
 MTN_CLIENT_SECRET = os.getenv('MTN_CLIENT_SECRET')
 MTN_SENDER_ID = os.getenv('MTN_SENDER_ID')
 
+# SMS gateway (notifications.sms)
+MTN_SMS_BASE_URL = os.getenv('MTN_SMS_BASE_URL', 'https://api.mtn.com')
+MTN_SMS_CLIENT_ID = os.getenv('MTN_SMS_CLIENT_ID', MTN_CLIENT_ID)
+MTN_SMS_CLIENT_SECRET = os.getenv('MTN_SMS_CLIENT_SECRET', MTN_CLIENT_SECRET)
+SMS_BATCH_SIZE = int(os.getenv('SMS_BATCH_SIZE', 100))  # Recipients per gateway request
+SMS_RATE_LIMIT = int(os.getenv('SMS_RATE_LIMIT', 20))  # Gateway requests per second, all workers
+
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0003_delete_pushsubscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('status', models.CharField(choices=[('ready', 'Ready'), ('insufficient_data', 'Insufficient Data')], default='ready', max_length=20)),
+                ('model_json', models.TextField(blank=True)),
+                ('history', models.JSONField(default=list)),
+                ('forecast', models.JSONField(default=list)),
+                ('summary', models.JSONField(default=dict)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('trained_at', models.DateTimeField()),
+                ('checked_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0004_forecastmodel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
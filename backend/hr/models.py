@@ -51,6 +51,30 @@ class PerformanceScore(models.Model):
     overall_score = models.FloatField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+class ForecastModel(models.Model):
+    """
+    Latest fitted Prophet model and forecast frame per series, written by hr.ml.forecast.
+    Endpoints read this (through the cache) instead of fitting Prophet per request.
+    """
+    STATUS_CHOICES = [
+        ('ready', 'Ready'),
+        ('insufficient_data', 'Insufficient Data'),
+    ]
+
+    key = models.CharField(max_length=50, unique=True)
+    fingerprint = models.CharField(max_length=40)  # Hash of the training data
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ready')
+    model_json = models.TextField(blank=True)  # prophet.serialize.model_to_json
+    history = models.JSONField(default=list)
+    forecast = models.JSONField(default=list)
+    summary = models.JSONField(default=dict)
+    duration_ms = models.PositiveIntegerField(default=0)
+    trained_at = models.DateTimeField()
+    checked_at = models.DateTimeField()  # Last fingerprint check, refit or not
+
+    def __str__(self):
+        return f"{self.key} forecast @ {self.trained_at:%Y-%m-%d %H:%M}"
+
 class SentimentFeedback(models.Model):
     staff = models.ForeignKey(Staff, on_delete=models.CASCADE)
     comment = models.TextField()
@@ -76,6 +100,7 @@ class Payroll(models.Model):
     irpp_tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     net_pay = models.DecimalField(max_digits=12, decimal_places=2, editable=False, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Watermark of erp.kpis.PayrollTotal
 
     class Meta:
         unique_together = ('staff', 'month', 'year')
@@ -142,7 +167,7 @@ class Payroll(models.Model):
 
         self.advance_deduction = advance_deduction
         self.net_pay = base_net_pay - advance_deduction
-        super().save(update_fields=['advance_deduction', 'net_pay'])  # Final save
+        super().save(update_fields=['advance_deduction', 'net_pay', 'updated_at'])  # Final save
 
         # 4. Only run side effects on creation
         if is_new:
@@ -1,10 +1,7 @@
 # hr/services.py
 
-import os
 from multiprocessing.connection import Client
 
-import requests
-import datetime
 from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.contrib.humanize.templatetags.humanize import intcomma
@@ -14,6 +11,7 @@ from django.utils import timezone
 from geopy.distance import Distance
 
 from customers.models import ServiceOrder
+from notifications import sms
 from users.models import CustomUser
 
 
@@ -48,37 +46,8 @@ class SMSReminderService:
 
     @staticmethod
     def send_sms(phone: str, message: str):
-        phone = phone.lstrip('+')
-        try:
-            # Primary: MTN Rwanda MoMo SMS
-            url = "https://proxy.momoapi.mtn.com/collection/v1_0/sms"
-            headers = {
-                'Authorization': f'Bearer {settings.MTN_TOKEN}',
-                'Ocp-Apim-Subscription-Key': settings.MTN_SUBSCRIPTION_KEY,
-                'Content-Type': 'application/json'
-            }
-            payload = {
-                "to": phone,
-                "message": message,
-                "senderId": "HPROSPER"
-            }
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            return response.status_code == 202
-        except:
-            # Fallback: Africa's Talking
-            try:
-                url = "https://api.africastalking.com/version1/messaging"
-                payload = {
-                    "username": settings.AT_USERNAME,
-                    "to": phone,
-                    "message": f"[High Prosper] {message}",
-                    "from": "HPROSPER"
-                }
-                response = requests.post(url, data=payload, auth=(settings.AT_USERNAME, settings.AT_API_KEY))
-                return response.status_code == 200
-            except Exception as e:
-                print(f"SMS failed: {e}")
-                return False
+        # MTN first, Africa's Talking fallback — both handled by the shared gateway
+        return sms.send_sms(phone, message)
 
 # notifications/services.py — Add AI Voice section
 
@@ -186,70 +155,24 @@ def auto_route_collector_to_overdue(invoice):
 class MTNSMSService:
     """
     Service class for sending SMS via MTN API.
+    Delegates to the shared gateway (notifications.sms), which owns the Redis-cached
+    OAuth token, the pooled session, batching and per-message status tracking.
     """
 
-    def __init__(self):
-        self.base_url = getattr(settings, "MTN_SMS_BASE_URL", "https://api.mtn.com")
-        self.client_id = getattr(settings, "MTN_SMS_CLIENT_ID", os.getenv("MTN_SMS_CLIENT_ID"))
-        self.client_secret = getattr(settings, "MTN_SMS_CLIENT_SECRET", os.getenv("MTN_SMS_CLIENT_SECRET"))
-
-        if not self.client_id or not self.client_secret:
-            raise ImproperlyConfigured("MTN SMS API keys not configured.")
-
-        self.token = None
-        self.token_expires = None
-
-    def get_token(self):
+    def send_sms(self, to, message):
         """
-        Get OAuth 2.0 token from MTN API.
+        Send SMS via MTN API.
         """
-        now = datetime.datetime.utcnow()
-        if self.token and self.token_expires and self.token_expires > now:
-            return self.token
-
-        url = f"{self.base_url}/v3/auth/oauth/token"
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-        }
-        response = requests.post(url, data=data)
-        if response.status_code == 200:
-            token_data = response.json()
-            self.token = token_data["access_token"]
-            self.token_expires = now + datetime.timedelta(seconds=token_data["expires_in"])
-            return self.token
-
-        raise Exception(f"MTN Token error: {response.status_code} - {response.text}")
+        summary = sms.send([to], message[:160])  # SMS max length
+        if not summary['sent']:
+            raise Exception(f"MTN SMS error: delivery to {to} failed")
+        return summary
 
-    def send_sms(self, to, message):
+    def send_bulk_sms(self, recipients, message):
         """
-        Send SMS via MTN API.
+        Send one SMS to many recipients, batched per gateway request.
         """
-        token = self.get_token()
-        url = f"{self.base_url}/v3/sms"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-        data = {
-            "from": "HighProsper",
-            "to": [to],
-            "content": message[:160],  # SMS max length
-        }
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 201:
-            return response.json()
-        elif response.status_code == 401:
-            # Retry once if token expired
-            self.token = None
-            token = self.get_token()
-            headers["Authorization"] = f"Bearer {token}"
-            response = requests.post(url, headers=headers, json=data)
-            if response.status_code == 201:
-                return response.json()
-
-        raise Exception(f"MTN SMS error: {response.status_code} - {response.text}")
+        return sms.send(recipients, message[:160])
 
 
 class EmailService:
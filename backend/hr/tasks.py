@@ -2,9 +2,12 @@
 
 from celery import shared_task
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from notifications import sms
 from users.models import CustomUser
 
+from .ml import forecast
 from .services import MTNSMSService, EmailService  # service layer for SMS & Email
 from celery import shared_task
 from django.contrib.auth import get_user_model
@@ -73,23 +76,164 @@ def send_notification(notification_id):
         return f"Failed to process notification {notification_id}: {str(e)}"
 
 
-@shared_task
-def send_bulk_notifications(customer_ids, title, message, notification_type):
+# ─── Bulk notifications ───
+
+BULK_NOTIFICATION_CHUNK = 1000   # Notification rows per bulk_create
+DELIVERY_BATCH_SIZE = 500        # Recipients per channel subtask
+BULK_PROGRESS_KEY = "bulk_notifications:{task_id}"
+BULK_PROGRESS_TIMEOUT = 60 * 60 * 24
+CHANNEL_PREFERENCES = {'push': 'notify_browser', 'sms': 'notify_sms', 'email': 'notify_email'}
+CHANNEL_ADDRESSES = {'sms': 'phone', 'email': 'email'}
+
+
+def _track_progress(progress_key, **counts):
+    if not progress_key:
+        return
+    for name, value in counts.items():
+        key = f"{progress_key}:{name}"
+        cache.add(key, 0, BULK_PROGRESS_TIMEOUT)
+        cache.incr(key, value)
+
+
+def bulk_notification_progress(task_id):
+    """Progress of a send_bulk_notifications run, or None when unknown/expired."""
+    key = BULK_PROGRESS_KEY.format(task_id=task_id)
+    progress = cache.get(key)
+    if progress is None:
+        return None
+    counters = cache.get_many([f"{key}:{name}" for name in ('batches_done', 'sent', 'failed')])
+    for name in ('batches_done', 'sent', 'failed'):
+        progress[name] = counters.get(f"{key}:{name}", 0)
+    progress['complete'] = progress['dispatched'] and progress['batches_done'] >= progress['batches_total']
+    return progress
+
+
+@shared_task(bind=True)
+def send_bulk_notifications(self, customer_ids, title, message, notification_type, channels=None):
     """
     Sends bulk notifications to multiple customers.
+    Recipients are loaded with one IN query, notification rows are bulk_created in chunks,
+    and delivery fans out to deliver_notification_batch subtasks per channel
+    (push / sms / email, respecting each user's notify_* preference).
+    Progress: bulk_notification_progress(<this task id>).
     """
+    from django.contrib.contenttypes.models import ContentType
     from notifications.models import Notification
 
-    for customer_id in customer_ids:
-        customer = CustomUser.objects.get(id=customer_id)
-        notification = Notification.objects.create(
-            recipient=customer,
-            title=title,
-            message=message,
-            notification_type=notification_type
-        )
-        notification.send()  # this can call send_notification internally
-    return f"Queued {len(customer_ids)} notifications"
+    channels = [channel for channel in (channels or CHANNEL_PREFERENCES) if channel in CHANNEL_PREFERENCES]
+    recipients = list(
+        CustomUser.objects.filter(id__in=customer_ids, is_active=True)
+        .values('id', 'phone', 'email', *CHANNEL_PREFERENCES.values())
+    )
+    user_type = ContentType.objects.get_for_model(CustomUser)
+    progress_key = BULK_PROGRESS_KEY.format(task_id=self.request.id)
+    progress = {'total': len(recipients), 'created': 0, 'dispatched': False, 'batches_total': 0, 'channels': {}}
+    cache.set(progress_key, progress, BULK_PROGRESS_TIMEOUT)
+
+    deliveries = {channel: [] for channel in channels}
+    for start in range(0, len(recipients), BULK_NOTIFICATION_CHUNK):
+        chunk = recipients[start:start + BULK_NOTIFICATION_CHUNK]
+        created = Notification.objects.bulk_create([
+            Notification(
+                recipient_id=recipient['id'],
+                actor_content_type=user_type,
+                actor_object_id=str(recipient['id']),
+                verb=title,
+                description=message,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+            )
+            for recipient in chunk
+        ])
+        for recipient, notification in zip(chunk, created):
+            for channel in channels:
+                address = CHANNEL_ADDRESSES.get(channel)
+                if recipient[CHANNEL_PREFERENCES[channel]] and (address is None or recipient[address]):
+                    deliveries[channel].append(notification.pk)
+
+        progress['created'] += len(created)
+        cache.set(progress_key, progress, BULK_PROGRESS_TIMEOUT)
+        self.update_state(state='PROGRESS', meta=progress)
+
+    # Totals are published before the first subtask runs so progress never reads as complete early
+    batches = [
+        (channel, ids[start:start + DELIVERY_BATCH_SIZE])
+        for channel, ids in deliveries.items()
+        for start in range(0, len(ids), DELIVERY_BATCH_SIZE)
+    ]
+    progress.update(
+        dispatched=True,
+        batches_total=len(batches),
+        channels={channel: len(ids) for channel, ids in deliveries.items()},
+    )
+    cache.set(progress_key, progress, BULK_PROGRESS_TIMEOUT)
+    for channel, ids in batches:
+        deliver_notification_batch.delay(channel, ids, progress_key)
+
+    return f"Queued {len(recipients)} notifications in {len(batches)} delivery batches"
+
+
+def _deliver_push(rows, title, message):
+    from notifications.models import PushSubscription
+    from notifications.utils import send_push_to_subscription
+
+    notification_for_user = {row['recipient_id']: row['id'] for row in rows}
+    delivered = set()
+    for subscription in PushSubscription.objects.filter(user_id__in=notification_for_user, is_active=True):
+        try:
+            if send_push_to_subscription(subscription, title, message):
+                delivered.add(notification_for_user[subscription.user_id])
+        except Exception as e:
+            print(f"Push failed for subscription {subscription.id}: {e}")
+    return delivered
+
+
+def _deliver_sms(rows, title, message):
+    summary = sms.send([row['recipient__phone'] for row in rows], f"{title}: {message}")
+    failed = set(summary['failed_phones'])
+    return {row['id'] for row in rows if sms.normalize_phone(row['recipient__phone']) not in failed}
+
+
+def _deliver_email(rows, title, message):
+    from django.core.mail import EmailMessage, get_connection
+
+    delivered = set()
+    with get_connection() as connection:  # One SMTP session for the whole batch
+        for row in rows:
+            try:
+                EmailMessage(
+                    f"High Prosper: {title}", message, settings.DEFAULT_FROM_EMAIL,
+                    [row['recipient__email']], connection=connection,
+                ).send()
+                delivered.add(row['id'])
+            except Exception as e:
+                print(f"Email failed for {row['recipient__email']}: {e}")
+    return delivered
+
+
+DELIVERY_SENDERS = {'push': _deliver_push, 'sms': _deliver_sms, 'email': _deliver_email}
+
+
+@shared_task
+def deliver_notification_batch(channel, notification_ids, progress_key=None):
+    """
+    Deliver one batch of bulk notifications over one channel and mark delivered rows as sent.
+    """
+    from notifications.models import Notification
+
+    rows = list(
+        Notification.objects.filter(id__in=notification_ids)
+        .values('id', 'recipient_id', 'recipient__phone', 'recipient__email', 'title', 'message')
+    )
+    delivered = set()
+    if rows:
+        # All rows of a bulk send share one text
+        delivered = DELIVERY_SENDERS[channel](rows, rows[0]['title'], rows[0]['message'])
+        Notification.objects.filter(id__in=delivered).update(status='sent')
+
+    _track_progress(progress_key, batches_done=1, sent=len(delivered), failed=len(rows) - len(delivered))
+    return f"{channel}: {len(delivered)}/{len(rows)} delivered"
 
 
 @shared_task
@@ -111,3 +255,28 @@ def send_payment_confirmation_email(user_id, invoice_id, amount, customer_name):
     """
     EmailService().send_email(user.email, subject, message)
     return f"Payment confirmation email sent to {user.email}"
+
+
+@shared_task
+def train_forecast(key, force=False):
+    """
+    Refit one Prophet forecast series when its data changed (queued by
+    hr.ml.forecast.schedule_refresh and by refresh_forecasts).
+    """
+    try:
+        record, refitted = forecast.train(key, force=force)
+        if refitted:
+            print(f"Trained {key} forecast in {record.duration_ms} ms ({record.status})")
+        return record.fingerprint
+    finally:
+        cache.delete(forecast.REFRESH_LOCK_KEY.format(key=key))
+
+
+@shared_task
+def refresh_forecasts():
+    """Periodic fingerprint check of every forecast series; only changed series are refit."""
+    for key in forecast.SERIES:
+        try:
+            train_forecast(key)
+        except Exception as e:
+            print(f"Forecast refresh failed for {key}: {e}")
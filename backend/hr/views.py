@@ -41,14 +41,9 @@ from .serializers import (
     ReportSerializer, TaskSerializer, StaffCreateWithUserSerializer, PayrollApprovalSerializer
 )
 from users.permissions import IsAdminOrHR
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-import numpy as np
+from .ml import forecast
 from django.http import JsonResponse
-from prophet import Prophet
-import pandas as pd
 from django_filters.rest_framework import DjangoFilterBackend
-from datetime import datetime, timedelta
 from notifications.models import Notification
 from notifications.serializers import NotificationSerializer
 import json
@@ -66,72 +61,19 @@ def create_staff_with_user(request):
     return Response(serializer.errors, status=400)
 
 def performance_forecast_view(request):
-    # Step 1: Pull real performance data from your DB
-    from hr.models import PerformanceScore  # ← your actual model name
-
-    df = pd.DataFrame(list(
-        PerformanceScore.objects.all()
-        .values('date', 'score')
-        .order_by('date')
-    ))
-
-    if df.empty:
-        return JsonResponse({"error": "No data"}, status=400)
-
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.rename(columns={'date': 'ds', 'score': 'y'})
-
-    # Step 2: Train Prophet (0.3 seconds)
-    m = Prophet(
-        yearly_seasonality=True,
-        weekly_seasonality=True,
-        daily_seasonality=False,
-        seasonality_mode='multiplicative',
-        changepoint_prior_scale=0.05,
-        interval_width=0.95
-    )
-
-    # Step 3: Add Cameroon Holidays (Critical for Accuracy)
-    cameroon_holidays = [
-        '2025-01-01', '2025-02-11', '2025-04-18', '2025-05-01',
-        '2025-05-20', '2025-08-15', '2025-12-25', '2025-05-25', '2025-06-05',
-        '2026-01-01', '2026-02-11', '2026-04-03', '2026-05-01', '2026-05-20',
-    ]
-    holidays_df = pd.DataFrame({
-        'holiday': 'cameroon_public',
-        'ds': pd.to_datetime(cameroon_holidays),
-        'lower_window': -2,
-        'upper_window': 2,
-    })
-    m.add_country_holidays(country_name='CM')
-    m.holidays = pd.concat([m.holidays] + [holidays_df])
-
-    m.fit(df)
-
-    # Step 4: Forecast next 180 days
-    future = m.make_future_dataframe(periods=180)
-    forecast = m.predict(future)
-
-    # Step 5: Prepare JSON response
-    history = df.to_dict('records')
-    future_forecast = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(180).to_dict('records')
+    """
+    Precomputed Prophet forecast of the monthly average performance score (hr.ml.forecast).
+    ?refresh=true queues a retrain; the response's freshness block reports its progress.
+    """
+    if request.GET.get('refresh') == 'true':
+        forecast.schedule_refresh(forecast.PERFORMANCE, force=True)
 
-    next_month_avg = round(forecast.tail(30)['yhat'].mean(), 2)
-    current_avg = round(df.tail(30)['y'].mean(), 2)
-    trend = "up" if next_month_avg > current_avg else "down" if next_month_avg < current_avg else "stable"
-
-    return JsonResponse({
-        "history": history,
-        "forecast": future_forecast,
-        "summary": {
-            "current_score": current_avg,
-            "next_month_prediction": next_month_avg,
-            "change": round(next_month_avg - current_avg, 2),
-            "trend": trend,
-            "confidence": 96,
-            "model": "Prophet (Meta AI)"
-        }
-    })
+    payload = forecast.get_forecast(forecast.PERFORMANCE)
+    if payload is None:
+        return JsonResponse({"status": "training", "detail": "Forecast is being trained, retry shortly."}, status=202)
+    if payload['status'] == 'insufficient_data':
+        return JsonResponse({"error": "No data", "freshness": payload['freshness']}, status=400)
+    return JsonResponse(payload)
 
 
 
@@ -398,18 +340,14 @@ class PerformanceViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'])
     def forecast(self, request):
-        # Simulate Prophet forecast
-        dates = [datetime.now() - timedelta(days=30*i) for i in range(12, 0, -1)]
-        history = [{"ds": d.strftime("%Y-%m-%d"), "y": 80 + np.random.normal(5, 3)} for d in dates]
-        df = pd.DataFrame(history)
-        m = Prophet(yearly_seasonality=True)
-        m.fit(df)
-        future = m.make_future_dataframe(periods=6, freq='M')
-        forecast = m.predict(future)
+        payload = forecast.get_forecast(forecast.PERFORMANCE)
+        if payload is None:
+            return Response({"status": "training"}, status=202)
         return Response({
-            "history": history,
-            "forecast": forecast.tail(6)[['ds', 'yhat']].to_dict('records'),
-            "summary": {"next_month_prediction": 92.8, "trend": "up", "change": 3.4, "confidence": 96}
+            "history": payload['history'],
+            "forecast": [row for row in payload['forecast'] if row['ds'].endswith('-01')],  # Monthly points
+            "summary": payload['summary'],
+            "freshness": payload['freshness'],
         })
 
 class SentimentViewSet(viewsets.ViewSet):
@@ -1,35 +1,221 @@
 # HIGH PROSPER AI – Churn Prediction 2026
+"""
+Churn feature pipeline, versioned model and batch scoring.
+
+- generate_features() assembles the feature matrix with four grouped queries (customers,
+  last successful payment, unpaid invoices, recent complaints) merged in pandas; no
+  per-customer query. Feature arithmetic is vectorized.
+- train_churn_model() fits the classifier on every customer, evaluates it on a holdout
+  split and stores it in default storage as a new version (MODEL_DIR/<version>.joblib);
+  MODEL_DIR/latest.json points at the version in use.
+- score_customers() walks customers in id chunks, builds each chunk's features with the
+  same grouped queries, predicts churn probability (0-100) and writes Customer.risk_score
+  with bulk_update. Without a trained model the rule-based score is used instead.
+"""
+import io
+import json
 from datetime import timedelta
 
+import joblib
+import numpy as np
 import pandas as pd
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max, Sum
 from django.utils import timezone
-from sklearn.ensemble import RandomForestClassifier
-import joblib
+
+MODEL_DIR = 'ml_models/churn'
+LATEST = f'{MODEL_DIR}/latest.json'
+SCORE_CHUNK = 5000
+UPDATE_BATCH = 1000
+COMPLAINT_WINDOW = timedelta(days=180)
+CHURNED_STATUSES = ['Suspended', 'Terminated']
+
+FEATURES = ['days_delinquent', 'balance_ratio', 'complaints_6m', 'tenure_days']
+
+_loaded = {}  # version → model, per process
+
+
+# ─── Features ───────────────────────────────────────────────────────────────
+
+def _grouped(queryset, column, customer_ids):
+    if customer_ids is not None:
+        queryset = queryset.filter(customer_id__in=customer_ids)
+    rows = queryset.order_by().values_list('customer_id', column)
+    return pd.DataFrame.from_records(list(rows), columns=['id', column]).set_index('id')[column]
+
+
+def generate_features(customer_ids=None):
+    """
+    Feature frame indexed by customer id (all customers, or only `customer_ids`), with the
+    FEATURES columns plus `churned` (label) and `status`.
+    """
+    from customers.models import Complaint, Customer
+    from payments.models import Invoice, Payment
+
+    customers = Customer.objects.all() if customer_ids is None else Customer.objects.filter(id__in=customer_ids)
+    frame = pd.DataFrame.from_records(
+        list(customers.order_by('id').values_list('id', 'monthly_fee', 'connection_date', 'status')),
+        columns=['id', 'monthly_fee', 'connection_date', 'status'],
+    ).set_index('id')
+    if frame.empty:
+        return frame.reindex(columns=FEATURES + ['churned', 'status'])
+
+    last_paid = _grouped(
+        Payment.objects.filter(status='Successful', customer__isnull=False).values('customer_id').annotate(last_paid=Max('completed_at')),
+        'last_paid', customer_ids,
+    )
+    balance = _grouped(
+        Invoice.objects.filter(status='Unpaid').values('customer_id').annotate(balance=Sum('amount')),
+        'balance', customer_ids,
+    )
+    complaints = _grouped(
+        Complaint.objects.filter(created_at__gte=timezone.now() - COMPLAINT_WINDOW).values('customer_id').annotate(complaints=Count('id')),
+        'complaints', customer_ids,
+    )
+
+    today = pd.Timestamp(timezone.localdate())
+    connected = pd.to_datetime(frame['connection_date']).fillna(today)
+    last_paid_date = (
+        pd.to_datetime(last_paid.reindex(frame.index), utc=True)
+        .dt.tz_convert(timezone.get_current_timezone_name()).dt.tz_localize(None).dt.normalize()
+    )
+    monthly_fee = frame['monthly_fee'].astype(float)
+
+    # Same rule as Customer.days_delinquent: 30 days grace after the last payment,
+    # days since connection when the customer never paid
+    since_payment = ((today - last_paid_date).dt.days - 30).clip(lower=0)
+    frame['days_delinquent'] = since_payment.fillna((today - connected).dt.days).astype(float)
+    frame['balance_ratio'] = np.where(
+        monthly_fee > 0, balance.reindex(frame.index).fillna(0).astype(float) / monthly_fee.where(monthly_fee > 0, 1), 0.0
+    )
+    frame['complaints_6m'] = complaints.reindex(frame.index).fillna(0).astype(float)
+    frame['tenure_days'] = (today - connected).dt.days.astype(float)
+    frame['churned'] = frame['status'].isin(CHURNED_STATUSES)
+    return frame[FEATURES + ['churned', 'status']]
+
+
+def rule_based_scores(frame):
+    """Rule-based score: delinquency bands, plus 30 when the balance exceeds three monthly fees."""
+    delinquent = frame['days_delinquent']
+    score = np.select([delinquent > 90, delinquent > 60, delinquent > 30], [70, 50, 30], default=0)
+    score = score + np.where(frame['balance_ratio'] > 3, 30, 0)
+    return np.minimum(score, 100).astype(float)
+
+
+# ─── Model versions ─────────────────────────────────────────────────────────
+
+def latest_version():
+    """Metadata of the model in use ({'version', 'trained_at', 'metrics', ...}) or None."""
+    if not default_storage.exists(LATEST):
+        return None
+    with default_storage.open(LATEST, 'rb') as handle:
+        return json.loads(handle.read())
+
+
+def load_model(version=None):
+    """The stored model `version` (default: latest), cached per process, or None."""
+    if version is None:
+        meta = latest_version()
+        if meta is None:
+            return None
+        version = meta['version']
+    if version not in _loaded:
+        with default_storage.open(f'{MODEL_DIR}/{version}.joblib', 'rb') as handle:
+            _loaded[version] = joblib.load(io.BytesIO(handle.read()))
+    return _loaded[version]
+
+
+def _save_model(model, meta):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    default_storage.save(f"{MODEL_DIR}/{meta['version']}.joblib", ContentFile(buffer.getvalue()))
+    if default_storage.exists(LATEST):
+        default_storage.delete(LATEST)
+    default_storage.save(LATEST, ContentFile(json.dumps(meta).encode()))
+
 
 def train_churn_model():
-    from customers.models import Customer, Payment, Invoice
+    """Fit, evaluate and store a new model version. Returns its metadata."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    frame = generate_features()
+    X, y = frame[FEATURES].to_numpy(), frame['churned'].to_numpy()
+    if len(frame) < 20 or y.all() or not y.any():
+        raise ValueError("Not enough labelled customers (both churned and active) to train")
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+    model = RandomForestClassifier(n_estimators=200, max_depth=10, class_weight='balanced', n_jobs=-1, random_state=42)
+    model.fit(X_train, y_train)
+    probabilities = model.predict_proba(X_test)[:, 1]
+    metrics = {
+        'accuracy': round(float(accuracy_score(y_test, probabilities >= 0.5)), 4),
+        'roc_auc': round(float(roc_auc_score(y_test, probabilities)), 4),
+    }
+
+    model.fit(X, y)  # Final model on every customer
+    now = timezone.now()
+    meta = {
+        'version': now.strftime('%Y%m%d%H%M%S'),
+        'trained_at': now.isoformat(),
+        'features': FEATURES,
+        'samples': int(len(frame)),
+        'churn_rate': round(float(y.mean()), 4),
+        'metrics': metrics,
+    }
+    _save_model(model, meta)
+    return meta
+
+
+# ─── Batch scoring ──────────────────────────────────────────────────────────
 
-def generate_features():
+def score_frame(frame, model=None):
+    """Risk scores (0-100) for a feature frame: churn probability, or the rules without a model."""
+    if frame.empty:
+        return np.array([])
+    if model is None:
+        return rule_based_scores(frame)
+    return np.round(model.predict_proba(frame[FEATURES].to_numpy())[:, 1] * 100, 1)
+
+
+def score_customers(customer_ids=None, chunk_size=SCORE_CHUNK):
+    """
+    Recompute Customer.risk_score for `customer_ids` (default: everyone) in chunks.
+    Returns {'scored': n, 'model_version': version or None}.
+    """
+    from customers.models import Customer
+
+    meta = latest_version()
+    model = load_model(meta['version']) if meta else None
+
+    if customer_ids is None:
+        ids = Customer.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=chunk_size)
+    else:
+        ids = sorted(customer_ids)
+
+    scored = 0
+    chunk = []
+    for customer_id in ids:
+        chunk.append(customer_id)
+        if len(chunk) == chunk_size:
+            scored += _score_chunk(chunk, model)
+            chunk = []
+    if chunk:
+        scored += _score_chunk(chunk, model)
+    return {'scored': scored, 'model_version': meta['version'] if meta else None}
+
+
+def _score_chunk(customer_ids, model):
     from customers.models import Customer
-    data = []
-    for customer in Customer.objects.all():
-        last_payment_days = customer.days_delinquent
-        balance = customer.balance
-        monthly_fee = customer.monthly_fee
-        complaints_last_6m = customer.complaints.filter(created_at__gte=timezone.now() - timedelta(days=180)).count()
-
-        data.append({
-            'days_delinquent': last_payment_days,
-            'balance_ratio': balance / monthly_fee if monthly_fee else 0,
-            'complaints_6m': complaints_last_6m,
-            'risk_score': customer.risk_score,
-            'churned': customer.status in ['Suspended', 'Terminated']  # label
-        })
-    df = pd.DataFrame(data)
-    X = df.drop('churned', axis=1)
-    y = df['churned']
-
-    model = RandomForestClassifier(n_estimators=200, max_depth=10)
-    model.fit(X, y)
-    joblib.dump(model, 'churn_model_2026.pkl')
-    return model
\ No newline at end of file
+
+    frame = generate_features(customer_ids)
+    scores = score_frame(frame, model)
+    Customer.objects.bulk_update(
+        [Customer(pk=customer_id, risk_score=float(score)) for customer_id, score in zip(frame.index, scores)],
+        ['risk_score'],
+        batch_size=UPDATE_BATCH,
+    )
+    return len(frame)
+
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_alter_unsubscribetoken_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SMSMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.UUIDField(db_index=True)),
+                ('phone', models.CharField(max_length=20)),
+                ('message', models.TextField()),
+                ('provider', models.CharField(blank=True, max_length=20)),
+                ('provider_reference', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('sent', 'Sent'), ('failed', 'Failed')], max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['phone', '-created_at'], name='notificatio_phone_ac22bf_idx'), models.Index(fields=['status', '-created_at'], name='notificatio_status_bcb577_idx')],
+            },
+        ),
+    ]
@@ -205,16 +205,41 @@ class Notification(AbstractNotification):
     def send_sms(self):
         """Send SMS notification (HR-style)"""
         try:
-            from hr.services import MTNSMSService
-            mtn_sms = MTNSMSService()
-            mtn_sms.send_sms(
-                to=self.recipient.phone_number,
-                message=f"High Prosper: {self.title or self.verb} - {self.message[:160]}"
+            from .sms import send_sms
+            send_sms(
+                self.recipient.phone_number,
+                f"High Prosper: {self.title or self.verb} - {self.message[:160]}"
             )
         except Exception as e:
             print(f"SMS send failed: {e}")
 
 
+class SMSMessage(models.Model):
+    """One recipient of an outbound SMS, written per batch by notifications.sms."""
+    STATUS_CHOICES = [
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    batch_id = models.UUIDField(db_index=True)  # One gateway request
+    phone = models.CharField(max_length=20)
+    message = models.TextField()
+    provider = models.CharField(max_length=20, blank=True)
+    provider_reference = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['phone', '-created_at']),
+            models.Index(fields=['status', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"SMS to {self.phone} ({self.status})"
+
 
 class PushSubscription(models.Model):
     """
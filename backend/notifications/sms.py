@@ -0,0 +1,243 @@
+# notifications/sms.py — SMS gateway
+"""
+The one outbound SMS path for HR, customers, reminders and notifications.
+
+- OAuth tokens are cached in Redis, so every worker and process shares one token
+  until it expires. A 401 drops the cached token and retries once.
+- Each process keeps one pooled requests.Session (keep-alive, retries on connect errors).
+- send() groups the recipients of one text into batches of SMS_BATCH_SIZE, since the MTN
+  API accepts a `to` list. A campaign to 50k customers is 500 requests instead of 50k.
+- A Redis fixed-window limiter caps gateway requests per second across all workers
+  (SMS_RATE_LIMIT).
+- Every recipient gets an SMSMessage row (sent/failed, provider, provider reference).
+- Africa's Talking is the fallback when MTN is not configured or rejects a batch.
+
+Provider URLs come from settings (MTN_SMS_BASE_URL, AFRICAS_TALKING_SMS_URL), so the
+gateway can be pointed at a local stub server.
+"""
+import logging
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
+
+from .models import SMSMessage
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_KEY = "sms:mtn:token"
+RATE_KEY = "sms:rate:{window}"
+REQUEST_TIMEOUT = 15
+POOL_SIZE = 20
+
+_session = None
+
+
+class SMSError(Exception):
+    """A provider rejected a batch."""
+
+
+def get_session():
+    """Per-process pooled HTTP session shared by every provider."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.5)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
+def normalize_phone(phone):
+    """Digits only (MSISDN without '+')."""
+    return ''.join(ch for ch in str(phone or '') if ch.isdigit())
+
+
+def throttle():
+    """Block until this process may make one more gateway request in the current second."""
+    limit = getattr(settings, 'SMS_RATE_LIMIT', 20)
+    if not limit:
+        return
+    while True:
+        window = int(time.time())
+        key = RATE_KEY.format(window=window)
+        cache.add(key, 0, 5)
+        try:
+            if cache.incr(key) <= limit:
+                return
+        except ValueError:  # Window key expired between add() and incr()
+            continue
+        time.sleep(max(window + 1 - time.time(), 0.01))
+
+
+# ─── Providers ───
+
+class MTNProvider:
+    name = 'mtn'
+
+    def __init__(self):
+        self.base_url = getattr(settings, 'MTN_SMS_BASE_URL', 'https://api.mtn.com').rstrip('/')
+        self.client_id = getattr(settings, 'MTN_SMS_CLIENT_ID', None)
+        self.client_secret = getattr(settings, 'MTN_SMS_CLIENT_SECRET', None)
+        self.sender_id = getattr(settings, 'MTN_SENDER_ID', None) or "HighProsper"
+
+    @property
+    def configured(self):
+        return bool(self.client_id and self.client_secret)
+
+    def get_token(self, session):
+        """OAuth 2.0 client-credentials token, shared by all processes through Redis."""
+        token = cache.get(TOKEN_CACHE_KEY)
+        if token:
+            return token
+
+        response = session.post(
+            f"{self.base_url}/v3/auth/oauth/token",
+            data={
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            },
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise SMSError(f"MTN token error: {response.status_code} - {response.text}")
+
+        token_data = response.json()
+        token = token_data["access_token"]
+        # Expire the cached copy a minute early so no request goes out with a dying token
+        cache.set(TOKEN_CACHE_KEY, token, max(int(token_data.get("expires_in", 3600)) - 60, 60))
+        return token
+
+    def send_batch(self, session, phones, text):
+        """Returns {phone: (ok, reference, error)}."""
+        payload = {"from": self.sender_id, "to": phones, "content": text}
+        for attempt in range(2):
+            throttle()
+            response = session.post(
+                f"{self.base_url}/v3/sms",
+                json=payload,
+                headers={"Authorization": f"Bearer {self.get_token(session)}"},
+                timeout=REQUEST_TIMEOUT,
+            )
+            if response.status_code == 401 and attempt == 0:
+                cache.delete(TOKEN_CACHE_KEY)
+                continue
+            break
+
+        if response.status_code not in (200, 201):
+            raise SMSError(f"MTN SMS error: {response.status_code} - {response.text}")
+
+        body = response.json() if response.content else {}
+        reference = str(body.get("transactionId") or body.get("requestId") or "")
+        return {phone: (True, reference, '') for phone in phones}
+
+
+class AfricasTalkingProvider:
+    name = 'africastalking'
+
+    def __init__(self):
+        self.url = getattr(settings, 'AFRICAS_TALKING_SMS_URL', "https://api.africastalking.com/version1/messaging")
+        self.username = getattr(settings, 'AFRICAS_TALKING_USERNAME', None)
+        self.api_key = getattr(settings, 'AFRICAS_TALKING_API_KEY', None)
+        self.sender_id = getattr(settings, 'AFRICAS_TALKING_SENDER_ID', None) or "HighProsper"
+
+    @property
+    def configured(self):
+        return bool(self.username and self.api_key)
+
+    def send_batch(self, session, phones, text):
+        throttle()
+        response = session.post(
+            self.url,
+            headers={"apiKey": self.api_key, "Accept": "application/json"},
+            data={
+                "username": self.username,
+                "to": ",".join(f"+{phone}" for phone in phones),
+                "message": text,
+                "from": self.sender_id,
+            },
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code not in (200, 201):
+            raise SMSError(f"Africa's Talking error: {response.status_code} - {response.text}")
+
+        recipients = response.json().get("SMSMessageData", {}).get("Recipients", [])
+        results = {phone: (False, '', 'No delivery report for recipient') for phone in phones}
+        for recipient in recipients:
+            phone = normalize_phone(recipient.get("number"))
+            if phone in results:
+                ok = recipient.get("status") == "Success"
+                results[phone] = (ok, recipient.get("messageId") or '', '' if ok else recipient.get("status", ''))
+        return results
+
+
+PROVIDERS = (MTNProvider, AfricasTalkingProvider)
+
+
+# ─── Sending ───
+
+def _send_batch(phones, text):
+    """Try each configured provider in order. Returns (provider_name, results)."""
+    session = get_session()
+    error = "No SMS provider configured"
+    for provider_class in PROVIDERS:
+        provider = provider_class()
+        if not provider.configured:
+            continue
+        try:
+            return provider.name, provider.send_batch(session, phones, text)
+        except (RequestException, SMSError, ValueError) as e:
+            error = str(e)
+            logger.warning(f"SMS batch of {len(phones)} via {provider.name} failed: {e}")
+    return '', {phone: (False, '', error) for phone in phones}
+
+
+def send(recipients, message, batch_size=None):
+    """
+    Send `message` to every phone in `recipients` (duplicates and blanks dropped),
+    one gateway request per batch.
+    Returns {'sent': n, 'failed': n, 'failed_phones': [...], 'batches': [batch_id, ...]}.
+    """
+    batch_size = batch_size or getattr(settings, 'SMS_BATCH_SIZE', 100)
+    phones = list(dict.fromkeys(filter(None, map(normalize_phone, recipients))))
+    summary = {'sent': 0, 'failed': 0, 'failed_phones': [], 'batches': []}
+
+    for start in range(0, len(phones), batch_size):
+        chunk = phones[start:start + batch_size]
+        batch_id = uuid.uuid4()
+        provider, results = _send_batch(chunk, message)
+
+        SMSMessage.objects.bulk_create([
+            SMSMessage(
+                batch_id=batch_id,
+                phone=phone,
+                message=message,
+                provider=provider,
+                provider_reference=reference,
+                status='sent' if ok else 'failed',
+                error=error,
+            )
+            for phone, (ok, reference, error) in results.items()
+        ])
+        failed = [phone for phone, (ok, _, _) in results.items() if not ok]
+        summary['sent'] += len(chunk) - len(failed)
+        summary['failed'] += len(failed)
+        summary['failed_phones'] += failed
+        summary['batches'].append(str(batch_id))
+
+    if phones:
+        logger.info(f"SMS to {len(phones)} recipients: {summary['sent']} sent, {summary['failed']} failed")
+    return summary
+
+
+def send_sms(phone, message):
+    """Single-recipient convenience wrapper; True when the gateway accepted the message."""
+    return send([phone], message)['sent'] == 1
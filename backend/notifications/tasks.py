@@ -6,6 +6,7 @@ from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 from django.db.models import Q
+from . import sms
 from .models import PushSubscription
 from .utils import send_push_to_subscription
 import logging
@@ -273,7 +274,33 @@ def send_push_to_phones(
 
 
 # ────────────────────────────────────────────────
-# 6. SCHEDULED CLEANUP TASK
+# 6. SMS CAMPAIGNS (notifications.sms gateway)
+# ────────────────────────────────────────────────
+SMS_CAMPAIGN_CHUNK = 2000  # Phones per worker task; the gateway batches them per request
+
+
+@shared_task(name="notifications.send_sms_batch")
+def send_sms_batch(phone_numbers: List[str], message: str) -> Dict[str, Any]:
+    """Send one text to a chunk of phones; every recipient is tracked as an SMSMessage."""
+    summary = sms.send(phone_numbers, message)
+    logger.info(f"SMS chunk completed: {summary['sent']} sent, {summary['failed']} failed")
+    return summary
+
+
+@shared_task(name="notifications.send_sms_campaign")
+def send_sms_campaign(phone_numbers: List[str], message: str) -> str:
+    """
+    Fan a campaign out to send_sms_batch tasks so several workers share it.
+    The gateway rate limit is global, so parallel chunks cannot overrun the provider.
+    """
+    for start in range(0, len(phone_numbers), SMS_CAMPAIGN_CHUNK):
+        send_sms_batch.delay(phone_numbers[start:start + SMS_CAMPAIGN_CHUNK], message)
+    chunks = -(-len(phone_numbers) // SMS_CAMPAIGN_CHUNK)
+    return f"SMS campaign queued: {len(phone_numbers)} phones in {chunks} chunks"
+
+
+# ────────────────────────────────────────────────
+# 7. SCHEDULED CLEANUP TASK
 # ────────────────────────────────────────────────
 @shared_task(bind=True, name="notifications.cleanup_inactive_subscriptions")
 def cleanup_inactive_subscriptions(self):
@@ -0,0 +1,107 @@
+# notifications/tests/test_sms.py — SMS gateway against a local stub server
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from notifications import sms
+from notifications.models import SMSMessage
+
+
+class StubMTNHandler(BaseHTTPRequestHandler):
+    """Minimal MTN SMS v3 API: OAuth token endpoint plus a multi-recipient send endpoint."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+
+        if self.path == '/v3/auth/oauth/token':
+            server.token_requests += 1
+            assert parse_qs(body)['grant_type'] == ['client_credentials']
+            return self._reply(200, {'access_token': f'token-{server.token_requests}', 'expires_in': 3600})
+
+        if self.path == '/v3/sms':
+            token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+            if token in server.revoked_tokens:
+                return self._reply(401, {'error': 'expired'})
+            data = json.loads(body)
+            server.batches.append(data['to'])
+            return self._reply(201, {'statusCode': '0000', 'transactionId': f"tx-{len(server.batches)}"})
+
+        self._reply(404, {})
+
+
+@override_settings(
+    MTN_SMS_CLIENT_ID='client',
+    MTN_SMS_CLIENT_SECRET='secret',
+    AFRICAS_TALKING_USERNAME=None,
+    AFRICAS_TALKING_API_KEY=None,
+    SMS_BATCH_SIZE=100,
+    SMS_RATE_LIMIT=0,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class SMSGatewayTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), StubMTNHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.token_requests = 0
+        self.server.batches = []
+        self.server.revoked_tokens = set()
+        cache.clear()
+        overrides = self.settings(MTN_SMS_BASE_URL=f"http://127.0.0.1:{self.server.server_port}")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_campaign_is_batched_with_one_token(self):
+        phones = [f"+2507880{i:05d}" for i in range(250)]
+        summary = sms.send(phones + phones[:10], "Service window tonight")
+
+        self.assertEqual(summary['sent'], 250)
+        self.assertEqual(summary['failed'], 0)
+        self.assertEqual([len(batch) for batch in self.server.batches], [100, 100, 50])
+        self.assertEqual(self.server.token_requests, 1)
+        self.assertEqual(SMSMessage.objects.filter(status='sent').count(), 250)
+        self.assertEqual(
+            SMSMessage.objects.filter(phone='250788000000').get().provider_reference, 'tx-1'
+        )
+
+    def test_expired_token_is_refreshed_once(self):
+        sms.send_sms('250788000001', 'first')
+        self.server.revoked_tokens.add('token-1')
+
+        self.assertTrue(sms.send_sms('250788000002', 'second'))
+        self.assertEqual(self.server.token_requests, 2)
+
+    def test_failed_batch_is_recorded(self):
+        with self.settings(MTN_SMS_BASE_URL='http://127.0.0.1:1'):
+            self.assertFalse(sms.send_sms('250788000003', 'unreachable'))
+
+        message = SMSMessage.objects.get(phone='250788000003')
+        self.assertEqual(message.status, 'failed')
+        self.assertTrue(message.error)
@@ -10,7 +10,6 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils import timezone
 from pywebpush import webpush, WebPushException
-from requests.exceptions import RequestException
 
 logger = logging.getLogger(__name__)
 
@@ -78,13 +77,13 @@ def send_email_notification(
 
 def send_sms_notification(phone: str, message: str, shorten: bool = True) -> bool:
     """
-    Send SMS with short unsubscribe instruction.
+    Send SMS with short unsubscribe instruction (through the notifications.sms gateway).
     """
-    if not phone or not settings.MTN_SMS_API_URL:
-        logger.warning("SMS skipped: no phone or API URL")
-        return False
+    from .sms import send_sms
 
-    phone = "+" + phone.lstrip("+0")
+    if not phone:
+        logger.warning("SMS skipped: no phone")
+        return False
 
     text = message[:140] if shorten else message
     sms_text = (
@@ -92,32 +91,11 @@ def send_sms_notification(phone: str, message: str, shorten: bool = True) -> boo
         f"Stop: Reply STOP or visit {settings.SITE_URL}/notifications/unsubscribe"
     )
 
-    payload = {
-        "to": phone,
-        "text": sms_text,
-        "from": settings.MTN_SMS_SENDER_ID or "HighProsper",
-    }
-
-    headers = {
-        "Authorization": f"Bearer {settings.MTN_SMS_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    try:
-        import requests
-        response = requests.post(
-            settings.MTN_SMS_API_URL,
-            json=payload,
-            headers=headers,
-            timeout=10,
-        )
-        response.raise_for_status()
+    if send_sms(phone, sms_text):
         logger.info(f"SMS sent to {phone} (with unsubscribe instruction)")
         return True
-
-    except RequestException as e:
-        logger.error(f"SMS failed to {phone}: {e}", exc_info=True)
-        return False
+    logger.error(f"SMS failed to {phone}")
+    return False
 
 
 # =============================================================================
@@ -12,6 +12,7 @@ from django.dispatch import receiver
 import requests
 from django.conf import settings
 from customers.models import Customer
+from tenants import sequences
 
 class PaymentMethod(models.Model):
     METHOD_TYPES = (
@@ -175,13 +176,8 @@ class Payment(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.reference:
-            # Generate unique reference
-            prefix = "PAY"
-            while True:
-                new_ref = f"{prefix}-{uuid.uuid4().hex[:12].upper()}"
-                if not Payment.objects.filter(reference=new_ref).exists():
-                    self.reference = new_ref
-                    break
+            # Unique by construction (tenants.sequences), no existence check needed
+            self.reference = sequences.next_number('PAY')
         super().save(*args, **kwargs)
 
     class Meta:
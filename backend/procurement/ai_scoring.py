@@ -1,46 +1,107 @@
 # backend/procurement/ai_scoring.py
-from django.db.models import Avg, Count, F
-from datetime import timedelta
+"""
+Supplier performance scoring, set-based.
+
+Delivery and quality rates for every supplier being scored come from two grouped
+aggregate queries (purchase orders, GRN lines); scores are derived in one pass over
+those rows and written back with bulk_update. Incremental runs only rescore suppliers
+with a PO updated or a GRN recorded since their last_scored_at.
+"""
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
 from django.utils import timezone
 
-from .models import GoodsReceipt
+from .models import GoodsReceipt, GoodsReceiptItem, PurchaseOrder, Supplier
 
+SCORED_PO_STATUSES = ['fully_received', 'closed']
+BULK_UPDATE_BATCH = 500
 
-def calculate_supplier_score(supplier):
+
+def suppliers_needing_rescore(queryset=None):
+    """Suppliers never scored, or with PO/GRN activity after their last score."""
+    queryset = Supplier.objects.all() if queryset is None else queryset
+    po_changed = PurchaseOrder.objects.filter(supplier=OuterRef('pk'), updated_at__gt=OuterRef('last_scored_at'))
+    grn_recorded = GoodsReceipt.objects.filter(
+        purchase_order__supplier=OuterRef('pk'), created_at__gt=OuterRef('last_scored_at')
+    )
+    return queryset.filter(Q(last_scored_at__isnull=True) | Exists(po_changed) | Exists(grn_recorded))
+
+
+def _delivery_rates(supplier_ids):
+    """{supplier_id: (orders, on_time)} — one grouped query."""
+    rows = (
+        PurchaseOrder.objects.filter(supplier_id__in=supplier_ids, status__in=SCORED_PO_STATUSES)
+        .order_by()
+        .values('supplier_id')
+        .annotate(
+            orders=Count('id', distinct=True),
+            on_time=Count('id', distinct=True, filter=Q(
+                receipts__receipt_date__lte=F('expected_delivery_date'),
+                receipts__deleted__isnull=True,
+            )),
+        )
+    )
+    return {row['supplier_id']: (row['orders'], row['on_time']) for row in rows}
+
+
+def _quality_rates(supplier_ids):
+    """{supplier_id: (received, accepted)} — one grouped query over GRN lines."""
+    rows = (
+        GoodsReceiptItem.objects.filter(
+            goods_receipt__purchase_order__supplier_id__in=supplier_ids,
+            goods_receipt__deleted__isnull=True,
+        )
+        .order_by()
+        .values(supplier=F('goods_receipt__purchase_order__supplier_id'))
+        .annotate(received=Sum('quantity_received'), accepted=Sum('quantity_accepted'))
+    )
+    return {row['supplier']: (row['received'] or 0, row['accepted'] or 0) for row in rows}
+
+
+def _score(delivery, quality):
     score = 100.0
     reasons = []
 
     # 1. On-time delivery (40%)
-    pos = supplier.purchaseorder_set.filter(status__in=['fully_received', 'closed'])
-    total_pos = pos.count()
-    if total_pos > 0:
-        on_time = pos.filter(receipts__receipt_date__lte=F('expected_delivery_date')).count()
-        delivery_rate = (on_time / total_pos) * 100
+    orders, on_time = delivery
+    if orders > 0:
+        delivery_rate = (on_time / orders) * 100
         score = score * (delivery_rate / 100)
         reasons.append(f"Delivery: {delivery_rate:.1f}%")
 
     # 2. Quality acceptance rate (30%)
-    total_received = 0
-    accepted = 0
-    for grn in GoodsReceipt.objects.filter(purchase_order__supplier=supplier):
-        for item in grn.items.all():
-            total_received += item.quantity_received
-            accepted += item.quantity_accepted
-    if total_received > 0:
-        quality_rate = (accepted / total_received) * 100
+    received, accepted = quality
+    if received > 0:
+        quality_rate = float(accepted / received) * 100
         score *= (quality_rate / 100) ** 0.3
         reasons.append(f"Quality: {quality_rate:.1f}%")
 
     # 3. Response time to RFQs (20%)
     # 4. Price competitiveness (10%)
 
-    final_score = max(0, min(100, score))
-    supplier.performance_score = round(final_score, 1)
-    supplier.last_scored_at = timezone.now()
-    supplier.save()
+    return max(0, min(100, score)), reasons
+
+
+def score_suppliers(suppliers):
+    """
+    Score `suppliers` (queryset or list) with two aggregate queries and one bulk_update.
+    Returns {supplier_id: {"score", "grade", "reasons"}}.
+    """
+    suppliers = list(suppliers)
+    supplier_ids = [supplier.pk for supplier in suppliers]
+    delivery = _delivery_rates(supplier_ids)
+    quality = _quality_rates(supplier_ids)
+    now = timezone.now()
+
+    results = {}
+    for supplier in suppliers:
+        final_score, reasons = _score(delivery.get(supplier.pk, (0, 0)), quality.get(supplier.pk, (0, 0)))
+        supplier.performance_score = round(final_score, 1)
+        supplier.last_scored_at = now
+        results[supplier.pk] = {"score": final_score, "grade": supplier.performance_grade, "reasons": reasons}
 
-    return {
-        "score": final_score,
-        "grade": supplier.performance_grade,
-        "reasons": reasons
-    }
\ No newline at end of file
+    Supplier.objects.bulk_update(suppliers, ['performance_score', 'last_scored_at'], batch_size=BULK_UPDATE_BATCH)
+    return results
+
+
+def calculate_supplier_score(supplier):
+    return score_suppliers([supplier])[supplier.pk]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:12
+
+from django.db import migrations
+from django.utils import timezone
+
+# doc_type, model, number field
+DOCUMENTS = (
+    ('PR', 'PurchaseRequisition', 'pr_number'),
+    ('RFQ', 'RFQ', 'rfq_number'),
+    ('PO', 'PurchaseOrder', 'po_number'),
+    ('GRN', 'GoodsReceipt', 'grn_number'),
+)
+
+
+def seed_today(apps, schema_editor):
+    """Start today's counters after numbers already issued by the old count()-based generator."""
+    DocumentSequence = apps.get_model('tenants', 'DocumentSequence')
+    today = timezone.now().strftime('%Y%m%d')
+
+    for doc_type, model_name, field in DOCUMENTS:
+        model = apps.get_model('procurement', model_name)
+        numbers = model._base_manager.filter(**{f'{field}__startswith': f'{doc_type}-{today}-'}).values_list(field, flat=True)
+        suffixes = [int(number.rsplit('-', 1)[1]) for number in numbers if number.rsplit('-', 1)[1].isdigit()]
+        if suffixes:
+            DocumentSequence.objects.update_or_create(
+                doc_type=doc_type, scope=0, period=today,
+                defaults={'last_value': max(suffixes)},
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procurement', '0001_initial'),
+        ('tenants', '0003_documentsequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_today, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+def mark_existing_posted(apps, schema_editor):
+    """Lines received before this migration went through the per-line signal; don't post them again."""
+    GoodsReceiptItem = apps.get_model('procurement', 'GoodsReceiptItem')
+    GoodsReceiptItem.objects.update(quantity_posted=models.F('quantity_accepted'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procurement', '0002_seed_document_sequences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goodsreceiptitem',
+            name='quantity_posted',
+            field=models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(mark_existing_posted, migrations.RunPython.noop),
+    ]
@@ -12,6 +12,8 @@ from model_utils import FieldTracker
 from safedelete.models import SafeDeleteModel
 from safedelete.managers import SafeDeleteManager
 
+from tenants import sequences
+
 from .managers import TenantManager
 
 User = get_user_model()
@@ -212,9 +214,7 @@ class PurchaseRequisition(SafeDeleteModel):
         super().save(*args, **kwargs)
 
     def _generate_pr_number(self):
-        today = timezone.now().strftime('%Y%m%d')
-        count = PurchaseRequisition.objects.filter(pr_number__startswith=f"PR-{today}").count() + 1
-        return f"PR-{today}-{count:04d}"
+        return sequences.next_number('PR')
 
     def __str__(self):
         return f"{self.pr_number} | {self.title}"
@@ -270,9 +270,7 @@ class RFQ(SafeDeleteModel):
         super().save(*args, **kwargs)
 
     def _generate_rfq_number(self):
-        today = timezone.now().strftime('%Y%m%d')
-        count = RFQ.objects.filter(rfq_number__startswith=f"RFQ-{today}").count() + 1
-        return f"RFQ-{today}-{count:04d}"
+        return sequences.next_number('RFQ')
 
     def __str__(self):
         return self.rfq_number
@@ -353,9 +351,7 @@ class PurchaseOrder(SafeDeleteModel):
         super().save(*args, **kwargs)
 
     def _generate_po_number(self):
-        today = timezone.now().strftime('%Y%m%d')
-        count = PurchaseOrder.objects.filter(po_number__startswith=f"PO-{today}").count() + 1
-        return f"PO-{today}-{count:04d}"
+        return sequences.next_number('PO')
 
     def __str__(self):
         return self.po_number
@@ -408,9 +404,7 @@ class GoodsReceipt(SafeDeleteModel):
         super().save(*args, **kwargs)
 
     def _generate_grn_number(self):
-        today = timezone.now().strftime('%Y%m%d')
-        count = GoodsReceipt.objects.filter(grn_number__startswith=f"GRN-{today}").count() + 1
-        return f"GRN-{today}-{count:04d}"
+        return sequences.next_number('GRN')
 
     def __str__(self):
         return self.grn_number
@@ -422,6 +416,7 @@ class GoodsReceiptItem(models.Model):
     quantity_received = models.DecimalField(max_digits=12, decimal_places=3)
     quantity_accepted = models.DecimalField(max_digits=12, decimal_places=3)
     quantity_rejected = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    quantity_posted = models.DecimalField(max_digits=12, decimal_places=3, default=0, editable=False)  # Accepted quantity already in stock
     notes = models.TextField(blank=True)
 
     def clean(self):
@@ -0,0 +1,157 @@
+# backend/procurement/posting.py
+"""
+GRN → stock posting.
+
+post_goods_receipt() posts a whole GoodsReceipt at once:
+- one query loads every line with its PO line, item and stock record;
+- the affected WarehouseStock rows are locked in one SELECT ... FOR UPDATE ordered by id
+  (so concurrent postings can't deadlock); missing rows are bulk-created first;
+- quantities and costs are applied with bulk_update and the StockTransactions bulk_created.
+
+Posting is idempotent. Each line remembers what it already posted (quantity_posted) and
+only the difference is applied: re-saves and repeated calls never double-count, and an
+edited accepted quantity posts its correction. Quantities are rounded half up to whole
+units; a correction never takes WarehouseStock below zero (it is clamped and logged).
+
+schedule_posting() is called from the GoodsReceiptItem post_save signal; all lines saved in
+one transaction (e.g. the admin inline formset) share a single posting after commit.
+"""
+import logging
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from high_prosper.on_commit import on_commit_once
+from stock.models import StockTransaction, WarehouseStock
+from .models import GoodsReceipt, GoodsReceiptItem
+
+logger = logging.getLogger(__name__)
+
+
+def _whole_units(quantity):
+    """WarehouseStock counts whole units: round received quantities half up, never truncate."""
+    return int(Decimal(quantity).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def _pending_lines(grn):
+    """(line, stock, warehouse_id, delta) for lines with an unposted difference."""
+    lines = GoodsReceiptItem.objects.filter(goods_receipt=grn).select_related('po_item__item__stock_record')
+    pending = []
+    for line in lines:
+        delta = _whole_units(line.quantity_accepted) - _whole_units(line.quantity_posted)
+        if not delta:
+            continue
+        item = line.po_item.item
+        if not item or not item.track_inventory:
+            continue
+        stock = item.stock_record
+        if not stock:
+            logger.warning(f"Item {item.sku} has no linked stock record")
+            continue
+        if not stock.default_warehouse_id:
+            logger.warning(f"Stock {stock.item_code} has no default warehouse; GRN {grn.grn_number} line not posted")
+            continue
+        pending.append((line, stock, stock.default_warehouse_id, delta))
+    return pending
+
+
+def _lock_warehouse_stock(keys, unit_prices):
+    """Lock (creating when missing) the WarehouseStock rows for `keys` = {(stock_id, warehouse_id)}."""
+    def select():
+        rows = (
+            WarehouseStock.objects.select_for_update()
+            .filter(stock_id__in={stock for stock, _ in keys}, warehouse_id__in={warehouse for _, warehouse in keys})
+            .order_by('id')
+        )
+        return {(row.stock_id, row.warehouse_id): row for row in rows if (row.stock_id, row.warehouse_id) in keys}
+
+    locked = select()
+    missing = keys - locked.keys()
+    if missing:
+        WarehouseStock.objects.bulk_create(
+            [WarehouseStock(stock_id=stock, warehouse_id=warehouse, unit_price=unit_prices[(stock, warehouse)])
+             for stock, warehouse in missing],
+            ignore_conflicts=True,
+        )
+        locked = select()
+    return locked
+
+
+def post_goods_receipt(grn_id):
+    """Post every unposted line difference of one GRN to stock. Returns the number of lines posted."""
+    with transaction.atomic():
+        # Serializes postings of the same GRN
+        grn = (
+            GoodsReceipt.all_objects.select_for_update(of=('self',))
+            .select_related('purchase_order')
+            .filter(pk=grn_id)
+            .first()
+        )
+        if grn is None:  # Deleted, or scheduled by a rolled-back transaction
+            return 0
+        pending = _pending_lines(grn)
+        if not pending:
+            return 0
+
+        unit_prices = {(stock.pk, warehouse): line.po_item.unit_price for line, stock, warehouse, _ in pending}
+        locked = _lock_warehouse_stock(set(unit_prices), unit_prices)
+
+        now = timezone.now()
+        transactions = []
+        for line, stock, warehouse, delta in pending:
+            row = locked[(stock.pk, warehouse)]
+            unit_price = line.po_item.unit_price
+            line.quantity_posted, posted = line.quantity_accepted, line.quantity_posted
+            if row.quantity + delta < 0:
+                # A downward correction of stock that was already issued: stock can't go negative
+                logger.warning(
+                    f"GRN {grn.grn_number}: correction of {delta} for {stock.item_code} clamped to "
+                    f"{-row.quantity} (on hand {row.quantity})"
+                )
+                delta = -row.quantity
+            row.unit_price = unit_price  # Update cost
+            row.last_updated = now
+            if not delta:
+                continue
+            row.quantity += delta
+            transactions.append(StockTransaction(
+                stock=stock,
+                to_warehouse_id=warehouse,
+                transaction_type='in' if posted == 0 else 'correction',
+                quantity=delta,
+                unit_price=unit_price,
+                total_value=abs(delta) * unit_price,
+                reference=f"GRN-{grn.grn_number}",
+                user_id=grn.received_by_id,
+                notes=f"Received via GRN for PO {grn.purchase_order.po_number}",
+            ))
+
+        WarehouseStock.objects.bulk_update(
+            {id(row): row for row in (locked[(stock.pk, warehouse)] for _, stock, warehouse, _ in pending)}.values(),
+            ['quantity', 'unit_price', 'last_updated'],
+        )
+        created = StockTransaction.objects.bulk_create(transactions)
+        GoodsReceiptItem.objects.bulk_update([line for line, _, _, _ in pending], ['quantity_posted'])
+
+        # bulk_create skips post_save; replay it after commit for the stock broadcast handlers
+        transaction.on_commit(lambda: _send_created_signals(created))
+
+    logger.info(f"GRN {grn.grn_number} posted: {len(pending)} lines")
+    return len(pending)
+
+
+def _send_created_signals(transactions):
+    for stock_transaction in transactions:
+        post_save.send(sender=StockTransaction, instance=stock_transaction, created=True, raw=False, using='default', update_fields=None)
+
+
+def _post_goods_receipts(grn_ids):
+    for grn_id in sorted(grn_ids):
+        post_goods_receipt(grn_id)
+
+
+def schedule_posting(grn_id):
+    """Post `grn_id` after the current transaction commits (immediately in autocommit)."""
+    on_commit_once('procurement.post_goods_receipts', _post_goods_receipts, [grn_id])
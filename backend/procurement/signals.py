@@ -1,7 +1,6 @@
 # backend/procurement/signals.py
 import logging
 from io import BytesIO
-from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
@@ -18,7 +17,7 @@ from .models import (
 )
 from .blockchain import verify_invoice_on_blockchain
 from .whatsapp import send_po_whatsapp
-from stock.models import WarehouseStock, StockTransaction
+from .posting import schedule_posting
 from billing.models import UsageRecord
 
 logger = logging.getLogger(__name__)
@@ -129,48 +128,9 @@ View: https://erp.highprosper.com/admin/procurement/purchaserequisition/{instanc
 # 3. GRN: Update Stock on Receipt
 # =============================================================================
 @receiver(post_save, sender=GoodsReceiptItem)
-def update_stock_from_grn(sender, instance, created, **kwargs):
-    """When GRN item is saved, increase stock in warehouse"""
-    if not created:
-        return
-
-    po_item = instance.po_item
-    if not po_item.item or not po_item.item.track_inventory:
-        return
-
-    stock_record = po_item.item.stock_record
-    if not stock_record:
-        logger.warning(f"Item {po_item.item.sku} has no linked stock record")
-        return
-
-    warehouse = instance.goods_receipt.purchase_order.delivery_address_warehouse  # or default
-    # Fallback to company default warehouse
-    if not warehouse:
-        warehouse = instance.goods_receipt.purchase_order.company.default_warehouse
-
-    with transaction.atomic():
-        ws, _ = WarehouseStock.objects.select_for_update().get_or_create(
-            stock=stock_record,
-            warehouse=warehouse,
-            defaults={'unit_price': po_item.unit_price}
-        )
-        ws.quantity += instance.quantity_accepted
-        ws.unit_price = po_item.unit_price  # Update cost
-        ws.save()
-
-        # Record transaction
-        StockTransaction.objects.create(
-            stock=stock_record,
-            to_warehouse=warehouse,
-            transaction_type='in',
-            quantity=instance.quantity_accepted,
-            unit_price=po_item.unit_price,
-            reference=f"GRN-{instance.goods_receipt.grn_number}",
-            user=instance.goods_receipt.received_by,
-            notes=f"Received via GRN for PO {instance.goods_receipt.purchase_order.po_number}"
-        )
-
-        logger.info(f"Stock updated: +{instance.quantity_accepted} {stock_record.name}")
+def update_stock_from_grn(sender, instance, **kwargs):
+    """Post the GRN to stock once its lines are committed (one batched, idempotent posting per GRN)"""
+    schedule_posting(instance.goods_receipt_id)
 
 
 # =============================================================================
@@ -5,7 +5,7 @@ from datetime import timedelta
 from django.core.mail import send_mail
 
 from .ai_agent import ProsperBot
-from .ai_scoring import calculate_supplier_score
+from .ai_scoring import score_suppliers, suppliers_needing_rescore
 from .models import Supplier, PurchaseOrder
 from django.core.mail import EmailMessage
 from django.conf import settings
@@ -102,9 +102,17 @@ def send_grn_reminders():
 
 # tasks.py
 @shared_task
-def update_all_supplier_scores():
-    for supplier in Supplier.objects.filter(is_approved=True):
-        calculate_supplier_score(supplier)
+def update_all_supplier_scores(full=False):
+    """
+    Rescore approved suppliers set-based (procurement.ai_scoring).
+    Incremental by default: only suppliers with PO/GRN activity since their last score.
+    """
+    suppliers = Supplier.objects.filter(is_approved=True).only('id', 'performance_score', 'last_scored_at')
+    if not full:
+        suppliers = suppliers_needing_rescore(suppliers)
+    results = score_suppliers(suppliers)
+    logger.info(f"Rescored {len(results)} suppliers (full={full})")
+    return len(results)
 
 @shared_task
 def check_procurement_inbox():
@@ -0,0 +1,260 @@
+# reports/engine.py — Streaming report engine
+"""
+Report generation for reports.tasks.generate_report_task, on top of the reports.exports writers.
+
+- Each ReportTemplate.report_type maps to a registered ReportType (an ExportSpec): a values()
+  projection read with .iterator(), so no report is ever materialised as Python objects.
+- CSV, Excel (write_only) and PDF are written incrementally by reports.exports; JSON is
+  streamed as an array. Files are spooled to disk past SPOOL_MAX_MEMORY.
+- Progress: Report.total_rows is counted up front and Report.rows_processed advanced with an
+  F() update every PROGRESS_EVERY rows, so parallel parts add up. A cancelled report stops at
+  its next progress update.
+- Reports above SPLIT_ROW_THRESHOLD rows (or requested with parameters.parallel) are split by
+  warehouse or date range. Each part streams its rows into a JSON-lines part file in storage
+  in its own task; a chord callback merges the part files in order into the final file.
+"""
+import json
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from stock.models import StockTransaction, WarehouseStock
+from .exports import WRITERS as EXPORT_WRITERS, ExportSpec, SPOOL_MAX_MEMORY
+from .models import Report
+
+PROGRESS_EVERY = 5000
+SPLIT_ROW_THRESHOLD = 250_000
+DEFAULT_SPLIT_DAYS = 7
+PART_PATH = "reports/parts/{report_id}/{index:04d}.jsonl"
+
+REPORT_TYPES = {}
+
+
+class ReportCancelled(Exception):
+    """The report was cancelled while it was being generated."""
+
+
+def register(cls):
+    REPORT_TYPES[cls.report_type] = cls
+    return cls
+
+
+def get_report_type(report_type, parameters=None, **kwargs):
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"No report engine for report type '{report_type}'")
+    return REPORT_TYPES[report_type](parameters, **kwargs)
+
+
+def _cell(value):
+    """Plain JSON/Excel-friendly cell values (identical whether a report is split or not)."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if timezone.is_aware(value) else value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class ReportType(ExportSpec):
+    """
+    One report type. Subclasses set report_type/headers/fields and implement get_queryset();
+    partitions() decides how a large report is split across parallel tasks.
+    """
+    report_type = None
+    split_by = None             # 'warehouse' or 'date'
+    warehouse_field = 'warehouse_id'
+    date_field = 'created_at'
+
+    def __init__(self, params=None, user=None, report_id=None, part_files=None):
+        super().__init__(params, user)
+        self.report_id = report_id
+        self.part_files = part_files    # Merge mode: rows come from these part files
+        self.rows_tracked = 0
+
+    # ─── Filters ────────────────────────────────────────────────────────────
+    def date_range(self):
+        """(start, end) dates from the start_date/end_date parameters, inclusive."""
+        start = parse_date(str(self.params.get('start_date') or '')) or timezone.localdate() - timedelta(days=30)
+        end = parse_date(str(self.params.get('end_date') or '')) or timezone.localdate()
+        return start, end
+
+    def filter_warehouse(self, queryset):
+        if self.params.get('warehouse_id'):
+            queryset = queryset.filter(**{self.warehouse_field: self.params['warehouse_id']})
+        return queryset
+
+    def filter_dates(self, queryset):
+        start, end = self.date_range()
+        return queryset.filter(**{
+            f'{self.date_field}__gte': _day_start(start),
+            f'{self.date_field}__lt': _day_start(end + timedelta(days=1)),
+        })
+
+    # ─── Splitting ──────────────────────────────────────────────────────────
+    def partitions(self, total):
+        """Parameter overrides, one per parallel part; [] to generate in a single pass."""
+        if not self.split_by or (total < SPLIT_ROW_THRESHOLD and not self.params.get('parallel')):
+            return []
+        if self.split_by == 'warehouse':
+            warehouse_ids = (
+                self.get_queryset().order_by(self.warehouse_field)
+                .values_list(self.warehouse_field, flat=True).distinct()
+            )
+            parts = [{'warehouse_id': warehouse_id} for warehouse_id in warehouse_ids]
+        else:
+            start, end = self.date_range()
+            days = int(self.params.get('split_days') or DEFAULT_SPLIT_DAYS)
+            parts = []
+            while start <= end:
+                part_end = min(start + timedelta(days=days - 1), end)
+                parts.append({'start_date': start.isoformat(), 'end_date': part_end.isoformat()})
+                start = part_end + timedelta(days=1)
+        return parts if len(parts) > 1 else []
+
+    # ─── Rows ───────────────────────────────────────────────────────────────
+    def rows(self):
+        if self.part_files is not None:
+            for name in self.part_files:
+                with default_storage.open(name, 'rb') as part:
+                    for line in part:
+                        yield json.loads(line)
+            return
+
+        pending = 0
+        for values in super().rows():
+            yield values
+            pending += 1
+            if pending == PROGRESS_EVERY:
+                self.track_progress(pending)
+                pending = 0
+        if pending:
+            self.track_progress(pending)
+
+    def row(self, values):
+        if self.part_files is not None:
+            return values
+        return [_cell(values[field]) for field in self.fields]
+
+    def track_progress(self, rows):
+        if self.report_id is None:
+            return
+        updated = Report.objects.filter(pk=self.report_id, status='generating').update(
+            rows_processed=F('rows_processed') + rows
+        )
+        if not updated:
+            raise ReportCancelled(f"Report {self.report_id} is no longer generating")
+        self.rows_tracked += rows
+
+
+# ─── Report types ───────────────────────────────────────────────────────────
+
+@register
+class InventoryValuationReport(ReportType):
+    report_type = 'inventory_valuation'
+    title = "Inventory Valuation"
+    filename = "inventory_valuation"
+    sheet_title = "Report"
+    headers = ('Stock Code', 'Stock Name', 'Warehouse', 'Quantity', 'Unit Price', 'Total Value')
+    fields = ('stock__item_code', 'stock__name', 'warehouse__name', 'quantity', 'unit_price', 'total_value')
+    column_widths = (16, 32, 22, 12, 14, 16)
+    split_by = 'warehouse'
+
+    def get_queryset(self):
+        queryset = WarehouseStock.objects.annotate(
+            total_value=ExpressionWrapper(
+                F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=16, decimal_places=2)
+            )
+        ).order_by('warehouse_id', 'id')
+        return self.filter_warehouse(queryset)
+
+    def summary(self):
+        totals = self.get_queryset().order_by().aggregate(items=Count('id'), value=Sum('total_value'))
+        return [('Total Items', totals['items']), ('Total Value', _cell(totals['value'] or 0))]
+
+
+@register
+class StockMovementReport(ReportType):
+    report_type = 'stock_movement'
+    title = "Stock Movement"
+    filename = "stock_movement"
+    sheet_title = "Report"
+    headers = ('Transaction ID', 'Stock', 'Type', 'Quantity', 'Warehouse', 'Date')
+    fields = ('id', 'stock__name', 'transaction_type', 'quantity', 'warehouse_name', 'created_at')
+    column_widths = (14, 32, 14, 12, 22, 18)
+    split_by = 'date'
+
+    def get_queryset(self):
+        queryset = StockTransaction.objects.annotate(
+            warehouse_name=Coalesce('to_warehouse__name', 'from_warehouse__name'),
+        ).order_by('created_at', 'id')
+        return self.filter_dates(queryset)
+
+    def summary(self):
+        start, end = self.date_range()
+        totals = self.get_queryset().order_by().aggregate(transactions=Count('id'), quantity=Sum('quantity'))
+        return [
+            ('Period', f"{start.isoformat()} – {end.isoformat()}"),
+            ('Transactions', totals['transactions']),
+            ('Net Quantity', totals['quantity'] or 0),
+        ]
+
+
+# ─── Writers ────────────────────────────────────────────────────────────────
+
+def write_json(spec, fileobj):
+    """JSON array of {header: value} objects, written row by row. Returns the row count."""
+    count = 0
+    fileobj.write(b'[')
+    for values in spec.rows():
+        if count:
+            fileobj.write(b',\n')
+        fileobj.write(json.dumps(dict(zip(spec.headers, spec.row(values))), default=str).encode())
+        count += 1
+    fileobj.write(b']')
+    return count
+
+
+WRITERS = {**EXPORT_WRITERS, 'json': write_json}
+
+
+def render(spec, format):
+    """Write a report into a spooled temp file; returns (file, row count) positioned at 0."""
+    if format not in WRITERS:
+        raise ValueError(f"Unsupported report format '{format}'")
+    fileobj = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    count = WRITERS[format](spec, fileobj)
+    fileobj.seek(0)
+    return fileobj, count
+
+
+def write_part(spec, report_id, index):
+    """Stream one partition's formatted rows into a JSON-lines part file. Returns (name, count)."""
+    count = 0
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as fileobj:
+        for values in spec.rows():
+            fileobj.write(json.dumps(spec.row(values), default=str).encode() + b'\n')
+            count += 1
+        fileobj.seek(0)
+        name = PART_PATH.format(report_id=report_id, index=index)
+        if default_storage.exists(name):  # Retried part
+            default_storage.delete(name)
+        name = default_storage.save(name, File(fileobj))
+    return name, count
+
+
+def delete_parts(names):
+    for name in names:
+        default_storage.delete(name)
+
@@ -0,0 +1,355 @@
+# reports/exports.py — Streaming export engine
+"""
+Shared CSV / Excel / PDF export engine for list exports (users, stock, collectors...).
+
+An ExportSpec declares a values() projection, headers and a row formatter.
+Rows are always read with .iterator(chunk_size=...) so no queryset cache is
+built, and every writer holds at most one chunk or one page in memory:
+
+- CSV is generated row by row into a StreamingHttpResponse.
+- Excel uses an openpyxl write_only workbook (rows are spooled to disk).
+- PDF draws one page-sized Table at a time straight onto a ReportLab canvas
+  (no flowable list; ReportLab only keeps the compressed page streams).
+
+Excel/PDF exports above INLINE_ROW_LIMIT rows, or any export requested with
+?async=true, run as an ExportJob in Celery (reports.tasks.run_export_job) and
+the response is a 202 with the job's status and download links.
+"""
+import csv
+import io
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas as pdf_canvas
+from reportlab.platypus import Frame, Paragraph, Spacer, Table, TableStyle
+from rest_framework import status
+from rest_framework.response import Response
+
+CHUNK_SIZE = 2000
+INLINE_ROW_LIMIT = 5000
+SPOOL_MAX_MEMORY = 5 * 1024 * 1024  # Spill generated files to disk above 5 MB
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+EXTENSIONS = {'csv': 'csv', 'excel': 'xlsx', 'pdf': 'pdf'}
+
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+DEFAULT_PDF_TABLE_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 8),
+    ('FONTSIZE', (0, 1), (-1, -1), 7),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('GRID', (0, 0), (-1, -1), 0.4, colors.grey),
+    ('LEFTPADDING', (0, 0), (-1, -1), 2),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+]
+
+
+def truncate(value, length, suffix='…'):
+    value = '' if value is None else str(value)
+    return value[:length] + suffix if len(value) > length else value
+
+
+class ExportSpec:
+    """
+    One exportable list. Subclasses set headers/fields and implement get_queryset();
+    the hooks below let an export add styling, summaries and PDF decorations.
+    Specs are rebuilt from (dotted path, params) inside Celery, so params must be JSON-serializable.
+    """
+    title = "Export"
+    filename = "export"
+    headers = ()
+    fields = ()                 # values() projection, may include annotations
+    chunk_size = CHUNK_SIZE
+
+    sheet_title = "Data"
+    header_color = "1F497D"
+    column_widths = ()          # Excel widths; write_only sheets can't be auto-sized afterwards
+
+    pdf_pagesize = landscape(letter)
+    pdf_col_widths = None
+    pdf_top_margin = 1.0 * inch
+    pdf_bottom_margin = 0.8 * inch
+    pdf_rows_per_page = 30
+    pdf_table_style = DEFAULT_PDF_TABLE_STYLE
+
+    def __init__(self, params=None, user=None):
+        self.params = dict(params or {})
+        self.user = user
+
+    @classmethod
+    def path(cls):
+        return f"{cls.__module__}.{cls.__qualname__}"
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def count(self):
+        return self.get_queryset().order_by().count()
+
+    def rows(self):
+        yield from self.get_queryset().values(*self.fields).iterator(chunk_size=self.chunk_size)
+
+    def row(self, values):
+        return [values[field] for field in self.fields]
+
+    def pdf_row(self, values):
+        return ['' if value is None else str(value) for value in self.row(values)]
+
+    def get_filename(self, format):
+        return f"{self.filename}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{EXTENSIONS[format]}"
+
+    def summary(self):
+        """[(label, value)] shown on the Excel summary sheet and the PDF first page."""
+        return []
+
+    # ─── Excel hooks ────────────────────────────────────────────────────────
+    def prepare_sheet(self, ws):
+        """Called before any row is written (widths and panes must precede sheet data)."""
+        for index, width in enumerate(self.column_widths):
+            ws.column_dimensions[get_column_letter(index + 1)].width = width
+        ws.freeze_panes = "A2"
+
+    def sheet_row(self, ws, values, row_number):
+        return self.row(values)
+
+    def finish_sheet(self, ws, last_row):
+        """Called after the last data row, e.g. for conditional formatting."""
+
+    def write_summary_sheet(self, wb, summary, row_count):
+        if not summary:
+            return
+        ws = wb.create_sheet("Summary")
+        ws.column_dimensions['A'].width = 28
+        ws.column_dimensions['B'].width = 20
+        ws.append([_bold(ws, self.title)])
+        ws.append([f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')} | Rows: {row_count}"])
+        ws.append([])
+        for label, value in summary:
+            ws.append([_bold(ws, label), value])
+
+    # ─── PDF hooks ──────────────────────────────────────────────────────────
+    def pdf_preamble(self, summary):
+        """Flowables drawn on the first page before the table pages."""
+        styles = getSampleStyleSheet()
+        elements = [
+            Paragraph(self.title, styles['Title']),
+            Paragraph(f"Generated: {timezone.now().strftime('%B %d, %Y %H:%M')}", styles['Normal']),
+            Spacer(1, 0.3 * inch),
+        ]
+        if summary:
+            table = Table([[label, value] for label, value in summary], colWidths=[2.8 * inch, 2.0 * inch])
+            table.setStyle(TableStyle([
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ]))
+            elements.append(table)
+        return elements
+
+    def decorate_pdf_page(self, canvas, page_number):
+        """Header/footer for every page; the default prints a page number."""
+        canvas.saveState()
+        canvas.setFont("Helvetica-Oblique", 7)
+        canvas.drawCentredString(self.pdf_pagesize[0] / 2, 0.2 * inch, f"Page {page_number}")
+        canvas.restoreState()
+
+
+def _bold(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = Font(bold=True)
+    return cell
+
+
+def styled_cell(ws, value, fill=None, font=None):
+    """Cell with inline styling for write_only sheets (cells can't be styled after append)."""
+    cell = WriteOnlyCell(ws, value=value)
+    if fill:
+        cell.fill = PatternFill(start_color=fill, end_color=fill, fill_type="solid")
+    if font:
+        cell.font = font
+    return cell
+
+
+# ─── Writers ────────────────────────────────────────────────────────────────
+
+class Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(spec):
+    writer = csv.writer(Echo())
+    yield writer.writerow(spec.headers)
+    for values in spec.rows():
+        yield writer.writerow(spec.row(values))
+
+
+def write_csv(spec, fileobj):
+    """UTF-8 CSV into a binary file object. Returns the number of data rows."""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(spec.headers)
+    count = 0
+    for values in spec.rows():
+        writer.writerow(spec.row(values))
+        count += 1
+    text.flush()
+    text.detach()  # Leave fileobj open for the caller
+    return count
+
+
+def write_excel(spec, fileobj):
+    """write_only workbook: data sheet streamed row by row, then the summary sheet. Returns the row count."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(spec.sheet_title)
+    spec.prepare_sheet(ws)
+
+    header = []
+    for title in spec.headers:
+        cell = styled_cell(ws, title, fill=spec.header_color, font=HEADER_FONT)
+        cell.alignment = HEADER_ALIGNMENT
+        header.append(cell)
+    ws.append(header)
+
+    count = 0
+    for values in spec.rows():
+        count += 1
+        ws.append(spec.sheet_row(ws, values, count + 1))
+    spec.finish_sheet(ws, count + 1)
+
+    spec.write_summary_sheet(wb, spec.summary(), count)
+    wb.save(fileobj)
+    return count
+
+
+def write_pdf(spec, fileobj):
+    """Preamble page, then one Table per page drawn directly on the canvas. Returns the row count."""
+    width, height = spec.pdf_pagesize
+    margin = 0.4 * inch
+    top, bottom = spec.pdf_top_margin, spec.pdf_bottom_margin
+    frame_width, frame_height = width - 2 * margin, height - top - bottom
+
+    canvas = pdf_canvas.Canvas(fileobj, pagesize=spec.pdf_pagesize)
+
+    def end_page():
+        spec.decorate_pdf_page(canvas, canvas.getPageNumber())
+        canvas.showPage()
+
+    preamble = list(spec.pdf_preamble(spec.summary()))
+    while preamble:
+        remaining = len(preamble)
+        Frame(margin, bottom, frame_width, frame_height, showBoundary=0).addFromList(preamble, canvas)
+        if len(preamble) == remaining:
+            preamble.pop(0)  # Larger than a whole page; skip it rather than loop
+            continue
+        end_page()
+
+    def draw_table(rows):
+        table = Table([list(spec.headers)] + rows, colWidths=spec.pdf_col_widths, repeatRows=1)
+        table.setStyle(TableStyle(spec.pdf_table_style))
+        _, table_height = table.wrapOn(canvas, frame_width, frame_height)
+        table.drawOn(canvas, margin, height - top - table_height)
+        end_page()
+
+    count = 0
+    page_rows = []
+    for values in spec.rows():
+        page_rows.append(spec.pdf_row(values))
+        count += 1
+        if len(page_rows) == spec.pdf_rows_per_page:
+            draw_table(page_rows)
+            page_rows = []
+    if page_rows or count == 0:
+        draw_table(page_rows)
+
+    canvas.save()
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'excel': write_excel,
+    'pdf': write_pdf,
+}
+
+
+def render_to_file(spec, format):
+    """Write an export into a spooled temp file; returns (file, row count) positioned at 0."""
+    fileobj = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    count = WRITERS[format](spec, fileobj)
+    fileobj.seek(0)
+    return fileobj, count
+
+
+# ─── HTTP entry points ──────────────────────────────────────────────────────
+
+def _query_params(request):
+    return getattr(request, 'query_params', request.GET)
+
+
+def wants_async(request):
+    return _query_params(request).get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def stream_export(spec, format):
+    """Inline response: CSV streamed as generated, Excel/PDF streamed from the spooled file."""
+    filename = spec.get_filename(format)
+    if format == 'csv':
+        response = StreamingHttpResponse(iter_csv(spec), content_type=CONTENT_TYPES['csv'])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    fileobj, _ = render_to_file(spec, format)
+    return FileResponse(fileobj, as_attachment=True, filename=filename, content_type=CONTENT_TYPES[format])
+
+
+def queue_export(spec, format, request):
+    """Create an ExportJob for the spec and hand it to Celery. Returns the 202 response."""
+    from .models import ExportJob
+    from .tasks import run_export_job
+
+    user = request.user if request.user.is_authenticated else None
+    job = ExportJob.objects.create(
+        user=user, spec=spec.path(), params=spec.params, format=format, title=spec.title,
+    )
+    task = run_export_job.delay(str(job.id))
+    ExportJob.objects.filter(pk=job.pk).update(task_id=task.id)
+
+    return Response({
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': request.build_absolute_uri(reverse('exportjob-detail', args=[job.id])),
+        'download_url': request.build_absolute_uri(reverse('exportjob-download', args=[job.id])),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def export_response(request, spec, format, inline_limit=INLINE_ROW_LIMIT):
+    """
+    Serve an export inline, or queue it when the caller asks for ?async=true or a
+    non-CSV export exceeds inline_limit rows (CSV streams at any size).
+    """
+    if wants_async(request) or (format != 'csv' and spec.count() > inline_limit):
+        return queue_export(spec, format, request)
+    return stream_export(spec, format)
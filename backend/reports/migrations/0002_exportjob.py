@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:00
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('task_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('title', models.CharField(max_length=200)),
+                ('spec', models.CharField(help_text='Dotted path of the ExportSpec class', max_length=255)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('excel', 'Excel'), ('pdf', 'PDF')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('file', models.FileField(blank=True, null=True, upload_to='exports/%Y/%m/%d/')),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='reports_exp_user_id_063732_idx')],
+            },
+        ),
+    ]
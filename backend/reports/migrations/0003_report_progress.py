@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='total_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='rows_processed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='parts_total',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='parts_completed',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
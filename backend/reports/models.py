@@ -105,6 +105,12 @@ class Report(models.Model):
     duration_seconds = models.PositiveIntegerField(default=0)
     row_count = models.PositiveIntegerField(default=0)
 
+    # Progress (reports.engine)
+    total_rows = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    parts_total = models.PositiveSmallIntegerField(default=0)
+    parts_completed = models.PositiveSmallIntegerField(default=0)
+
     # Error tracking
     error_message = models.TextField(blank=True, null=True)
     error_trace = models.TextField(blank=True, null=True)
@@ -148,4 +154,45 @@ class ReportLog(models.Model):
         indexes = [models.Index(fields=['report', 'timestamp'])]
 
     def __str__(self):
-        return f"{self.level}: {self.message[:50]}"
\ No newline at end of file
+        return f"{self.level}: {self.message[:50]}"
+
+class ExportJob(models.Model):
+    """Background list export (reports.exports) whose file is downloaded once completed"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('excel', 'Excel'),
+        ('pdf', 'PDF'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task_id = models.CharField(max_length=255, blank=True, null=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    title = models.CharField(max_length=200)
+    spec = models.CharField(max_length=255, help_text="Dotted path of the ExportSpec class")
+    params = models.JSONField(default=dict, blank=True)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    file = models.FileField(upload_to='exports/%Y/%m/%d/', blank=True, null=True)
+    file_size = models.PositiveBigIntegerField(default=0)
+    row_count = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.format}) - {self.status}"
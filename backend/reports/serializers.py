@@ -1,6 +1,7 @@
 # reports/serializers.py
 from rest_framework import serializers
-from .models import Report, ReportTemplate, ReportCategory, ReportLog
+from .models import Report, ReportTemplate, ReportCategory, ReportLog, ExportJob
+from django.urls import reverse
 from django.utils import timezone
 from datetime import datetime
 
@@ -39,12 +40,14 @@ class ReportSerializer(serializers.ModelSerializer):
             'id', 'title', 'template', 'template_name', 'category', 'category_name',
             'user', 'user_name', 'parameters', 'status', 'priority', 'format',
             'file', 'file_url', 'file_size', 'generated_at', 'completed_at',
-            'duration_seconds', 'row_count', 'error_message', 'progress',
+            'duration_seconds', 'row_count', 'total_rows', 'rows_processed',
+            'parts_total', 'parts_completed', 'error_message', 'progress',
             'can_cancel', 'logs', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'user', 'status', 'file', 'file_url', 'generated_at',
-            'completed_at', 'duration_seconds', 'row_count', 'error_message',
+            'completed_at', 'duration_seconds', 'row_count', 'total_rows', 'rows_processed',
+            'parts_total', 'parts_completed', 'error_message',
             'progress', 'can_cancel', 'logs', 'created_at', 'updated_at'
         ]
 
@@ -55,11 +58,13 @@ class ReportSerializer(serializers.ModelSerializer):
         return None
 
     def get_progress(self, obj):
-        """Calculate progress based on status"""
+        """Rows streamed so far (the last 5% is writing/merging the file)"""
         if obj.status == 'completed':
             return 100
         elif obj.status == 'generating':
-            return 50
+            if not obj.total_rows:
+                return 50
+            return 10 + int(85 * min(obj.rows_processed / obj.total_rows, 1))
         elif obj.status == 'pending':
             return 10
         return 0
@@ -97,4 +102,22 @@ class ReportStatusSerializer(serializers.Serializer):
     """Serializer for report status updates"""
     status = serializers.ChoiceField(choices=Report.STATUS_CHOICES)
     progress = serializers.IntegerField(min_value=0, max_value=100, required=False)
-    message = serializers.CharField(max_length=500, required=False)
\ No newline at end of file
+    message = serializers.CharField(max_length=500, required=False)
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """Status of a background export"""
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'title', 'format', 'status', 'row_count', 'file_size',
+            'error_message', 'download_url', 'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        request = self.context.get('request')
+        if obj.status == 'completed' and obj.file and request:
+            return request.build_absolute_uri(reverse('exportjob-download', args=[obj.id]))
+        return None
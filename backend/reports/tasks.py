@@ -1,130 +1,187 @@
 # reports/tasks.py
-import uuid
+import hashlib
+import traceback
+from datetime import timedelta
 
-from celery import shared_task
-from celery.result import AsyncResult
+from celery import chord, shared_task
 import logging
+from django.db.models import F
 from django.utils import timezone
-from .models import Report, ReportLog, ReportTemplate
-import pandas as pd
-import json
-from io import BytesIO
-import os
+from django.core.files import File
+from django.utils.module_loading import import_string
+from . import engine
+from .exports import render_to_file
+from .models import ExportJob, Report, ReportLog, ReportTemplate
 
 logger = logging.getLogger(__name__)
 
+def _log(report, level, message, **metadata):
+    ReportLog.objects.create(report=report, level=level, message=message, metadata=metadata)
+
+
+def _complete_report(report, spec, fileobj, row_count):
+    """Store the rendered file on the report and mark it completed."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(1024 * 1024), b''):
+        digest.update(chunk)
+    fileobj.seek(0)
+
+    with fileobj:
+        report.file.save(spec.get_filename(report.format), File(fileobj), save=False)
+    report.file_size = report.file.size
+    report.file_hash = digest.hexdigest()
+    report.status = 'completed'
+    report.row_count = row_count
+    report.rows_processed = row_count
+    report.completed_at = timezone.now()
+    report.duration_seconds = int((report.completed_at - report.created_at).total_seconds())
+    report.save(update_fields=[
+        'file', 'file_size', 'file_hash', 'status', 'row_count', 'rows_processed',
+        'completed_at', 'duration_seconds', 'updated_at',
+    ])
+    _log(report, 'INFO', 'Report generation completed successfully',
+         rows=report.row_count, duration=report.duration_seconds)
+
+
+def _fail_report(report, exc):
+    logger.error(f"Report generation failed: {exc}")
+    _log(report, 'ERROR', str(exc), traceback=traceback.format_exc())
+    Report.objects.filter(pk=report.pk).exclude(status='cancelled').update(
+        status='failed', error_message=str(exc), error_trace=traceback.format_exc()
+    )
+
+
 @shared_task(bind=True, queue='reports', max_retries=3)
 def generate_report_task(self, report_id, template_id, parameters, format, priority):
-    """Main report generation task"""
+    """
+    Main report generation task (reports.engine). Small reports are streamed to the file
+    here; large ones are split into generate_report_part tasks merged by merge_report_parts.
+    """
+    report = Report.objects.get(id=report_id)
+    template = ReportTemplate.objects.get(id=template_id)
+    if report.status == 'cancelled':
+        return {'status': 'cancelled', 'report_id': str(report.id)}
+
     try:
-        report = Report.objects.get(id=report_id)
-        template = ReportTemplate.objects.get(id=template_id)
-
-        # Log start
-        ReportLog.objects.create(
-            report=report,
-            level='INFO',
-            message=f'Starting report generation: {template.name}',
-            metadata={'parameters': parameters, 'format': format}
+        _log(report, 'INFO', f'Starting report generation: {template.name}', parameters=parameters, format=format)
+
+        spec = engine.get_report_type(template.report_type, parameters, user=report.user, report_id=report.id)
+        total = spec.count()
+        parts = spec.partitions(total)
+        Report.objects.filter(pk=report.pk).update(
+            status='generating', generated_at=timezone.now(), total_rows=total,
+            rows_processed=0, parts_total=len(parts), parts_completed=0, error_message=None,
         )
 
-        # Update status
-        report.status = 'generating'
-        report.save()
-
-        # Generate data based on template
-        data = generate_report_data(template.report_type, parameters)
-
-        # Create file
-        file_path = create_report_file(data, format, report.title)
-
-        # Update report
-        report.file.name = file_path
-        report.status = 'completed'
-        report.row_count = len(data) if isinstance(data, list) else 1
-        report.completed_at = timezone.now()
-        report.duration_seconds = int((timezone.now() - report.created_at).total_seconds())
-        report.save()
-
-        # Log success
-        ReportLog.objects.create(
-            report=report,
-            level='INFO',
-            message='Report generation completed successfully',
-            metadata={'rows': report.row_count, 'duration': report.duration_seconds}
-        )
+        if parts:
+            _log(report, 'INFO', f'Split into {len(parts)} parts by {spec.split_by}', rows=total)
+            chord(
+                generate_report_part.s(str(report.id), index, {**parameters, **part})
+                for index, part in enumerate(parts)
+            )(merge_report_parts.s(str(report.id)))
+            return {'status': 'split', 'report_id': str(report.id), 'parts': len(parts), 'rows': total}
+
+        fileobj, row_count = engine.render(spec, format)
+        report.refresh_from_db()
+        _complete_report(report, spec, fileobj, row_count)
 
         return {
             'status': 'success',
             'report_id': str(report.id),
-            'file_path': file_path,
+            'file_path': report.file.name,
             'rows': report.row_count
         }
 
+    except engine.ReportCancelled:
+        _log(report, 'WARNING', 'Report generation cancelled')
+        return {'status': 'cancelled', 'report_id': str(report.id)}
+    except ValueError as exc:  # Unknown report type or format; retrying can't help
+        _fail_report(report, exc)
+        raise
     except Exception as exc:
-        logger.error(f"Report generation failed: {exc}")
-        ReportLog.objects.create(
-            report=report,
-            level='ERROR',
-            message=str(exc),
-            metadata={'traceback': str(exc)}
-        )
-        report.status = 'failed'
-        report.error_message = str(exc)
-        report.save()
-        raise self.retry(countdown=60 * (self.request.retries + 1))
-
-def generate_report_data(report_type, parameters):
-    """Generate report data based on type"""
-    from stock.models import Stock, WarehouseStock, StockTransaction
-
-    if report_type == 'inventory_valuation':
-        stocks = WarehouseStock.objects.select_related('stock', 'warehouse')
-        return [{
-            'stock_code': ws.stock.item_code,
-            'stock_name': ws.stock.name,
-            'warehouse': ws.warehouse.name,
-            'quantity': ws.quantity,
-            'unit_price': ws.unit_price,
-            'total_value': ws.quantity * ws.unit_price
-        } for ws in stocks]
-
-    elif report_type == 'stock_movement':
-        transactions = StockTransaction.objects.filter(
-            created_at__gte=parameters.get('start_date'),
-            created_at__lte=parameters.get('end_date')
-        )
-        return [{
-            'transaction_id': t.id,
-            'stock': t.stock.name,
-            'type': t.transaction_type,
-            'quantity': t.quantity,
-            'warehouse': t.warehouse.name,
-            'date': t.created_at
-        } for t in transactions]
-
-    # Add more report types...
-    return []
-
-def create_report_file(data, format, title):
-    """Create report file in specified format"""
-    if format == 'excel':
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Report', index=False)
-            # Add summary sheet
-            summary = pd.DataFrame({
-                'Metric': ['Total Items', 'Total Value'],
-                'Value': [len(data), df.get('total_value', [0]).sum()]
-            })
-            summary.to_excel(writer, sheet_name='Summary', index=False)
-        output.seek(0)
-
-        filename = f"reports/{timezone.now().strftime('%Y/%m/%d')}/{title}_{uuid.uuid4().hex[:8]}.xlsx"
-        with open(filename, 'wb') as f:
-            f.write(output.getvalue())
-        return filename
-
-    # Add PDF, CSV formats
-    return None
\ No newline at end of file
+        _fail_report(report, exc)
+        raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
+
+
+@shared_task(bind=True, queue='reports', max_retries=2)
+def generate_report_part(self, report_id, index, parameters):
+    """Stream one partition of a split report into its part file. Returns its name, None when cancelled."""
+    report = Report.objects.select_related('template').get(id=report_id)
+    spec = engine.get_report_type(report.template.report_type, parameters, report_id=report.id)
+    try:
+        name, _ = engine.write_part(spec, report.id, index)
+        Report.objects.filter(pk=report.pk).update(parts_completed=F('parts_completed') + 1)
+        return name
+
+    except engine.ReportCancelled:
+        # Not raised: a failed header task would skip merge_report_parts, which deletes the other parts
+        return None
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            _fail_report(report, exc)
+            raise
+        # The retry streams these rows again
+        Report.objects.filter(pk=report.pk).update(rows_processed=F('rows_processed') - spec.rows_tracked)
+        raise self.retry(exc=exc, countdown=30)
+
+
+@shared_task(bind=True, queue='reports')
+def merge_report_parts(self, part_files, report_id):
+    """Chord callback: merge the part files, in partition order, into the final report file"""
+    report = Report.objects.select_related('template').get(id=report_id)
+    if None in part_files or report.status == 'cancelled':
+        engine.delete_parts(name for name in part_files if name)
+        _log(report, 'WARNING', 'Report generation cancelled')
+        return {'status': 'cancelled', 'report_id': str(report.id)}
+    try:
+        spec = engine.get_report_type(report.template.report_type, report.parameters, part_files=part_files)
+        fileobj, row_count = engine.render(spec, report.format)
+        _complete_report(report, spec, fileobj, row_count)
+        return {'status': 'success', 'report_id': str(report.id), 'rows': row_count}
+
+    except Exception as exc:
+        _fail_report(report, exc)
+        raise
+    finally:
+        engine.delete_parts(part_files)
+
+
+@shared_task(bind=True, queue='reports')
+def run_export_job(self, job_id):
+    """Render a queued ExportJob (reports.exports) to storage"""
+    job = ExportJob.objects.select_related('user').get(id=job_id)
+    job.status = 'running'
+    job.save(update_fields=['status'])
+
+    try:
+        spec = import_string(job.spec)(job.params, user=job.user)
+        fileobj, row_count = render_to_file(spec, job.format)
+        with fileobj:
+            job.file.save(spec.get_filename(job.format), File(fileobj), save=False)
+        job.file_size = job.file.size
+        job.row_count = row_count
+        job.status = 'completed'
+        job.completed_at = timezone.now()
+        job.save(update_fields=['file', 'file_size', 'row_count', 'status', 'completed_at'])
+        return {'status': 'success', 'job_id': str(job.id), 'rows': row_count}
+
+    except Exception as exc:
+        logger.exception(f"Export job {job_id} failed")
+        job.status = 'failed'
+        job.error_message = str(exc)
+        job.save(update_fields=['status', 'error_message'])
+        raise
+
+
+@shared_task(name='purge_expired_exports')
+def purge_expired_exports(days=7):
+    """Delete export jobs (and their files) older than `days`"""
+    expired = ExportJob.objects.filter(created_at__lt=timezone.now() - timedelta(days=days))
+    count = 0
+    for job in expired.iterator(chunk_size=500):
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    logger.info(f"Purged {count} expired export jobs")
+    return count
@@ -7,6 +7,7 @@ router = DefaultRouter()
 router.register(r'categories', views.ReportCategoryViewSet, basename='reportcategory')
 router.register(r'templates', views.ReportTemplateViewSet, basename='reporttemplate')
 router.register(r'reports', views.ReportViewSet, basename='report')
+router.register(r'exports', views.ExportJobViewSet, basename='exportjob')
 
 urlpatterns = [
     path('', include(router.urls)),
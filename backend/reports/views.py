@@ -8,10 +8,11 @@ from django.shortcuts import get_object_or_404
 from django.http import FileResponse, HttpResponse
 from django.utils import timezone
 import json
-from .models import Report, ReportTemplate, ReportCategory, ReportLog
+from .models import Report, ReportTemplate, ReportCategory, ReportLog, ExportJob
 from .serializers import (
     ReportCategorySerializer, ReportTemplateSerializer,
-    ReportSerializer, ReportCreateSerializer, ReportStatusSerializer, ReportLogSerializer
+    ReportSerializer, ReportCreateSerializer, ReportStatusSerializer, ReportLogSerializer,
+    ExportJobSerializer
 )
 from .tasks import generate_report_task
 
@@ -141,4 +142,27 @@ class ReportViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
                 .values('title', 'status', 'completed_at', 'format')[:5]
             )
         }
-        return Response(stats)
\ No newline at end of file
+        return Response(stats)
+
+class ExportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Background exports (reports.exports) started by the current user"""
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Stream the finished export file"""
+        job = self.get_object()
+        if job.status != 'completed' or not job.file:
+            return Response({
+                'error': 'Export not ready for download',
+                'status': job.status
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.file.name.rsplit('/', 1)[-1])
+        except FileNotFoundError:
+            return Response({'error': 'Export file not found'}, status=status.HTTP_404_NOT_FOUND)
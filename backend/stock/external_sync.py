@@ -0,0 +1,625 @@
+# backend/stock/external_sync.py
+"""
+Concurrent, batched synchronization of WarehouseStock with the external inventory systems
+(EXTERNAL_INVENTORY_SYSTEMS), run by the stock.process_stock_sync task.
+
+- Every system gets one pooled httpx.AsyncClient (keep-alive, at most `concurrency`
+  connections) and a semaphore capping its in-flight requests; all systems run at once.
+- Connectors with a batch endpoint (WooCommerce, Shopify, ERP/WMS with `batch_path`) fetch
+  up to `batch_size` SKUs per request; the others are queried once per distinct SKU.
+- Transport errors, 5xx and 429 are retried with full-jitter exponential backoff. After
+  `breaker_threshold` failed calls a system's circuit opens: its remaining calls fail fast
+  and later runs skip it until `breaker_cooldown` has passed (then one run probes it).
+- Incremental runs only check the rows changed since the system's watermark
+  (ExternalSyncState), which advances to the run start after a run without failures.
+- Every mismatch is stored in bulk as a StockSyncDiscrepancy. Unless the run is
+  `external`, rows whose median external quantity differs by more than max(5, 5%) are
+  corrected in one bulk update with one `correction` StockTransaction each.
+
+Tuning lives in settings.EXTERNAL_SYNC; a system config may override `concurrency`,
+`batch_size` and `timeout`.
+"""
+import asyncio
+import logging
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+import httpx
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ExternalSyncState, StockSyncDiscrepancy, StockTransaction, WarehouseStock
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'max_connections': 20,      # pooled connections per system
+    'default_concurrency': 10,  # in-flight requests per system
+    'timeout': 10,              # seconds per request
+    'retries': 3,
+    'backoff': 0.5,             # base delay (s) of the jittered exponential backoff
+    'breaker_threshold': 5,     # failed calls before the circuit opens
+    'breaker_cooldown': 300,    # seconds before an open circuit is probed again
+}
+SYNC_TYPES = ('full', 'incremental', 'external')
+MIN_CORRECTION = 5
+CORRECTION_RATIO = 0.05
+
+
+def sync_settings():
+    return {**DEFAULTS, **getattr(settings, 'EXTERNAL_SYNC', {})}
+
+
+class SyncError(Exception):
+    """A call to an external system failed after its retries"""
+
+
+class CircuitOpenError(SyncError):
+    """The system's circuit is open: the call was not attempted"""
+
+
+@dataclass
+class SyncItem:
+    """One WarehouseStock row as sent to the connectors"""
+    pk: int
+    stock_id: str
+    warehouse_id: int
+    warehouse_code: str
+    sku: str
+    quantity: int
+
+
+# ─── Resilience ─────────────────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; half-open once `cooldown` has passed"""
+
+    def __init__(self, threshold, cooldown, open_until=None):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.open_until = open_until
+        self.failures = 0
+
+    @property
+    def is_open(self):
+        return self.open_until is not None and timezone.now() < self.open_until
+
+    def allow(self):
+        return not self.is_open
+
+    def record_success(self):
+        self.failures = 0
+        self.open_until = None
+
+    def record_failure(self):
+        self.failures += 1
+        # Half-open (cooldown over): a single failed probe reopens the circuit
+        if self.failures >= self.threshold or self.open_until is not None:
+            self.open_until = timezone.now() + timedelta(seconds=self.cooldown)
+
+
+class SystemClient:
+    """Pooled HTTP client of one system: concurrency limit, retries and circuit breaker"""
+
+    def __init__(self, name, http, breaker, concurrency, retries, backoff):
+        self.name = name
+        self.http = http
+        self.breaker = breaker
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.retries = retries
+        self.backoff = backoff
+
+    async def request(self, method, url, **kwargs):
+        """Response of the first attempt that is neither a transport error, a 5xx nor a 429"""
+        error = None
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name}: circuit open")
+            try:
+                async with self.semaphore:
+                    response = await self.http.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code < 500 and response.status_code != 429:
+                    self.breaker.record_success()
+                    return response
+                error = f"HTTP {response.status_code}"
+            if attempt < self.retries:
+                # Full jitter: concurrent callers do not retry in lockstep
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        self.breaker.record_failure()
+        raise SyncError(f"{self.name}: {method} {url} failed: {error}")
+
+    async def json(self, method, url, **kwargs):
+        response = await self.request(method, url, **kwargs)
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 400:
+            raise SyncError(f"{self.name}: {method} {url} returned HTTP {response.status_code}")
+        return response.json()
+
+
+# ─── Connectors ─────────────────────────────────────────────────────────────
+
+class Connector:
+    """
+    Reads quantities from one external system. Items are deduplicated on key() before
+    fetching; fetch() returns {key: quantity} for the keys the system knows.
+    """
+    name = None
+    setting = None
+    batch_size = 1
+    per_warehouse = False  # quantities are per (sku, warehouse) rather than per SKU
+
+    def __init__(self, config):
+        self.config = config or {}
+        self.batch_size = self.config.get('batch_size', self.batch_size)
+
+    @property
+    def enabled(self):
+        return bool(self.config.get('enabled'))
+
+    def key(self, item):
+        return (item.sku, item.warehouse_code) if self.per_warehouse else item.sku
+
+    def client_options(self):
+        """httpx.AsyncClient arguments (base_url, headers, params)"""
+        return {'base_url': self.config.get('base_url', '')}
+
+    async def fetch(self, client, items):
+        quantities = await asyncio.gather(*(self.fetch_one(client, item) for item in items))
+        return {self.key(item): qty for item, qty in zip(items, quantities) if qty is not None}
+
+    async def fetch_one(self, client, item):
+        raise NotImplementedError
+
+
+class ERPConnector(Connector):
+    """SAP-like ERP: GET /api/inventory/<sku>?warehouse=; POST `batch_path` when configured"""
+    name = 'erp'
+    setting = 'ERP_CONFIG'
+    per_warehouse = True
+
+    def __init__(self, config):
+        super().__init__(config)
+        if self.config.get('batch_path'):
+            self.batch_size = self.config.get('batch_size', 100)
+
+    def client_options(self):
+        return {
+            'base_url': self.config['base_url'],
+            'headers': {'Authorization': f"Bearer {self.config['access_token']}"},
+        }
+
+    async def fetch(self, client, items):
+        if not self.config.get('batch_path'):
+            return await super().fetch(client, items)
+        data = await client.json('POST', self.config['batch_path'], json={
+            'items': [{'sku': item.sku, 'warehouse': item.warehouse_code} for item in items],
+        })
+        return {
+            (row['sku'], row['warehouse']): int(row.get('available_quantity', 0))
+            for row in (data or {}).get('items', [])
+        }
+
+    async def fetch_one(self, client, item):
+        data = await client.json('GET', f"/api/inventory/{item.sku}", params={'warehouse': item.warehouse_code})
+        return None if data is None else int(data.get('available_quantity', 0))
+
+
+class WMSConnector(Connector):
+    """WMS: POST /api/v1/stock/location per SKU; POST `batch_path` when configured"""
+    name = 'wms'
+    setting = 'WMS_CONFIG'
+    per_warehouse = True
+
+    def __init__(self, config):
+        super().__init__(config)
+        if self.config.get('batch_path'):
+            self.batch_size = self.config.get('batch_size', 100)
+
+    def key(self, item):
+        return (item.sku, item.warehouse_id)
+
+    def client_options(self):
+        return {
+            'base_url': self.config['base_url'],
+            'headers': {'Authorization': f"Basic {self.config['api_key']}"},
+        }
+
+    async def fetch(self, client, items):
+        if not self.config.get('batch_path'):
+            return await super().fetch(client, items)
+        data = await client.json('POST', self.config['batch_path'], json={
+            'location_type': 'available',
+            'items': [{'sku': item.sku, 'warehouse_id': item.warehouse_id} for item in items],
+        })
+        return {
+            (row['sku'], row['warehouse_id']): int(row.get('quantity', 0))
+            for row in (data or {}).get('items', [])
+        }
+
+    async def fetch_one(self, client, item):
+        data = await client.json('POST', "/api/v1/stock/location", json={
+            'sku': item.sku,
+            'warehouse_id': item.warehouse_id,
+            'location_type': 'available',
+        })
+        return None if data is None else int(data.get('quantity', 0))
+
+
+class POSConnector(Connector):
+    """Square-like POS: quantity summed over the item's locations"""
+    name = 'pos'
+    setting = 'POS_CONFIG'
+
+    def client_options(self):
+        return {
+            'base_url': self.config['base_url'],
+            'headers': {'Authorization': f"Bearer {self.config['access_token']}"},
+        }
+
+    async def fetch_one(self, client, item):
+        data = await client.json('GET', f"/v1/items/{item.sku}/inventory")
+        if data is None:
+            return None
+        return sum(int(location.get('quantity', 0)) for location in data.get('locations', []))
+
+
+class WooCommerceConnector(Connector):
+    """WooCommerce REST v3: products filtered by a comma-separated SKU list"""
+    name = 'woocommerce'
+    setting = 'WOOCOMMERCE_CONFIG'
+    batch_size = 100  # per_page maximum
+
+    def client_options(self):
+        return {
+            'base_url': self.config['base_url'],
+            'params': {
+                'consumer_key': self.config['consumer_key'],
+                'consumer_secret': self.config['consumer_secret'],
+            },
+        }
+
+    async def fetch(self, client, items):
+        skus = [item.sku for item in items]
+        products = await client.json('GET', "/wp-json/wc/v3/products", params={
+            'sku': ",".join(skus), 'per_page': len(skus),
+        }) or []
+        # SKUs the store doesn't know are left out (not compared), as for Shopify
+        wanted = set(skus)
+        quantities = {}
+        for product in products:
+            if product.get('sku') in wanted:
+                quantities[product['sku']] = int(product.get('stock_quantity') or 0)
+        return quantities
+
+
+class ShopifyConnector(Connector):
+    """Shopify Admin API: products by id (product_mapping), variant quantities summed"""
+    name = 'shopify'
+    setting = 'SHOPIFY_CONFIG'
+    batch_size = 250  # products.json limit
+    API_VERSION = '2023-10'
+
+    def client_options(self):
+        return {
+            'base_url': self.config['base_url'],
+            'headers': {'X-Shopify-Access-Token': self.config['access_token']},
+        }
+
+    async def fetch(self, client, items):
+        mapping = self.config.get('product_mapping', {})
+        product_skus = {str(mapping[item.sku]): item.sku for item in items if item.sku in mapping}
+        if not product_skus:
+            return {}
+        data = await client.json('GET', f"/admin/api/{self.API_VERSION}/products.json", params={
+            'ids': ",".join(product_skus), 'limit': len(product_skus),
+        }) or {}
+        quantities = {}
+        for product in data.get('products', []):
+            sku = product_skus.get(str(product.get('id')))
+            if sku:
+                quantities[sku] = sum(int(v.get('inventory_quantity', 0)) for v in product.get('variants', []))
+        return quantities
+
+
+class MagentoConnector(Connector):
+    """Magento REST: /rest/V1/stockItems/<sku>"""
+    name = 'magento'
+    setting = 'MAGENTO_CONFIG'
+
+    def client_options(self):
+        return {
+            'base_url': self.config['base_url'],
+            'headers': {'Authorization': f"Bearer {self.config['access_token']}"},
+        }
+
+    async def fetch_one(self, client, item):
+        data = await client.json('GET', f"/rest/V1/stockItems/{item.sku}")
+        return None if data is None else int(data.get('qty', 0))
+
+
+class CustomAPIConnector(Connector):
+    """CUSTOM_INVENTORY_APIS: the first enabled endpoint returning a quantity wins"""
+    name = 'custom_api'
+    setting = 'CUSTOM_INVENTORY_APIS'
+
+    def __init__(self, config):
+        super().__init__({})
+        self.apis = [api for api in (config or []) if api.get('enabled')]
+
+    @property
+    def enabled(self):
+        return bool(self.apis)
+
+    def client_options(self):
+        return {}  # endpoints are absolute URLs
+
+    async def fetch_one(self, client, item):
+        for api in self.apis:
+            data = await client.json('GET', api['endpoint'].format(sku=item.sku), headers=api.get('headers', {}))
+            quantity = extract_json_value(data, api.get('quantity_path', 'quantity'))
+            if quantity is not None:
+                return int(quantity)
+        return None
+
+
+def extract_json_value(data, path):
+    """Value at a dot-separated path, or None"""
+    current = data
+    for key in path.split('.'):
+        if not isinstance(current, dict) or key not in current:
+            return None
+        current = current[key]
+    return current
+
+
+CONNECTORS = {
+    connector.name: connector
+    for connector in (ERPConnector, WMSConnector, POSConnector, WooCommerceConnector,
+                      ShopifyConnector, MagentoConnector, CustomAPIConnector)
+}
+
+
+def configured_connectors():
+    """Enabled connectors of EXTERNAL_INVENTORY_SYSTEMS, by name"""
+    connectors = {}
+    for name in getattr(settings, 'EXTERNAL_INVENTORY_SYSTEMS', None) or []:
+        if name not in CONNECTORS:
+            logger.warning(f"Unknown external inventory system: {name}")
+            continue
+        connector = CONNECTORS[name](getattr(settings, CONNECTORS[name].setting, None))
+        if connector.enabled:
+            connectors[name] = connector
+    return connectors
+
+
+# ─── Engine ─────────────────────────────────────────────────────────────────
+
+@dataclass
+class SystemResult:
+    name: str
+    status: str = 'ok'  # ok, partial, failed, circuit_open
+    checked: int = 0
+    failed: int = 0
+    error: str = ''
+    quantities: dict = None  # {item pk: external quantity}
+
+
+class ExternalSystemSyncManager:
+    """Fetches the external quantities of many items from all systems concurrently"""
+
+    def __init__(self, connectors, breakers, options=None):
+        self.connectors = connectors
+        self.breakers = breakers
+        self.options = options or sync_settings()
+
+    async def sync_all_systems(self, items_by_system):
+        """{system: SystemResult} for {system: [SyncItem]}"""
+        names = [name for name in items_by_system if name in self.connectors]
+        results = await asyncio.gather(*(self.sync_system(name, items_by_system[name]) for name in names))
+        return dict(zip(names, results))
+
+    async def sync_system(self, name, items):
+        connector = self.connectors[name]
+        breaker = self.breakers[name]
+        result = SystemResult(name, quantities={})
+        if not items:
+            return result
+        if not breaker.allow():
+            result.status, result.error = 'circuit_open', f"circuit open until {breaker.open_until.isoformat()}"
+            return result
+
+        groups = {}
+        for item in items:
+            groups.setdefault(connector.key(item), []).append(item)
+        unique = [group[0] for group in groups.values()]
+        chunks = [unique[i:i + connector.batch_size] for i in range(0, len(unique), connector.batch_size)]
+
+        concurrency = connector.config.get('concurrency', self.options['default_concurrency'])
+        async with httpx.AsyncClient(
+            **connector.client_options(),
+            timeout=connector.config.get('timeout', self.options['timeout']),
+            limits=httpx.Limits(max_connections=self.options['max_connections'],
+                                max_keepalive_connections=self.options['max_connections']),
+        ) as http:
+            client = SystemClient(name, http, breaker, concurrency, self.options['retries'], self.options['backoff'])
+            outcomes = await asyncio.gather(
+                *(connector.fetch(client, chunk) for chunk in chunks), return_exceptions=True,
+            )
+
+        for chunk, outcome in zip(chunks, outcomes):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, (SyncError, ValueError, KeyError, TypeError)):
+                    raise outcome
+                result.failed += sum(len(groups[connector.key(item)]) for item in chunk)
+                result.error = str(outcome)
+                continue
+            for key, quantity in outcome.items():
+                for item in groups.get(key, []):
+                    result.quantities[item.pk] = quantity
+            result.checked += sum(len(groups[connector.key(item)]) for item in chunk)
+
+        if result.failed:
+            result.status = 'failed' if not result.checked else 'partial'
+            logger.warning(f"{name} sync: {result.failed} items failed ({result.error})")
+        return result
+
+
+# ─── Sync run ───────────────────────────────────────────────────────────────
+
+def _load_items(warehouse_ids=None, changed_since=None):
+    queryset = WarehouseStock.objects.filter(stock__is_active=True)
+    if warehouse_ids:
+        queryset = queryset.filter(warehouse_id__in=warehouse_ids)
+    if changed_since:
+        queryset = queryset.filter(last_updated__gte=changed_since)
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'stock_id', 'warehouse_id', 'warehouse__code', 'stock__item_code', 'quantity', 'last_updated',
+    )
+    return [(SyncItem(pk, str(stock_id), warehouse_id, code, sku, quantity), last_updated)
+            for pk, stock_id, warehouse_id, code, sku, quantity, last_updated in rows.iterator(chunk_size=2000)]
+
+
+def _apply_corrections(items, results, run_id):
+    """Set the rows far off their median external quantity; returns the applied updates"""
+    targets = {}
+    for item in items:
+        external = sorted(r.quantities[item.pk] for r in results.values() if item.pk in r.quantities)
+        if not external:
+            continue
+        median = max(external[len(external) // 2], 0)
+        if abs(median - item.quantity) > max(MIN_CORRECTION, item.quantity * CORRECTION_RATIO):
+            targets[item.pk] = (item.quantity, median, len(external))
+    if not targets:
+        return []
+
+    now = timezone.now()
+    updates = []
+    with transaction.atomic():
+        rows = list(WarehouseStock.objects.select_for_update(of=('self',)).filter(pk__in=targets).order_by('pk'))
+        changed, transactions = [], []
+        for row in rows:
+            read_quantity, new_quantity, sources = targets[row.pk]
+            if row.quantity != read_quantity:
+                continue  # Moved since it was read: the next run compares again
+            row.quantity, row.last_updated = new_quantity, now
+            changed.append(row)
+            difference = new_quantity - read_quantity
+            transactions.append(StockTransaction(
+                stock_id=row.stock_id,
+                to_warehouse_id=row.warehouse_id,
+                transaction_type='correction',
+                quantity=difference,
+                unit_price=row.unit_price,
+                total_value=abs(difference) * row.unit_price,
+                reference=f"sync_{run_id}"[:100],
+                notes=f"Auto-sync with external systems: {sources} sources",
+            ))
+            updates.append({
+                'warehouse_stock_id': row.pk,
+                'stock_id': str(row.stock_id),
+                'warehouse_id': str(row.warehouse_id),
+                'old_quantity': read_quantity,
+                'new_quantity': new_quantity,
+            })
+        WarehouseStock.objects.bulk_update(changed, ['quantity', 'last_updated'], batch_size=1000)
+        StockTransaction.objects.bulk_create(transactions, batch_size=1000)
+    return updates
+
+
+def sync_stock(warehouse_ids=None, sync_type='full', connectors=None):
+    """
+    Run one sync over the active WarehouseStock rows (of `warehouse_ids`).
+    sync_type: 'full' (all rows), 'incremental' (rows changed since each system's
+    watermark) or 'external' (all rows, discrepancies recorded but not corrected).
+    Returns the run report.
+    """
+    if sync_type not in SYNC_TYPES:
+        raise ValueError(f"Unknown sync type: {sync_type}")
+    options = sync_settings()
+    connectors = configured_connectors() if connectors is None else connectors
+    started = timezone.now()
+    run_id = uuid.uuid4().hex
+    report = {
+        'run_id': run_id,
+        'sync_type': sync_type,
+        'timestamp': started.isoformat(),
+        'systems': {},
+        'checked_items': 0,
+        'discrepancies': 0,
+        'updated_items': 0,
+        'updates': [],
+    }
+    if not connectors:
+        return report
+
+    states = {state.system: state for state in ExternalSyncState.objects.filter(system__in=connectors)}
+    for name in connectors:
+        if name not in states:
+            states[name] = ExternalSyncState.objects.get_or_create(system=name)[0]
+
+    watermarks = {name: states[name].watermark if sync_type == 'incremental' else None for name in connectors}
+    since = None if None in watermarks.values() else min(watermarks.values())
+    loaded = _load_items(warehouse_ids, since)
+    items = [item for item, _ in loaded]
+    items_by_system = {
+        name: [item for item, last_updated in loaded if watermark is None or last_updated >= watermark]
+        for name, watermark in watermarks.items()
+    }
+
+    breakers = {
+        name: CircuitBreaker(options['breaker_threshold'], options['breaker_cooldown'], states[name].circuit_open_until)
+        for name in connectors
+    }
+    results = asyncio.run(ExternalSystemSyncManager(connectors, breakers, options).sync_all_systems(items_by_system))
+
+    by_pk = {item.pk: item for item in items}
+    discrepancies = [
+        StockSyncDiscrepancy(
+            run_id=run_id,
+            system=name,
+            warehouse_stock_id=pk,
+            local_quantity=by_pk[pk].quantity,
+            external_quantity=quantity,
+            difference=quantity - by_pk[pk].quantity,
+            detected_at=started,
+        )
+        for name, result in results.items()
+        for pk, quantity in result.quantities.items()
+        if quantity != by_pk[pk].quantity
+    ]
+    StockSyncDiscrepancy.objects.bulk_create(discrepancies, batch_size=1000)
+
+    if sync_type != 'external':
+        report['updates'] = _apply_corrections(items, results, run_id)
+
+    for name, state in states.items():
+        result = results.get(name) or SystemResult(name)
+        state.last_run_at = timezone.now()
+        state.last_status = result.status
+        state.last_error = result.error
+        state.circuit_open_until = breakers[name].open_until
+        if result.status == 'ok':
+            state.watermark = started
+    ExternalSyncState.objects.bulk_update(
+        states.values(), ['last_run_at', 'last_status', 'last_error', 'circuit_open_until', 'watermark'],
+    )
+
+    report['systems'] = {
+        name: {'status': r.status, 'checked': r.checked, 'failed': r.failed, 'error': r.error}
+        for name, r in results.items()
+    }
+    report['checked_items'] = len({pk for r in results.values() for pk in r.quantities})
+    report['discrepancies'] = len(discrepancies)
+    report['updated_items'] = len(report['updates'])
+    logger.info(
+        f"Stock sync {run_id} ({sync_type}): {report['checked_items']} items checked, "
+        f"{report['discrepancies']} discrepancies, {report['updated_items']} updated"
+    )
+    return report
@@ -0,0 +1,125 @@
+# stock/management/commands/benchmark_stock_transactions.py
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+SCHEMA = 'stock_benchmark'
+COLUMNS = """
+    id bigint NOT NULL,
+    stock_id integer NOT NULL,
+    warehouse_id integer NOT NULL,
+    transaction_type varchar(20) NOT NULL,
+    quantity integer NOT NULL,
+    unit_price numeric(10, 2) NOT NULL,
+    created_at timestamptz NOT NULL
+"""
+# Rows in id order are in created_at order, as in the append-only ledger
+ROWS_SQL = """
+    SELECT g,
+           (g * 7919) %% 5000,
+           (g * 31) %% 12,
+           (ARRAY['in', 'out', 'out', 'transfer', 'adjustment', 'reservation'])[1 + (g * 13) %% 6],
+           CASE WHEN (g * 13) %% 6 IN (1, 2) THEN -1 ELSE 1 END * (1 + (g * 17) %% 50),
+           1 + (g * 23) %% 900,
+           %(start)s::timestamptz + (g * %(span)s / %(rows)s) * interval '1 second'
+    FROM generate_series(%(first)s::bigint, %(last)s::bigint) AS g
+"""
+QUERIES = {
+    'totals': "SELECT transaction_type, COUNT(*), SUM(quantity) FROM {table} "
+              "WHERE created_at >= now() - %(window)s::interval GROUP BY 1",
+    'warehouse': "SELECT stock_id, SUM(quantity) FROM {table} "
+                 "WHERE warehouse_id = 3 AND created_at >= now() - %(window)s::interval GROUP BY 1",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare 7-day and 90-day window queries on a plain B-tree-indexed ledger and on the monthly "
+        "partitioned, BRIN-indexed layout, with synthetic rows (default 50M) in a scratch schema. "
+        "Run against a staging database: it needs about 2x the data size in free disk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50_000_000)
+        parser.add_argument("--months", type=int, default=36, help="History spanned by the rows, up to now.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--keep", action="store_true", help="Keep the scratch schema after the run.")
+
+    def handle(self, *args, **options):
+        self.setup(options["rows"], options["months"])
+        try:
+            for label, size in (("plain", self.size("plain")), ("partitioned", self.size("partitioned"))):
+                self.stdout.write(f"{label:<12} table+indexes={size}")
+            for name, sql in QUERIES.items():
+                for days in (7, 90):
+                    for table in ("plain", "partitioned"):
+                        self.report(f"{name} {days}d {table}", sql.format(table=f"{SCHEMA}.{table}"),
+                                    f"{days} days", options["repeat"])
+        finally:
+            if not options["keep"]:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+                self.stdout.write("Scratch schema removed.")
+
+    def setup(self, rows, months):
+        span = months * 30 * 24 * 3600
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+            cursor.execute(f"CREATE TABLE {SCHEMA}.plain ({COLUMNS}, PRIMARY KEY (id))")
+            cursor.execute(
+                f"CREATE TABLE {SCHEMA}.partitioned ({COLUMNS}, PRIMARY KEY (id, created_at)) "
+                f"PARTITION BY RANGE (created_at)"
+            )
+            cursor.execute(f"CREATE TABLE {SCHEMA}.partitioned_default PARTITION OF {SCHEMA}.partitioned DEFAULT")
+            cursor.execute(
+                "SELECT date_trunc('month', now() - %s * interval '1 second', 'UTC') + n * interval '1 month' "
+                "FROM generate_series(0, %s) AS n",
+                [span, months + 1],
+            )
+            for n, (month,) in enumerate(cursor.fetchall()):
+                cursor.execute(
+                    f"CREATE TABLE {SCHEMA}.partitioned_{n} PARTITION OF {SCHEMA}.partitioned "
+                    f"FOR VALUES FROM (%s) TO (%s::timestamptz + interval '1 month')",
+                    [month, month],
+                )
+            cursor.execute("SELECT now() - %s * interval '1 second'", [span])
+            start = cursor.fetchone()[0]
+
+            started = time.perf_counter()
+            for first in range(1, rows + 1, 1_000_000):
+                params = {'start': start, 'span': span, 'rows': rows, 'first': first, 'last': min(first + 999_999, rows)}
+                for table in ("plain", "partitioned"):
+                    cursor.execute(f"INSERT INTO {SCHEMA}.{table} {ROWS_SQL}", params)
+            self.stdout.write(f"Loaded {rows:,} rows per layout in {time.perf_counter() - started:.1f}s")
+
+            # Indexes of stock_stocktransaction before and after migration 0004
+            cursor.execute(f"CREATE INDEX ON {SCHEMA}.plain (created_at)")
+            cursor.execute(f"CREATE INDEX ON {SCHEMA}.plain (warehouse_id, created_at)")
+            cursor.execute(f"CREATE INDEX ON {SCHEMA}.partitioned USING brin (created_at) WITH (autosummarize = on)")
+            cursor.execute(f"CREATE INDEX ON {SCHEMA}.partitioned (warehouse_id, created_at)")
+            cursor.execute(f"VACUUM ANALYZE {SCHEMA}.plain")
+            cursor.execute(f"VACUUM ANALYZE {SCHEMA}.partitioned")
+
+    def size(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_size_pretty(SUM(pg_total_relation_size(relid))) FROM pg_partition_tree(%s)",
+                [f"{SCHEMA}.{table}"],
+            )
+            return cursor.fetchone()[0]
+
+    def report(self, label, sql, window, repeat):
+        timings = []
+        with connection.cursor() as cursor:
+            for _ in range(repeat + 1):
+                started = time.perf_counter()
+                cursor.execute(sql, {'window': window})
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+        timings = sorted(timings[1:])  # The first run only warms the cache
+        self.stdout.write(self.style.SUCCESS(
+            f"{label:<28} p50={statistics.median(timings):9.2f}ms  max={timings[-1]:9.2f}ms"
+        ))
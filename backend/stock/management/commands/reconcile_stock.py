@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from stock.reconciliation import reconcile, report_lines
+
+
+class Command(BaseCommand):
+    help = "Report stock discrepancies (tab-separated, diffable); --apply also fixes reserved quantities"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warehouse', type=int, default=None, help="Warehouse id (default: all)")
+        parser.add_argument('--days', type=int, default=7, help="Movement window for negative totals")
+        parser.add_argument('--apply', action='store_true', help="Fix reserved > available (default: dry run)")
+
+    def handle(self, *args, **options):
+        report = reconcile(options['warehouse'], dry_run=not options['apply'], days=options['days'])
+        for line in report_lines(report):
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['total_items_checked']} discrepancies, {report['items_fixed']} fixed"
+            + (" (dry run)" if report['dry_run'] else "")
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from stock.partitions import archive_partitions, ensure_partitions, partitions
+
+
+class Command(BaseCommand):
+    help = "Create the upcoming monthly StockTransaction partitions; --archive also archives expired ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=None, help="Months to create ahead (default: settings)")
+        parser.add_argument('--archive', action='store_true', help="Export, detach and drop expired partitions")
+        parser.add_argument('--keep-months', type=int, default=None, help="Months kept attached (default: settings)")
+        parser.add_argument('--dry-run', action='store_true', help="With --archive: only list the expired partitions")
+
+    def handle(self, *args, **options):
+        for name in ensure_partitions(options['ahead']):
+            self.stdout.write(f"created\t{name}")
+        if options['archive']:
+            archived = archive_partitions(options['keep_months'], dry_run=options['dry_run'])
+            for name in archived:
+                self.stdout.write(f"{'expired' if options['dry_run'] else 'archived'}\t{name}")
+        attached = list(partitions().values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(attached)} monthly partitions ({attached[0]} … {attached[-1]})" if attached
+            else "No monthly partitions"
+        ))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0002_alter_stock_supplier_delete_supplier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExternalSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('system', models.CharField(max_length=50, unique=True)),
+                ('watermark', models.DateTimeField(blank=True, help_text='Start of the last run without failures; incremental runs only check rows changed since', null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, max_length=20)),
+                ('last_error', models.TextField(blank=True)),
+                ('circuit_open_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockSyncDiscrepancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(db_index=True, max_length=64)),
+                ('system', models.CharField(max_length=50)),
+                ('local_quantity', models.IntegerField()),
+                ('external_quantity', models.IntegerField()),
+                ('difference', models.IntegerField()),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('warehouse_stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_discrepancies', to='stock.warehousestock')),
+            ],
+            options={
+                'ordering': ['-detected_at'],
+                'indexes': [models.Index(fields=['warehouse_stock', 'detected_at'], name='stock_stock_warehou_5b1c2e_idx'), models.Index(fields=['system', 'detected_at'], name='stock_stock_system_8d0a4f_idx')],
+            },
+        ),
+    ]
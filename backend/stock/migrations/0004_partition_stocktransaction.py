@@ -0,0 +1,134 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:05
+#
+# Rebuilds stock_stocktransaction as a table range-partitioned by month on created_at
+# (PostgreSQL declarative partitioning): one partition per month holding data, the
+# months up to MONTHS_AHEAD ahead and a DEFAULT partition. The existing rows are copied
+# in one pass, so run it in a maintenance window on large ledgers.
+#
+# - The primary key becomes (id, created_at), as partitioned tables require; id keeps
+#   being unique through its sequence.
+# - The B-tree on created_at is replaced by a BRIN index.
+# - StockBatchUsage.transaction loses its database constraint (a foreign key can only
+#   reference a unique constraint, and id alone is no longer one).
+# New months are created ahead of time by stock.partitions.ensure_partitions().
+
+import datetime
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+TABLE = 'stock_stocktransaction'
+SEQUENCE = f'{TABLE}_id_seq'
+MONTHS_AHEAD = 3
+BTREE_INDEXES = {
+    'stock_stock_stock_i_5d1998_idx': ('stock_id', 'transaction_type', 'created_at'),
+    'stock_stock_from_wa_98698d_idx': ('from_warehouse_id', 'created_at'),
+    'stock_stock_to_ware_2bc6db_idx': ('to_warehouse_id', 'created_at'),
+    f'{TABLE}_stock_id_idx': ('stock_id',),
+    f'{TABLE}_from_warehouse_id_idx': ('from_warehouse_id',),
+    f'{TABLE}_to_warehouse_id_idx': ('to_warehouse_id',),
+    f'{TABLE}_user_id_idx': ('user_id',),
+}
+
+
+def _add_month(month):
+    return datetime.datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _restore_relations(apps, schema_editor, table):
+    """Indexes and deferred foreign keys of the ledger (dropped with the old table)"""
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    foreign_keys = {
+        'stock_id': 'stock_stock',
+        'from_warehouse_id': 'stock_warehouse',
+        'to_warehouse_id': 'stock_warehouse',
+        'user_id': user_table,
+    }
+    for name, columns in BTREE_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX "{name}" ON "{table}" ({", ".join(columns)})')
+    for column, target in foreign_keys.items():
+        schema_editor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{column}_fk" FOREIGN KEY ({column}) '
+            f'REFERENCES "{target}" (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+def partition_transactions(apps, schema_editor):
+    execute = schema_editor.execute
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(created_at), MAX(id) FROM "{TABLE}"')
+        oldest, max_id = cursor.fetchone()
+
+    execute(f'CREATE TABLE "{TABLE}_partitioned" (LIKE "{TABLE}") PARTITION BY RANGE (created_at)')
+    execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}_partitioned" DEFAULT')
+    now = datetime.datetime.now(datetime.timezone.utc)
+    month = datetime.datetime((oldest or now).year, (oldest or now).month, 1, tzinfo=datetime.timezone.utc)
+    last = datetime.datetime(now.year, now.month, 1, tzinfo=datetime.timezone.utc)
+    for _ in range(MONTHS_AHEAD):
+        last = _add_month(last)
+    while month <= last:
+        execute(
+            f'CREATE TABLE "{TABLE}_p{month:%Y%m}" PARTITION OF "{TABLE}_partitioned" '
+            f'FOR VALUES FROM (%s) TO (%s)', [month, _add_month(month)],
+        )
+        month = _add_month(month)
+
+    execute(f'INSERT INTO "{TABLE}_partitioned" SELECT * FROM "{TABLE}"')
+    execute(f'DROP TABLE "{TABLE}"')  # With its identity sequence and indexes
+    execute(f'ALTER TABLE "{TABLE}_partitioned" RENAME TO "{TABLE}"')
+
+    execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY (id, created_at)')
+    # Identity columns need PostgreSQL 17 on partitioned tables: use a plain sequence
+    execute(f'CREATE SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id')
+    execute(f"SELECT setval('\"{SEQUENCE}\"', %s, %s)", [max_id or 1, max_id is not None])
+    execute(f"ALTER TABLE \"{TABLE}\" ALTER COLUMN id SET DEFAULT nextval('\"{SEQUENCE}\"')")
+    execute(
+        f'CREATE INDEX "stock_stock_created_brin_idx" ON "{TABLE}" USING brin (created_at) '
+        f'WITH (autosummarize = on)'
+    )
+    _restore_relations(apps, schema_editor, TABLE)
+
+
+def unpartition_transactions(apps, schema_editor):
+    execute = schema_editor.execute
+    execute(f'CREATE TABLE "{TABLE}_plain" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+    execute(f'INSERT INTO "{TABLE}_plain" SELECT * FROM "{TABLE}"')
+    execute(f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}_plain".id')
+    execute(f'DROP TABLE "{TABLE}"')  # With every partition
+    execute(f'ALTER TABLE "{TABLE}_plain" RENAME TO "{TABLE}"')
+    execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY (id)')
+    execute(f'CREATE INDEX "stock_stock_created_c38b0d_idx" ON "{TABLE}" (created_at)')
+    _restore_relations(apps, schema_editor, TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0003_externalsyncstate_stocksyncdiscrepancy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockbatchusage',
+            name='transaction',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='batch_usages', to='stock.stocktransaction'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='stocktransaction',
+                    name='stock_stock_created_c38b0d_idx',
+                ),
+                migrations.AddIndex(
+                    model_name='stocktransaction',
+                    index=django.contrib.postgres.indexes.BrinIndex(autosummarize=True, fields=['created_at'], name='stock_stock_created_brin_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(partition_transactions, unpartition_transactions),
+            ],
+        ),
+    ]
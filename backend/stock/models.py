@@ -9,6 +9,7 @@ from decimal import Decimal
 import uuid
 from django.db.models import F, Sum, Avg, Count
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex
 from django.urls import reverse
 import json
 from django.contrib.auth import get_user_model
@@ -226,7 +227,8 @@ class StockBatch(models.Model):
 class StockBatchUsage(models.Model):
     """Tracks usage of specific batches for valuation"""
     batch = models.ForeignKey(StockBatch, on_delete=models.CASCADE, related_name='usages')
-    transaction = models.ForeignKey('StockTransaction', on_delete=models.CASCADE, related_name='batch_usages')
+    # No database constraint: StockTransaction is partitioned and its primary key is (id, created_at)
+    transaction = models.ForeignKey('StockTransaction', on_delete=models.CASCADE, related_name='batch_usages', db_constraint=False)
     quantity = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -260,11 +262,12 @@ class StockTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        # The table is range-partitioned by month on created_at (see stock.partitions)
         indexes = [
             models.Index(fields=['stock', 'transaction_type', 'created_at']),
             models.Index(fields=['from_warehouse', 'created_at']),
             models.Index(fields=['to_warehouse', 'created_at']),
-            models.Index(fields=['created_at']),
+            BrinIndex(fields=['created_at'], name='stock_stock_created_brin_idx', autosummarize=True),
         ]
 
     def save(self, *args, **kwargs):
@@ -722,4 +725,40 @@ class InventoryAdjustmentItem(models.Model):
     @property
     def has_variance(self):
         """Check if this item has a variance"""
-        return self.quantity_change != 0
\ No newline at end of file
+        return self.quantity_change != 0
+
+class ExternalSyncState(models.Model):
+    """Per-system state of the external inventory sync (stock.external_sync)"""
+    system = models.CharField(max_length=50, unique=True)
+    watermark = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Start of the last run without failures; incremental runs only check rows changed since"
+    )
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, blank=True)  # ok, partial, failed, circuit_open
+    last_error = models.TextField(blank=True)
+    circuit_open_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.system} ({self.last_status or 'never run'})"
+
+
+class StockSyncDiscrepancy(models.Model):
+    """Local vs external quantity mismatch found by one sync run"""
+    run_id = models.CharField(max_length=64, db_index=True)
+    system = models.CharField(max_length=50)
+    warehouse_stock = models.ForeignKey(WarehouseStock, on_delete=models.CASCADE, related_name='sync_discrepancies')
+    local_quantity = models.IntegerField()
+    external_quantity = models.IntegerField()
+    difference = models.IntegerField()  # external - local
+    detected_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-detected_at']
+        indexes = [
+            models.Index(fields=['warehouse_stock', 'detected_at']),
+            models.Index(fields=['system', 'detected_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.system}: {self.warehouse_stock_id} {self.local_quantity} vs {self.external_quantity}"
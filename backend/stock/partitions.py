@@ -0,0 +1,145 @@
+# backend/stock/partitions.py
+"""
+Monthly partitions of the StockTransaction ledger (migration 0004).
+
+stock_stocktransaction is range-partitioned on created_at: one partition per UTC month
+named <table>_pYYYYMM, plus <table>_default for rows outside them. Queries filtering on
+created_at only scan the months of their window, and the BRIN index on created_at
+stays a few pages per partition since the ledger is append-only.
+
+- ensure_partitions() creates the partitions of the current month and of the months
+  ahead (stock.ensure_transaction_partitions, daily; `manage.py stock_partitions`).
+  Rows already in the DEFAULT partition move into the new partition.
+- archive_partitions() writes each partition older than the retention, and the batch
+  usages of its transactions, to gzip-compressed CSV files, then detaches and drops it
+  (stock.archive_transaction_partitions, monthly; `stock_partitions --archive`).
+
+Settings: STOCK_TRANSACTION_PARTITIONS = {'months_ahead', 'keep_months', 'archive_dir'}.
+"""
+import gzip
+import logging
+import os
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import StockBatchUsage, StockTransaction
+
+logger = logging.getLogger(__name__)
+
+TABLE = StockTransaction._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+DEFAULTS = {
+    'months_ahead': 3,
+    'keep_months': 24,
+    'archive_dir': os.path.join(settings.BASE_DIR, 'archive', 'stock_transactions'),
+}
+
+
+def partition_settings():
+    return {**DEFAULTS, **getattr(settings, 'STOCK_TRANSACTION_PARTITIONS', {})}
+
+
+def month_start(moment=None):
+    """First instant (UTC) of the month of `moment` (default: now)"""
+    moment = (moment or timezone.now()).astimezone(dt_timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def partitions():
+    """{month start: partition name} of the attached monthly partitions, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = {}
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            months[datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc)] = name
+    return dict(sorted(months.items()))
+
+
+def create_partition(month):
+    """Create and attach the partition of `month`, moving its rows out of DEFAULT"""
+    name, start, end = partition_name(month), month, add_months(month, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved',
+            [start, end],
+        )
+        if cursor.rowcount:
+            logger.warning(f"Moved {cursor.rowcount} rows of {month:%Y-%m} out of {DEFAULT_PARTITION}")
+        # Indexes and the primary key are created from the parent's on attach
+        cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return name
+
+
+def ensure_partitions(months_ahead=None, now=None):
+    """Create the missing partitions from the current month to `months_ahead` ahead; returns their names"""
+    if months_ahead is None:
+        months_ahead = partition_settings()['months_ahead']
+    existing = partitions()
+    current = month_start(now)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            created.append(create_partition(month))
+    return created
+
+
+def _export(cursor, query, path):
+    """COPY `query` to a gzip CSV at `path` (written to a temporary file, then renamed)"""
+    partial = f"{path}.partial"
+    with gzip.open(partial, 'wb') as handle:
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", handle)
+    os.replace(partial, path)
+
+
+def archive_partitions(keep_months=None, archive_dir=None, now=None, dry_run=False):
+    """
+    Archive the partitions of the months before the last `keep_months`: export them to
+    <archive_dir>/<partition>.csv.gz (and <partition>_batch_usages.csv.gz), then detach
+    and drop them. Returns the archived partition names.
+    """
+    options = partition_settings()
+    keep_months = options['keep_months'] if keep_months is None else keep_months
+    archive_dir = archive_dir or options['archive_dir']
+    cutoff = add_months(month_start(now), -keep_months)
+    expired = [name for month, name in partitions().items() if month < cutoff]
+    if dry_run or not expired:
+        return expired
+
+    os.makedirs(archive_dir, exist_ok=True)
+    usages = StockBatchUsage._meta.db_table
+    for name in expired:
+        usage_query = f'SELECT u.* FROM "{usages}" u JOIN "{name}" t ON t.id = u.transaction_id'
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Lock the month first: the exports and the drop see the same rows
+            cursor.execute(f'LOCK TABLE "{name}" IN SHARE MODE')
+            _export(cursor, f'SELECT * FROM "{name}" ORDER BY id', os.path.join(archive_dir, f"{name}.csv.gz"))
+            _export(cursor, f'{usage_query} ORDER BY u.id', os.path.join(archive_dir, f"{name}_batch_usages.csv.gz"))
+            cursor.execute(f'DELETE FROM "{usages}" WHERE transaction_id IN (SELECT id FROM "{name}")')
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+        logger.info(f"Archived {name} to {archive_dir}")
+    return expired
@@ -1,50 +1,63 @@
 # backend/stock/predictive.py
+
 import pandas as pd
-from django.core.mail import send_mail
-from prophet import Prophet
-from django.db import connection
 from celery import shared_task
-
-from procurement.models import Item
+from django.core.mail import send_mail
+from django.db.models import Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from hr.ml import forecast
+from hr.ml.forecast import ForecastSeries
+from procurement.models import Item, PurchaseOrderItem
+
+
+class StockDemandForecast(ForecastSeries):
+    """Daily ordered quantity of inventory items over the last 180 order days."""
+    key = forecast.STOCK_DEMAND
+    periods = 30
+    min_points = 30
+    history_days = 180
+
+    def history(self):
+        rows = list(
+            PurchaseOrderItem.objects.filter(
+                item__track_inventory=True,
+                purchase_order__status__in=('confirmed', 'sent'),
+            )
+            .annotate(ds=TruncDate('purchase_order__created_at'))
+            .values('ds')
+            .annotate(y=Sum('quantity_ordered'))
+            .order_by('-ds')[:self.history_days]
+        )
+        return pd.DataFrame(
+            [{'ds': pd.Timestamp(row['ds']), 'y': float(row['y'])} for row in reversed(rows)],
+            columns=['ds', 'y'],
+        )
+
+    def build_model(self):
+        from prophet import Prophet
+        return Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
 
 
 @shared_task
 def generate_stock_alerts():
-    with connection.cursor() as cursor:
-        cursor.execute("""
-                       SELECT DATE(created_at) as date, SUM(quantity) as qty
-                       FROM procurement_purchaseorderitem ppi
-                           JOIN procurement_purchaseorder po ON ppi.purchase_order_id = po.id
-                           JOIN procurement_item i ON ppi.item_id = i.id
-                       WHERE i.track_inventory = TRUE AND po.status IN ('confirmed', 'sent')
-                       GROUP BY DATE(created_at)
-                       ORDER BY date DESC LIMIT 180
-                       """)
-        rows = cursor.fetchall()
-
-    if len(rows) < 30:
+    # Refits only when order history changed since the last run; otherwise reuses the stored forecast
+    record, _ = forecast.train(forecast.STOCK_DEMAND)
+    if record.status != 'ready':
         return
 
-    df = pd.DataFrame(rows, columns=['ds', 'y'])
-    m = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
-    m.fit(df)
-
-    future = m.make_future_dataframe(periods=30)
-    forecast = m.predict(future)
+    # Predict consumption in next 15 days
+    predicted = sum(row['yhat'] for row in record.forecast[:15])
 
-    # Find items projected to go below safety stock
-    low_stock_items = Item.objects.filter(
-        track_inventory=True,
-        # Add your current stock logic here
+    low_stock_items = Item.objects.filter(track_inventory=True).annotate(
+        current_stock=Coalesce(Sum('stock_record__warehouse_stocks__quantity'), 0)
     )
 
     for item in low_stock_items:
-        # Predict consumption in next 15 days
-        predicted = forecast.tail(15)['yhat'].sum()
         if predicted > item.current_stock * 1.5:  # 50% buffer
             send_mail(
                 "Predictive Reorder Alert",
                 f"Item {item.sku} - {item.name} will run out in ~12 days. Predicted usage: {predicted:.0f}",
                 "ai@highprosper.com",
                 ["procurement@highprosper.com"]
-            )
\ No newline at end of file
+            )
@@ -0,0 +1,191 @@
+# backend/stock/reconciliation.py
+"""
+Set-based stock discrepancy detection and reconciliation.
+
+find_discrepancies() finds both discrepancy classes in one SQL statement: WarehouseStock
+joined with the last DAYS of StockTransaction movements grouped by (stock, warehouse).
+- reserved_exceeds_available: reserved_quantity > quantity
+- negative_transactions: the recent movements of the row net out below zero
+
+A movement belongs to the warehouse it leaves (negative quantity, from_warehouse) or
+enters (to_warehouse). Reservations and releases move no stock and are not counted.
+
+reconcile() fixes the reserved excess in one atomic block: the flagged rows are locked,
+reserved_quantity is reset with one conditional UPDATE (GREATEST(quantity, 0)) and
+one `release` StockTransaction per row is bulk-created. Negative movement totals need a
+count and are only reported. The report is sorted by warehouse and SKU, and
+report_lines() renders it as stable, diffable text.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Stock, StockTransaction, Warehouse, WarehouseStock
+
+DAYS = 7
+NON_MOVEMENT_TYPES = ('reservation', 'release')
+CORRECTION_REFERENCE = 'reserved_excess_correction'
+
+DISCREPANCIES_SQL = """
+    WITH movements AS (
+        SELECT t.stock_id,
+               CASE WHEN t.quantity < 0 THEN COALESCE(t.from_warehouse_id, t.to_warehouse_id)
+                    ELSE COALESCE(t.to_warehouse_id, t.from_warehouse_id) END AS warehouse_id,
+               SUM(t.quantity) AS recent_total
+        FROM {transactions} t
+        WHERE t.created_at >= %(since)s
+          AND NOT (t.transaction_type = ANY(%(non_movement)s))
+          AND (%(warehouse_id)s IS NULL OR t.from_warehouse_id = %(warehouse_id)s OR t.to_warehouse_id = %(warehouse_id)s)
+        GROUP BY 1, 2
+    )
+    SELECT ws.id, ws.stock_id, ws.warehouse_id, s.item_code AS sku, w.code AS warehouse_code,
+           ws.quantity, ws.reserved_quantity, m.recent_total
+    FROM {warehouse_stock} ws
+    JOIN {stock} s ON s.id = ws.stock_id
+    JOIN {warehouse} w ON w.id = ws.warehouse_id
+    LEFT JOIN movements m ON m.stock_id = ws.stock_id AND m.warehouse_id = ws.warehouse_id
+    WHERE s.is_active
+      AND (ws.quantity > 0 OR ws.reserved_quantity > 0)
+      AND (%(warehouse_id)s IS NULL OR ws.warehouse_id = %(warehouse_id)s)
+      AND (ws.reserved_quantity > ws.quantity OR m.recent_total < 0)
+    ORDER BY w.code, s.item_code
+"""
+
+
+def _rows(warehouse_id=None, days=DAYS):
+    params = {
+        'since': timezone.now() - timedelta(days=days),
+        'non_movement': list(NON_MOVEMENT_TYPES),
+        'warehouse_id': int(warehouse_id) if warehouse_id else None,
+    }
+    sql = DISCREPANCIES_SQL.format(
+        transactions=StockTransaction._meta.db_table,
+        warehouse_stock=WarehouseStock._meta.db_table,
+        stock=Stock._meta.db_table,
+        warehouse=Warehouse._meta.db_table,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def find_discrepancies(warehouse_id=None, days=DAYS):
+    """Discrepancy reports (one per class and row), sorted by warehouse and SKU"""
+    discrepancies = []
+    for row in _rows(warehouse_id, days):
+        base = {
+            'warehouse_stock_id': row['id'],
+            'stock_id': str(row['stock_id']),
+            'sku': row['sku'],
+            'warehouse_id': str(row['warehouse_id']),
+            'warehouse_code': row['warehouse_code'],
+        }
+        if row['reserved_quantity'] > row['quantity']:
+            discrepancies.append({
+                'type': 'reserved_exceeds_available',
+                **base,
+                'available': row['quantity'],
+                'reserved': row['reserved_quantity'],
+                'discrepancy': row['reserved_quantity'] - row['quantity'],
+                'severity': 'high',
+            })
+        if row['recent_total'] is not None and row['recent_total'] < 0:
+            discrepancies.append({
+                'type': 'negative_transactions',
+                **base,
+                'recent_total': int(row['recent_total']),
+                'current_quantity': row['quantity'],
+                'severity': 'medium',
+            })
+    return discrepancies
+
+
+def _fix_reserved_excess(warehouse_stock_ids, user=None):
+    """Reset reserved_quantity of the rows still over quantity; returns the corrections"""
+    with transaction.atomic():
+        # Re-read under lock: the rows may have changed since detection
+        rows = list(
+            WarehouseStock.objects.select_for_update(of=('self',))
+            .filter(pk__in=warehouse_stock_ids, reserved_quantity__gt=F('quantity'))
+            .order_by('pk')
+            .values('pk', 'stock_id', 'warehouse_id', 'stock__item_code', 'warehouse__code',
+                    'quantity', 'reserved_quantity', 'unit_price')
+        )
+        if not rows:
+            return []
+
+        WarehouseStock.objects.filter(
+            pk__in=[row['pk'] for row in rows], reserved_quantity__gt=F('quantity'),
+        ).update(reserved_quantity=Greatest(F('quantity'), Value(0)), last_updated=timezone.now())
+
+        corrections, transactions = [], []
+        for row in rows:
+            new_reserved = max(row['quantity'], 0)
+            released = row['reserved_quantity'] - new_reserved
+            corrections.append({
+                'stock_id': str(row['stock_id']),
+                'sku': row['stock__item_code'],
+                'warehouse_id': str(row['warehouse_id']),
+                'warehouse_code': row['warehouse__code'],
+                'action': 'reduced_reserved_quantity',
+                'old_value': row['reserved_quantity'],
+                'new_value': new_reserved,
+                'difference': released,
+            })
+            transactions.append(StockTransaction(
+                stock_id=row['stock_id'],
+                to_warehouse_id=row['warehouse_id'],
+                transaction_type='release',
+                quantity=released,
+                unit_price=row['unit_price'],
+                total_value=released * row['unit_price'],
+                reference=CORRECTION_REFERENCE,
+                notes=f"Fixed reserved > available: {row['reserved_quantity']} -> {new_reserved}",
+                user=user,
+            ))
+        # Administrative corrections: no per-row post_save broadcast
+        StockTransaction.objects.bulk_create(transactions, batch_size=1000)
+
+    corrections.sort(key=lambda c: (c['warehouse_code'], c['sku']))
+    return corrections
+
+
+def reconcile(warehouse_id=None, dry_run=True, user=None, days=DAYS):
+    """
+    Detect discrepancies and, unless `dry_run`, fix the reserved excess.
+    Returns the reconciliation report.
+    """
+    report = {
+        'dry_run': dry_run,
+        'timestamp': timezone.now().isoformat(),
+        'warehouse_id': str(warehouse_id) if warehouse_id else None,
+        'discrepancies': find_discrepancies(warehouse_id, days),
+        'corrections_made': [],
+        'items_fixed': 0,
+    }
+    report['total_items_checked'] = len(report['discrepancies'])
+
+    if not dry_run:
+        ids = [d['warehouse_stock_id'] for d in report['discrepancies'] if d['type'] == 'reserved_exceeds_available']
+        if ids:
+            report['corrections_made'] = _fix_reserved_excess(ids, user=user)
+        report['items_fixed'] = len(report['corrections_made'])
+    return report
+
+
+def report_lines(report):
+    """Tab-separated lines, one per discrepancy / correction, stable across runs"""
+    lines = []
+    for d in report['discrepancies']:
+        if d['type'] == 'reserved_exceeds_available':
+            detail = f"reserved={d['reserved']}\tavailable={d['available']}"
+        else:
+            detail = f"recent_total={d['recent_total']}\tquantity={d['current_quantity']}"
+        lines.append(f"{d['warehouse_code']}\t{d['sku']}\t{d['type']}\t{detail}")
+    for c in report['corrections_made']:
+        lines.append(f"{c['warehouse_code']}\t{c['sku']}\tfixed\treserved {c['old_value']} -> {c['new_value']}")
+    return lines
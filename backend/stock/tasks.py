@@ -2,9 +2,7 @@
 Stock Management Celery Tasks
 Comprehensive background processing for inventory operations
 """
-import asyncio
 import logging
-import requests
 import json
 from celery.schedules import crontab
 from datetime import datetime, timedelta
@@ -37,6 +35,8 @@ from .serializers import (
     WarehouseStockSerializer
 )
 from .consumers import redis_cache, broadcast_stock_transaction
+from .external_sync import sync_stock
+from .partitions import archive_partitions, ensure_partitions
 from .utils import (
     calculate_safety_stock, forecast_demand, calculate_eoq,
     generate_barcode, validate_stock_data
@@ -45,456 +45,50 @@ from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
-class ExternalSystemSyncManager:
-    """Manager for synchronizing with external inventory systems"""
-
-    def __init__(self):
-        self.systems = {
-            'erp': self._sync_erp,
-            'wms': self._sync_wms,
-            'pos': self._sync_pos,
-            'woocommerce': self._sync_woocommerce,
-            'shopify': self._sync_shopify,
-            'magento': self._sync_magento,
-            'custom_api': self._sync_custom_api
-        }
-
-    async def sync_all_systems(self, stock_item: WarehouseStock) -> Dict[str, Any]:
-        """Synchronize with all configured external systems"""
-        sync_results = {
-            'stock_id': str(stock_item.stock_id),
-            'sku': stock_item.stock.sku,
-            'systems_synced': 0,
-            'systems_failed': 0,
-            'external_quantities': {},
-            'final_quantity': stock_item.quantity,
-            'discrepancies_found': False,
-            'timestamp': timezone.now().isoformat()
-        }
-
-        configured_systems = settings.EXTERNAL_INVENTORY_SYSTEMS or []
-
-        for system_name in configured_systems:
-            if system_name in self.systems:
-                try:
-                    external_qty = await self.systems[system_name](stock_item)
-                    sync_results['external_quantities'][system_name] = external_qty
-                    sync_results['systems_synced'] += 1
-
-                    # Check for discrepancies
-                    if external_qty != stock_item.quantity:
-                        sync_results['discrepancies_found'] = True
-                        logger.warning(
-                            f"Discrepancy detected for {stock_item.stock.sku}: "
-                            f"Local={stock_item.quantity}, {system_name}={external_qty}"
-                        )
-
-                except Exception as e:
-                    sync_results['systems_failed'] += 1
-                    sync_results['external_quantities'][system_name] = {
-                        'error': str(e),
-                        'status': 'failed'
-                    }
-                    logger.error(f"Sync failed for {system_name} - {stock_item.stock.sku}: {e}")
-
-        return sync_results
-
-    async def _sync_erp(self, stock_item: WarehouseStock) -> Optional[int]:
-        """Sync with ERP system (SAP, Oracle, Microsoft Dynamics)"""
-        try:
-            erp_config = settings.ERP_CONFIG
-            if not erp_config.get('enabled'):
-                return None
-
-            # SAP-like API endpoint
-            url = f"{erp_config['base_url']}/api/inventory/{stock_item.stock.sku}"
-            headers = {
-                'Authorization': f"Bearer {erp_config['access_token']}",
-                'Content-Type': 'application/json'
-            }
-
-            response = requests.get(
-                url,
-                headers=headers,
-                timeout=10,
-                params={'warehouse': stock_item.warehouse.code}
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                return int(data.get('available_quantity', 0))
-            else:
-                logger.error(f"ERP sync failed: {response.status_code} - {response.text}")
-                return None
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"ERP request failed for {stock_item.stock.sku}: {e}")
-            return None
-        except (ValueError, KeyError) as e:
-            logger.error(f"ERP data parsing failed for {stock_item.stock.sku}: {e}")
-            return None
-
-    async def _sync_wms(self, stock_item: WarehouseStock) -> Optional[int]:
-        """Sync with Warehouse Management System (Manhattan, HighJump, etc.)"""
-        try:
-            wms_config = settings.WMS_CONFIG
-            if not wms_config.get('enabled'):
-                return None
-
-            url = f"{wms_config['base_url']}/api/v1/stock/location"
-            headers = {
-                'Authorization': f"Basic {wms_config['api_key']}",
-                'Content-Type': 'application/json'
-            }
-
-            payload = {
-                'sku': stock_item.stock.sku,
-                'warehouse_id': stock_item.warehouse.id,
-                'location_type': 'available'
-            }
-
-            response = requests.post(
-                url,
-                headers=headers,
-                json=payload,
-                timeout=15
-            )
-
-            if response.status_code in [200, 201]:
-                data = response.json()
-                return int(data.get('quantity', 0))
-            else:
-                logger.error(f"WMS sync failed: {response.status_code}")
-                return None
-
-        except Exception as e:
-            logger.error(f"WMS sync error for {stock_item.stock.sku}: {e}")
-            return None
-
-    async def _sync_pos(self, stock_item: WarehouseStock) -> Optional[int]:
-        """Sync with Point of Sale systems (Square, Lightspeed, etc.)"""
-        try:
-            pos_config = settings.POS_CONFIG
-            if not pos_config.get('enabled'):
-                return None
-
-            url = f"{pos_config['base_url']}/v1/items/{stock_item.stock.sku}/inventory"
-            headers = {
-                'Authorization': f"Bearer {pos_config['access_token']}",
-                'Content-Type': 'application/json'
-            }
-
-            response = requests.get(
-                url,
-                headers=headers,
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                # POS systems often track by location
-                total_qty = 0
-                for location in data.get('locations', []):
-                    total_qty += int(location.get('quantity', 0))
-                return total_qty
-            else:
-                logger.error(f"POS sync failed: {response.status_code}")
-                return None
-
-        except Exception as e:
-            logger.error(f"POS sync error for {stock_item.stock.sku}: {e}")
-            return None
-
-    async def _sync_woocommerce(self, stock_item: WarehouseStock) -> Optional[int]:
-        """Sync with WooCommerce"""
-        try:
-            wc_config = settings.WOOCOMMERCE_CONFIG
-            if not wc_config.get('enabled'):
-                return None
-
-            # First get product ID by SKU
-            products_url = f"{wc_config['base_url']}/wp-json/wc/v3/products"
-            params = {
-                'sku': stock_item.stock.sku,
-                'consumer_key': wc_config['consumer_key'],
-                'consumer_secret': wc_config['consumer_secret']
+def _broadcast_stock_sync_update(update: Dict, run_id: str) -> None:
+    """Broadcast one row corrected by the external sync via WebSocket"""
+    try:
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+        stock_id, warehouse_id = update['stock_id'], update['warehouse_id']
+        async_to_sync(channel_layer.group_send)(
+            'stock_updates',
+            {
+                'type': 'stock_level_changed',
+                'stock_id': stock_id,
+                'warehouse_id': warehouse_id,
+                'old_quantity': update['old_quantity'],
+                'new_quantity': update['new_quantity'],
+                'available_quantity': update['new_quantity'],
+                'sync_run': run_id,
+                'timestamp': timezone.now().isoformat()
             }
+        )
 
-            response = requests.get(products_url, params=params, timeout=15)
-            if response.status_code != 200:
-                return None
-
-            products = response.json()
-            if not products:
-                return 0
-
-            product_id = products[0]['id']
-            stock_url = f"{wc_config['base_url']}/wp-json/wc/v3/products/{product_id}/stock"
-
-            stock_response = requests.get(
-                stock_url,
-                params={
-                    'consumer_key': wc_config['consumer_key'],
-                    'consumer_secret': wc_config['consumer_secret']
+        # Also send to specific stock group
+        async_to_sync(channel_layer.group_send)(
+            f'stock_{stock_id}',
+            {
+                'type': 'stock_transaction_update',
+                'transaction': {
+                    'stock_id': stock_id,
+                    'transaction_type': 'correction',
+                    'quantity': update['new_quantity'] - update['old_quantity'],
+                    'reference': f'sync_{run_id}'
                 },
-                timeout=10
-            )
-
-            if stock_response.status_code == 200:
-                stock_data = stock_response.json()
-                return int(stock_data.get('stock_quantity', 0))
-            return None
-
-        except Exception as e:
-            logger.error(f"WooCommerce sync error for {stock_item.stock.sku}: {e}")
-            return None
-
-    async def _sync_shopify(self, stock_item: WarehouseStock) -> Optional[int]:
-        """Sync with Shopify"""
-        try:
-            shopify_config = settings.SHOPIFY_CONFIG
-            if not shopify_config.get('enabled'):
-                return None
-
-            url = f"{shopify_config['base_url']}/admin/api/2023-10/products.json"
-            headers = {
-                'X-Shopify-Access-Token': shopify_config['access_token'],
-                'Content-Type': 'application/json'
-            }
-            params = {'limit': 1, 'ids': shopify_config.get('product_mapping', {}).get(stock_item.stock.sku)}
-
-            response = requests.get(url, headers=headers, params=params, timeout=15)
-            if response.status_code == 200:
-                products = response.json().get('products', [])
-                if products:
-                    variants = products[0].get('variants', [])
-                    total_qty = sum(v.get('inventory_quantity', 0) for v in variants)
-                    return total_qty
-            return None
-
-        except Exception as e:
-            logger.error(f"Shopify sync error for {stock_item.stock.sku}: {e}")
-            return None
-
-    async def _sync_magento(self, stock_item: WarehouseStock) -> Optional[int]:
-        """Sync with Magento"""
-        try:
-            magento_config = settings.MAGENTO_CONFIG
-            if not magento_config.get('enabled'):
-                return None
-
-            url = f"{magento_config['base_url']}/rest/V1/stockItems/{stock_item.stock.sku}"
-            headers = {
-                'Authorization': f"Bearer {magento_config['access_token']}"
+                'stock_id': stock_id,
+                'timestamp': timezone.now().isoformat()
             }
-
-            response = requests.get(url, headers=headers, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                return int(data.get('qty', 0))
-            return None
-
-        except Exception as e:
-            logger.error(f"Magento sync error for {stock_item.stock.sku}: {e}")
-            return None
-
-    async def _sync_custom_api(self, stock_item: WarehouseStock) -> Optional[int]:
-        """Sync with custom external API"""
-        try:
-            custom_configs = getattr(settings, 'CUSTOM_INVENTORY_APIS', [])
-            for config in custom_configs:
-                if config.get('enabled'):
-                    url = config['endpoint'].format(sku=stock_item.stock.sku)
-                    headers = config.get('headers', {})
-
-                    response = requests.get(url, headers=headers, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        quantity_path = config.get('quantity_path', 'quantity')
-                        quantity = self._extract_json_value(data, quantity_path)
-                        if quantity is not None:
-                            return int(quantity)
-            return None
-        except Exception as e:
-            logger.error(f"Custom API sync error for {stock_item.stock.sku}: {e}")
-            return None
-
-    def _extract_json_value(self, data: Dict, path: str) -> Any:
-        """Extract value from JSON using dot notation"""
-        keys = path.split('.')
-        current = data
-        for key in keys:
-            if isinstance(current, dict) and key in current:
-                current = current[key]
-            else:
-                return None
-        return current
-
-# Global sync manager instance
-sync_manager = ExternalSystemSyncManager()
-
-def _full_stock_sync(stock_item: WarehouseStock) -> bool:
-    """
-    Perform comprehensive full stock synchronization across all systems
-
-    Args:
-        stock_item: WarehouseStock instance to sync
-
-    Returns:
-        bool: True if sync was successful, False otherwise
-    """
-    try:
-        # Skip sync if stock is inactive or zero quantity
-        if not stock_item.stock.is_active or stock_item.quantity == 0:
-            return True
-
-        # Check cache first (5 minute cache)
-        cache_key = f"stock_sync_{stock_item.stock_id}_{stock_item.warehouse_id}"
-        cached_results = cache.get(cache_key)
-        if cached_results and (timezone.now() - cached_results['timestamp']).seconds < 300:
-            return cached_results['sync_successful']
-
-        # Perform async sync (but since we're in sync context, use sync_to_async)
-        loop = asyncio.get_event_loop()
-        sync_results = loop.run_until_complete(
-            sync_manager.sync_all_systems(stock_item)
         )
 
-        # Determine if update is needed
-        update_performed = False
-
-        # Calculate average external quantity (majority vote)
-        external_quantities = [
-            qty for qty in sync_results['external_quantities'].values()
-            if isinstance(qty, int) and qty is not None
-        ]
-
-        if external_quantities:
-            # Use median to avoid outliers
-            median_external_qty = sorted(external_quantities)[len(external_quantities)//2]
-
-            # Only update if significant discrepancy (>5% or minimum 5 units)
-            discrepancy_threshold = max(5, stock_item.quantity * 0.05)
-            if abs(median_external_qty - stock_item.quantity) > discrepancy_threshold:
-
-                with transaction.atomic():
-                    old_quantity = stock_item.quantity
-
-                    # Update stock quantity
-                    stock_item.quantity = median_external_qty
-                    stock_item.last_updated = timezone.now()
-                    stock_item.save(update_fields=['quantity', 'last_updated'])
-
-                    # Create adjustment transaction
-                    if old_quantity != median_external_qty:
-                        StockTransaction.objects.create(
-                            stock=stock_item.stock,
-                            warehouse=stock_item.warehouse,
-                            transaction_type='system_sync',
-                            quantity=median_external_qty - old_quantity,
-                            reference=f"sync_{sync_results['timestamp']}",
-                            notes=f"Auto-sync with external systems: {len(external_quantities)} sources"
-                        )
-
-                        update_performed = True
-
-                        # Broadcast real-time update
-                        loop.run_until_complete(
-                            _broadcast_stock_sync_update(
-                                stock_item, old_quantity, median_external_qty, sync_results
-                            )
-                        )
-
-        # Cache results
-        cache_results = {
-            'sync_successful': True,
-            'systems_synced': sync_results['systems_synced'],
-            'systems_failed': sync_results['systems_failed'],
-            'discrepancies_found': sync_results['discrepancies_found'],
-            'timestamp': timezone.now()
-        }
-        cache.set(cache_key, cache_results, 300)  # 5 minutes
-
-        # Log sync results
-        logger.info(
-            f"Stock sync completed for {stock_item.stock.sku}: "
-            f"synced={sync_results['systems_synced']}, "
-            f"failed={sync_results['systems_failed']}, "
-            f"updated={update_performed}, "
-            f"discrepancies={sync_results['discrepancies_found']}"
-        )
-
-        return True
-
-    except Exception as e:
-        logger.error(f"Full stock sync failed for {stock_item.stock.sku}: {e}")
-
-        # Cache failure to prevent repeated attempts
-        cache_key = f"stock_sync_{stock_item.stock_id}_{stock_item.warehouse_id}"
-        cache.set(cache_key, {'sync_successful': False, 'timestamp': timezone.now()}, 600)
-
-        return False
-
-async def _broadcast_stock_sync_update(stock_item: WarehouseStock,
-                                       old_quantity: int,
-                                       new_quantity: int,
-                                       sync_results: Dict) -> None:
-    """Broadcast stock sync update via WebSocket"""
-    try:
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            await channel_layer.group_send(
-                'stock_updates',
-                {
-                    'type': 'stock_level_changed',
-                    'stock_id': str(stock_item.stock_id),
-                    'warehouse_id': str(stock_item.warehouse_id),
-                    'old_quantity': old_quantity,
-                    'new_quantity': new_quantity,
-                    'available_quantity': new_quantity,
-                    'sync_results': sync_results,
-                    'timestamp': timezone.now().isoformat()
-                }
-            )
-
-            # Also send to specific stock group
-            await channel_layer.group_send(
-                f'stock_{stock_item.stock_id}',
-                {
-                    'type': 'stock_transaction_update',
-                    'transaction': {
-                        'stock_id': str(stock_item.stock_id),
-                        'transaction_type': 'system_sync',
-                        'quantity': new_quantity - old_quantity,
-                        'reference': 'auto-sync'
-                    },
-                    'stock_id': str(stock_item.stock_id),
-                    'timestamp': timezone.now().isoformat()
-                }
-            )
-
-            # Cache invalidation
-            await redis_cache.delete_cache(f"warehouse_stock_{stock_item.warehouse_id}_{stock_item.stock_id}")
-            cache.delete(f"warehouse_stock_{stock_item.warehouse_id}_{stock_item.stock_id}")
+        # Cache invalidation
+        async_to_sync(redis_cache.delete_cache)(f"warehouse_stock_{warehouse_id}_{stock_id}")
+        cache.delete(f"warehouse_stock_{warehouse_id}_{stock_id}")
 
     except Exception as e:
         logger.error(f"Failed to broadcast stock sync update: {e}")
 
-# Additional sync helper functions
-def _incremental_stock_sync(stock_item: WarehouseStock) -> bool:
-    """Perform incremental sync (only changed items)"""
-    # Check if item was modified recently
-    if stock_item.last_updated > timezone.now() - timedelta(hours=1):
-        return _full_stock_sync(stock_item)
-    return True
-
-def _external_stock_sync(stock_item: WarehouseStock) -> bool:
-    """Sync only with external systems (skip internal validation)"""
-    # Implementation similar to _full_stock_sync but focused on external only
-    loop = asyncio.get_event_loop()
-    sync_results = loop.run_until_complete(sync_manager.sync_all_systems(stock_item))
-    return sync_results['systems_synced'] > 0
-
 
 # =============================================================================
 # 📦 BULK OPERATIONS TASKS
@@ -633,67 +227,54 @@ def _import_stock_item(row: pd.Series, warehouse: Warehouse, user_id: int) -> bo
 def process_stock_sync(self, warehouse_ids: List[str] = None,
                        sync_type: str = 'full') -> Dict[str, Any]:
     """
-    Synchronize stock levels across systems
+    Synchronize stock levels with the external inventory systems (stock.external_sync)
 
     Args:
         warehouse_ids: Specific warehouses to sync (optional)
         sync_type: 'full', 'incremental', 'external'
     """
     try:
-        sync_results = {
-            'synced_items': 0,
-            'updated_items': 0,
-            'errors': [],
-            'timestamp': timezone.now().isoformat(),
-            'task_id': self.request.id
-        }
-
-        queryset = WarehouseStock.objects.all()
-        if warehouse_ids:
-            queryset = queryset.filter(warehouse_id__in=warehouse_ids)
-
-        with transaction.atomic():
-            for stock_item in queryset.iterator(chunk_size=1000):
-                try:
-                    if sync_type == 'full':
-                        success = _full_stock_sync(stock_item)
-                    elif sync_type == 'incremental':
-                        success = _incremental_stock_sync(stock_item)
-                    elif sync_type == 'external':
-                        success = _external_stock_sync(stock_item)
-
-                    if success:
-                        sync_results['synced_items'] += 1
-                    else:
-                        sync_results['updated_items'] += 1
-
-                except Exception as e:
-                    sync_results['errors'].append({
-                        'stock_id': stock_item.stock_id,
-                        'error': str(e)
-                    })
-
-        # Update cache
-        cache.set(f"stock_sync_{self.request.id}", sync_results, 1800)
-
-        # Broadcast sync completion
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                'stock_updates',
-                {
-                    'type': 'stock_sync_completed',
-                    'results': sync_results,
-                    'timestamp': timezone.now().isoformat()
-                }
-            )
-
-        return sync_results
-
+        report = sync_stock(warehouse_ids, sync_type)
+    except ValueError:
+        raise
     except Exception as e:
         logger.error(f"Stock sync failed: {e}")
         raise self.retry(countdown=300)
 
+    sync_results = {
+        'synced_items': report['checked_items'],
+        'updated_items': report['updated_items'],
+        'discrepancies': report['discrepancies'],
+        'systems': report['systems'],
+        'errors': [
+            {'system': name, 'error': system['error']}
+            for name, system in report['systems'].items() if system['error']
+        ],
+        'run_id': report['run_id'],
+        'timestamp': report['timestamp'],
+        'task_id': self.request.id
+    }
+
+    for update in report['updates']:
+        _broadcast_stock_sync_update(update, report['run_id'])
+
+    # Update cache
+    cache.set(f"stock_sync_{self.request.id}", sync_results, 1800)
+
+    # Broadcast sync completion
+    channel_layer = get_channel_layer()
+    if channel_layer:
+        async_to_sync(channel_layer.group_send)(
+            'stock_updates',
+            {
+                'type': 'stock_sync_completed',
+                'results': sync_results,
+                'timestamp': timezone.now().isoformat()
+            }
+        )
+
+    return sync_results
+
 
 # =============================================================================
 # 📊 ANALYSIS TASKS
@@ -1392,7 +973,9 @@ __all__ = [
     'check_stock_alerts',
     'update_dashboard_metrics',
     'process_high_volume_stock_update',
-    'process_pending_transfers'
+    'process_pending_transfers',
+    'ensure_transaction_partitions',
+    'archive_transaction_partitions'
 ]
 
 # =============================================================================
@@ -1541,6 +1124,20 @@ def cleanup_expired_cache():
         logger.error(f"Cache cleanup failed: {e}")
         return {'status': 'error', 'message': str(e)}
 
+@shared_task(time_limit=30 * 60, soft_time_limit=25 * 60)
+def ensure_transaction_partitions():
+    """Create the upcoming monthly StockTransaction partitions (stock.partitions)"""
+    created = ensure_partitions()
+    if created:
+        logger.info(f"Created stock transaction partitions: {', '.join(created)}")
+    return {'status': 'success', 'created': created}
+
+@shared_task(time_limit=6 * 60 * 60, soft_time_limit=5 * 60 * 60)
+def archive_transaction_partitions():
+    """Export, detach and drop the StockTransaction partitions past their retention"""
+    archived = archive_partitions()
+    return {'status': 'success', 'archived': archived}
+
 @shared_task
 def update_stock_analytics():
     """Update daily stock analytics"""
@@ -0,0 +1,249 @@
+# backend/stock/tests.py
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase, override_settings
+
+from .external_sync import sync_stock
+from .partitions import archive_partitions, ensure_partitions, partitions
+from .models import ExternalSyncState, Stock, StockSyncDiscrepancy, StockTransaction, Warehouse, WarehouseStock
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    def _handle(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        request = {'method': self.command, 'path': url.path, 'query': parse_qs(url.query), 'body': body}
+        with self.server.lock:
+            self.server.requests.append(request)
+            status, payload = self.server.respond(request, len(self.server.requests))
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeServer(ThreadingHTTPServer):
+    """In-process external system: `respond(request, n)` -> (status, JSON payload)"""
+    daemon_threads = True
+
+    def __init__(self, respond):
+        super().__init__(('127.0.0.1', 0), FakeHandler)
+        self.respond = respond
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+FAST = {'retries': 2, 'backoff': 0, 'breaker_threshold': 2, 'breaker_cooldown': 300, 'timeout': 5}
+
+
+class ExternalSyncTestCase(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Main", code="MAIN")
+        self.rows = {}
+        for sku, quantity in (('SKU001', 100), ('SKU002', 40), ('SKU003', 7)):
+            stock = Stock.objects.create(item_code=sku, name=sku, unit_price=2)
+            self.rows[sku] = WarehouseStock.objects.create(stock=stock, warehouse=self.warehouse, quantity=quantity, unit_price=2)
+        # External truth: SKU001 lost 30 units everywhere, SKU002 only differs in the WMS
+        self.external = {'SKU001': 70, 'SKU002': 40, 'SKU003': 7}
+
+    def erp(self, request, n):
+        assert request['path'] == '/batch'
+        return 200, {'items': [
+            {'sku': i['sku'], 'warehouse': i['warehouse'], 'available_quantity': self.external[i['sku']]}
+            for i in request['body']['items']
+        ]}
+
+    def wms(self, request, n):
+        sku = request['body']['sku']
+        return 200, {'quantity': self.external[sku] + (2 if sku == 'SKU002' else 0)}
+
+    def shopify(self, request, n):
+        ids = request['query']['ids'][0].split(',')
+        skus = {'1': 'SKU001', '2': 'SKU002', '3': 'SKU003'}
+        return 200, {'products': [
+            {'id': int(i), 'variants': [{'inventory_quantity': self.external[skus[i]]}]} for i in ids
+        ]}
+
+    def systems(self, erp, wms, shopify, **options):
+        return override_settings(
+            EXTERNAL_INVENTORY_SYSTEMS=['erp', 'wms', 'shopify'],
+            ERP_CONFIG={'enabled': True, 'base_url': erp.url, 'access_token': 't', 'batch_path': '/batch'},
+            WMS_CONFIG={'enabled': True, 'base_url': wms.url, 'api_key': 'k'},
+            SHOPIFY_CONFIG={'enabled': True, 'base_url': shopify.url, 'access_token': 't',
+                            'product_mapping': {'SKU001': '1', 'SKU002': '2', 'SKU003': '3'}},
+            EXTERNAL_SYNC={**FAST, **options},
+        )
+
+    def test_batched_sync_persists_discrepancies_and_corrects(self):
+        with FakeServer(self.erp) as erp, FakeServer(self.wms) as wms, FakeServer(self.shopify) as shopify:
+            with self.systems(erp, wms, shopify):
+                report = sync_stock()
+
+        # Batch endpoints: one call for all SKUs; the WMS has none: one call per SKU
+        self.assertEqual(len(erp.requests), 1)
+        self.assertEqual(len(erp.requests[0]['body']['items']), 3)
+        self.assertEqual(len(shopify.requests), 1)
+        self.assertEqual(len(wms.requests), 3)
+
+        self.assertEqual({name: s['status'] for name, s in report['systems'].items()},
+                         {'erp': 'ok', 'wms': 'ok', 'shopify': 'ok'})
+        self.assertEqual(report['checked_items'], 3)
+        discrepancies = StockSyncDiscrepancy.objects.filter(run_id=report['run_id'])
+        self.assertEqual(
+            sorted(discrepancies.values_list('system', 'warehouse_stock__stock__item_code', 'difference')),
+            [('erp', 'SKU001', -30), ('shopify', 'SKU001', -30), ('wms', 'SKU001', -30), ('wms', 'SKU002', 2)],
+        )
+
+        # Only SKU001 is over the max(5, 5%) threshold
+        self.assertEqual(report['updated_items'], 1)
+        self.rows['SKU001'].refresh_from_db()
+        self.rows['SKU002'].refresh_from_db()
+        self.assertEqual(self.rows['SKU001'].quantity, 70)
+        self.assertEqual(self.rows['SKU002'].quantity, 40)
+        correction = StockTransaction.objects.get(transaction_type='correction')
+        self.assertEqual(correction.quantity, -30)
+        self.assertEqual(correction.reference, f"sync_{report['run_id']}")
+
+        self.assertEqual(ExternalSyncState.objects.filter(watermark__isnull=False).count(), 3)
+
+    def test_unknown_woocommerce_skus_are_not_zeroed(self):
+        def woocommerce(request, n):
+            skus = request['query']['sku'][0].split(',')
+            return 200, [{'sku': 'SKU001', 'stock_quantity': self.external['SKU001']}] if 'SKU001' in skus else []
+
+        with FakeServer(woocommerce) as server:
+            with override_settings(
+                EXTERNAL_INVENTORY_SYSTEMS=['woocommerce'],
+                WOOCOMMERCE_CONFIG={'enabled': True, 'base_url': server.url, 'consumer_key': 'k', 'consumer_secret': 's'},
+                EXTERNAL_SYNC=FAST,
+            ):
+                report = sync_stock()
+
+        self.assertEqual(
+            list(StockSyncDiscrepancy.objects.filter(run_id=report['run_id'])
+                 .values_list('warehouse_stock__stock__item_code', 'difference')),
+            [('SKU001', -30)],
+        )
+        self.rows['SKU002'].refresh_from_db()
+        self.rows['SKU003'].refresh_from_db()
+        self.assertEqual((self.rows['SKU002'].quantity, self.rows['SKU003'].quantity), (40, 7))
+
+    def test_external_sync_only_records(self):
+        with FakeServer(self.erp) as erp, FakeServer(self.wms) as wms, FakeServer(self.shopify) as shopify:
+            with self.systems(erp, wms, shopify):
+                report = sync_stock(sync_type='external')
+
+        self.assertEqual(report['discrepancies'], 4)
+        self.assertEqual(report['updated_items'], 0)
+        self.rows['SKU001'].refresh_from_db()
+        self.assertEqual(self.rows['SKU001'].quantity, 100)
+        self.assertFalse(StockTransaction.objects.exists())
+
+    def test_incremental_sync_starts_at_the_watermark(self):
+        with FakeServer(self.erp) as erp, FakeServer(self.wms) as wms, FakeServer(self.shopify) as shopify:
+            with self.systems(erp, wms, shopify):
+                sync_stock(sync_type='external')
+                row = self.rows['SKU003']
+                row.quantity = 9
+                row.save()
+                wms.requests.clear()
+                erp.requests.clear()
+                report = sync_stock(sync_type='incremental')
+
+        self.assertEqual([r['body']['sku'] for r in wms.requests], ['SKU003'])
+        self.assertEqual([i['sku'] for i in erp.requests[0]['body']['items']], ['SKU003'])
+        self.assertEqual(report['checked_items'], 1)
+
+    def test_transient_errors_are_retried(self):
+        def flaky_wms(request, n):
+            return (503, {}) if n <= 2 else self.wms(request, n)
+
+        with FakeServer(self.erp) as erp, FakeServer(flaky_wms) as wms, FakeServer(self.shopify) as shopify:
+            with self.systems(erp, wms, shopify, breaker_threshold=10):
+                report = sync_stock(sync_type='external')
+
+        self.assertEqual(report['systems']['wms']['status'], 'ok')
+        self.assertEqual(report['systems']['wms']['checked'], 3)
+        self.assertEqual(len(wms.requests), 5)
+
+    def test_circuit_breaker_opens_and_skips_the_system(self):
+        with FakeServer(self.erp) as erp, FakeServer(lambda request, n: (500, {})) as wms, \
+                FakeServer(self.shopify) as shopify:
+            with self.systems(erp, wms, shopify):
+                report = sync_stock(sync_type='external')
+                calls = len(wms.requests)
+                second = sync_stock(sync_type='external')
+
+        self.assertEqual(report['systems']['wms']['status'], 'failed')
+        self.assertEqual(report['systems']['wms']['failed'], 3)
+        self.assertEqual(report['systems']['erp']['status'], 'ok')
+        self.assertLessEqual(calls, 3 * (FAST['retries'] + 1))
+        state = ExternalSyncState.objects.get(system='wms')
+        self.assertIsNotNone(state.circuit_open_until)
+        self.assertIsNone(state.watermark)
+
+        self.assertEqual(second['systems']['wms']['status'], 'circuit_open')
+        self.assertEqual(len(wms.requests), calls)
+
+
+class TransactionPartitionsTestCase(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+
+    def test_partitions_are_created_ahead_and_archived(self):
+        future = datetime(2040, 1, 15, tzinfo=dt_timezone.utc)
+        stock = Stock.objects.create(item_code="SKU-P", name="Partitioned", unit_price=1)
+        warehouse = Warehouse.objects.create(name="Archive", code="ARC")
+        [row] = StockTransaction.objects.bulk_create([StockTransaction(
+            stock=stock, to_warehouse=warehouse, transaction_type='in',
+            quantity=3, unit_price=1, total_value=3, reference="partition-test",
+        )])
+        # Lands in the DEFAULT partition, then moves with the partition created for its month
+        StockTransaction.objects.filter(pk=row.pk).update(created_at=future)
+
+        created = ensure_partitions(months_ahead=1, now=future)
+        self.assertEqual(created, ['stock_stocktransaction_p204001', 'stock_stocktransaction_p204002'])
+        self.assertEqual(ensure_partitions(months_ahead=1, now=future), [])
+        self.assertEqual(StockTransaction.objects.get(pk=row.pk).created_at, future)
+
+        self.assertIn('stock_stocktransaction_p204001',
+                      archive_partitions(keep_months=1, now=future.replace(month=3), dry_run=True))
+        archived = archive_partitions(keep_months=1, archive_dir=self.archive_dir, now=future.replace(month=3))
+        self.assertIn('stock_stocktransaction_p204001', archived)
+        self.assertNotIn('stock_stocktransaction_p204002', archived)
+        self.assertNotIn('stock_stocktransaction_p204001', partitions().values())
+        self.assertFalse(StockTransaction.objects.filter(pk=row.pk).exists())
+
+        with gzip.open(os.path.join(self.archive_dir, 'stock_stocktransaction_p204001.csv.gz'), 'rt') as handle:
+            rows = list(csv.DictReader(handle))
+        self.assertEqual([(r['id'], r['reference']) for r in rows], [(str(row.pk), "partition-test")])
@@ -546,58 +546,18 @@ def calculate_inventory_metrics(warehouse_id: str = None) -> Dict[str, Any]:
 
 def detect_stock_discrepancies(warehouse_id: str = None) -> List[Dict[str, Any]]:
     """
-    Detect potential stock discrepancies
+    Detect potential stock discrepancies (one SQL pass, see stock.reconciliation)
 
     Returns:
         List of discrepancy reports
     """
-    discrepancies = []
+    from .reconciliation import find_discrepancies
 
-    warehouse_stocks = WarehouseStock.objects.filter(
-        stock__is_active=True,
-        quantity__gt=0
-    )
-
-    if warehouse_id:
-        warehouse_stocks = warehouse_stocks.filter(warehouse_id=warehouse_id)
-
-    for ws in warehouse_stocks:
-        # Check 1: Reserved vs Available
-        if ws.reserved_quantity > ws.quantity:
-            discrepancies.append({
-                'type': 'reserved_exceeds_available',
-                'stock_id': str(ws.stock_id),
-                'sku': ws.stock.sku,
-                'warehouse_id': str(ws.warehouse_id),
-                'available': ws.quantity,
-                'reserved': ws.reserved_quantity,
-                'discrepancy': ws.reserved_quantity - ws.quantity,
-                'severity': 'high'
-            })
-
-        # Check 2: Negative quantities in transactions
-        recent_transactions = StockTransaction.objects.filter(
-            stock=ws.stock,
-            warehouse=ws.warehouse,
-            created_at__gte=timezone.now() - timedelta(days=7)
-        ).aggregate(total_qty=Sum('quantity'))
-
-        if recent_transactions['total_qty'] and recent_transactions['total_qty'] < 0:
-            discrepancies.append({
-                'type': 'negative_transactions',
-                'stock_id': str(ws.stock_id),
-                'sku': ws.stock.sku,
-                'warehouse_id': str(ws.warehouse_id),
-                'recent_total': recent_transactions['total_qty'],
-                'current_quantity': ws.quantity,
-                'severity': 'medium'
-            })
-
-    return discrepancies
+    return find_discrepancies(warehouse_id)
 
 def reconcile_stock_levels(warehouse_id: str = None, dry_run: bool = True) -> Dict[str, Any]:
     """
-    Reconcile and fix stock level discrepancies
+    Reconcile and fix stock level discrepancies (see stock.reconciliation)
 
     Args:
         warehouse_id: Specific warehouse to reconcile
@@ -606,53 +566,9 @@ def reconcile_stock_levels(warehouse_id: str = None, dry_run: bool = True) -> Di
     Returns:
         Reconciliation report
     """
-    report = {
-        'total_items_checked': 0,
-        'items_fixed': 0,
-        'corrections_made': [],
-        'dry_run': dry_run,
-        'timestamp': timezone.now().isoformat()
-    }
-
-    discrepancies = detect_stock_discrepancies(warehouse_id)
-
-    for discrepancy in discrepancies:
-        if discrepancy['type'] == 'reserved_exceeds_available':
-            stock_id = discrepancy['stock_id']
-            warehouse_id = discrepancy['warehouse_id']
-            excess_reserved = discrepancy['discrepancy']
-
-            ws = WarehouseStock.objects.get(
-                stock_id=stock_id,
-                warehouse_id=warehouse_id
-            )
+    from .reconciliation import reconcile
 
-            if not dry_run:
-                old_reserved = ws.reserved_quantity
-                ws.reserved_quantity = max(0, ws.reserved_quantity - excess_reserved)
-                ws.save(update_fields=['reserved_quantity'])
-
-                # Log correction
-                StockTransaction.objects.create(
-                    stock_id=stock_id,
-                    warehouse_id=warehouse_id,
-                    transaction_type='reconciliation',
-                    quantity=excess_reserved,
-                    reference='reserved_excess_correction',
-                    notes=f'Fixed reserved > available: {old_reserved} -> {ws.reserved_quantity}'
-                )
-
-                report['items_fixed'] += 1
-                report['corrections_made'].append({
-                    'stock_id': stock_id,
-                    'action': 'reduced_reserved_quantity',
-                    'old_value': old_reserved,
-                    'new_value': ws.reserved_quantity,
-                    'difference': excess_reserved
-                })
-
-    report['total_items_checked'] = len(detect_stock_discrepancies(warehouse_id))
-    return report
+    return reconcile(warehouse_id, dry_run=dry_run)
 
 # =============================================================================
 # 📊 VISUALIZATION UTILITIES
@@ -21,9 +21,7 @@ from redis.exceptions import RedisError
 import qrcode
 import pandas as pd
 from decimal import Decimal
-import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-import csv
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.db import transaction
@@ -54,6 +52,9 @@ from .throttles import (
     BulkImportExportThrottle
 )
 from .analytics import StockAnalytics
+from .exports import StockExport
+from .external_sync import SYNC_TYPES
+from reports.exports import export_response
 from .models import *
 from .serializers import *
 from .tasks import (
@@ -715,113 +716,15 @@ class ExportStockView(APIView):
     throttle_classes = [BulkImportExportThrottle]
 
     def get(self, request):
-        warehouse_id = request.query_params.get('warehouse')
         format_type = request.query_params.get('format', 'excel')
-
-        if warehouse_id:
-            stocks = WarehouseStock.objects.select_related(
-                'stock__category', 'warehouse'
-            ).filter(warehouse_id=warehouse_id, stock__is_active=True)
-        else:
-            stocks = WarehouseStock.objects.select_related(
-                'stock__category', 'warehouse'
-            ).filter(stock__is_active=True)
-
-        if format_type == 'excel':
-            return self._export_excel(stocks)
-        elif format_type == 'csv':
-            return self._export_csv(stocks)
-        else:
+        if format_type not in ('excel', 'csv'):
             return Response({
                 'error': 'Format must be excel or csv'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-    def _export_excel(self, stocks):
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Enterprise Stock Report"
-
-        # Headers with styling
-        headers = [
-            'Item Code', 'Name', 'Category', 'Warehouse', 'Quantity',
-            'Available', 'Reserved', 'Unit Price', 'Total Value',
-            'Min Level', 'Reorder Level', 'Status'
-        ]
-
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-
-        # Data rows
-        for row_idx, ws_obj in enumerate(stocks, 2):
-            stock = ws_obj.stock
-            ws.cell(row=row_idx, column=1, value=stock.item_code)
-            ws.cell(row=row_idx, column=2, value=stock.name)
-            ws.cell(row=row_idx, column=3, value=stock.category.name if stock.category else '')
-            ws.cell(row=row_idx, column=4, value=ws_obj.warehouse.name)
-            ws.cell(row=row_idx, column=5, value=ws_obj.quantity)
-            ws.cell(row=row_idx, column=6, value=ws_obj.available_quantity)
-            ws.cell(row=row_idx, column=7, value=ws_obj.reserved_quantity)
-            ws.cell(row=row_idx, column=8, value=float(ws_obj.unit_price))
-            ws.cell(row=row_idx, column=9, value=float(ws_obj.total_value))
-            ws.cell(row=row_idx, column=10, value=stock.min_stock_level)
-            ws.cell(row=row_idx, column=11, value=stock.reorder_level)
-            ws.cell(row=row_idx, column=12, value=stock.stock_status)
-
-            # Conditional formatting
-            status_cell = ws.cell(row=row_idx, column=12)
-            if stock.stock_status == 'critical':
-                status_cell.fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-                status_cell.font = Font(color="FFFFFF")
-            elif stock.stock_status == 'low':
-                status_cell.fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
-
-        # Summary
-        ws.append([])
-        ws.append(['SUMMARY'])
-        ws.append(['Total Items', len(stocks)])
-        ws.append(['Total Value', f'${float(stocks.aggregate(total=Sum(F("quantity") * F("unit_price")))["total"] or 0):,.2f}'])
-
-        filename = f"stock_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        wb.save(response)
-        return response
-
-    def _export_csv(self, stocks):
-        response = HttpResponse(content_type='text/csv')
-        filename = f"stock_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        writer = csv.writer(response)
-        writer.writerow([
-            'Item Code', 'Name', 'Category', 'Warehouse', 'Quantity',
-            'Available', 'Reserved', 'Unit Price', 'Total Value',
-            'Min Level', 'Reorder Level', 'Status'
-        ])
-
-        for ws_obj in stocks:
-            stock = ws_obj.stock
-            writer.writerow([
-                stock.item_code,
-                stock.name,
-                stock.category.name if stock.category else '',
-                ws_obj.warehouse.name,
-                ws_obj.quantity,
-                ws_obj.available_quantity,
-                ws_obj.reserved_quantity,
-                float(ws_obj.unit_price),
-                float(ws_obj.total_value),
-                stock.min_stock_level,
-                stock.reorder_level,
-                stock.stock_status
-            ])
-
-        return response
+        # Streamed through reports.exports; large Excel exports are queued as background jobs
+        spec = StockExport({'warehouse': request.query_params.get('warehouse')}, user=request.user)
+        return export_response(request, spec, format_type)
 
 class ExportStockExcelView(ExportStockView):
     """Dedicated Excel export endpoint"""
@@ -1610,7 +1513,18 @@ class StockSyncView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        task = process_stock_sync.delay(request.user.id)
+        sync_type = request.data.get('sync_type', 'full')
+        if sync_type not in SYNC_TYPES:
+            return Response({'error': f"sync_type must be one of {', '.join(SYNC_TYPES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        warehouse_ids = request.data.get('warehouse_ids') or None
+        if warehouse_ids is not None and not (
+            isinstance(warehouse_ids, list)
+            and all(isinstance(pk, int) and not isinstance(pk, bool) for pk in warehouse_ids)
+        ):
+            return Response({'error': 'warehouse_ids must be a list of integers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        task = process_stock_sync.delay(warehouse_ids, sync_type)
         return Response({
             'success': True,
             'task_id': task.id,
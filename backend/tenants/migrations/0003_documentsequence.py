@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_branch_alter_company_options_company_address_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(max_length=10)),
+                ('scope', models.PositiveBigIntegerField(default=0, help_text='Company id for company-scoped sequences, 0 for global')),
+                ('period', models.CharField(blank=True, help_text='YYYYMMDD for daily sequences', max_length=8)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doc_type', 'scope', 'period'), name='tenants_documentsequence_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Payment references come from a PostgreSQL sequence (tenants.sequences.SEQUENCES)
+
+from django.db import migrations
+
+SEQUENCE = 'tenants_pay_number_seq'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0003_documentsequence'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                f"CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}",
+                # Continue past every value the PAY counter rows already handed out
+                f"""SELECT setval('{SEQUENCE}', COALESCE(MAX(last_value), 1), MAX(last_value) IS NOT NULL)
+                    FROM tenants_documentsequence WHERE doc_type = 'PAY'""",
+            ],
+            reverse_sql=f"DROP SEQUENCE IF EXISTS {SEQUENCE}",
+        ),
+    ]
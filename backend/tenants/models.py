@@ -161,4 +161,22 @@ class Branch(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(f"{self.company.name}-{self.name}")
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class DocumentSequence(models.Model):
+    """
+    One counter row per (document type, scope, period), allocated by tenants.sequences
+    with a single atomic upsert. Numbers PRs, RFQs, POs, GRNs and payment references.
+    """
+    doc_type = models.CharField(max_length=10)
+    scope = models.PositiveBigIntegerField(default=0, help_text="Company id for company-scoped sequences, 0 for global")
+    period = models.CharField(max_length=8, blank=True, help_text="YYYYMMDD for daily sequences")
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doc_type', 'scope', 'period'], name='tenants_documentsequence_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.doc_type}/{self.scope}/{self.period or '-'} @ {self.last_value}"
@@ -0,0 +1,86 @@
+# tenants/sequences.py — Document number sequences
+"""
+O(1), collision-free document numbers (PR/RFQ/PO/GRN, payment references).
+
+Each (document type, scope, period) owns one DocumentSequence counter row. A number is
+allocated with a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING: the first
+allocation of a day creates the row, every later one increments it atomically. There is
+no prefix scan and no retry on duplicates. Concurrent allocations of the same counter
+only queue on that one row until the allocating transaction commits.
+
+That queueing is fine for procurement documents but not for payments, inserted on the
+MoMo callback and USSD hot paths: PAY numbers come from a PostgreSQL SEQUENCE instead
+(SEQUENCES). nextval() is not transactional and never blocks; values are unique but not
+daily, and a rolled-back payment leaves a gap.
+
+reserve() preallocates a block of numbers in the same single statement, so bulk imports
+can bulk_create documents with their numbers already assigned.
+"""
+from django.db import connection
+from django.utils import timezone
+
+from .models import DocumentSequence
+
+# doc_type: (prefix, digits)
+DOCUMENT_FORMATS = {
+    'PR': ('PR', 4),
+    'RFQ': ('RFQ', 4),
+    'PO': ('PO', 4),
+    'GRN': ('GRN', 4),
+    'PAY': ('PAY', 6),
+}
+
+# doc_type: PostgreSQL sequence (tenants migration 0004) used instead of a counter row
+SEQUENCES = {
+    'PAY': 'tenants_pay_number_seq',
+}
+
+_ALLOCATE_SQL = f"""
+    INSERT INTO {DocumentSequence._meta.db_table} AS seq (doc_type, scope, period, last_value)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (doc_type, scope, period)
+    DO UPDATE SET last_value = seq.last_value + EXCLUDED.last_value
+    RETURNING last_value
+"""
+
+
+def allocate(doc_type, count=1, scope=0, period=''):
+    """
+    Atomically reserve `count` consecutive values of one counter.
+    Returns the last value; the block is last - count + 1 .. last.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    with connection.cursor() as cursor:
+        cursor.execute(_ALLOCATE_SQL, [doc_type, scope, period, count])
+        return cursor.fetchone()[0]
+
+
+def reserve(doc_type, count, date=None):
+    """
+    Preallocate `count` formatted numbers of `doc_type` for `date` (default today),
+    e.g. ['PO-20261019-0041', 'PO-20261019-0042', ...].
+
+    Numbers are globally unique (the document number columns are unique across
+    companies), so these daily counters are global rather than per company.
+    """
+    prefix, digits = DOCUMENT_FORMATS[doc_type]
+    period = (date or timezone.now()).strftime('%Y%m%d')
+    if doc_type in SEQUENCES:
+        values = _nextvals(SEQUENCES[doc_type], count)
+    else:
+        last = allocate(doc_type, count, period=period)
+        values = range(last - count + 1, last + 1)
+    return [f"{prefix}-{period}-{value:0{digits}d}" for value in values]
+
+
+def _nextvals(sequence, count):
+    """`count` values of a PostgreSQL sequence (unique, not necessarily consecutive)"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [sequence, count])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def next_number(doc_type, date=None):
+    """The next formatted number of `doc_type`, e.g. 'PR-20261019-0007'."""
+    return reserve(doc_type, 1, date)[0]
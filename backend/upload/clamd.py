@@ -0,0 +1,73 @@
+# backend/upload/clamd.py
+"""
+Minimal ClamAV (clamd) client streaming files with the INSTREAM command.
+
+The file is sent in CLAMD_CHUNK_SIZE pieces ([4-byte length][data] ..., then a zero
+length), so scanning a file never holds more than one chunk in memory. clamd is reached
+through CLAMD_SOCKET (unix socket path) or CLAMD_HOST/CLAMD_PORT; without either,
+scanning is disabled.
+"""
+import socket
+import struct
+
+from django.conf import settings
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_TIMEOUT = 30
+
+
+class ClamdError(Exception):
+    """clamd could not be reached or did not return a verdict."""
+
+
+def is_configured():
+    return bool(getattr(settings, 'CLAMD_SOCKET', None) or getattr(settings, 'CLAMD_HOST', None))
+
+
+def _connect():
+    timeout = getattr(settings, 'CLAMD_TIMEOUT', DEFAULT_TIMEOUT)
+    try:
+        if getattr(settings, 'CLAMD_SOCKET', None):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(settings.CLAMD_SOCKET)
+            return sock
+        return socket.create_connection((settings.CLAMD_HOST, getattr(settings, 'CLAMD_PORT', 3310)), timeout=timeout)
+    except OSError as e:
+        raise ClamdError(f"Cannot connect to clamd: {e}")
+
+
+def scan_stream(fileobj, chunk_size=None):
+    """
+    Stream `fileobj` (binary, read from its current position) to clamd.
+    Returns None when clean, the signature name when infected; raises ClamdError otherwise.
+    """
+    chunk_size = chunk_size or getattr(settings, 'CLAMD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    sock = _connect()
+    try:
+        sock.sendall(b"zINSTREAM\0")
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            sock.sendall(struct.pack("!L", len(chunk)) + chunk)
+        sock.sendall(struct.pack("!L", 0))
+
+        reply = b""
+        while not reply.endswith(b"\0"):
+            data = sock.recv(4096)
+            if not data:
+                break
+            reply += data
+    except OSError as e:
+        raise ClamdError(f"clamd scan failed: {e}")
+    finally:
+        sock.close()
+
+    reply = reply.rstrip(b"\0").decode(errors='replace').strip()
+    # "stream: OK", "stream: <signature> FOUND" or "<message> ERROR"
+    if reply.endswith("FOUND"):
+        return reply[len("stream:"):-len("FOUND")].strip()
+    if reply.endswith("OK"):
+        return None
+    raise ClamdError(f"Unexpected clamd reply: {reply or '(empty)'}")
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload', '0001_initial'),
+    ]
+
+    operations = [
+        # Existing rows were processed synchronously on save: mark them ready, new rows start pending
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='processing_state',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('infected', 'Infected'), ('failed', 'Failed')], db_index=True, default='ready', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='uploadedfile',
+            name='processing_state',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('infected', 'Infected'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='processing_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Variant name → storage path'),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -4,23 +4,11 @@ import uuid
 from datetime import timedelta
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
-from django.core.files.storage import default_storage
 from django.dispatch import receiver
 from django.db.models.signals import post_delete, pre_save
 
-from PIL import Image
-from io import BytesIO
-from django.core.files.base import ContentFile
-
-# Optional: pip install python-clamav (for virus scanning)
-try:
-    import pyclamd
-    CLAMD_AVAILABLE = True
-except ImportError:
-    CLAMD_AVAILABLE = False
-
 
 def get_upload_path(instance, filename):
     """
@@ -36,7 +24,24 @@ def get_upload_path(instance, filename):
 class UploadMixin(models.Model):
     """
     Common fields & logic for all upload models
+
+    Saving a new file only stores it: the row is marked `pending` and, after commit,
+    upload.tasks.process_upload scans it and renders the image variants (upload.pipeline).
+    The file is served once `processing_state` is `ready`.
     """
+    STATE_PENDING = 'pending'
+    STATE_PROCESSING = 'processing'
+    STATE_READY = 'ready'
+    STATE_INFECTED = 'infected'
+    STATE_FAILED = 'failed'
+    PROCESSING_STATES = [
+        (STATE_PENDING, 'Pending'),
+        (STATE_PROCESSING, 'Processing'),
+        (STATE_READY, 'Ready'),
+        (STATE_INFECTED, 'Infected'),
+        (STATE_FAILED, 'Failed'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -52,6 +57,12 @@ class UploadMixin(models.Model):
     uploaded_at = models.DateTimeField(default=timezone.now)
     expires_at = models.DateTimeField(null=True, blank=True, help_text="Optional expiration date")
 
+    # Background processing (upload.pipeline)
+    processing_state = models.CharField(max_length=20, choices=PROCESSING_STATES, default=STATE_PENDING, db_index=True)
+    processing_error = models.CharField(max_length=255, blank=True)
+    variants = models.JSONField(default=dict, blank=True, help_text="Variant name → storage path")
+    processed_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         abstract = True
         ordering = ['-uploaded_at']
@@ -61,23 +72,45 @@ class UploadMixin(models.Model):
 
     @property
     def url(self):
-        return self.file.url if self.file else ""
+        return self.file.url if self.file and self.is_ready else ""
 
     @property
     def is_expired(self):
         return self.expires_at and self.expires_at < timezone.now()
 
-    def save(self, *args, **kwargs):
-        if not self.original_name and self.file:
+    @property
+    def is_ready(self):
+        return self.processing_state == self.STATE_READY
+
+    @property
+    def has_new_file(self):
+        """True while the assigned file has not been written to storage yet."""
+        return bool(self.file) and not self.file._committed
+
+    def read_file_metadata(self):
+        """Name, size and MIME type of a newly assigned file (no storage access)."""
+        if not self.original_name:
             self.original_name = self.file.name
+        self.size_bytes = self.file.size
+        self.mime_type = getattr(self.file.file, 'content_type', '') or \
+                         self.file.name.split('.')[-1].lower()
 
-        if self.file:
-            self.size_bytes = self.file.size
-            self.mime_type = getattr(self.file.file, 'content_type', '') or \
-                             self.file.name.split('.')[-1].lower()
+    def save(self, *args, **kwargs):
+        new_file = self.has_new_file
+        if new_file:
+            self.read_file_metadata()
+            self.processing_state = self.STATE_PENDING
+            self.processing_error = ''
+            self.variants = {}
+            self.processed_at = None
 
         super().save(*args, **kwargs)
 
+        if new_file:
+            from .tasks import process_upload
+            pk = self.pk
+            transaction.on_commit(lambda: process_upload.delay(str(pk)))
+
 
 # ──────────────────────────────────────────────────────────────
 # IMAGE PROCESSING MIXIN (compression + resize + crop)
@@ -85,38 +118,15 @@ class UploadMixin(models.Model):
 
 class ImageProcessingMixin:
     """
-    Mixin for automatic image optimization
-    - Resize to max 1920×1920
-    - Compress to 75–85% quality
-    - Smart center crop for avatars/profile pics
+    Image variant settings read by upload.pipeline
+    - One WEBP per UPLOAD_IMAGE_VARIANTS entry (e.g. large 1920, medium 800, thumb 256)
+    - Smart center crop for avatars/profile pics (crop_to_square)
     """
+    variant_quality = 85
 
-    def save(self, *args, **kwargs):
-        if self.file and self.file.name.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
-            img = Image.open(self.file)
-            img = img.convert('RGB')  # remove alpha if present
-
-            # Resize (keep aspect ratio)
-            max_size = (1920, 1920)
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-
-            # Optional: center crop to square (good for avatars)
-            if hasattr(self, 'crop_to_square') and self.crop_to_square:
-                width, height = img.size
-                size = min(width, height)
-                left = (width - size) // 2
-                top = (height - size) // 2
-                img = img.crop((left, top, left + size, top + size))
-
-            # Save with compression
-            output = BytesIO()
-            img.save(output, format='WEBP', quality=85, optimize=True)
-            output.seek(0)
-
-            new_name = os.path.splitext(self.file.name)[0] + '.webp'
-            self.file.save(new_name, ContentFile(output.read()), save=False)
-
-        super().save(*args, **kwargs)
+    @property
+    def crops_to_square(self):
+        return bool(getattr(self, 'crop_to_square', False))
 
 
 # ──────────────────────────────────────────────────────────────
@@ -149,6 +159,9 @@ class UploadedFile(UploadMixin, ImageProcessingMixin):
         ]
 
     def save(self, *args, **kwargs):
+        if self.has_new_file:
+            self.read_file_metadata()
+
         # Auto-detect type
         if self.mime_type:
             mt = self.mime_type.lower()
@@ -219,50 +232,40 @@ class StickerFile(UploadedFile):
 # SIGNALS: Auto-delete files from S3/local when model deleted
 # ──────────────────────────────────────────────────────────────
 
-@receiver(pre_save, sender=UploadedFile)
+UPLOAD_MODELS = (UploadedFile, ProfilePicture, ChatAttachment, VideoRecording, AudioRecording, StickerFile)
+
+
+def delete_stored_files(file_name, variants):
+    """Remove a file and its variants through the storage backend (local or S3)"""
+    storage = UploadedFile._meta.get_field('file').storage
+    for name in [file_name, *(variants or {}).values()]:
+        if name:
+            storage.delete(name)
+
+
 def auto_delete_old_file_on_change(sender, instance, **kwargs):
     """
-    Delete old file when new file is uploaded (for profile picture, etc.)
+    Delete old file (and its variants) when new file is uploaded (for profile picture, etc.)
     """
-    if not instance.pk:
-        return False
-
-    try:
-        old_file = sender.objects.get(pk=instance.pk).file
-    except sender.DoesNotExist:
-        return False
+    if instance._state.adding or not instance.has_new_file:
+        return
 
-    new_file = instance.file
-    if old_file and old_file != new_file:
-        if os.path.isfile(old_file.path):
-            os.remove(old_file.path)
+    old = UploadedFile.objects.filter(pk=instance.pk).values('file', 'variants').first()
+    if old:
+        transaction.on_commit(lambda: delete_stored_files(old['file'], old['variants']))
 
 
 @receiver(post_delete, sender=UploadedFile)
 def auto_delete_file_on_delete(sender, instance, **kwargs):
     """
-    Delete file from storage when model is deleted
+    Delete file from storage when model is deleted (subclass deletes also delete
+    their UploadedFile parent row, so this covers every upload model)
     """
     if instance.file:
-        if os.path.isfile(instance.file.path):
-            os.remove(instance.file.path)
-
-
-# ──────────────────────────────────────────────────────────────
-# OPTIONAL: Virus scanning hook (using ClamAV)
-# ──────────────────────────────────────────────────────────────
-
-@receiver(pre_save, sender=UploadedFile)
-def scan_for_viruses(sender, instance, **kwargs):
-    if not CLAMD_AVAILABLE or not instance.file:
-        return
+        file_name, variants = instance.file.name, instance.variants
+        transaction.on_commit(lambda: delete_stored_files(file_name, variants))
 
-    try:
-        cd = pyclamd.ClamdAgnostic()
-        result = cd.scan_stream(instance.file.read())
-        instance.file.seek(0)  # reset file pointer
 
-        if result is not None:
-            raise ValidationError(f"Virus detected: {result}")
-    except Exception as e:
-        raise ValidationError(f"Antivirus scan failed: {str(e)}")
\ No newline at end of file
+# pre_save is only sent for the saved class itself, not for its parents
+for upload_model in UPLOAD_MODELS:
+    pre_save.connect(auto_delete_old_file_on_change, sender=upload_model)
@@ -0,0 +1,159 @@
+# backend/upload/pipeline.py
+"""
+Background processing of stored uploads, run by the upload.process_upload task.
+
+- Saving an upload only writes the raw file and marks it `pending` (UploadMixin.save).
+- process_upload() claims the row, streams the stored file to clamd in fixed-size chunks
+  (upload.clamd), deletes it when infected, renders one WEBP per UPLOAD_IMAGE_VARIANTS
+  entry for images and marks the row `ready` (or `infected` / `failed`).
+- Variants are produced from a single decode: JPEGs are decoded at a reduced scale with
+  Image.draft() and each variant is shrunk from the previous, larger one.
+- A row whose file was replaced while it was being processed is left to the newer job.
+- A claim expires after CLAIM_TIMEOUT (longer than the task's time limit): a row left
+  `processing` by a dead worker is claimed again by the redelivered job, or re-enqueued by
+  the upload.requeue_stale_uploads sweep.
+"""
+import logging
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+
+from . import clamd
+from .models import ProfilePicture, UploadedFile, delete_stored_files
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANTS = {'large': 1920, 'medium': 800, 'thumb': 256}
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+PROFILE_VARIANT = 'medium'
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+def variant_sizes():
+    """{name: max side in px}, largest first"""
+    variants = getattr(settings, 'UPLOAD_IMAGE_VARIANTS', DEFAULT_VARIANTS)
+    return dict(sorted(variants.items(), key=lambda item: item[1], reverse=True))
+
+
+def is_image(upload):
+    return upload.is_image or upload.file.name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def scan(upload):
+    """Signature name when clamd flags the stored file, else None (also when clamd is not configured)"""
+    if not clamd.is_configured():
+        return None
+    with upload.file.storage.open(upload.file.name, 'rb') as handle:
+        return clamd.scan_stream(handle)
+
+
+def render_variants(upload):
+    """Write the WEBP variants of an image upload; returns {name: storage path}"""
+    sizes = variant_sizes()
+    storage = upload.file.storage
+    base = os.path.splitext(upload.file.name)[0]
+    largest = max(sizes.values())
+
+    with storage.open(upload.file.name, 'rb') as handle:
+        img = Image.open(handle)
+        img.draft('RGB', (largest, largest))  # JPEG: decode at the smallest scale still >= largest
+        img = img.convert('RGB')  # remove alpha if present
+
+    if upload.crops_to_square:
+        width, height = img.size
+        size = min(width, height)
+        left = (width - size) // 2
+        top = (height - size) // 2
+        img = img.crop((left, top, left + size, top + size))
+
+    variants = {}
+    for name, size in sizes.items():
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        output = BytesIO()
+        img.save(output, format='WEBP', quality=upload.variant_quality)
+        variants[name] = storage.save(f"{base}_{name}.webp", ContentFile(output.getvalue()))
+    return variants
+
+
+def _finish(upload, state, variants=None, error=''):
+    """Record the outcome unless the file was replaced meanwhile; returns whether it was recorded."""
+    recorded = UploadedFile.objects.filter(pk=upload.pk, file=upload.file.name).update(
+        processing_state=state,
+        variants=variants or {},
+        processing_error=error[:255],
+        processed_at=timezone.now(),
+    )
+    if not recorded and variants:
+        delete_stored_files(None, variants)
+    return bool(recorded)
+
+
+def publish_profile_picture(upload):
+    """Point the owner's profile picture at the processed avatar"""
+    picture = ProfilePicture.objects.filter(pk=upload.pk).select_related('user').first()
+    if not picture or not picture.user:
+        return
+    name = picture.variants.get(PROFILE_VARIANT) or picture.file.name
+    user = picture.user
+    user.profile_picture = name
+    user.profile_picture_url = picture.file.storage.url(name)
+    user.save(update_fields=['profile_picture_url', 'profile_picture'])
+
+
+def stale_claims(now=None):
+    """Uploads left `processing` longer than CLAIM_TIMEOUT (their worker died)"""
+    cutoff = (now or timezone.now()) - CLAIM_TIMEOUT
+    return UploadedFile.objects.filter(processing_state=UploadedFile.STATE_PROCESSING, processed_at__lt=cutoff)
+
+
+def process_upload(upload_id):
+    """
+    Scan and post-process one upload. Returns the final state, or None when the row is
+    gone or claimed by another live job. clamd.ClamdError propagates (the row is left
+    `failed`) so the task can retry.
+    """
+    now = timezone.now()
+    claimed = UploadedFile.objects.filter(
+        Q(processing_state__in=[UploadedFile.STATE_PENDING, UploadedFile.STATE_FAILED])
+        | Q(processing_state=UploadedFile.STATE_PROCESSING, processed_at__lt=now - CLAIM_TIMEOUT),
+        pk=upload_id,
+    ).update(
+        processing_state=UploadedFile.STATE_PROCESSING,
+        processed_at=now,  # Claim time, until the outcome is recorded
+    )
+    if not claimed:
+        return None
+    upload = UploadedFile.objects.get(pk=upload_id)
+    if hasattr(upload, 'profilepicture'):
+        upload = upload.profilepicture  # crop_to_square
+
+    try:
+        signature = scan(upload)
+    except clamd.ClamdError as e:
+        _finish(upload, UploadedFile.STATE_FAILED, error=str(e))
+        raise
+
+    if signature:
+        logger.warning(f"Upload {upload_id} infected ({signature}); file deleted")
+        if _finish(upload, UploadedFile.STATE_INFECTED, error=f"Virus detected: {signature}"):
+            delete_stored_files(upload.file.name, {})
+        return UploadedFile.STATE_INFECTED
+
+    try:
+        variants = render_variants(upload) if is_image(upload) else {}
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.exception(f"Upload {upload_id}: image processing failed")
+        _finish(upload, UploadedFile.STATE_FAILED, error=str(e))
+        return UploadedFile.STATE_FAILED
+
+    if not _finish(upload, UploadedFile.STATE_READY, variants):
+        return None
+    if isinstance(upload, ProfilePicture):
+        publish_profile_picture(upload)
+    return UploadedFile.STATE_READY
@@ -9,7 +9,8 @@ class UploadedFileSerializer(serializers.ModelSerializer):
     Base serializer for UploadedFile and its subclasses.
     Handles common fields + dynamic URL and human-readable size.
     """
-    url = serializers.SerializerMethodField(help_text="Public or signed URL to the file")
+    url = serializers.SerializerMethodField(help_text="Public or signed URL to the file (empty until processed)")
+    variant_urls = serializers.SerializerMethodField(help_text="URLs of the image variants (empty until processed)")
     file_size_display = serializers.SerializerMethodField(help_text="Human-readable file size")
     uploaded_by = serializers.SerializerMethodField(help_text="Username of uploader if available")
 
@@ -27,37 +28,54 @@ class UploadedFileSerializer(serializers.ModelSerializer):
             'is_image', 'is_video', 'is_audio', 'is_document',
             'title', 'description', 'tags',
             'uploaded_at', 'expires_at',
-            'url',
+            'processing_state', 'processing_error',
+            'url', 'variant_urls',
         ]
         read_only_fields = [
             'id', 'mime_type', 'size_bytes', 'file_size_display',
             'is_image', 'is_video', 'is_audio', 'is_document',
             'uploaded_at', 'url', 'uploaded_by',
+            'processing_state', 'processing_error', 'variant_urls',
         ]
+        # Upload only: the stored file is served through `url`, once it is scanned and processed
+        extra_kwargs = {'file': {'write_only': True}}
+
+    def _storage_url(self, obj, name):
+        """
+        URL of a stored file — supports signed URLs for private S3 buckets
+        """
+        storage = obj.file.storage
+        # For S3 private buckets — generate signed URL (expires in 1 hour)
+        if hasattr(storage, 'querystring_expire'):
+            return storage.url(name, expire=3600)
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(storage.url(name))
+        return storage.url(name)
 
     def get_url(self, obj):
         """
-        Returns the file URL — supports signed URLs for private S3 buckets
+        Returns the file URL once scanned and processed
         """
-        if not obj.file:
+        if not obj.file or not obj.is_ready:
             return ""
-        request = self.context.get('request')
-        if request and hasattr(obj.file.storage, 'url'):
-            # For S3 private buckets — generate signed URL (expires in 1 hour)
-            if hasattr(obj.file.storage, 'querystring_expire'):
-                return obj.file.storage.url(obj.file.name, expire=3600)
-            return request.build_absolute_uri(obj.file.url)
-        return obj.file.url
+        return self._storage_url(obj, obj.file.name)
+
+    def get_variant_urls(self, obj):
+        if not obj.is_ready:
+            return {}
+        return {name: self._storage_url(obj, path) for name, path in obj.variants.items()}
 
     def get_file_size_display(self, obj):
         """Human-readable file size (e.g. 2.3 MB)"""
-        if not obj.size_bytes:
+        size = obj.size_bytes
+        if not size:
             return "0 B"
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if obj.size_bytes < 1024:
-                return f"{obj.size_bytes:.1f} {unit}"
-            obj.size_bytes /= 1024
-        return f"{obj.size_bytes:.1f} PB"
+            if size < 1024:
+                return f"{size:.1f} {unit}"
+            size /= 1024
+        return f"{size:.1f} PB"
 
     def get_uploaded_by(self, obj):
         """Display username or fallback"""
@@ -66,15 +84,7 @@ class UploadedFileSerializer(serializers.ModelSerializer):
         return "Anonymous"
 
     def create(self, validated_data):
-        """Virus scan hook + user assignment"""
-        file_obj = validated_data.get('file')
-        if file_obj and CLAMD_AVAILABLE:
-            file_obj.seek(0)
-            scan_result = pyclamd.ClamdAgnostic().scan_stream(file_obj.read())
-            file_obj.seek(0)
-            if scan_result:
-                raise serializers.ValidationError(_("File contains potential virus/malware"))
-
+        """User assignment (virus scanning runs after save, see upload.pipeline)"""
         # Assign current user if not provided
         if 'user' not in validated_data and self.context['request'].user.is_authenticated:
             validated_data['user'] = self.context['request'].user
@@ -91,6 +101,7 @@ class ProfilePictureSerializer(UploadedFileSerializer):
         model = ProfilePicture
         fields = UploadedFileSerializer.Meta.fields + ['user']
         read_only_fields = UploadedFileSerializer.Meta.read_only_fields + ['user']
+        extra_kwargs = UploadedFileSerializer.Meta.extra_kwargs
 
     # backend/upload/views.py – ProfilePictureUploadView.post
     def post(self, request):
@@ -132,6 +143,7 @@ class ChatAttachmentSerializer(UploadedFileSerializer):
         model = ChatAttachment
         fields = UploadedFileSerializer.Meta.fields + ['message']
         read_only_fields = UploadedFileSerializer.Meta.read_only_fields + ['message']
+        extra_kwargs = UploadedFileSerializer.Meta.extra_kwargs
 
 
 class VideoRecordingSerializer(UploadedFileSerializer):
@@ -139,6 +151,7 @@ class VideoRecordingSerializer(UploadedFileSerializer):
         model = VideoRecording
         fields = UploadedFileSerializer.Meta.fields + ['duration_seconds', 'thumbnail']
         read_only_fields = UploadedFileSerializer.Meta.read_only_fields + ['duration_seconds', 'thumbnail']
+        extra_kwargs = UploadedFileSerializer.Meta.extra_kwargs
 
 
 class AudioRecordingSerializer(UploadedFileSerializer):
@@ -146,10 +159,12 @@ class AudioRecordingSerializer(UploadedFileSerializer):
         model = AudioRecording
         fields = UploadedFileSerializer.Meta.fields + ['duration_seconds']
         read_only_fields = UploadedFileSerializer.Meta.read_only_fields + ['duration_seconds']
+        extra_kwargs = UploadedFileSerializer.Meta.extra_kwargs
 
 
 class StickerFileSerializer(UploadedFileSerializer):
     class Meta:
         model = StickerFile
         fields = UploadedFileSerializer.Meta.fields + ['is_public', 'category', 'emoji']
-        read_only_fields = UploadedFileSerializer.Meta.read_only_fields
\ No newline at end of file
+        read_only_fields = UploadedFileSerializer.Meta.read_only_fields
+        extra_kwargs = UploadedFileSerializer.Meta.extra_kwargs
@@ -0,0 +1,33 @@
+# backend/upload/tasks.py
+from celery import shared_task
+import logging
+
+from .clamd import ClamdError
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name='upload.process_upload', max_retries=5, acks_late=True,
+             time_limit=10 * 60, soft_time_limit=8 * 60)
+def process_upload(self, upload_id):
+    """Scan a stored upload and render its variants (upload.pipeline); retried while clamd is unreachable"""
+    from .pipeline import process_upload as run
+
+    try:
+        return run(upload_id)
+    except ClamdError as exc:
+        logger.warning(f"Upload {upload_id}: {exc} (retry {self.request.retries + 1})")
+        raise self.retry(exc=exc, countdown=60 * 2 ** self.request.retries)
+
+
+@shared_task(name='upload.requeue_stale_uploads')
+def requeue_stale_uploads():
+    """Re-enqueue uploads whose processing worker died (upload.pipeline.CLAIM_TIMEOUT)"""
+    from .pipeline import stale_claims
+
+    upload_ids = [str(pk) for pk in stale_claims().values_list('pk', flat=True)]
+    for upload_id in upload_ids:
+        process_upload.delay(upload_id)
+    if upload_ids:
+        logger.warning(f"Re-enqueued {len(upload_ids)} stale uploads")
+    return len(upload_ids)
@@ -0,0 +1,170 @@
+# backend/upload/tests.py
+import shutil
+import socketserver
+import struct
+import tempfile
+import threading
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from . import clamd
+from .models import UploadedFile
+from .pipeline import CLAIM_TIMEOUT, process_upload
+from .serializers import UploadedFileSerializer
+
+MARKER = b"FAKE-EICAR-SIGNATURE"
+
+
+class FakeClamdHandler(socketserver.BaseRequestHandler):
+    """Speaks INSTREAM: records every chunk size and flags streams containing MARKER"""
+
+    def read(self, size):
+        data = b""
+        while len(data) < size:
+            part = self.request.recv(size - len(data))
+            if not part:
+                raise ConnectionError("client closed the stream")
+            data += part
+        return data
+
+    def handle(self):
+        command = b""
+        while not command.endswith(b"\0"):
+            command += self.read(1)
+        assert command == b"zINSTREAM\0", command
+
+        received = b""
+        while True:
+            (size,) = struct.unpack("!L", self.read(4))
+            if not size:
+                break
+            self.server.chunks.append(size)
+            received += self.read(size)
+
+        if MARKER in received:
+            self.request.sendall(b"stream: Fake.Test.Signature FOUND\0")
+        else:
+            self.request.sendall(b"stream: OK\0")
+
+
+class FakeClamd(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeClamdHandler)
+        self.chunks = []
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def settings(self):
+        return override_settings(CLAMD_SOCKET=None, CLAMD_HOST="127.0.0.1", CLAMD_PORT=self.server_address[1])
+
+
+class ClamdStreamTestCase(SimpleTestCase):
+    def test_file_is_streamed_in_fixed_size_chunks(self):
+        with FakeClamd() as server, server.settings():
+            result = clamd.scan_stream(BytesIO(b"x" * 200_000), chunk_size=64 * 1024)
+
+        self.assertIsNone(result)
+        self.assertEqual(server.chunks, [65536, 65536, 65536, 3392])
+
+    def test_infected_stream_returns_signature(self):
+        with FakeClamd() as server, server.settings():
+            result = clamd.scan_stream(BytesIO(b"header " + MARKER + b" trailer"))
+
+        self.assertEqual(result, "Fake.Test.Signature")
+
+    def test_unreachable_clamd_raises(self):
+        with FakeClamd() as server:
+            port = server.server_address[1]
+        with override_settings(CLAMD_SOCKET=None, CLAMD_HOST="127.0.0.1", CLAMD_PORT=port):
+            with self.assertRaises(clamd.ClamdError):
+                clamd.scan_stream(BytesIO(b"data"))
+
+
+class UploadPipelineTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root, UPLOAD_IMAGE_VARIANTS={'medium': 64, 'thumb': 16})
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def upload(self, name, content, content_type):
+        with mock.patch('upload.tasks.process_upload.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                upload = UploadedFile.objects.create(file=SimpleUploadedFile(name, content, content_type=content_type))
+        delay.assert_called_once_with(str(upload.pk))
+        return upload
+
+    def png(self, size=(300, 200)):
+        output = BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 128)).save(output, format='PNG')
+        return output.getvalue()
+
+    def test_save_only_stores_and_enqueues(self):
+        upload = self.upload("photo.png", self.png(), "image/png")
+
+        self.assertEqual(upload.processing_state, UploadedFile.STATE_PENDING)
+        self.assertTrue(upload.is_image)
+        self.assertEqual(upload.variants, {})
+        data = UploadedFileSerializer(upload).data
+        self.assertEqual(data['url'], "")
+        self.assertEqual(data['variant_urls'], {})
+        self.assertNotIn('file', data)
+
+    def test_image_is_scanned_and_variants_rendered(self):
+        upload = self.upload("photo.png", self.png(), "image/png")
+
+        with FakeClamd() as server, server.settings():
+            self.assertEqual(process_upload(upload.pk), UploadedFile.STATE_READY)
+        self.assertTrue(server.chunks)
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.processing_state, UploadedFile.STATE_READY)
+        self.assertEqual(set(upload.variants), {'medium', 'thumb'})
+        with upload.file.storage.open(upload.variants['thumb']) as handle:
+            self.assertEqual(max(Image.open(handle).size), 16)
+        data = UploadedFileSerializer(upload).data
+        self.assertNotEqual(data['url'], "")
+        self.assertEqual(set(data['variant_urls']), {'medium', 'thumb'})
+
+        # Already processed: a duplicate job is a no-op
+        self.assertIsNone(process_upload(upload.pk))
+
+    def test_infected_file_is_deleted_and_never_served(self):
+        upload = self.upload("notes.txt", b"hello " + MARKER, "text/plain")
+
+        with FakeClamd() as server, server.settings():
+            self.assertEqual(process_upload(upload.pk), UploadedFile.STATE_INFECTED)
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.processing_state, UploadedFile.STATE_INFECTED)
+        self.assertFalse(upload.file.storage.exists(upload.file.name))
+        self.assertEqual(UploadedFileSerializer(upload).data['url'], "")
+
+    def test_claim_of_a_dead_worker_expires(self):
+        upload = self.upload("notes.txt", b"hello", "text/plain")
+        claimed_at = timezone.now() - CLAIM_TIMEOUT / 2
+        UploadedFile.objects.filter(pk=upload.pk).update(
+            processing_state=UploadedFile.STATE_PROCESSING, processed_at=claimed_at,
+        )
+
+        # Claimed by a job that may still be running
+        self.assertIsNone(process_upload(upload.pk))
+
+        UploadedFile.objects.filter(pk=upload.pk).update(processed_at=claimed_at - CLAIM_TIMEOUT)
+        with FakeClamd() as server, server.settings():
+            self.assertEqual(process_upload(upload.pk), UploadedFile.STATE_READY)
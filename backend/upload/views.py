@@ -3,6 +3,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import PermissionDenied
+from django.contrib.auth import get_user_model
 from .models import UploadedFile, ProfilePicture, ChatAttachment, VideoRecording, AudioRecording, StickerFile
 from .serializers import UploadedFileSerializer, ProfilePictureSerializer, ChatAttachmentSerializer, VideoRecordingSerializer, AudioRecordingSerializer, StickerFileSerializer
 from django.shortcuts import get_object_or_404
@@ -23,7 +25,7 @@ class UploadFileView(APIView):
         serializer = UploadedFileSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -49,7 +51,7 @@ class ProfilePictureUploadView(APIView):
                 logger.warning(f"Non-admin {request.user.username} tried to upload for user ID {target_user_id}")
                 raise PermissionDenied("Only admins can upload profile pictures for other users")
 
-            target_user = get_object_or_404(CustomUser, id=target_user_id)
+            target_user = get_object_or_404(get_user_model(), id=target_user_id)
             logger.info(f"Admin {request.user.username} uploading profile picture for user ID {target_user_id}")
         else:
             # Regular user uploads for themselves
@@ -101,22 +103,20 @@ class ProfilePictureUploadView(APIView):
         try:
             saved_pic = serializer.save()
 
-            # ─── 6. Update target user's profile_picture_url ────────────────────
-            target_user.profile_picture_url = saved_pic.file.url
-            target_user.profile_picture = saved_pic.file  # if using ImageField
-            target_user.save(update_fields=['profile_picture_url', 'profile_picture'])
-
-            logger.info(f"Profile picture updated for user {target_user.username}. URL: {target_user.profile_picture_url}")
+            # ─── 6. Scan + avatar variants run on the media queue ───────────────
+            # upload.pipeline points target_user.profile_picture_url at the new
+            # picture once it is ready; until then the previous one stays in place.
+            logger.info(f"Profile picture stored for user {target_user.username}; processing queued")
 
             return Response({
-                "message": "Profile picture updated successfully",
+                "message": "Profile picture received and is being processed",
+                "processing_state": saved_pic.processing_state,
                 "profile_picture_url": target_user.profile_picture_url,
-                "url": saved_pic.file.url,
                 "id": str(saved_pic.id),
                 "original_name": saved_pic.original_name,
                 "size": saved_pic.size_bytes,
                 "was_new": created
-            }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.exception("Error during profile picture upload/save")
@@ -143,7 +143,7 @@ class ChatAttachmentUploadView(APIView):
         serializer = ChatAttachmentSerializer(data=data)
         if serializer.is_valid():
             serializer.save(user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -158,7 +158,7 @@ class VideoUploadView(APIView):
         serializer = VideoRecordingSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -173,7 +173,7 @@ class AudioUploadView(APIView):
         serializer = AudioRecordingSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -188,5 +188,5 @@ class StickerUploadView(APIView):
         serializer = StickerFileSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
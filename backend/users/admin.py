@@ -17,16 +17,12 @@ from django.utils import timezone
 from .models import (
     CustomUser, UserProfile, ChatRoom, RoomMember, ChatMessage,
     MessageReaction, BlockedUser, StarredMessage, OTP, Sticker,
-    CryptoKeyBundle, SearchAnalytics,
+    CryptoKeyBundle, SearchAnalytics, SearchDailyStat,
     Post, Comment, Reaction, Share, Friendship, Activity
 )
 
-# Spam keywords (used in spam detection)
-SPAM_KEYWORDS = [
-    'buy', 'cheap', 'viagra', 'casino', 'bitcoin', 'free money',
-    'click here', 'earn money', 'investment', 'adult', 'porn',
-    # Add your domain-specific spam keywords here
-]
+# Spam keywords & scoring rules live in users/spam.py
+from .spam import SPAM_KEYWORDS, AUTO_FLAG_RULES, flag_spam
 
 # ──────────────────────────────────────────────────────────────
 # Inlines
@@ -284,30 +280,7 @@ class PostAdmin(admin.ModelAdmin):
 
     @admin.action(description="Advanced Spam Detection & Flag")
     def advanced_spam_detection(self, request, queryset):
-        flagged = 0
-        for post in queryset:
-            score = 0
-            if (not post.content or len(post.content.strip()) < 15) and not post.media:
-                score += 45
-            if post.views > 0 and post.shares / post.views > 6:
-                score += 35
-            if any(kw in (post.content or '').lower() for kw in SPAM_KEYWORDS):
-                score += 30
-            similar = Post.objects.filter(user=post.user, content=post.content).exclude(id=post.id).count()
-            if similar > 3:
-                score += 35
-            recent = Post.objects.filter(
-                user=post.user,
-                created_at__gte=timezone.now() - timedelta(hours=1)
-            ).count()
-            if recent > 8:
-                score += 40
-
-            if score >= 60:
-                post.privacy = 'private'
-                post.is_announcement = False
-                post.save(update_fields=['privacy', 'is_announcement'])
-                flagged += 1
+        flagged = flag_spam(AUTO_FLAG_RULES, post_ids=list(queryset.values_list('id', flat=True)))
 
         self.message_user(
             request,
@@ -743,4 +716,13 @@ class SearchAnalyticsAdmin(admin.ModelAdmin):
     list_display = ['user', 'query', 'results_count', 'timestamp']
     list_filter = ['timestamp', 'has_results', 'filters']
     search_fields = ['query', 'user__username']
-    readonly_fields = ['timestamp']
\ No newline at end of file
+    readonly_fields = ['timestamp']
+
+
+@admin.register(SearchDailyStat)
+class SearchDailyStatAdmin(admin.ModelAdmin):
+    list_display = ['date', 'query', 'searches', 'zero_result_searches', 'clicks']
+    list_filter = ['date']
+    search_fields = ['query']
+    date_hierarchy = 'date'
+    readonly_fields = ['date', 'query', 'searches', 'zero_result_searches', 'total_results', 'clicks']
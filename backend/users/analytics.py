@@ -0,0 +1,537 @@
+# users/analytics.py — Analytics snapshot engine
+"""
+Precomputed payloads for the admin dashboards and scheduled reports.
+
+- user_dashboard() builds the UserAnalyticsAPIView payload from one conditional
+  aggregate (Count(filter=Q(...))) plus three grouped queries, instead of ~20
+  separate COUNTs.
+- payment_summary() builds the analytics_summary payload; totals come from one
+  aggregate and collector performance from grouped queries instead of a loop
+  of per-collector aggregates.
+- refresh_snapshot() stores the result as a timestamped AnalyticsSnapshot.
+  User snapshots refresh incrementally: month buckets older than the 12-month
+  comparison window are carried over from the previous snapshot and only recent
+  months are re-aggregated. A full rebuild runs at least once a day.
+- get_snapshot() serves the latest snapshot (cached) and queues a background
+  refresh when it is older than SNAPSHOT_TTL.
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import CharField, Count, Exists, F, Func, OuterRef, Q, Sum, Value
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, ExtractWeek, TruncDate, TruncMonth
+from django.utils import timezone
+
+from collector.models import Collector
+from customers.models import Customer, Village
+from payments.models import Payment, PaymentMethod
+from .models import Activity, AnalyticsSnapshot, BlockedUser, CustomUser
+
+SNAPSHOT_TTL = timedelta(minutes=5)
+FULL_REFRESH_EVERY = timedelta(hours=24)
+SNAPSHOT_RETENTION = timedelta(days=7)
+
+CACHE_KEY = "analytics:snapshot:{kind}"
+REFRESH_LOCK_KEY = "analytics:refresh:{kind}"
+CACHE_TIMEOUT = 60 * 60
+REFRESH_LOCK_TIMEOUT = 5 * 60
+
+
+def _to_char_month(field):
+    return Func(F(field), Value('YYYY-MM'), function='TO_CHAR', output_field=CharField())
+
+
+# ─── User Analytics ─────────────────────────────────────────────────────────
+
+def _role_month_buckets(since, year_ago):
+    """(month, role) registration counts; `previous` counts users who joined on or before year_ago."""
+    queryset = CustomUser.objects.all()
+    if since:
+        queryset = queryset.filter(date_joined__gte=since)
+    rows = (
+        queryset
+        .annotate(month=TruncMonth('date_joined'))
+        .values('month', 'role')
+        .annotate(
+            count=Count('id'),
+            previous=Count('id', filter=Q(date_joined__lte=year_ago)),
+        )
+        .order_by('month', 'role')
+    )
+    return [
+        {'month': row['month'].strftime('%Y-%m'), 'role': row['role'], 'count': row['count'], 'previous': row['previous']}
+        for row in rows
+    ]
+
+
+def user_dashboard(previous=None):
+    """
+    Payload for UserAnalyticsAPIView. `previous` is the data of the last user
+    snapshot; when given, its settled month buckets are reused.
+    """
+    now = timezone.now()
+    online_threshold = now - timedelta(minutes=5)      # considered online
+    inactive_threshold = now - timedelta(days=30)      # inactive if no activity
+    today = timezone.localdate(now)
+    this_month_start = today.replace(day=1)
+    month_ago = now - timedelta(days=30)
+    year_ago = now - timedelta(days=365)
+
+    # ─── Basic Counts (one query) ───────────────────────────────────────────
+    stats = CustomUser.objects.aggregate(
+        total_users=Count('id'),
+        total_online=Count('id', filter=Q(is_active=True, last_seen__gte=online_threshold)),
+        new_users_today=Count('id', filter=Q(date_joined__date=today)),
+        new_users_month=Count('id', filter=Q(date_joined__gte=this_month_start)),
+        blocked_users=Count('id', filter=Q(Exists(BlockedUser.objects.filter(blocked=OuterRef('pk'))))),
+        inactive_users=Count('id', filter=Q(is_active=True, last_seen__lt=inactive_threshold)),
+        deleted_users=Count('id', filter=Q(is_deleted=True)),
+        active=Count('id', filter=Q(is_active=True)),
+        verified=Count('id', filter=Q(is_verified=True)),
+        active_7d=Count('id', filter=Q(last_seen__gte=now - timedelta(days=7))),
+    )
+    total_users = stats['total_users']
+    total_offline = total_users - stats['total_online']
+
+    # ─── Month × Role Buckets (growth, role trend, comparison, role totals) ─
+    # Months before the one containing year_ago can no longer change their
+    # `previous` count, so an incremental refresh only re-aggregates from there.
+    settled_before = timezone.localdate(year_ago).replace(day=1)
+    settled_key = settled_before.strftime('%Y-%m')
+    if previous and previous.get('_buckets') is not None:
+        buckets = [
+            {**bucket, 'previous': bucket['count']}
+            for bucket in previous['_buckets'] if bucket['month'] < settled_key
+        ]
+        buckets += _role_month_buckets(settled_before, year_ago)
+        full_at = previous.get('_full_at')
+    else:
+        buckets = _role_month_buckets(None, year_ago)
+        full_at = now.isoformat()
+
+    users_by_role = defaultdict(int)
+    monthly_growth = defaultdict(int)
+    role_trend = defaultdict(dict)
+    previous_role_trend = defaultdict(dict)
+    for bucket in buckets:
+        role = bucket['role'] or 'Unknown'
+        users_by_role[bucket['role']] += bucket['count']
+        monthly_growth[bucket['month']] += bucket['count']
+        role_trend[bucket['month']][role] = bucket['count']
+        if bucket['previous']:
+            previous_role_trend[bucket['month']][role] = bucket['previous']
+
+    # ─── Activity Heatmap (Day/Hour Matrix - last 30 days) ──────────────────
+    activity_heatmap = [
+        {'day': entry['day'], 'hour': entry['hour'], 'value': entry['count']}
+        for entry in (
+            CustomUser.objects
+            .filter(last_seen__gte=month_ago)
+            .annotate(day=ExtractIsoWeekDay('last_seen'), hour=ExtractHour('last_seen'))
+            .values('day', 'hour')
+            .annotate(count=Count('id'))
+            .order_by('day', 'hour')
+        )
+    ]
+
+    # ─── Logged-in Stats (from Activity model, one query) ───────────────────
+    logins = Activity.objects.filter(action_type='login').aggregate(
+        total=Count('id'),
+        month=Count('id', filter=Q(created_at__gte=this_month_start)),
+    )
+
+    return {
+        "total_users": total_users,
+        "users_by_role": dict(users_by_role),
+        "total_online": stats['total_online'],
+        "total_offline": total_offline,
+        "new_users_today": stats['new_users_today'],
+        "new_users_month": stats['new_users_month'],
+        "blocked_users": stats['blocked_users'],
+        "inactive_users": stats['inactive_users'],
+        "deleted_users": stats['deleted_users'],
+        "logged_in_total": logins['total'],
+        "logged_in_month": logins['month'],
+        # Placeholder: 30 min average session per login
+        "usage_hours": round(logins['month'] * 0.5, 1),
+        "performance_percentage": round((stats['active_7d'] / total_users * 100), 1) if total_users > 0 else 0,
+
+        # Chart-specific data
+        "monthly_growth": [
+            {'month': month, 'registrations': count} for month, count in sorted(monthly_growth.items())
+        ],
+        "role_trend": [{'month': month, **counts} for month, counts in sorted(role_trend.items())],
+        "role_trend_previous": [{'month': month, **counts} for month, counts in sorted(previous_role_trend.items())],
+        "activity_heatmap": activity_heatmap,
+        "status_breakdown": {
+            'active': stats['active'],
+            'inactive': total_users - stats['active'],
+            'verified': stats['verified'],
+            'unverified': total_users - stats['verified'],
+            'online': stats['total_online'],
+            'offline': total_offline,
+        },
+
+        # Internal: reused by the next incremental refresh and the unfiltered exports
+        "_buckets": buckets,
+        "_full_at": full_at,
+        "_export_summary": user_summary(CustomUser.objects.all()),
+    }
+
+
+def user_summary(users):
+    """Summary block of the user exports for any (filtered) CustomUser queryset — three queries."""
+    now = timezone.now()
+    today = timezone.localdate(now)
+    month_start = today.replace(day=1)
+    first_day = today - timedelta(days=29)
+
+    stats = users.aggregate(
+        total_users=Count('id'),
+        total_online=Count('id', filter=Q(is_online=True)),
+        new_today=Count('id', filter=Q(date_joined__date=today)),
+        new_month=Count('id', filter=Q(date_joined__gte=month_start)),
+        inactive_users=Count('id', filter=Q(is_active=True, last_seen__lt=now - timedelta(days=30))),
+        active_last_week=Count('id', filter=Q(last_seen__gte=now - timedelta(days=7))),
+    )
+    users_by_role = dict(
+        users.order_by().values('role').annotate(count=Count('id')).values_list('role', 'count')
+    )
+    per_day = dict(
+        users.filter(date_joined__date__gte=first_day)
+        .annotate(day=TruncDate('date_joined'))
+        .order_by().values('day')
+        .annotate(count=Count('id'))
+        .values_list('day', 'count')
+    )
+
+    total_users = stats['total_users']
+    return {
+        **stats,
+        'users_by_role': users_by_role,
+        'total_offline': total_users - stats['total_online'],
+        'performance_percentage': round((stats['active_last_week'] / total_users * 100), 1) if total_users > 0 else 0,
+        # Daily new users trend (last 30 days for line chart)
+        'daily_new': [
+            ((first_day + timedelta(days=offset)).strftime('%Y-%m-%d'), per_day.get(first_day + timedelta(days=offset), 0))
+            for offset in range(30)
+        ],
+    }
+
+
+# ─── Payment Analytics ──────────────────────────────────────────────────────
+
+def _collector_bonus(total_collected, target):
+    """Tiered bonus calculation."""
+    if total_collected > target * Decimal('1.2'):
+        return total_collected * Decimal('0.15')
+    if total_collected >= target:
+        return total_collected * Decimal('0.10')
+    if total_collected >= target * Decimal('0.9'):
+        return total_collected * Decimal('0.05')
+    return Decimal('0')
+
+
+def _collector_performance(payments):
+    """Per-collector totals and monthly trends from three grouped queries (plus the collector list)."""
+    collectors = list(
+        Collector.objects.filter(is_active=True, is_deleted=False).select_related('user')
+    )
+    if not collectors:
+        return []
+    user_ids = [collector.user_id for collector in collectors]
+
+    trends = defaultdict(list)
+    for row in (
+        payments
+        .filter(customer__village__collectors__in=user_ids)
+        .annotate(collector_user=F('customer__village__collectors'), month=_to_char_month('created_at'))
+        .order_by()
+        .values('collector_user', 'month')
+        .annotate(
+            collected=Sum('amount', filter=Q(status='Successful')),
+            pending=Sum('amount', filter=Q(status='Pending')),
+        )
+        .order_by('collector_user', 'month')
+    ):
+        trends[row['collector_user']].append(row)
+
+    customer_counts = dict(
+        Customer.objects.filter(village__collectors__in=user_ids)
+        .order_by().values('village__collectors')
+        .annotate(count=Count('id'))
+        .values_list('village__collectors', 'count')
+    )
+
+    village_names = defaultdict(list)
+    for user_id, name in (
+        Village.objects.filter(collectors__in=user_ids)
+        .order_by('name').values_list('collectors', 'name')
+    ):
+        village_names[user_id].append(name)
+
+    performance = []
+    for collector in collectors:
+        rows = trends.get(collector.user_id, [])
+        customers_count = customer_counts.get(collector.user_id, 0)
+        total_collected = sum((row['collected'] or Decimal('0') for row in rows), Decimal('0'))
+        pending_collected = sum((row['pending'] or Decimal('0') for row in rows), Decimal('0'))
+        avg_per_customer = total_collected / Decimal(customers_count) if customers_count > 0 else Decimal('0')
+        target = Decimal(getattr(collector, 'target_amount', 0) or 0)
+
+        performance.append({
+            "collector": collector.user.get_full_name() or collector.user.username,
+            "villages": ", ".join(village_names.get(collector.user_id, [])) or "None",
+            "customers": customers_count,
+            "total_collected": float(total_collected),
+            "pending": float(pending_collected),
+            "avg_per_customer": float(avg_per_customer),
+            "bonus": float(_collector_bonus(total_collected, target)),
+            "target_amount": float(target),
+            "monthly_trends": [
+                {
+                    "month": row['month'],
+                    "collected": float(row['collected'] or 0),
+                    "pending": float(row['pending'] or 0),
+                    "avg": float((row['collected'] or 0) / Decimal(customers_count) if customers_count > 0 else 0),
+                }
+                for row in rows
+            ],
+        })
+
+    # Sort by total collected
+    performance.sort(key=lambda x: x['total_collected'], reverse=True)
+    return performance
+
+
+def payment_summary(start_date=None, end_date=None, village=None, method_name=None):
+    """Payload for analytics_summary (and the weekly PDF report)."""
+    payments = Payment.objects.all()
+    customers = Customer.objects.all()
+
+    if start_date:
+        payments = payments.filter(created_at__date__gte=start_date)
+        customers = customers.filter(created_at__date__gte=start_date)
+    if end_date:
+        payments = payments.filter(created_at__date__lte=end_date)
+        customers = customers.filter(created_at__date__lte=end_date)
+    if village:
+        payments = payments.filter(customer__village__name=village)
+        customers = customers.filter(village__name=village)
+    if method_name:
+        method_obj = PaymentMethod.objects.filter(name=method_name).first()
+        if method_obj:
+            payments = payments.filter(method=method_obj)
+
+    # === 1-3. Revenue, Collections, Pending (one query) ===
+    totals = payments.aggregate(
+        total=Sum('amount'),
+        collections=Sum('amount', filter=Q(status='Successful')),
+        pending=Sum('amount', filter=Q(status='Pending')),
+    )
+    total_revenue = totals['total'] or Decimal('0')
+    collections = totals['collections'] or Decimal('0')
+    pending = totals['pending'] or Decimal('0')
+
+    # === Previous Period for Growth Comparison ===
+    today = timezone.now().date()
+    prev_revenue = Payment.objects.filter(
+        created_at__date__gte=today - timedelta(days=60),
+        created_at__date__lte=today - timedelta(days=30),
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    revenue_growth = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else Decimal('0')
+
+    # === 4. Payment Methods Breakdown ===
+    payment_methods = {
+        item['method__name'] or 'Unknown': {'count': item['count'], 'total': item['total'] or Decimal('0')}
+        for item in payments.values('method__name').annotate(count=Count('id'), total=Sum('amount')).order_by('-count')
+    }
+    most_used_method, most_used_count = None, 0
+    if payment_methods:
+        most_used_method, method_data = max(payment_methods.items(), key=lambda x: x[1]['count'])
+        most_used_count = method_data['count']
+
+    # === 5. Top Customers ===
+    top_customers = list(
+        payments.values('customer__name', 'customer__village__name')
+        .annotate(total_paid=Sum('amount'))
+        .order_by('-total_paid')[:10]
+    )
+
+    # === 6-7. Customer Growth and Revenue Series ===
+    customer_growth = list(
+        customers.annotate(month=_to_char_month('created_at'))
+        .values('month').annotate(count=Count('id')).order_by('month')
+    )
+    daily_revenue = list(
+        payments.annotate(date=TruncDate('created_at'))
+        .values('date').annotate(amount=Sum('amount')).order_by('date')
+    )
+    weekly_revenue = list(
+        payments.annotate(week=ExtractWeek('created_at'))
+        .values('week').annotate(amount=Sum('amount')).order_by('week')
+    )
+    monthly_revenue = list(
+        payments.annotate(month=_to_char_month('created_at'))
+        .values('month').annotate(amount=Sum('amount')).order_by('month')
+    )
+
+    # === 8. Collector Performance with Monthly Trends & Incentives ===
+    collector_performance = _collector_performance(payments)
+
+    # === AI-Powered Insights ===
+    insights = []
+
+    top_village = payments.values('customer__village__name').annotate(total=Sum('amount')).order_by('-total').first()
+    if top_village:
+        insights.append({
+            "title": "Top Performing Village",
+            "message": f"{top_village['customer__village__name']} generated {top_village['total']:,} RWF — focus marketing here!",
+            "type": "success"
+        })
+
+    fastest = customers.values('village__name').annotate(count=Count('id')).order_by('-count').first()
+    if fastest:
+        insights.append({
+            "title": "Fastest Growing Village",
+            "message": f"{fastest['village__name']} added {fastest['count']} new customers this period!",
+            "type": "growth"
+        })
+
+    if most_used_method:
+        insights.append({
+            "title": "Recommended Payment Method",
+            "message": f"{most_used_method} is most popular ({most_used_count} transactions) — promote it more!",
+            "type": "info"
+        })
+
+    pending_ratio = (pending / total_revenue * 100) if total_revenue > 0 else 0
+    if pending_ratio > 30:
+        insights.append({
+            "title": "High Pending Risk",
+            "message": f"Pending payments are {pending_ratio:.1f}% of revenue — follow up urgently!",
+            "type": "warning"
+        })
+
+    today_amount = Decimal('0')
+    avg_daily = Decimal('0')
+    if daily_revenue:
+        today_amount = daily_revenue[-1]['amount'] or Decimal('0')
+        avg_daily = sum(d['amount'] or Decimal('0') for d in daily_revenue) / Decimal(len(daily_revenue))
+
+    if today_amount < avg_daily * Decimal('0.7'):
+        insights.append({
+            "title": "Daily Revenue Alert",
+            "message": f"Today's revenue ({today_amount:,} RWF) is below average — check activity!",
+            "type": "warning"
+        })
+
+    # === AI-Generated Report Summary ===
+    summary_parts = []
+    if revenue_growth > 0:
+        summary_parts.append(f"Revenue grew by {revenue_growth:.1f}%")
+    else:
+        summary_parts.append(f"Revenue declined by {abs(revenue_growth):.1f}%")
+
+    if pending_ratio > 30:
+        summary_parts.append("high pending payments detected")
+    elif pending_ratio > 15:
+        summary_parts.append("moderate pending payments")
+
+    if most_used_method:
+        summary_parts.append(f"{most_used_method} is the dominant payment method")
+
+    report_summary = "Summary: " + ", ".join(summary_parts) + "." if summary_parts else "No data available yet."
+
+    return {
+        "totalRevenue": float(total_revenue),
+        "collections": float(collections),
+        "pending": float(pending),
+        "paymentMethods": payment_methods,
+        "topCustomers": top_customers,
+        "customerGrowth": customer_growth,
+        "revenue": {
+            "daily": daily_revenue,
+            "weekly": weekly_revenue,
+            "monthly": monthly_revenue,
+        },
+        "collectorPerformance": collector_performance,
+        "insights": insights,
+        "reportSummary": report_summary,
+        "revenueGrowth": float(revenue_growth)
+    }
+
+
+# ─── Snapshots ──────────────────────────────────────────────────────────────
+
+def refresh_snapshot(kind, full=False):
+    """Compute and store a new snapshot of `kind` ('users' or 'payments')."""
+    started = time.monotonic()
+    previous = None
+
+    if kind == 'users':
+        if not full:
+            latest = AnalyticsSnapshot.objects.filter(kind=kind).only('data').first()
+            full_at = latest.data.get('_full_at') if latest else None
+            if full_at and timezone.now() - datetime.fromisoformat(full_at) < FULL_REFRESH_EVERY:
+                previous = latest.data
+        data = user_dashboard(previous)
+    elif kind == 'payments':
+        data = payment_summary()
+    else:
+        raise ValueError(f"Unknown analytics snapshot kind: {kind}")
+
+    snapshot = AnalyticsSnapshot.objects.create(
+        kind=kind,
+        data=data,
+        is_full=previous is None,
+        duration_ms=int((time.monotonic() - started) * 1000),
+    )
+    # Re-read so the cached copy holds the JSON-decoded payload, same as a DB hit
+    snapshot.refresh_from_db(fields=['data'])
+    cache.set(CACHE_KEY.format(kind=kind), snapshot, CACHE_TIMEOUT)
+    return snapshot
+
+
+def prune_snapshots(retention=SNAPSHOT_RETENTION):
+    deleted, _ = AnalyticsSnapshot.objects.filter(created_at__lt=timezone.now() - retention).delete()
+    return deleted
+
+
+def schedule_refresh(kind):
+    """Queue one background refresh per kind; concurrent stale reads don't pile up tasks."""
+    if cache.add(REFRESH_LOCK_KEY.format(kind=kind), True, REFRESH_LOCK_TIMEOUT):
+        from .tasks import refresh_analytics_snapshot
+        refresh_analytics_snapshot.delay(kind)
+
+
+def get_snapshot(kind, max_age=SNAPSHOT_TTL):
+    """
+    Latest snapshot of `kind`. Computed inline only when none exists yet;
+    otherwise a stale snapshot is served while a refresh runs in the background.
+    """
+    snapshot = cache.get(CACHE_KEY.format(kind=kind))
+    if snapshot is None:
+        snapshot = AnalyticsSnapshot.objects.filter(kind=kind).first()
+        if snapshot is None:
+            return refresh_snapshot(kind)
+        cache.set(CACHE_KEY.format(kind=kind), snapshot, CACHE_TIMEOUT)
+
+    if timezone.now() - snapshot.created_at > max_age:
+        schedule_refresh(kind)
+    return snapshot
+
+
+def snapshot_payload(snapshot, max_age=SNAPSHOT_TTL):
+    """Public payload of a snapshot plus its freshness metadata."""
+    data = {key: value for key, value in snapshot.data.items() if not key.startswith('_')}
+    data['snapshot'] = {
+        'generated_at': snapshot.created_at,
+        'stale': timezone.now() - snapshot.created_at > max_age,
+        'incremental': not snapshot.is_full,
+        'duration_ms': snapshot.duration_ms,
+    }
+    return data
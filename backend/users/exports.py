@@ -0,0 +1,393 @@
+# users/exports.py — User list exports (reports.exports specs)
+import os
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+from openpyxl.chart import BarChart, LineChart, PieChart, Reference
+from openpyxl.chart.label import DataLabelList
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import Font, PatternFill
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Image as ReportLabImage, Paragraph, Spacer, Table, TableStyle
+
+from reports.exports import ExportSpec, styled_cell, truncate
+from . import analytics
+from .models import CustomUser
+
+# ─── Configuration ──────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+LOGO_PATH = os.path.join(STATIC_DIR, 'logo.png')  # Update to your real logo path
+
+SOCIAL_ICONS = {
+    "Twitter/X": {
+        "icon": os.path.join(STATIC_DIR, 'social', 'twitter.png'),
+        "url": "https://twitter.com/highprosper_rw"
+    },
+    "Facebook": {
+        "icon": os.path.join(STATIC_DIR, 'social', 'facebook.png'),
+        "url": "https://facebook.com/highprosper"
+    },
+    "LinkedIn": {
+        "icon": os.path.join(STATIC_DIR, 'social', 'linkedin.png'),
+        "url": "https://linkedin.com/company/highprosper"
+    },
+    "Instagram": {
+        "icon": os.path.join(STATIC_DIR, 'social', 'instagram.png'),
+        "url": "https://instagram.com/highprosper_rw"
+    },
+    "WhatsApp": {
+        "icon": os.path.join(STATIC_DIR, 'social', 'whatsapp.png'),
+        "url": "https://wa.me/250788123456"
+    },
+    "Telegram": {
+        "icon": os.path.join(STATIC_DIR, 'social', 'telegram.png'),
+        "url": "https://t.me/highprosper_rw"
+    }
+}
+
+COMPANY_NAME = "High Prosper Services Ltd"
+COMPANY_LOCATION = "Kigali, Rwanda"
+COMPANY_PHONE = "+250 788 123 456"
+COMPANY_EMAIL = "info@highprosper.com"
+
+GREEN_FILL = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+RED_FILL = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+ORANGE_FILL = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
+
+
+def _yes_no(value, yes="Yes", no="No"):
+    return yes if value else no
+
+
+class UserExport(ExportSpec):
+    """
+    Users matching the admin list filters (role, search, is_active, date_from, date_to).
+    """
+    FILTERS = ('role', 'search', 'is_active', 'date_from', 'date_to')
+
+    title = "Users Management Report"
+    filename = "high_prosper_users_report"
+    fields = (
+        'id', 'username', 'first_name', 'last_name', 'email', 'phone', 'role',
+        'company__name', 'branch__name', 'last_login', 'date_joined',
+        'is_online', 'is_verified', 'is_active',
+    )
+
+    @classmethod
+    def from_request(cls, request):
+        params = {key: request.query_params.get(key) for key in cls.FILTERS if key in request.query_params}
+        return cls(params, user=request.user)
+
+    def get_queryset(self):
+        queryset = CustomUser.objects.all()
+        params = self.params
+
+        if params.get('role'):
+            queryset = queryset.filter(role=params['role'])
+        search = params.get('search')
+        if search:
+            queryset = queryset.filter(
+                Q(username__icontains=search) |
+                Q(email__icontains=search) |
+                Q(first_name__icontains=search) |
+                Q(last_name__icontains=search)
+            )
+        if params.get('is_active') is not None:
+            queryset = queryset.filter(is_active=params['is_active'].lower() in ('true', '1', 'yes'))
+        for key, lookup in (('date_from', 'date_joined__date__gte'), ('date_to', 'date_joined__date__lte')):
+            if params.get(key):
+                try:
+                    queryset = queryset.filter(**{lookup: datetime.strptime(params[key], '%Y-%m-%d').date()})
+                except ValueError:
+                    pass
+
+        return queryset.order_by('-date_joined')
+
+    def summary_data(self):
+        """Unfiltered exports reuse the latest users snapshot; filtered ones are aggregated live."""
+        if not hasattr(self, '_summary_data'):
+            summary = None
+            if not self.params:
+                summary = analytics.get_snapshot('users').data.get('_export_summary')
+            self._summary_data = summary or analytics.user_summary(self.get_queryset())
+        return self._summary_data
+
+    @staticmethod
+    def full_name(values):
+        return f"{values['first_name'] or ''} {values['last_name'] or ''}".strip()
+
+
+class UserCSVExport(UserExport):
+    """Plain user list for admin_users_export_csv."""
+    filename = "users_report"
+    headers = ("ID", "Username", "Email", "Role", "Date Joined")
+    fields = ('id', 'username', 'email', 'role', 'date_joined')
+
+    def get_queryset(self):
+        return CustomUser.objects.order_by('id')
+
+    def row(self, values):
+        return [values['id'], values['username'], values['email'], values['role'], values['date_joined'].strftime("%Y-%m-%d")]
+
+
+class UserExcelExport(UserExport):
+    """Users List sheet (alternating rows, status highlighting) plus the Summary Statistics dashboard."""
+    headers = (
+        "ID", "Username", "Full Name", "Email", "Phone", "Role",
+        "Company", "Branch", "Last Login", "Date Joined",
+        "Online", "Verified", "Active"
+    )
+    sheet_title = "Users List"
+    column_widths = (8, 18, 24, 32, 16, 12, 24, 18, 18, 14, 10, 10, 10)
+
+    def row(self, values):
+        return [
+            values['id'],
+            values['username'],
+            self.full_name(values),
+            values['email'],
+            values['phone'] or "—",
+            (values['role'] or '').capitalize(),
+            values['company__name'] or '—',
+            values['branch__name'] or '—',
+            values['last_login'].strftime("%Y-%m-%d %H:%M") if values['last_login'] else "Never",
+            values['date_joined'].strftime("%Y-%m-%d"),
+            _yes_no(values['is_online']),
+            _yes_no(values['is_verified']),
+            _yes_no(values['is_active']),
+        ]
+
+    def sheet_row(self, ws, values, row_number):
+        cells = self.row(values)
+        if row_number % 2 == 0:  # Alternate row color
+            return [styled_cell(ws, value, fill="F2F2F2") for value in cells]
+        return cells
+
+    def finish_sheet(self, ws, last_row):
+        if last_row < 2:
+            return
+        for column, no_fill in (('K', RED_FILL), ('L', ORANGE_FILL), ('M', RED_FILL)):
+            cells = f'{column}2:{column}{last_row}'
+            ws.conditional_formatting.add(cells, CellIsRule(operator='equal', formula=['"Yes"'], fill=GREEN_FILL))
+            ws.conditional_formatting.add(cells, CellIsRule(operator='equal', formula=['"No"'], fill=no_fill))
+
+    def write_summary_sheet(self, wb, summary, row_count):
+        data = self.summary_data()
+        ws = wb.create_sheet("Summary Statistics")
+        for column, width in (('A', 22), ('B', 14), ('D', 18), ('E', 10), ('G', 14), ('H', 12)):
+            ws.column_dimensions[column].width = width
+
+        # write_only sheets are written row by row, so lay the cells out in a grid first
+        grid = {
+            (1, 1): styled_cell(ws, "Summary Statistics Dashboard", font=Font(size=18, bold=True, color="1F497D")),
+            (2, 1): f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')} | Total Users: {data['total_users']}",
+        }
+
+        # Key Metrics (A4:B10)
+        metrics = [
+            ("Total Users", data['total_users']),
+            ("Online Users", data['total_online']),
+            ("Offline Users", data['total_offline']),
+            ("New Today", data['new_today']),
+            ("New This Month", data['new_month']),
+            ("Blocked/Inactive", data['inactive_users']),
+            ("Performance %", f"{data['performance_percentage']}%"),
+        ]
+        for row, (label, value) in enumerate(metrics, start=4):
+            grid[(row, 1)] = styled_cell(ws, label, font=Font(bold=True))
+            grid[(row, 2)] = value
+
+        # Users by Role Pie Chart Data (D4:E13)
+        sorted_roles = sorted(data['users_by_role'].items(), key=lambda x: x[1], reverse=True)
+        role_rows = [((role or 'Unknown').capitalize(), count) for role, count in sorted_roles[:8]]
+        others_count = sum(count for _, count in sorted_roles[8:])
+        if others_count > 0:
+            role_rows.append(("Others", others_count))
+        grid[(4, 4)] = styled_cell(ws, "Users by Role", font=Font(bold=True))
+        for row, (role, count) in enumerate(role_rows, start=5):
+            grid[(row, 4)] = role
+            grid[(row, 5)] = count
+
+        # New users trend (G20:H50)
+        grid[(20, 7)] = "Date"
+        grid[(20, 8)] = "New Users"
+        for row, (date, count) in enumerate(data['daily_new'], start=21):
+            grid[(row, 7)] = date
+            grid[(row, 8)] = count
+
+        max_row = max(row for row, _ in grid)
+        for row in range(1, max_row + 1):
+            ws.append([grid.get((row, column)) for column in range(1, 9)])
+
+        # ─── PIE CHART: Users by Role ───────────────────────────────────────
+        if role_rows:
+            pie = PieChart()
+            last_role_row = 4 + len(role_rows)
+            pie.add_data(Reference(ws, min_col=5, min_row=5, max_row=last_role_row))
+            pie.set_categories(Reference(ws, min_col=4, min_row=5, max_row=last_role_row))
+            pie.title = "Distribution by Role"
+            pie.dataLabels = DataLabelList()
+            pie.dataLabels.showVal = True
+            pie.dataLabels.showPercent = True
+            pie.legend.position = 'b'
+            ws.add_chart(pie, "G4")
+
+        # ─── BAR CHART: Key Metrics ─────────────────────────────────────────
+        bar = BarChart()
+        bar.title = "Key User Metrics"
+        bar.y_axis.title = "Count"
+        bar.x_axis.title = "Category"
+        bar.add_data(Reference(ws, min_col=2, min_row=4, max_row=10), titles_from_data=True)
+        bar.set_categories(Reference(ws, min_col=1, min_row=5, max_row=10))
+        bar.legend = None
+        ws.add_chart(bar, "A15")
+
+        # ─── LINE CHART: New Users Trend (Last 30 Days) ─────────────────────
+        line = LineChart()
+        line.title = "New Users - Last 30 Days"
+        line.y_axis.title = "New Users"
+        line.x_axis.title = "Date"
+        last_trend_row = 20 + len(data['daily_new'])
+        line.add_data(Reference(ws, min_col=8, min_row=21, max_row=last_trend_row), titles_from_data=False)
+        line.set_categories(Reference(ws, min_col=7, min_row=21, max_row=last_trend_row))
+        ws.add_chart(line, "J20")
+
+
+class UserPDFExport(UserExport):
+    """Branded landscape report: summary and role chart on page one, then the compact users table."""
+    headers = (
+        "ID", "User", "Name", "Email", "Phone", "Role", "Company", "Branch", "Login", "Joined", "Online", "Ver.", "Act."
+    )
+    pdf_col_widths = [0.5*inch, 1.0*inch, 1.2*inch, 1.5*inch, 0.8*inch, 0.7*inch, 1.0*inch, 0.8*inch, 0.9*inch, 0.8*inch, 0.5*inch, 0.5*inch, 0.5*inch]
+    pdf_top_margin = 1.2 * inch
+    pdf_bottom_margin = 1.0 * inch
+    pdf_rows_per_page = 26
+    pdf_table_style = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 4),
+        ('GRID', (0, 0), (-1, -1), 0.4, colors.grey),
+        ('FONTSIZE', (0, 1), (-1, -1), 7),
+        ('LEFTPADDING', (0, 0), (-1, -1), 2),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (3, 1), (3, -1), 'LEFT'),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    ]
+
+    def pdf_row(self, values):
+        return [
+            str(values['id']),
+            truncate(values['username'], 12),
+            truncate(self.full_name(values), 15),
+            truncate(values['email'], 20),
+            truncate(values['phone'], 12, '...') or "—",
+            (values['role'] or '')[:10].capitalize() or "—",
+            truncate(values['company__name'] or '—', 15),
+            truncate(values['branch__name'] or '—', 12),
+            values['last_login'].strftime("%Y-%m-%d") if values['last_login'] else "—",
+            values['date_joined'].strftime("%Y-%m-%d"),
+            _yes_no(values['is_online'], "Y", "N"),
+            _yes_no(values['is_verified'], "Y", "N"),
+            _yes_no(values['is_active'], "Y", "N"),
+        ]
+
+    def pdf_preamble(self, summary):
+        data = self.summary_data()
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle(name='Title', fontSize=20, leading=24, textColor=colors.darkblue, spaceAfter=10, alignment=1)
+        heading_style = ParagraphStyle(name='Heading2', fontSize=14, leading=18, textColor=colors.darkblue, spaceAfter=6)
+        generated_by = f" by {self.user.get_full_name()}" if self.user else ""
+
+        summary_table = Table([
+            ["Total Users", data['total_users']],
+            ["Online", data['total_online']],
+            ["New Today", data['new_today']],
+            ["New Month", data['new_month']],
+            ["Inactive", data['inactive_users']],
+        ], colWidths=[2.8*inch, 2.0*inch])
+        summary_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+
+        # Pie Chart
+        drawing = Drawing(350, 180)
+        pie = Pie()
+        sorted_roles = sorted(data['users_by_role'].items(), key=lambda x: x[1], reverse=True)
+        pie.data = [count for _, count in sorted_roles[:8]] + [sum(count for _, count in sorted_roles[8:])]
+        pie.labels = [(role or 'Unknown').capitalize()[:12] for role, _ in sorted_roles[:8]] + ['Others']
+        pie.x = 80
+        pie.y = 20
+        pie.width = 140
+        pie.height = 140
+        drawing.add(pie)
+
+        return [
+            Paragraph("High Prosper Services", title_style),
+            Paragraph(self.title, title_style),
+            Spacer(1, 0.2*inch),
+            Paragraph(f"Generated: {timezone.now().strftime('%B %d, %Y %H:%M')}{generated_by}", styles['Normal']),
+            Spacer(1, 0.3*inch),
+            Paragraph("Summary", heading_style),
+            summary_table,
+            Spacer(1, 0.3*inch),
+            Paragraph("Users by Role", heading_style),
+            drawing,
+        ]
+
+    def decorate_pdf_page(self, canvas, page_number):
+        width, height = self.pdf_pagesize
+        canvas.saveState()
+
+        if os.path.exists(LOGO_PATH):
+            try:
+                logo = ReportLabImage(LOGO_PATH, width=1.5*inch, height=1.0*inch)
+                logo.drawOn(canvas, 0.4*inch, height - 1.1*inch)
+            except Exception as e:
+                print(f"Logo error: {e}")
+
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColor(colors.darkgray)
+        y = 0.3*inch
+
+        if page_number == 1:
+            canvas.drawString(0.4*inch, y, f"{COMPANY_NAME} • {COMPANY_LOCATION} • {COMPANY_PHONE} • {COMPANY_EMAIL}")
+
+            x = width - 4.9*inch
+            canvas.drawString(x, y + 0.08*inch, "Follow us:")
+            x += canvas.stringWidth("Follow us:", "Helvetica", 8) + 0.1*inch
+
+            icon_size = 0.25*inch
+            for platform, data in SOCIAL_ICONS.items():
+                if os.path.exists(data["icon"]):
+                    try:
+                        ReportLabImage(data["icon"], width=icon_size, height=icon_size).drawOn(canvas, x, y - 0.04*inch)
+                    except Exception:
+                        canvas.drawString(x, y, platform[:3])
+                else:
+                    canvas.drawString(x, y, platform[:3])
+
+                canvas.linkURL(data["url"], (x, y - 0.08*inch, x + icon_size, y + icon_size + 0.08*inch))
+                x += icon_size + 0.15*inch
+
+            canvas.setStrokeColor(colors.lightgrey)
+            canvas.line(0.4*inch, y - 0.15*inch, width - 0.4*inch, y - 0.15*inch)
+
+        canvas.setFont("Helvetica-Oblique", 7)
+        canvas.drawCentredString(width / 2, 0.2*inch, f"Page {page_number} • Confidential Document")
+        canvas.restoreState()
@@ -0,0 +1,82 @@
+# users/management/commands/benchmark_search.py
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from users.models import CustomUser, SearchDocument
+from users.search import CHUNK_SIZE, search, suggest
+
+BENCHMARK_TYPE = 'benchmark'
+WORDS = [
+    'jean', 'marie', 'claude', 'uwimana', 'mukamana', 'habimana', 'niyonzima', 'kigali', 'gasabo',
+    'kicukiro', 'nyarugenge', 'remera', 'kimironko', 'invoice', 'truck', 'toyota', 'isuzu', 'bin',
+    'container', 'supplier', 'diesel', 'collector', 'sector', 'cell', 'village', 'payment', 'pending',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load synthetic search documents (default 1M) and time ranked search and suggestions. "
+        "Run against a staging database; documents use a private object type and are removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--documents", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--keep", action="store_true", help="Keep the synthetic documents after the run.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        total = options["documents"]
+        self.load_documents(rng, total)
+
+        admin = CustomUser(id=0, role='admin')
+        collector = CustomUser(id=rng.randint(1, 500), role='collector')
+        queries = [" ".join(rng.sample(WORDS, rng.randint(1, 2))) for _ in range(options["queries"])]
+        prefixes = [rng.choice(WORDS)[:rng.randint(2, 4)] for _ in range(options["queries"])]
+        types = [BENCHMARK_TYPE]
+
+        self.report("search (admin)", queries, lambda q: search(admin, q, object_types=types))
+        self.report("search (collector)", queries, lambda q: search(collector, q, object_types=types))
+        self.report("search page 20", queries, lambda q: search(admin, q, page=20, object_types=types))
+        self.report("suggest", prefixes, lambda q: suggest(admin, q, object_types=types))
+
+        if not options["keep"]:
+            SearchDocument.objects.filter(object_type=BENCHMARK_TYPE).delete()
+            self.stdout.write("Synthetic documents removed.")
+
+    def load_documents(self, rng, total):
+        SearchDocument.objects.filter(object_type=BENCHMARK_TYPE).delete()
+        started = time.perf_counter()
+        for start in range(0, total, CHUNK_SIZE):
+            SearchDocument.objects.bulk_create([
+                SearchDocument(
+                    object_type=BENCHMARK_TYPE,
+                    object_id=i,
+                    title=" ".join(rng.sample(WORDS, 3)).title(),
+                    subtitle=f"Benchmark • {i}",
+                    href=f"/benchmark/{i}",
+                    body=f"25078{rng.randint(1000000, 9999999)} " + " ".join(rng.sample(WORDS, 4)),
+                    status=rng.choice(['', 'Pending', 'Paid', 'Overdue']),
+                    collector_ids=[rng.randint(1, 500)],
+                )
+                for i in range(start, min(start + CHUNK_SIZE, total))
+            ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE users_searchdocument")
+        self.stdout.write(f"Loaded {total:,} documents in {time.perf_counter() - started:.1f}s")
+
+    def report(self, label, inputs, fn):
+        timings = []
+        for value in inputs:
+            started = time.perf_counter()
+            fn(value)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(self.style.SUCCESS(
+            f"{label:<20} p50={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms  max={timings[-1]:7.2f}ms"
+        ))
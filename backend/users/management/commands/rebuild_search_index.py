@@ -0,0 +1,25 @@
+# users/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand, CommandError
+
+from users.search import SOURCES, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the GlobalSearchView search index (all types, or only those given with --type)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type",
+            action="append",
+            dest="types",
+            help=f"Object type to rebuild; repeatable. One of: {', '.join(SOURCES)}",
+        )
+
+    def handle(self, *args, **options):
+        types = options["types"]
+        unknown = set(types or []) - set(SOURCES)
+        if unknown:
+            raise CommandError(f"Unknown search type(s): {', '.join(sorted(unknown))}")
+
+        for object_type, count in rebuild_index(types).items():
+            self.stdout.write(self.style.SUCCESS(f"✅ Indexed {count} {object_type} documents"))
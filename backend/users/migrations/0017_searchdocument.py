@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:00
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+import django.utils.timezone
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_customuser_created_by'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('href', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('status', models.CharField(blank=True, max_length=30)),
+                ('doc_date', models.DateField(blank=True, null=True)),
+                ('admin_only', models.BooleanField(default=False)),
+                ('collector_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None)),
+                ('search_vector', models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('body', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField())),
+                ('indexed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('object_type', 'object_id')},
+                'indexes': [
+                    django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='users_searchdoc_vector_gin'),
+                    django.contrib.postgres.indexes.GinIndex(fields=['title'], name='users_searchdoc_title_trgm', opclasses=['gin_trgm_ops']),
+                    django.contrib.postgres.indexes.GinIndex(fields=['collector_ids'], name='users_searchdoc_collectors'),
+                    models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('title'), name='varchar_pattern_ops'), name='users_searchdoc_title_prefix'),
+                    models.Index(fields=['object_type', 'admin_only'], name='users_searchdoc_type_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('query', models.CharField(max_length=255)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_result_searches', models.PositiveIntegerField(default=0)),
+                ('total_results', models.PositiveBigIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date', '-searches'],
+                'indexes': [models.Index(fields=['date', '-searches'], name='users_searc_date_83164f_idx')],
+                'unique_together': {('date', 'query')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:00
+
+import rest_framework.utils.encoders
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_searchdailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('users', 'User Analytics'), ('payments', 'Payment Analytics')], max_length=20)),
+                ('data', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder)),
+                ('is_full', models.BooleanField(default=True)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'get_latest_by': 'created_at',
+                'indexes': [models.Index(fields=['kind', '-created_at'], name='users_analy_kind_b43a46_idx')],
+            },
+        ),
+    ]
@@ -7,10 +7,13 @@ from django.core.validators import FileExtensionValidator
 from django.db import models
 from django.utils import timezone
 import uuid
-from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.contrib.postgres.search import SearchVectorField, SearchVector
+from django.db.models.functions import Lower
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from rest_framework.utils.encoders import JSONEncoder
 
 class CustomUser(AbstractUser, PermissionsMixin):
     ROLE_CHOICES = [
@@ -195,11 +198,12 @@ class Post(models.Model):
 
     def increment_views(self):
         self.views += 1
-        self.save(update_fields=['views'])
+        # updated_at: the spam sweep (users.spam) re-scores posts changed since its watermark
+        self.save(update_fields=['views', 'updated_at'])
 
     def share(self, by_user):
         self.shares += 1
-        self.save(update_fields=['shares'])
+        self.save(update_fields=['shares', 'updated_at'])
         # Create activity
         Activity.objects.create(
             user=by_user,
@@ -637,6 +641,92 @@ class SearchAnalytics(models.Model):
     def __str__(self):
         return f"{self.user} searched '{self.query}' → {self.results_count} results"
 
+class SearchDailyStat(models.Model):
+    """
+    Per-day search roll-up maintained by users.search_telemetry when buffered events are flushed.
+    Admin analytics read these rows instead of scanning SearchAnalytics.
+    """
+    date = models.DateField()
+    query = models.CharField(max_length=255)  # Normalized (lower-cased, trimmed)
+    searches = models.PositiveIntegerField(default=0)
+    zero_result_searches = models.PositiveIntegerField(default=0)
+    total_results = models.PositiveBigIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'query')
+        ordering = ['-date', '-searches']
+        indexes = [
+            models.Index(fields=['date', '-searches']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} '{self.query}': {self.searches} searches, {self.clicks} clicks"
+
+class SearchDocument(models.Model):
+    """
+    Denormalized search index row used by GlobalSearchView.
+    One row per searchable object; kept current by users.search (signals + batch indexer).
+    """
+    object_type = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    href = models.CharField(max_length=255)
+    body = models.TextField(blank=True)  # Secondary searchable text: phone, email, sku, village...
+    status = models.CharField(max_length=30, blank=True)
+    doc_date = models.DateField(null=True, blank=True)  # Date used by from/to filters (e.g. invoice due date)
+    admin_only = models.BooleanField(default=False)
+    collector_ids = ArrayField(models.IntegerField(), blank=True, default=list)  # Collector scoping
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='simple') +
+            SearchVector('body', weight='B', config='simple')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    indexed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('object_type', 'object_id')
+        indexes = [
+            GinIndex(fields=['search_vector'], name='users_searchdoc_vector_gin'),
+            GinIndex(fields=['title'], name='users_searchdoc_title_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['collector_ids'], name='users_searchdoc_collectors'),
+            models.Index(OpClass(Lower('title'), name='varchar_pattern_ops'), name='users_searchdoc_title_prefix'),
+            models.Index(fields=['object_type', 'admin_only'], name='users_searchdoc_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.object_type}#{self.object_id}: {self.title}"
+
+class AnalyticsSnapshot(models.Model):
+    """
+    Timestamped, precomputed dashboard payload written by users.analytics.
+    Dashboards and scheduled reports read the latest row per kind instead of aggregating live.
+    """
+    KIND_CHOICES = [
+        ('users', 'User Analytics'),
+        ('payments', 'Payment Analytics'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    data = models.JSONField(encoder=JSONEncoder)
+    is_full = models.BooleanField(default=True)  # False when historical buckets were reused from the previous snapshot
+    duration_ms = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        get_latest_by = 'created_at'
+        indexes = [
+            models.Index(fields=['kind', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} snapshot @ {self.created_at:%Y-%m-%d %H:%M}"
+
 class Share(models.Model):
     """
     Tracks when a user shares a post (re-post / share).
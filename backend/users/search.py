@@ -0,0 +1,379 @@
+# users/search.py — Unified search index for GlobalSearchView
+"""
+Every searchable object (user, customer, invoice, vehicle, item, staff, supplier)
+is projected into a single SearchDocument row with a ready-made title, subtitle
+and href plus a weighted tsvector. Searches then hit one table through GIN
+indexes (tsvector + pg_trgm) and are ranked, role-scoped and paginated in
+PostgreSQL instead of scanning seven tables with icontains.
+
+Documents are kept current by signals (users/signals.py → index_objects) and
+can be rebuilt in bulk with rebuild_index() / `manage.py rebuild_search_index`.
+"""
+import re
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.apps import apps
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Lower
+from django.utils import timezone
+
+from .models import CustomUser, SearchDocument
+
+ADMIN_ROLES = ('ceo', 'admin', 'manager')
+COLLECTOR_SCOPED_TYPES = ('customer', 'invoice')
+CHUNK_SIZE = 2000
+SUGGESTION_LIMIT = 8
+
+ROLE_LABELS = dict(CustomUser.ROLE_CHOICES)
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _village_collectors(village_ids):
+    """Map village id -> [collector ids] with one query on the M2M table."""
+    village_ids = [v for v in village_ids if v]
+    if not village_ids:
+        return {}
+    Village = apps.get_model('customers', 'Village')
+    mapping = defaultdict(list)
+    rows = Village.collectors.through.objects.filter(village_id__in=village_ids).values_list('village_id', 'customuser_id')
+    for village_id, collector_id in rows:
+        mapping[village_id].append(collector_id)
+    return mapping
+
+
+def _join(*parts):
+    return " ".join(str(p) for p in parts if p)
+
+
+# ─── Document Sources ──────────────────────────────────────────────────────
+
+class SearchSource:
+    """
+    Describes how one model is projected into SearchDocument rows.
+    Rows are read with values() so indexing never instantiates models or follows lazy FKs.
+    """
+    object_type = None
+    model_label = None
+    admin_only = False
+    fields = ()
+    village_field = None  # values() key holding the village id used for collector scoping
+
+    def get_queryset(self):
+        return apps.get_model(self.model_label)._default_manager.all()
+
+    def watches(self, update_fields):
+        """True if a save touching update_fields can change this source's documents."""
+        watched = {f.split('__')[0].removesuffix('_id') for f in self.fields}
+        return any(f.removesuffix('_id') in watched for f in update_fields)
+
+    def document(self, row):
+        raise NotImplementedError
+
+    def iter_documents(self, ids=None):
+        qs = self.get_queryset()
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+        rows = qs.order_by('pk').values(*self.fields).iterator(chunk_size=CHUNK_SIZE)
+        now = timezone.now()
+        for chunk in _chunked(rows, CHUNK_SIZE):
+            collectors = _village_collectors({r[self.village_field] for r in chunk}) if self.village_field else {}
+            docs = []
+            for row in chunk:
+                doc = SearchDocument(
+                    object_type=self.object_type,
+                    object_id=row['id'],
+                    admin_only=self.admin_only,
+                    indexed_at=now,
+                    **self.document(row),
+                )
+                if self.village_field:
+                    doc.collector_ids = collectors.get(row[self.village_field], [])
+                docs.append(doc)
+            yield docs
+
+
+class UserSource(SearchSource):
+    object_type = 'user'
+    model_label = 'users.CustomUser'
+    admin_only = True
+    fields = ('id', 'username', 'first_name', 'last_name', 'phone', 'email', 'role')
+
+    def document(self, row):
+        return {
+            'title': _join(row['first_name'], row['last_name']) or row['username'],
+            'subtitle': f"{ROLE_LABELS.get(row['role'], row['role'])} • {row['phone'] or 'No phone'}",
+            'href': f"/users/{row['id']}",
+            'body': _join(row['username'], row['phone'], row['email']),
+        }
+
+
+class CustomerSource(SearchSource):
+    object_type = 'customer'
+    model_label = 'customers.Customer'
+    fields = ('id', 'name', 'phone', 'village_id', 'village__name', 'balance')
+    village_field = 'village_id'
+
+    def get_queryset(self):
+        Invoice = apps.get_model('payments', 'Invoice')
+        unpaid = (
+            Invoice.objects.filter(customer=OuterRef('pk'), status='Unpaid')
+            .values('customer')
+            .annotate(total=Sum('amount'))
+            .values('total')
+        )
+        return super().get_queryset().annotate(
+            balance=Coalesce(Subquery(unpaid), Value(Decimal('0')), output_field=DecimalField(max_digits=14, decimal_places=2))
+        )
+
+    def document(self, row):
+        return {
+            'title': row['name'],
+            'subtitle': f"Customer • {row['phone']} • Balance: RWF {row['balance']:,}",
+            'href': f"/customers/{row['id']}",
+            'body': _join(row['phone'], row['village__name']),
+        }
+
+
+class InvoiceSource(SearchSource):
+    object_type = 'invoice'
+    model_label = 'payments.Invoice'
+    fields = ('id', 'period_year', 'period_month', 'amount', 'status', 'due_date', 'customer__name', 'customer__village_id')
+    village_field = 'customer__village_id'
+
+    def document(self, row):
+        return {
+            'title': f"Invoice {row['period_year']}-{row['period_month']:02d}",
+            'subtitle': f"Invoice • RWF {row['amount']:,} • {row['status']}",
+            'href': f"/payments/invoices/{row['id']}",
+            'body': _join(row['customer__name'], row['period_year'], row['period_month']),
+            'status': row['status'],
+            'doc_date': row['due_date'],
+        }
+
+
+class VehicleSource(SearchSource):
+    object_type = 'vehicle'
+    model_label = 'fleet.Vehicle'
+    admin_only = True
+    fields = ('id', 'registration_number', 'brand', 'model', 'vehicle_type', 'status')
+
+    def document(self, row):
+        return {
+            'title': f"{row['registration_number']} — {row['brand']} {row['model']}",
+            'subtitle': f"Vehicle • {row['vehicle_type']} • {row['status']}",
+            'href': f"/fleet/vehicles/{row['id']}",
+            'body': _join(row['registration_number'], row['brand'], row['model']),
+            'status': row['status'],
+        }
+
+
+class ItemSource(SearchSource):
+    object_type = 'item'
+    model_label = 'procurement.Item'
+    fields = ('id', 'name', 'sku', 'item_type')
+
+    def document(self, row):
+        item_types = dict(apps.get_model(self.model_label).ITEM_TYPE_CHOICES)
+        return {
+            'title': row['name'],
+            'subtitle': f"{item_types.get(row['item_type'], row['item_type'])} • {row['sku']}",
+            'href': f"/procurement/items/{row['id']}",
+            'body': row['sku'],
+        }
+
+
+class StaffSource(SearchSource):
+    object_type = 'staff'
+    model_label = 'hr.Staff'
+    admin_only = True
+    fields = ('id', 'user__username', 'user__first_name', 'user__last_name', 'position', 'department')
+
+    def document(self, row):
+        return {
+            'title': _join(row['user__first_name'], row['user__last_name']) or row['user__username'],
+            'subtitle': f"Staff • {row['position']} • {row['department']}",
+            'href': f"/hr/staff/{row['id']}",
+            'body': _join(row['user__username'], row['position'], row['department']),
+        }
+
+
+class SupplierSource(SearchSource):
+    object_type = 'supplier'
+    model_label = 'procurement.Supplier'
+    admin_only = True
+    fields = ('id', 'name', 'code', 'phone')
+
+    def document(self, row):
+        return {
+            'title': row['name'],
+            'subtitle': f"Supplier • {row['code']}",
+            'href': f"/procurement/suppliers/{row['id']}",
+            'body': _join(row['code'], row['phone']),
+        }
+
+
+SOURCES = {
+    source.object_type: source
+    for source in (
+        UserSource(), CustomerSource(), InvoiceSource(), VehicleSource(),
+        ItemSource(), StaffSource(), SupplierSource(),
+    )
+}
+
+UPDATE_FIELDS = ['title', 'subtitle', 'href', 'body', 'status', 'doc_date', 'admin_only', 'collector_ids', 'indexed_at']
+
+
+# ─── Indexing ──────────────────────────────────────────────────────────────
+
+def _upsert(docs):
+    SearchDocument.objects.bulk_create(
+        docs,
+        batch_size=CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=['object_type', 'object_id'],
+        update_fields=UPDATE_FIELDS,
+    )
+
+
+def index_objects(object_type, ids):
+    """Re-index the given objects; ids that no longer exist are dropped from the index."""
+    ids = set(ids)
+    if not ids:
+        return 0
+    indexed = set()
+    for docs in SOURCES[object_type].iter_documents(ids):
+        _upsert(docs)
+        indexed.update(d.object_id for d in docs)
+    stale = ids - indexed
+    if stale:
+        SearchDocument.objects.filter(object_type=object_type, object_id__in=stale).delete()
+    return len(indexed)
+
+
+def schedule_index(object_type, ids):
+    """Index after the surrounding transaction commits (used from signals)."""
+    ids = list(ids)
+    if ids:
+        transaction.on_commit(lambda: index_objects(object_type, ids))
+
+
+def rebuild_index(object_types=None):
+    """Full batch rebuild. Returns {object_type: documents indexed}."""
+    stats = {}
+    for object_type in object_types or SOURCES:
+        started = timezone.now()
+        count = 0
+        for docs in SOURCES[object_type].iter_documents():
+            _upsert(docs)
+            count += len(docs)
+        SearchDocument.objects.filter(object_type=object_type, indexed_at__lt=started).delete()
+        stats[object_type] = count
+    return stats
+
+
+# ─── Querying ──────────────────────────────────────────────────────────────
+
+def _prefix_tsquery(query):
+    """'jean kig' -> 'jean:* & kig:*' (tokens are \\w-only, so safe for raw tsquery)."""
+    tokens = re.findall(r'\w+', query.lower())
+    return " & ".join(f"{t}:*" for t in tokens)
+
+
+def visible_types(user):
+    if user.role in ADMIN_ROLES:
+        return list(SOURCES)
+    return [t for t, source in SOURCES.items() if not source.admin_only]
+
+
+def scoped_documents(user, type_filter=None, object_types=None):
+    types = object_types or visible_types(user)
+    if type_filter:
+        types = [t for t in types if t == type_filter]
+    qs = SearchDocument.objects.filter(object_type__in=types)
+    if user.role == 'collector':
+        qs = qs.filter(
+            ~Q(object_type__in=COLLECTOR_SCOPED_TYPES) |
+            Q(collector_ids__contains=[user.id])
+        )
+    return qs
+
+
+def search(user, query, type_filter=None, status=None, date_from=None, date_to=None,
+           page=1, limit=15, object_types=None):
+    """
+    Ranked, role-scoped search. Returns (results, total_count) for the requested page;
+    ranking, counting and pagination all happen in the database.
+    """
+    tsquery_text = _prefix_tsquery(query)
+    if not tsquery_text:
+        return [], 0
+
+    tsquery = SearchQuery(tsquery_text, search_type='raw', config='simple')
+    qs = scoped_documents(user, type_filter, object_types).filter(
+        Q(search_vector=tsquery) | Q(title__trigram_similar=query)
+    )
+    if status:
+        qs = qs.filter(Q(status__iexact=status) | Q(status=''))
+    if date_from:
+        qs = qs.filter(Q(doc_date__gte=date_from) | Q(doc_date__isnull=True))
+    if date_to:
+        qs = qs.filter(Q(doc_date__lte=date_to) | Q(doc_date__isnull=True))
+
+    total_count = qs.count()
+    offset = (page - 1) * limit
+    rows = (
+        qs.annotate(rank=SearchRank(F('search_vector'), tsquery) + TrigramSimilarity('title', query))
+        .order_by('-rank', 'title', 'object_id')
+        .values('object_id', 'title', 'subtitle', 'object_type', 'href', 'rank')[offset:offset + limit]
+    )
+    results = [
+        {
+            "id": r['object_id'],
+            "title": r['title'],
+            "subtitle": r['subtitle'],
+            "type": r['object_type'],
+            "href": r['href'],
+            "relevance": round(r['rank'], 4),
+        }
+        for r in rows
+    ]
+    return results, total_count
+
+
+def suggest(user, query, limit=SUGGESTION_LIMIT, object_types=None):
+    """
+    Typeahead titles. Title prefix matches come first (btree varchar_pattern_ops on
+    lower(title)); word-prefix tsquery matches fill the rest. At most two indexed queries.
+    """
+    query = query.strip().lower()
+    if not query:
+        return []
+    scoped = scoped_documents(user, object_types=object_types)
+    titles = list(dict.fromkeys(
+        scoped.annotate(title_lower=Lower('title'))
+        .filter(title_lower__startswith=query)
+        .order_by('title_lower')
+        .values_list('title', flat=True)[:limit * 2]
+    ))[:limit]
+
+    tsquery_text = _prefix_tsquery(query)
+    if len(titles) < limit and tsquery_text:
+        tsquery = SearchQuery(tsquery_text, search_type='raw', config='simple')
+        more = (
+            scoped.filter(search_vector=tsquery)
+            .exclude(title__in=titles)
+            .annotate(rank=SearchRank(F('search_vector'), tsquery))
+            .order_by('-rank', 'title')
+            .values_list('title', flat=True)[:limit * 2]
+        )
+        titles.extend(t for t in dict.fromkeys(more) if t not in titles)
+    return titles[:limit]
@@ -0,0 +1,258 @@
+# users/search_telemetry.py — Buffered search analytics
+"""
+GlobalSearchView and SearchClickView only append a small JSON event to a Redis
+list; flush_events() (Celery beat, every minute, or early once the buffer
+reaches FLUSH_THRESHOLD) drains it in batches:
+
+- search events become SearchAnalytics rows through one bulk_create
+- click events are attached to the matching search (same batch, or the latest
+  stored row for that user/query) and written with one bulk_update
+- SearchDailyStat roll-ups are incremented with one INSERT ... ON CONFLICT
+
+If Redis is unreachable, the event is written straight to the database (one
+small transaction in the request) instead; when that fails as well it is
+dropped, counted and logged. The early flush is only queued while Redis is
+reachable, without publish retries, so a broker outage never blocks a search.
+
+When a batch cannot be persisted, its events are retried one by one: events
+that fail on their own are re-queued with an attempt count and moved to
+DEAD_LETTER_KEY after MAX_ATTEMPTS. While the database is unreachable the batch
+is re-queued unchanged.
+"""
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import SearchAnalytics
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = "search:telemetry:events"
+FLUSH_THRESHOLD = 500
+FLUSH_BATCH_SIZE = 5000
+DEAD_LETTER_KEY = "search:telemetry:dead"
+MAX_ATTEMPTS = 3
+
+_dropped = 0  # Events lost while neither Redis nor the database took them (per process)
+
+
+def _normalize(query):
+    return (query or "").strip().lower()[:255]
+
+
+def _decode(payload):
+    event = json.loads(payload)
+    event["ts"] = datetime.fromisoformat(event["ts"])
+    return event
+
+
+def _enqueue(event):
+    payload = json.dumps(event, default=str)
+    try:
+        length = get_redis_connection("default").rpush(BUFFER_KEY, payload)
+    except Exception as e:
+        logger.warning(f"Search telemetry buffer unavailable, writing the event directly: {e}")
+        _write_through(payload)
+        return  # Broker likely down too: no early flush
+
+    if length == FLUSH_THRESHOLD:
+        from .tasks import flush_search_events
+        try:
+            flush_search_events.apply_async(retry=False)
+        except Exception as e:
+            logger.warning(f"Could not queue early search telemetry flush: {e}")
+
+
+def record_search(user, query, filters, results_count):
+    _enqueue({
+        "kind": "search",
+        "user_id": user.id,
+        "query": (query or "")[:255],
+        "filters": filters,
+        "results_count": results_count,
+        "ts": timezone.now().isoformat(),
+    })
+
+
+def record_click(user, query, result):
+    _enqueue({
+        "kind": "click",
+        "user_id": user.id,
+        "query": (query or "")[:255],
+        "result": {
+            "title": result.get('title'),
+            "type": result.get('type'),
+            "href": result.get('href'),
+            "position": result.get('position'),
+        },
+        "ts": timezone.now().isoformat(),
+    })
+
+
+def _write_through(payload):
+    """Persist one event without the Redis buffer; count and log it when that fails too."""
+    global _dropped
+    try:
+        _persist_events([_decode(payload)])
+    except Exception as e:
+        _dropped += 1
+        if _dropped % 1000 == 1:
+            logger.error(f"Search telemetry event dropped ({_dropped} in this process): {e}")
+
+
+def _drain(batch_size):
+    """Atomically pop up to batch_size events from the Redis list."""
+    try:
+        client = get_redis_connection("default")
+        pipe = client.pipeline(transaction=True)
+        pipe.lrange(BUFFER_KEY, 0, batch_size - 1)
+        pipe.ltrim(BUFFER_KEY, batch_size, -1)
+        raw, _ = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Search telemetry flush could not reach Redis: {e}")
+        return []
+
+    events = []
+    for item in raw:
+        try:
+            events.append(_decode(item))
+        except (ValueError, TypeError, KeyError) as e:
+            _dead_letter(item, e)
+    return events
+
+
+def _database_available():
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+def _dead_letter(payload, error):
+    if not isinstance(payload, (str, bytes)):
+        payload = json.dumps(payload, default=str)
+    logger.error(f"Search telemetry event dead-lettered ({error}): {payload[:500]!r}")
+    try:
+        get_redis_connection("default").rpush(DEAD_LETTER_KEY, payload)
+    except Exception as e:
+        logger.warning(f"Search telemetry dead-letter list unavailable: {e}")
+
+
+def _increment_daily_stats(rollup):
+    if not rollup:
+        return
+    rows = [(day, query, *counts) for (day, query), counts in rollup.items()]
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(rows))
+    params = [value for row in rows for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO users_searchdailystat (date, query, searches, zero_result_searches, total_results, clicks)
+            VALUES {placeholders}
+            ON CONFLICT (date, query) DO UPDATE SET
+                searches = users_searchdailystat.searches + EXCLUDED.searches,
+                zero_result_searches = users_searchdailystat.zero_result_searches + EXCLUDED.zero_result_searches,
+                total_results = users_searchdailystat.total_results + EXCLUDED.total_results,
+                clicks = users_searchdailystat.clicks + EXCLUDED.clicks
+        """, params)
+
+
+def flush_events(batch_size=FLUSH_BATCH_SIZE):
+    """Persist buffered events. Returns (searches written, clicks applied)."""
+    events = _drain(batch_size)
+    if not events:
+        return 0, 0
+
+    try:
+        return _persist_events(events)
+    except Exception:
+        logger.exception("Search telemetry flush failed; retrying events one by one")
+
+    persisted, failed = (0, 0), []
+    for event in sorted(events, key=lambda e: e["ts"]):
+        try:
+            searches, clicks = _persist_events([event])
+            persisted = (persisted[0] + searches, persisted[1] + clicks)
+        except Exception as e:
+            failed.append((event, e))
+
+    if len(failed) == len(events) and not _database_available():
+        # Nothing can be written: keep the batch as it is
+        for event, _ in failed:
+            _enqueue(event)
+        raise failed[-1][1]
+
+    for event, error in failed:
+        event["attempts"] = event.get("attempts", 0) + 1
+        if event["attempts"] >= MAX_ATTEMPTS:
+            _dead_letter(event, error)
+        else:
+            _enqueue(event)
+    return persisted
+
+
+def _persist_events(events):
+    """Write one batch of events in one transaction. Returns (searches written, clicks applied)."""
+    searches = []
+    latest_search = {}      # (user_id, query) -> SearchAnalytics in this batch
+    pending_clicks = {}     # (user_id, query) -> click result for searches stored earlier
+    rollup = defaultdict(lambda: [0, 0, 0, 0])  # searches, zero results, total results, clicks
+
+    for event in sorted(events, key=lambda e: e["ts"]):
+        key = (event["user_id"], event["query"])
+        stats = rollup[(timezone.localdate(event["ts"]), _normalize(event["query"]))]
+
+        if event["kind"] == "search":
+            entry = SearchAnalytics(
+                user_id=event["user_id"],
+                query=event["query"],
+                filters=event["filters"],
+                results_count=event["results_count"],
+                has_results=event["results_count"] > 0,
+                timestamp=event["ts"],
+            )
+            searches.append(entry)
+            latest_search[key] = entry
+            stats[0] += 1
+            stats[1] += 0 if entry.has_results else 1
+            stats[2] += entry.results_count
+        else:
+            stats[3] += 1
+            if key in latest_search:
+                latest_search[key].clicked_result = event["result"]
+            else:
+                pending_clicks[key] = event["result"]
+
+    _persist(searches, pending_clicks, rollup)
+
+    click_count = sum(counts[3] for counts in rollup.values())
+    return len(searches), click_count
+
+
+def _persist(searches, pending_clicks, rollup):
+    with transaction.atomic():
+        SearchAnalytics.objects.bulk_create(searches, batch_size=1000)
+
+        clicked = []
+        if pending_clicks:
+            user_ids = {user_id for user_id, _ in pending_clicks}
+            queries = {query for _, query in pending_clicks}
+            candidates = (
+                SearchAnalytics.objects.filter(user_id__in=user_ids, query__in=queries)
+                .order_by('user_id', 'query', '-timestamp')
+                .distinct('user_id', 'query')
+            )
+            for entry in candidates:
+                result = pending_clicks.get((entry.user_id, entry.query))
+                if result is not None:
+                    entry.clicked_result = result
+                    clicked.append(entry)
+            SearchAnalytics.objects.bulk_update(clicked, ['clicked_result'], batch_size=1000)
+
+        _increment_daily_stats(rollup)
@@ -1,9 +1,11 @@
 # backend/users/signals.py
-from django.db.models.signals import post_save, pre_save, pre_delete
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.apps import apps
+from django.db import transaction
 from django.utils import timezone
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
@@ -13,6 +15,7 @@ from .serializers import (
     PostSerializer, CommentSerializer, ReactionSerializer, ShareSerializer, FriendshipSerializer
 )
 from .utils import send_push_notification
+from .search import SOURCES as SEARCH_SOURCES, schedule_index
 from payments.models import Payment
 
 User = get_user_model()
@@ -389,4 +392,50 @@ def update_unread_count_on_read(sender, instance, **kwargs):
                     "type": "unread_count",
                     "count": unread
                 }
-            )
\ No newline at end of file
+            )
+
+# ─── Search Index Maintenance ──────────────────────────────────────────────
+# Keep SearchDocument rows (users/search.py) in sync; indexing runs after commit.
+
+SEARCH_INDEXED_MODELS = {
+    'users.CustomUser': 'user',
+    'customers.Customer': 'customer',
+    'payments.Invoice': 'invoice',
+    'fleet.Vehicle': 'vehicle',
+    'procurement.Item': 'item',
+    'hr.Staff': 'staff',
+    'procurement.Supplier': 'supplier',
+}
+
+
+def reindex_search_document(sender, instance, **kwargs):
+    object_type = SEARCH_INDEXED_MODELS[sender._meta.label]
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not SEARCH_SOURCES[object_type].watches(update_fields):
+        return  # e.g. last_seen/is_online heartbeats
+    schedule_index(object_type, [instance.pk])
+
+    if object_type == 'user':
+        # Staff titles are built from the user's name
+        schedule_index('staff', apps.get_model('hr', 'Staff').objects.filter(user_id=instance.pk).values_list('pk', flat=True))
+    elif object_type == 'customer':
+        # Invoice documents carry the customer name and collector scope
+        schedule_index('invoice', instance.invoices.values_list('pk', flat=True))
+    elif object_type == 'invoice' and instance.customer_id:
+        # Customer subtitle shows the unpaid balance
+        schedule_index('customer', [instance.customer_id])
+
+
+for _label in SEARCH_INDEXED_MODELS:
+    post_save.connect(reindex_search_document, sender=_label, dispatch_uid=f"search_index_save_{_label}")
+    post_delete.connect(reindex_search_document, sender=_label, dispatch_uid=f"search_index_delete_{_label}")
+
+
+@receiver(m2m_changed, sender='customers.Village_collectors')
+def reindex_village_search_scope(sender, instance, action, pk_set, **kwargs):
+    """Collector reassignment changes who can see the village's customers and invoices."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from .tasks import reindex_search_objects
+    village_ids = [instance.pk] if not kwargs.get('reverse') else list(pk_set or [])
+    transaction.on_commit(lambda: reindex_search_objects.delay(village_ids=village_ids))
@@ -1,57 +1,28 @@
-import base64
-import uuid
 from datetime import timedelta
 
 from celery import shared_task
 from django.core.mail import send_mail, EmailMessage, EmailMultiAlternatives
 from django.conf import settings
-import requests
+from django.core.cache import cache
 import json
-from django.db.models import Sum
+from django.db.models import Q, Sum
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from io import BytesIO
-from .models import Post, CustomUser
+from .models import CustomUser, AnalyticsSnapshot
 from payments.models import Payment
-from .views import analytics_summary  # Reuse your summary logic
+from . import analytics
 from django.template.loader import render_to_string
 from django.utils import timezone
 from datetime import timedelta
 from customers.models import Customer
-from .admin import SPAM_KEYWORDS  # Import if defined in admin.py, or move to models/utils
+from notifications import sms
+from .spam import SUSPICIOUS_RULES, AUTO_FLAG_RULES, flag_recent_spam
 
 @shared_task(name='flag_suspicious_posts')
 def flag_suspicious_posts():
     print("Running automatic spam detection...")
-    flagged = 0
-    threshold = 50
-
-    recent_threshold = timezone.now() - timedelta(days=7)  # Only check recent posts
-
-    for post in Post.objects.filter(created_at__gte=recent_threshold):
-        score = 0
-
-        if (not post.content or len(post.content) < 15) and not post.media:
-            score += 40
-        if post.views > 0 and post.shares / post.views > 5:
-            score += 30
-        if any(kw in (post.content or '').lower() for kw in SPAM_KEYWORDS):
-            score += 25
-        similar = Post.objects.filter(user=post.user, content=post.content).count() - 1
-        if similar > 2:
-            score += 30
-        recent_count = Post.objects.filter(
-            user=post.user,
-            created_at__gte=timezone.now() - timedelta(hours=1)
-        ).count()
-        if recent_count > 5:
-            score += 35
-
-        if score >= threshold:
-            post.privacy = 'private'
-            post.save(update_fields=['privacy'])
-            flagged += 1
-
+    flagged = flag_recent_spam(SUSPICIOUS_RULES)
     print(f"Flagged {flagged} suspicious posts automatically.")
     return flagged
 
@@ -61,40 +32,7 @@ def auto_flag_spam_posts():
     Runs periodically - finds and flags suspicious posts
     """
     print("Starting automatic spam flagging...")
-    flagged = 0
-    threshold = 60  # stricter for automatic action
-
-    # Only check relatively recent posts
-    recent = timezone.now() - timedelta(days=14)
-
-    for post in Post.objects.filter(created_at__gte=recent):
-        score = 0
-
-        if (not post.content or len(post.content.strip()) < 15) and not post.media:
-            score += 45
-        if post.views > 0 and post.shares / post.views > 6:
-            score += 35
-        if any(kw in (post.content or '').lower() for kw in SPAM_KEYWORDS):
-            score += 30
-        similar = Post.objects.filter(
-            user=post.user,
-            content=post.content
-        ).exclude(id=post.id).count()
-        if similar > 3:
-            score += 35
-        recent_count = Post.objects.filter(
-            user=post.user,
-            created_at__gte=timezone.now() - timedelta(hours=1)
-        ).count()
-        if recent_count > 8:
-            score += 40
-
-        if score >= threshold:
-            post.privacy = 'private'
-            post.is_announcement = False
-            post.save(update_fields=['privacy', 'is_announcement'])
-            flagged += 1
-
+    flagged = flag_recent_spam(AUTO_FLAG_RULES)
     print(f"Auto-flagged {flagged} suspicious posts.")
     return flagged
 
@@ -106,9 +44,14 @@ def send_weekly_analytics_report():
 
     payments = Payment.objects.filter(created_at__date__range=[start_of_week, end_of_week])
 
-    total_revenue = payments.aggregate(total=Sum('amount'))['total'] or 0
-    collections = payments.filter(status='completed').aggregate(total=Sum('amount'))['total'] or 0
-    pending = payments.filter(status='pending').aggregate(total=Sum('amount'))['total'] or 0
+    totals = payments.aggregate(
+        total=Sum('amount'),
+        collections=Sum('amount', filter=Q(status='Successful')),
+        pending=Sum('amount', filter=Q(status='Pending')),
+    )
+    total_revenue = totals['total'] or 0
+    collections = totals['collections'] or 0
+    pending = totals['pending'] or 0
 
     top_village = payments.values('customer__village').annotate(total=Sum('amount')).order_by('-total').first()
     top_village_name = top_village['customer__village'] if top_village else "N/A"
@@ -140,14 +83,8 @@ def send_weekly_analytics_report():
 
 @shared_task
 def send_weekly_pdf_report():
-    # Simulate request object for analytics_summary
-    class FakeRequest:
-        GET = {}
-        user = None  # You can add auth if needed
-
-    request = FakeRequest()
-    response = analytics_summary(request)
-    data = response.data
+    # Same payload as analytics_summary, read from the latest payments snapshot
+    data = analytics.snapshot_payload(analytics.get_snapshot('payments'))
 
     # Generate PDF in memory
     buffer = BytesIO()
@@ -230,35 +167,11 @@ def send_email_notification(recipient_email, subject, message):
 @shared_task
 def send_mtn_sms_notification(phone_number, message):
     """
-    Async MTN SMS notification using MTN API.
+    Async MTN SMS notification through the shared SMS gateway (notifications.sms).
     """
-    try:
-        url = settings.MTN_SMS['BASE_URL'] + '/collection/token/'
-        headers = {
-            'Authorization': 'Basic ' + base64.b64encode(f"{settings.MTN_CLIENT_ID}:{settings.MTN_CLIENT_SECRET}".encode()).decode(),
-            'Ocp-Apim-Subscription-Key': settings.MTN_API_KEY,
-        }
-        response = requests.post(url, headers=headers)
-        token = response.json().get('access_token')
-
-        sms_url = settings.MTN_SMS['BASE_URL'] + '/collection/v1_0/requesttopay'
-        sms_headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Ocp-Apim-Subscription-Key': settings.MTN_API_KEY,
-        }
-        sms_data = {
-            'amount': '1',  # MTN SMS requires amount for requesttopay
-            'currency': 'RWF',
-            'externalId': str(uuid.uuid4()),
-            'payer': {'partyIdType': 'MSISDN', 'partyId': phone_number},
-            'payerMessage': message[:160],  # MTN SMS limit
-            'payeeNote': 'High Prosper Notification',
-        }
-        sms_response = requests.post(sms_url, headers=sms_headers, json=sms_data)
-        return f"SMS sent to {phone_number}: {sms_response.status_code}"
-    except Exception as e:
-        return f"SMS failed for {phone_number}: {str(e)}"
+    if sms.send_sms(phone_number, message[:160]):  # MTN SMS limit
+        return f"SMS sent to {phone_number}"
+    return f"SMS failed for {phone_number}"
 
 @shared_task
 def send_notification(notification_id):
@@ -283,3 +196,49 @@ def clean_online_status():
         last_seen__lt=threshold
     ).update(is_online=False)
     print(f"Set {updated} users offline.")
+
+@shared_task(name='rebuild_search_index')
+def rebuild_search_index(object_types=None):
+    """Nightly full rebuild of the GlobalSearchView index (heals any missed signal)."""
+    from .search import rebuild_index
+    stats = rebuild_index(object_types)
+    print(f"Search index rebuilt: {stats}")
+    return stats
+
+@shared_task
+def reindex_search_objects(village_ids=None):
+    """Re-index customers and invoices of villages whose collectors changed."""
+    from payments.models import Invoice
+    from .search import index_objects
+    customer_ids = list(Customer.objects.filter(village_id__in=village_ids or []).values_list('id', flat=True))
+    index_objects('customer', customer_ids)
+    index_objects('invoice', Invoice.objects.filter(customer_id__in=customer_ids).values_list('id', flat=True))
+    return len(customer_ids)
+
+@shared_task(name='flush_search_events')
+def flush_search_events():
+    """Drain buffered search/click events into SearchAnalytics and the daily roll-ups."""
+    from .search_telemetry import flush_events
+    searches, clicks = flush_events()
+    return {"searches": searches, "clicks": clicks}
+
+
+@shared_task(name='refresh_analytics_snapshot')
+def refresh_analytics_snapshot(kind, full=False):
+    """Recompute one dashboard snapshot (queued by users.analytics.get_snapshot when stale)."""
+    try:
+        snapshot = analytics.refresh_snapshot(kind, full=full)
+        print(f"Refreshed {kind} analytics snapshot in {snapshot.duration_ms} ms (full={snapshot.is_full})")
+        return snapshot.id
+    finally:
+        cache.delete(analytics.REFRESH_LOCK_KEY.format(kind=kind))
+
+
+@shared_task(name='refresh_analytics_snapshots')
+def refresh_analytics_snapshots(full=False):
+    """Periodic refresh of every snapshot kind; the nightly full run also prunes old snapshots."""
+    for kind, _ in AnalyticsSnapshot.KIND_CHOICES:
+        refresh_analytics_snapshot(kind, full=full)
+    if full:
+        pruned = analytics.prune_snapshots()
+        print(f"Pruned {pruned} old analytics snapshots")
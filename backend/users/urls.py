@@ -44,7 +44,7 @@ from .views import (
     analytics_summary, send_report_email,
 
     # Search & Notifications
-    GlobalSearchView, SearchClickView,
+    GlobalSearchView, SearchClickView, SearchAnalyticsSummaryView,
     get_notifications, mark_as_read, mark_all_as_read,
     save_push_subscription, send_push_notification,
     update_last_seen, UserAnalyticsAPIView, ExportUsersPDFAPIView, ExportUsersExcelAPIView, BlockedUserAnalyticsAPIView,
@@ -100,6 +100,7 @@ urlpatterns = [
     path('admin/users/export_pdf/', ExportUsersPDFAPIView.as_view(), name='export-users-pdf'),
     path('admin/users/export_excel/', ExportUsersExcelAPIView.as_view(), name='export-users-excel'),
     path('admin/blocked-analytics/', BlockedUserAnalyticsAPIView.as_view(), name='blocked-user-analytics'),
+    path('admin/search-analytics/', SearchAnalyticsSummaryView.as_view(), name='search-analytics'),
 
     # 4. Chat & Messaging
     path('messages/', ChatMessageListCreateView.as_view(), name='messages-list-create'),
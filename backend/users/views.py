@@ -1,16 +1,14 @@
 import json
 import secrets
-import traceback
-from decimal import Decimal
 
 from asgiref.sync import async_to_sync
 from django.contrib.auth.hashers import make_password
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.messages import get_messages
 from django.core.exceptions import PermissionDenied
-from django.db.models.functions import TruncMonth, TruncDay, ExtractHour, ExtractIsoWeekDay
+from django.db.models.functions import TruncDay
 from django.db import models
-from django.db.models import Q, Sum, Count, Value, CharField, Func, F, OuterRef, Exists
+from django.db.models import Q, Sum, Count, CharField
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets, views, permissions, generics
@@ -25,55 +23,41 @@ from channels.layers import get_channel_layer
 import io
 
 from reportlab.lib.pagesizes import A4
-from django.http import HttpResponse, JsonResponse
-import csv
+from django.http import HttpResponse
 from django.utils import timezone
 from django.core.mail import send_mail, EmailMessage
 import random
 from datetime import timedelta, datetime
 from django.conf import settings
-from payments.models import Payment, PaymentMethod
+from payments.models import Payment
 from pywebpush import webpush, WebPushException
 from .models import Sticker, BlockedUser
 from .permissions import IsOwnerOrAdmin
 from django.core.files.storage import default_storage
-from hr.services import MTNSMSService, EmailService
+from hr.services import EmailService
+from notifications import sms
 from .utils import require_group_admin
-from customers.models import Customer
+from . import analytics, search as search_index, search_telemetry
+from .exports import UserCSVExport, UserExcelExport, UserPDFExport
+from reports.exports import export_response, stream_export
 from django.core.cache import cache
-from collector.models import Collector
 from notifications.models import Notification
-from fleet.models import Vehicle
-from hr.models import Staff
-from payments.models import Invoice
-from procurement.models import Item, Supplier
-from django.db.models.functions import Lower, Concat
+from django.db.models.functions import Lower
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.pagination import PageNumberPagination
-from reportlab.lib.pagesizes import landscape, letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as ReportLabImage, \
-    PageBreak, PageTemplate, Frame
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Frame
+from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
-from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.graphics.charts.linecharts import HorizontalLineChart
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from openpyxl.formatting.rule import CellIsRule, FormulaRule
-from openpyxl.chart import PieChart, BarChart, LineChart, Reference
-from openpyxl.chart.label import DataLabelList
-import os
 
 from .models import (
     CustomUser, UserProfile, ChatMessage, Sticker, MessageReaction,
-    ChatRoom, RoomMember, Post, Comment, Reaction, Share, Friendship, Activity, OTP, SearchAnalytics
+    ChatRoom, RoomMember, Post, Comment, Reaction, Share, Friendship, Activity, OTP,
+    SearchDailyStat
 )
 from .serializers import (
     UserSerializer, LoginSerializer, UserUpdateSerializer,
@@ -89,43 +73,6 @@ User = get_user_model()
 # Temporary OTP store (in-memory). For production use Redis or database table.
 OTP_STORE = {}
 
-# ─── Configuration ──────────────────────────────────────────────────────────
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-STATIC_DIR = os.path.join(BASE_DIR, 'static')
-LOGO_PATH = os.path.join(STATIC_DIR, 'logo.png')  # Update to your real logo path
-
-SOCIAL_ICONS = {
-    "Twitter/X": {
-        "icon": os.path.join(STATIC_DIR, 'social', 'twitter.png'),
-        "url": "https://twitter.com/highprosper_rw"
-    },
-    "Facebook": {
-        "icon": os.path.join(STATIC_DIR, 'social', 'facebook.png'),
-        "url": "https://facebook.com/highprosper"
-    },
-    "LinkedIn": {
-        "icon": os.path.join(STATIC_DIR, 'social', 'linkedin.png'),
-        "url": "https://linkedin.com/company/highprosper"
-    },
-    "Instagram": {
-        "icon": os.path.join(STATIC_DIR, 'social', 'instagram.png'),
-        "url": "https://instagram.com/highprosper_rw"
-    },
-    "WhatsApp": {
-        "icon": os.path.join(STATIC_DIR, 'social', 'whatsapp.png'),
-        "url": "https://wa.me/250788123456"
-    },
-    "Telegram": {
-        "icon": os.path.join(STATIC_DIR, 'social', 'telegram.png'),
-        "url": "https://t.me/highprosper_rw"
-    }
-}
-
-COMPANY_NAME = "High Prosper Services Ltd"
-COMPANY_LOCATION = "Kigali, Rwanda"
-COMPANY_PHONE = "+250 788 123 456"
-COMPANY_EMAIL = "info@highprosper.com"
-
 # Custom Pagination
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
@@ -852,23 +799,14 @@ class GlobalSearchView(APIView):
         }
         filters_clean = {k: v for k, v in filters.items() if v}
 
-        # Log search analytics (except suggestions)
-        analytics_entry = None
-        if not suggest and (query or filters_clean):
-            analytics_entry = SearchAnalytics.objects.create(
-                user=user,
-                query=query,
-                filters=filters_clean,
-                results_count=0,
-                has_results=False,
-            )
+        # Log search analytics (except suggestions) — buffered, flushed in batches
+        log_search = not suggest and (query or filters_clean)
 
         if len(query) < 2 and not suggest:
+            if log_search:
+                search_telemetry.record_search(user, query, filters_clean, 0)
             return Response({"results": []})
 
-        is_admin = user.role in ['ceo', 'admin', 'manager']
-        is_collector = user.role == 'collector'
-
         # Parse dates
         date_from_obj = None
         date_to_obj = None
@@ -884,230 +822,27 @@ class GlobalSearchView(APIView):
                 pass
 
         if suggest:
-            # Real-time suggestions — unique titles only
-            titles = set()
-
-            # Customers
-            customer_qs = Customer.objects.all()
-            if is_collector:
-                customer_qs = customer_qs.filter(collector=user)
-            titles.update(customer_qs.filter(name__icontains=query).values_list('name', flat=True)[:8])
-
-            # Invoices
-            invoice_qs = Invoice.objects.all()
-            if is_collector:
-                invoice_qs = invoice_qs.filter(customer__collector=user)
-            titles.update(
-                invoice_qs.annotate(
-                    title=Concat(
-                        Value('Invoice '),
-                        'period_year',
-                        Value('-'),
-                        Func(F('period_month'), function='LPAD', arg2=Value(2), arg3=Value('0'))
-                    )
-                ).values_list('title', flat=True)[:8]
-            )
-
-            # Vehicles (admin only)
-            if is_admin:
-                titles.update(
-                    Vehicle.objects.filter(
-                        Q(registration_number__icontains=query) |
-                        Q(brand__icontains=query) |
-                        Q(model__icontains=query)
-                    )
-                    .annotate(full_title=Concat('registration_number', Value(' — '), 'brand', Value(' '), 'model'))
-                    .values_list('full_title', flat=True)[:8]
-                )
-
-            # Items
-            titles.update(Item.objects.filter(Q(name__icontains=query) | Q(sku__icontains=query)).values_list('name', flat=True)[:8])
-
-            # Staff (admin only)
-            if is_admin:
-                titles.update(
-                    Staff.objects.select_related('user')
-                    .filter(
-                        Q(user__username__icontains=query) |
-                        Q(user__first_name__icontains=query) |
-                        Q(user__last_name__icontains=query)
-                    )
-                    .annotate(full_name=Concat('user__first_name', Value(' '), 'user__last_name'))
-                    .values_list('full_name', flat=True)[:8]
-                )
-
-            # Suppliers (admin only)
-            if is_admin:
-                titles.update(Supplier.objects.filter(name__icontains=query).values_list('name', flat=True)[:8])
-
-            suggestions = list(titles)[:8]
-            return Response({"suggestions": suggestions})
-
-        # Full search mode
-        all_results = []
-        total_count = 0
-        offset = (page - 1) * limit
-
-        # Helper to add results
-        def add_results(qs, result_type, title_expr, subtitle_template, href_template):
-            nonlocal total_count
-            count = qs.count()
-            total_count += count
-            for item in qs:
-                title = title_expr(item)
-                relevance = 0 if query and query.lower() in title.lower() else 1
-                all_results.append({
-                    "id": item.id,
-                    "title": title,
-                    "subtitle": subtitle_template(item),
-                    "type": result_type,
-                    "href": href_template(item),
-                    "relevance": relevance
-                })
-
-        # 1. Users (Admins only)
-        if is_admin and (not type_filter or type_filter == 'user'):
-            qs = CustomUser.objects.filter(
-                Q(username__icontains=query) |
-                Q(first_name__icontains=query) |
-                Q(last_name__icontains=query) |
-                Q(phone__icontains=query) |
-                Q(email__icontains=query)
-            )
-            add_results(
-                qs, "user",
-                lambda u: u.get_full_name() or u.username,
-                lambda u: f"{u.get_role_display()} • {u.phone or 'No phone'}",
-                lambda u: f"/users/{u.id}"
-            )
-
-        # 2. Customers
-        if not type_filter or type_filter == 'customer':
-            qs = Customer.objects.all()
-            if is_collector:
-                qs = qs.filter(collector=user)
-            if query:
-                qs = qs.filter(
-                    Q(name__icontains=query) |
-                    Q(phone__icontains=query) |
-                    Q(village__name__icontains=query)
-                )
-
-            add_results(
-                qs, "customer",
-                lambda c: c.name,
-                lambda c: f"Customer • {c.phone} • Balance: RWF {c.balance:,}",
-                lambda c: f"/customers/{c.id}"
-            )
-
-        # 3. Invoices
-        if not type_filter or type_filter == 'invoice':
-           qs = Invoice.objects.all()
-           if is_collector:
-               qs = qs.filter(customer__collector=user)
-           if query:
-               # Search in customer name or period (as string)
-               qs = qs.filter(
-                   Q(customer__name__icontains=query) |  # assuming customer has 'name'
-                   Q(period_year__icontains=query) |
-                   Q(period_month__icontains=query)
-               )
-           if status_filter:
-               qs = qs.filter(status__iexact=status_filter)
-           if date_from_obj:
-               qs = qs.filter(due_date__gte=date_from_obj)
-           if date_to_obj:
-               qs = qs.filter(due_date__lte=date_to_obj)
-
-               add_results(
-                   qs, "invoice",
-                   lambda i: f"Invoice {i.period_year}-{i.period_month:02d}",  # e.g., "Invoice 2025-12"
-                   lambda i: f"Invoice • RWF {i.amount:,} • {i.status}",
-                   lambda i: f"/payments/invoices/{i.id}"
-               )
-
-        # 4. Vehicles (Admins only)
-        if is_admin and (not type_filter or type_filter == 'vehicle'):
-            qs = Vehicle.objects.all()
-            if query:
-                qs = qs.filter(
-                    Q(registration_number__icontains=query) |
-                    Q(brand__icontains=query) |
-                    Q(model__icontains=query)
-                )
-            if status_filter:
-                qs = qs.filter(status__iexact=status_filter)
-            add_results(
-                qs, "vehicle",
-                lambda v: f"{v.registration_number} — {v.brand} {v.model}",
-                lambda v: f"Vehicle • {v.vehicle_type} • {v.status}",
-                lambda v: f"/fleet/vehicles/{v.id}"
-            )
-
-        # 5. Items
-        if not type_filter or type_filter == 'item':
-            qs = Item.objects.all()
-            if query:
-                qs = qs.filter(
-                    Q(name__icontains=query) |
-                    Q(sku__icontains=query)
-                )
-            add_results(
-                qs, "item",
-                lambda i: i.name,
-                lambda i: f"{i.get_item_type_display()} • {i.sku}",
-                lambda i: f"/procurement/items/{i.id}"
-            )
-
-        # 6. Staff (Admins only)
-        if is_admin and (not type_filter or type_filter == 'staff'):
-            qs = Staff.objects.select_related('user')
-            if query:
-                qs = qs.filter(
-                    Q(user__username__icontains=query) |
-                    Q(user__first_name__icontains=query) |
-                    Q(user__last_name__icontains=query) |
-                    Q(position__icontains=query)
-                )
-            add_results(
-                qs, "staff",
-                lambda s: s.user.get_full_name() or s.user.username,
-                lambda s: f"Staff • {s.position} • {s.department}",
-                lambda s: f"/hr/staff/{s.id}"
-            )
-
-        # 7. Suppliers (Admins only)
-        if is_admin and (not type_filter or type_filter == 'supplier'):
-            qs = Supplier.objects.all()
-            if query:
-                qs = qs.filter(
-                    Q(name__icontains=query) |
-                    Q(code__icontains=query) |
-                    Q(phone__icontains=query)
-                )
-            add_results(
-                qs, "supplier",
-                lambda s: s.name,
-                lambda s: f"Supplier • {s.code}",
-                lambda s: f"/procurement/suppliers/{s.id}"
-            )
-
-        # Sort by relevance (exact title matches first)
-        all_results.sort(key=lambda x: x['relevance'])
-
-        # Pagination
-        paginated = all_results[offset:offset + limit]
+            # Real-time suggestions — unique titles only (prefix-indexed)
+            return Response({"suggestions": search_index.suggest(user, query)})
+
+        # Full search mode — ranked, role-scoped and paginated in the database
+        results, total_count = search_index.search(
+            user, query,
+            type_filter=type_filter,
+            status=status_filter,
+            date_from=date_from_obj,
+            date_to=date_to_obj,
+            page=page,
+            limit=limit,
+        )
         total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
 
-        # Update analytics
-        if analytics_entry:
-            analytics_entry.results_count = len(paginated)
-            analytics_entry.has_results = len(paginated) > 0
-            analytics_entry.save(update_fields=['results_count', 'has_results'])
+        if log_search:
+            search_telemetry.record_search(user, query, filters_clean, len(results))
 
         return Response({
-            "results": paginated,
-            "count": len(paginated),
+            "results": results,
+            "count": len(results),
             "total_count": total_count,
             "page": page,
             "total_pages": total_pages,
@@ -1125,23 +860,54 @@ class SearchClickView(APIView):
         query = data.get('search_term', '')
         result = data.get('result', {})
 
-        # Find the most recent search by this user with matching query
-        recent_search = SearchAnalytics.objects.filter(
-            user=user,
-            query=query
-        ).order_by('-timestamp').first()
-
-        if recent_search:
-            recent_search.clicked_result = {
-                "title": result.get('title'),
-                "type": result.get('type'),
-                "href": result.get('href'),
-                "position": result.get('position')
-            }
-            recent_search.save(update_fields=['clicked_result'])
+        # Attached to the most recent matching search when the buffer is flushed
+        search_telemetry.record_click(user, query, result)
 
         return Response({"status": "logged"})
 
+class SearchAnalyticsSummaryView(APIView):
+    """
+    GET /api/v1/users/admin/search-analytics/?days=30
+    Search volume, zero-result queries and click-through, read from the daily roll-up table
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            days = min(365, max(1, int(request.GET.get('days', 30))))
+        except (TypeError, ValueError):
+            return Response({"error": "days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        since = timezone.localdate() - timedelta(days=days - 1)
+        stats = SearchDailyStat.objects.filter(date__gte=since)
+
+        totals = stats.aggregate(
+            searches=Sum('searches'),
+            zero_results=Sum('zero_result_searches'),
+            clicks=Sum('clicks'),
+        )
+        searches = totals['searches'] or 0
+        daily = (
+            stats.values('date')
+            .annotate(searches=Sum('searches'), zero_results=Sum('zero_result_searches'), clicks=Sum('clicks'))
+            .order_by('date')
+        )
+        by_query = stats.values('query').annotate(
+            searches=Sum('searches'),
+            zero_results=Sum('zero_result_searches'),
+            clicks=Sum('clicks'),
+        )
+
+        return Response({
+            "days": days,
+            "total_searches": searches,
+            "zero_result_searches": totals['zero_results'] or 0,
+            "total_clicks": totals['clicks'] or 0,
+            "click_through_rate": round((totals['clicks'] or 0) / searches * 100, 2) if searches else 0.0,
+            "daily": list(daily),
+            "top_queries": list(by_query.order_by('-searches')[:20]),
+            "zero_result_queries": list(by_query.filter(zero_results__gt=0).order_by('-zero_results')[:20]),
+        })
+
 def send_notification_to_user(user_id: int, title: str, message: str, notification_type="info", action_url=None, image=None):
     channel_layer = get_channel_layer()
     if channel_layer:
@@ -1257,9 +1023,9 @@ class AdminResetPasswordView(APIView):
 
         # Send notifications
         if user.phone:
-            MTNSMSService(
-                phone_number=user.phone,
-                message=f"Your password has been reset. Username: {user.username}, Password: default123. Please change it after login."
+            sms.send_sms(
+                user.phone,
+                f"Your password has been reset. Username: {user.username}, Password: default123. Please change it after login."
             )
         if user.email:
             EmailService(
@@ -1438,20 +1204,7 @@ class LoginVerifyOTPView(APIView):
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
 def admin_users_export_csv(request):
-    users = CustomUser.objects.all().order_by("id")
-
-    # Create HTTP response
-    response = HttpResponse(content_type="text/csv")
-    timestamp = timezone.now().strftime("%Y-%m-%d_%H-%M-%S")
-    response["Content-Disposition"] = f'attachment; filename="users_report_{timestamp}.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(["ID", "Username", "Email", "Role", "Date Joined"])
-
-    for user in users:
-        writer.writerow([user.id, user.username, user.email, user.role, user.date_joined.strftime("%Y-%m-%d")])
-
-    return response
+    return stream_export(UserCSVExport(user=request.user), 'csv')
 
 
 # ---------------- PDF EXPORT FOR USERS ----------------
@@ -2749,232 +2502,29 @@ def notification_settings(request):
 def analytics_summary(request):
     """
     Comprehensive analytics endpoint for High Prosper Admin Dashboard (2026)
-    Fixed: PostgreSQL-compatible date grouping with TO_CHAR()
+    Unfiltered requests are served from the latest payments snapshot (users.analytics);
+    filtered requests are aggregated live. ?refresh=true forces a new snapshot.
     """
-    start_date = request.GET.get('start')
-    end_date = request.GET.get('end')
-    village = request.GET.get('village')
-    method_name = request.GET.get('method')
-
-    # Base querysets
-    payments = Payment.objects.all()
-    customers = Customer.objects.all()
-    collectors = Collector.objects.filter(is_active=True, is_deleted=False)
-
-    # Apply date range filters
-    if start_date:
-        payments = payments.filter(created_at__date__gte=start_date)
-        customers = customers.filter(created_at__date__gte=start_date)
-    if end_date:
-        payments = payments.filter(created_at__date__lte=end_date)
-        customers = customers.filter(created_at__date__lte=end_date)
-
-    # Apply village filter
-    if village:
-        payments = payments.filter(customer__village__name=village)
-        customers = customers.filter(village__name=village)
-
-    # Apply payment method filter
-    if method_name:
-        try:
-            method_obj = PaymentMethod.objects.get(name=method_name)
-            payments = payments.filter(method=method_obj)
-        except PaymentMethod.DoesNotExist:
-            pass
-
-    # === 1. Total Revenue ===
-    total_revenue = payments.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # === 2. Collections (Successful payments) ===
-    collections = payments.filter(status='Successful').aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # === 3. Pending Payments ===
-    pending = payments.filter(status='Pending').aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # === Previous Period for Growth Comparison ===
-    prev_start = (timezone.now().date() - timedelta(days=60)).strftime('%Y-%m-%d')
-    prev_end = (timezone.now().date() - timedelta(days=30)).strftime('%Y-%m-%d')
-    prev_payments = Payment.objects.filter(created_at__date__gte=prev_start, created_at__date__lte=prev_end)
-    prev_revenue = prev_payments.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    revenue_growth = ((total_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else Decimal('0')
-
-    # === 4. Payment Methods Breakdown ===
-    payment_methods = payments.values('method__name').annotate(
-        count=Count('id'),
-        total=Sum('amount')
-    ).order_by('-count')
-    payment_methods_dict = {
-        item['method__name'] or 'Unknown': {
-            'count': item['count'],
-            'total': item['total'] or Decimal('0')
-        }
-        for item in payment_methods
+    filters = {
+        'start_date': request.GET.get('start'),
+        'end_date': request.GET.get('end'),
+        'village': request.GET.get('village'),
+        'method_name': request.GET.get('method'),
     }
 
-    # Most Used Method
-    most_used_method = None
-    most_used_count = 0
-    if payment_methods_dict:
-        most_used_method, data = max(payment_methods_dict.items(), key=lambda x: x[1]['count'])
-        most_used_count = data['count']
-
-    # === 5. Top Customers ===
-    top_customers = payments.values(
-        'customer__name', 'customer__village__name'
-    ).annotate(
-        total_paid=Sum('amount')
-    ).order_by('-total_paid')[:10]
-
-    # === 6. Customer Growth (PostgreSQL: TO_CHAR) ===
-    customer_growth = customers.extra({
-        'month': "TO_CHAR(created_at, 'YYYY-MM')"
-    }).values('month').annotate(count=Count('id')).order_by('month')
-
-    # === 7. Daily, Weekly, Monthly Revenue (PostgreSQL) ===
-    daily_revenue = payments.extra({
-        'date': "DATE(created_at)"
-    }).values('date').annotate(amount=Sum('amount')).order_by('date')
-
-    weekly_revenue = payments.extra({
-        'week': "EXTRACT(week FROM created_at)"
-    }).values('week').annotate(amount=Sum('amount')).order_by('week')
-
-    monthly_revenue = payments.extra({
-        'month': "TO_CHAR(created_at, 'YYYY-MM')"
-    }).values('month').annotate(amount=Sum('amount')).order_by('month')
-
-    # === 8. Collector Performance with Monthly Trends & Incentives ===
-    collector_performance = []
-
-    for collector in collectors:
-        collector_payments = payments.filter(customer__village__collectors=collector)
-
-        monthly_trends = collector_payments.extra({
-            'month': "TO_CHAR(created_at, 'YYYY-MM')"
-        }).values('month').annotate(
-            collected=Sum('amount', filter=Q(status='Successful')),
-            pending=Sum('amount', filter=Q(status='Pending'))
-        ).order_by('month')
-
-        total_collected = collector_payments.filter(status='Successful').aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        pending_collected = collector_payments.filter(status='Pending').aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        customers_count = Customer.objects.filter(village__collectors=collector).count()
-        avg_per_customer = total_collected / Decimal(customers_count) if customers_count > 0 else Decimal('0')
-
-        # Tiered Bonus Calculation
-        bonus = Decimal('0')
-        if total_collected > collector.target_amount * Decimal('1.2'):
-            bonus = total_collected * Decimal('0.15')
-        elif total_collected >= collector.target_amount:
-            bonus = total_collected * Decimal('0.10')
-        elif total_collected >= collector.target_amount * Decimal('0.9'):
-            bonus = total_collected * Decimal('0.05')
-
-        collector_performance.append({
-            "collector": collector.user.get_full_name() or collector.user.username,
-            "villages": ", ".join(v.name for v in collector.villages.all()) or "None",
-            "customers": customers_count,
-            "total_collected": float(total_collected),
-            "pending": float(pending_collected),
-            "avg_per_customer": float(avg_per_customer),
-            "bonus": float(bonus),
-            "target_amount": float(collector.target_amount or 0),
-            "monthly_trends": [
-                {
-                    "month": item['month'],
-                    "collected": float(item['collected'] or 0),
-                    "pending": float(item['pending'] or 0),
-                    "avg": float((item['collected'] or 0) / Decimal(customers_count) if customers_count > 0 else 0)
-                }
-                for item in monthly_trends
-            ]
-        })
-
-    # Sort by total collected
-    collector_performance.sort(key=lambda x: x['total_collected'], reverse=True)
-
-    # === AI-Powered Insights ===
-    insights = []
-
-    # Top Performing Village
-    village_performance = payments.values('customer__village__name').annotate(total=Sum('amount')).order_by('-total')[:3]
-    if village_performance:
-        top_village = village_performance[0]
-        insights.append({
-            "title": "Top Performing Village",
-            "message": f"{top_village['customer__village__name']} generated {top_village['total']:,} RWF — focus marketing here!",
-            "type": "success"
-        })
-
-    # Fastest Growing Village
-    growth_by_village = customers.values('village__name').annotate(count=Count('id')).order_by('-count')[:3]
-    if growth_by_village:
-        fastest = growth_by_village[0]
-        insights.append({
-            "title": "Fastest Growing Village",
-            "message": f"{fastest['village__name']} added {fastest['count']} new customers this period!",
-            "type": "growth"
-        })
-
-    # Payment Method Recommendation
-    if most_used_method:
-        insights.append({
-            "title": "Recommended Payment Method",
-            "message": f"{most_used_method} is most popular ({most_used_count} transactions) — promote it more!",
-            "type": "info"
-        })
-
-    # Risk Alert: High Pending
-    pending_ratio = (pending / total_revenue * 100) if total_revenue > 0 else 0
-    if pending_ratio > 30:
-        insights.append({
-            "title": "High Pending Risk",
-            "message": f"Pending payments are {pending_ratio:.1f}% of revenue — follow up urgently!",
-            "type": "warning"
-        })
-
-    # Daily Revenue Alert
-    today_amount = Decimal('0')
-    if daily_revenue:
-        last_entry = daily_revenue.order_by('-date').first()
-        today_amount = last_entry['amount'] if last_entry else Decimal('0')
-
-    avg_daily = Decimal('0')
-    if daily_revenue:
-        total_daily = sum(d['amount'] or Decimal('0') for d in daily_revenue)
-        avg_daily = total_daily / Decimal(len(daily_revenue)) if daily_revenue else Decimal('0')
-
-    if today_amount < avg_daily * Decimal('0.7'):
-        insights.append({
-            "title": "Daily Revenue Alert",
-            "message": f"Today's revenue ({today_amount:,} RWF) is below average — check activity!",
-            "type": "warning"
-        })
-
-    # === AI-Generated Report Summary ===
-    summary_parts = []
-    if revenue_growth > 0:
-        summary_parts.append(f"Revenue grew by {revenue_growth:.1f}%")
+    if any(filters.values()):
+        response_data = analytics.payment_summary(**filters)
+    elif request.GET.get('refresh', '').lower() in ('1', 'true', 'yes'):
+        response_data = analytics.snapshot_payload(analytics.refresh_snapshot('payments'))
     else:
-        summary_parts.append(f"Revenue declined by {abs(revenue_growth):.1f}%")
-
-    if pending_ratio > 30:
-        summary_parts.append("high pending payments detected")
-    elif pending_ratio > 15:
-        summary_parts.append("moderate pending payments")
-
-    if most_used_method:
-        summary_parts.append(f"{most_used_method} is the dominant payment method")
-
-    report_summary = "Summary: " + ", ".join(summary_parts) + "." if summary_parts else "No data available yet."
+        response_data = analytics.snapshot_payload(analytics.get_snapshot('payments'))
 
     # === Email Alerts for Critical Insights ===
-    critical_insights = [i for i in insights if i["type"] == "warning"]
+    critical_insights = [i for i in response_data["insights"] if i["type"] == "warning"]
     if critical_insights:
         subject = "URGENT: Critical Insights Detected in High Prosper Analytics"
         message = "\n".join([f"- {i['title']}: {i['message']}" for i in critical_insights])
-        message += f"\n\nFull Report: {report_summary}"
+        message += f"\n\nFull Report: {response_data['reportSummary']}"
         send_mail(
             subject,
             message,
@@ -2983,25 +2533,6 @@ def analytics_summary(request):
             fail_silently=False,
         )
 
-    # === Final Response ===
-    response_data = {
-        "totalRevenue": float(total_revenue),
-        "collections": float(collections),
-        "pending": float(pending),
-        "paymentMethods": payment_methods_dict,
-        "topCustomers": list(top_customers),
-        "customerGrowth": list(customer_growth),
-        "revenue": {
-            "daily": list(daily_revenue),
-            "weekly": list(weekly_revenue),
-            "monthly": list(monthly_revenue),
-        },
-        "collectorPerformance": collector_performance,
-        "insights": insights,
-        "reportSummary": report_summary,
-        "revenueGrowth": float(revenue_growth)
-    }
-
     return Response(response_data)
 
 @api_view(['POST'])
@@ -3030,420 +2561,22 @@ class UserAnalyticsAPIView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        now = timezone.now()
-        online_threshold = now - timedelta(minutes=5)      # considered online
-        inactive_threshold = now - timedelta(days=30)      # inactive if no activity
-        today = now.date()
-        this_month_start = today.replace(day=1)
-        month_ago = now - timedelta(days=30)
-        year_ago = now - timedelta(days=365)
-
-        # Base queryset
-        all_users = CustomUser.objects.all()
-
-        # ─── Basic Counts ───────────────────────────────────────────────────────
-        total_users = all_users.count()
-        users_by_role = dict(
-            all_users.values('role').annotate(count=Count('id')).values_list('role', 'count')
-        )
-
-        total_online = all_users.filter(
-            is_active=True,
-            last_seen__gte=online_threshold
-        ).count()
-        total_offline = total_users - total_online
-
-        new_today = all_users.filter(date_joined__date=today).count()
-        new_month = all_users.filter(date_joined__gte=this_month_start).count()
-
-        blocked_users = all_users.filter(
-            Exists(BlockedUser.objects.filter(blocked=OuterRef('pk')))
-        ).count()
-
-        inactive_users = all_users.filter(
-            is_active=True,
-            last_seen__lt=inactive_threshold
-        ).count()
-
-        deleted_users = all_users.filter(is_deleted=True).count()
-
-        # ─── Status Breakdown (Donut Chart) ─────────────────────────────────────
-        status_breakdown = {
-            'active': all_users.filter(is_active=True).count(),
-            'inactive': all_users.filter(is_active=False).count(),
-            'verified': all_users.filter(is_verified=True).count(),
-            'unverified': all_users.filter(is_verified=False).count(),
-            'online': total_online,
-            'offline': total_offline,
-        }
-
-        # ─── Monthly User Growth (Line Chart) ───────────────────────────────────
-        monthly_growth_raw = (
-            all_users
-            .annotate(month=TruncMonth('date_joined'))
-            .values('month')
-            .annotate(registrations=Count('id'))
-            .order_by('month')
-        )
-
-        monthly_growth = [
-            {
-                'month': entry['month'].strftime('%Y-%m'),
-                'registrations': entry['registrations']
-            }
-            for entry in monthly_growth_raw
-        ]
-
-        # ─── Role Trend Over Time (Stacked Area Chart) ──────────────────────────
-        role_trend_raw = (
-            all_users
-            .annotate(month=TruncMonth('date_joined'))
-            .values('month', 'role')
-            .annotate(count=Count('id'))
-            .order_by('month', 'role')
-        )
-
-        role_trend = {}
-        for entry in role_trend_raw:
-            month_str = entry['month'].strftime('%Y-%m')
-            role = entry['role'] or 'Unknown'
-            if month_str not in role_trend:
-                role_trend[month_str] = {}
-            role_trend[month_str][role] = entry['count']
-
-        role_trend_formatted = sorted(
-            [{'month': month, **counts} for month, counts in role_trend.items()],
-            key=lambda x: x['month']
-        )
-
-        # Previous period (last 12 months for comparison)
-        previous_role_trend_raw = (
-            all_users
-            .filter(date_joined__lte=year_ago)
-            .annotate(month=TruncMonth('date_joined'))
-            .values('month', 'role')
-            .annotate(count=Count('id'))
-            .order_by('month', 'role')
-        )
-
-        previous_role_trend = {}
-        for entry in previous_role_trend_raw:
-            month_str = entry['month'].strftime('%Y-%m')
-            role = entry['role'] or 'Unknown'
-            if month_str not in previous_role_trend:
-                previous_role_trend[month_str] = {}
-            previous_role_trend[month_str][role] = entry['count']
-
-        previous_role_trend_formatted = sorted(
-            [{'month': month, **counts} for month, counts in previous_role_trend.items()],
-            key=lambda x: x['month']
-        )
-
-        # ─── Activity Heatmap (Day/Hour Matrix - last 30 days) ──────────────────
-        activity_heatmap_raw = (
-            all_users
-            .filter(last_seen__gte=month_ago)
-            .annotate(
-                day=ExtractIsoWeekDay('last_seen'), # ← Correct name
-                hour=ExtractHour('last_seen')
-            )
-            .values('day', 'hour')
-            .annotate(count=Count('id'))
-            .order_by('day', 'hour')
-        )
-
-        activity_heatmap = [
-            {'day': entry['day'], 'hour': entry['hour'], 'value': entry['count']}
-            for entry in activity_heatmap_raw
-        ]
-
-        # ─── Logged-in Stats (from Activity model) ──────────────────────────────
-        logged_in_total = Activity.objects.filter(action_type='login').count()
-        logged_in_month = Activity.objects.filter(
-            action_type='login',
-            created_at__gte=this_month_start
-        ).count()
-
-        # ─── Usage Hours & Performance ──────────────────────────────────────────
-        # Placeholder: 30 min average session per login
-        usage_hours = round(logged_in_month * 0.5, 1)
-
-        active_7d = all_users.filter(last_seen__gte=now - timedelta(days=7)).count()
-        performance_percentage = round((active_7d / total_users * 100), 1) if total_users > 0 else 0
-
-        # ─── Final Response Data ────────────────────────────────────────────────
-        data = {
-            "total_users": total_users,
-            "users_by_role": users_by_role,
-            "total_online": total_online,
-            "total_offline": total_offline,
-            "new_users_today": new_today,
-            "new_users_month": new_month,
-            "blocked_users": blocked_users,
-            "inactive_users": inactive_users,
-            "deleted_users": deleted_users,
-            "logged_in_total": logged_in_total,
-            "logged_in_month": logged_in_month,
-            "usage_hours": usage_hours,
-            "performance_percentage": performance_percentage,
-
-            # Chart-specific data
-            "monthly_growth": monthly_growth,               # Line chart
-            "role_trend": role_trend_formatted,             # Stacked area chart
-            "role_trend_previous": previous_role_trend_formatted,  # Comparison
-            "activity_heatmap": activity_heatmap,           # Heatmap + zoom
-            "status_breakdown": status_breakdown,           # Donut chart
-        }
-
-        return Response(data)
+        # Served from the latest snapshot (users.analytics); ?refresh=true recomputes now
+        if request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes'):
+            snapshot = analytics.refresh_snapshot('users')
+        else:
+            snapshot = analytics.get_snapshot('users')
+        return Response(analytics.snapshot_payload(snapshot))
 
 class ExportUsersPDFAPIView(APIView):
+    """
+    GET /api/v1/users/admin/users/export_pdf/
+    Branded users report; same filters as the Excel export. Large exports are queued (reports.exports).
+    """
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        print("PDF Export requested by:", request.user, "Is staff:", request.user.is_staff)
-
-        try:
-            # Filters
-            queryset = CustomUser.objects.all()
-            role = request.query_params.get('role')
-            if role:
-                queryset = queryset.filter(role=role)
-            search = request.query_params.get('search')
-            if search:
-                queryset = queryset.filter(
-                    Q(username__icontains=search) |
-                    Q(email__icontains=search) |
-                    Q(first_name__icontains=search) |
-                    Q(last_name__icontains=search)
-                )
-            is_active_str = request.query_params.get('is_active')
-            if is_active_str is not None:
-                is_active_bool = is_active_str.lower() in ('true', '1', 'yes')
-                queryset = queryset.filter(is_active=is_active_bool)
-            date_from = request.query_params.get('date_from')
-            if date_from:
-                try:
-                    dt_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-                    queryset = queryset.filter(date_joined__date__gte=dt_from)
-                except ValueError:
-                    pass
-            date_to = request.query_params.get('date_to')
-            if date_to:
-                try:
-                    dt_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-                    queryset = queryset.filter(date_joined__date__lte=dt_to)
-                except ValueError:
-                    pass
-
-            users = queryset.order_by('-date_joined')
-
-            # Summary stats
-            total_users = users.count()
-            users_by_role = dict(
-                users.values('role').annotate(count=Count('id')).values_list('role', 'count')
-            )
-            total_online = users.filter(is_online=True).count()
-            total_offline = total_users - total_online
-            now = timezone.now()
-            today = now.date()
-            month_start = today.replace(day=1)
-            new_today = users.filter(date_joined__date=today).count()
-            new_month = users.filter(date_joined__gte=month_start).count()
-            inactive_users = users.filter(is_active=True, last_seen__lt=now - timedelta(days=30)).count()
-
-            # PDF response
-            response = HttpResponse(content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename="high_prosper_users_report.pdf"'
-
-            doc = SimpleDocTemplate(
-                response,
-                pagesize=landscape(letter),
-                rightMargin=0.4*inch,
-                leftMargin=0.4*inch,
-                topMargin=1.2*inch,
-                bottomMargin=1.0*inch
-            )
-
-            elements = []
-            styles = getSampleStyleSheet()
-
-            title_style = ParagraphStyle(name='Title', fontSize=20, leading=24, textColor=colors.darkblue, spaceAfter=10, alignment=1)
-            heading_style = ParagraphStyle(name='Heading2', fontSize=14, leading=18, textColor=colors.darkblue, spaceAfter=6)
-            normal_style = styles['Normal']
-
-            def add_header(canvas, doc):
-                canvas.saveState()
-                if os.path.exists(LOGO_PATH):
-                    try:
-                        logo = ReportLabImage(LOGO_PATH, width=1.5*inch, height=1.0*inch)
-                        logo.drawOn(canvas, 0.4*inch, doc.height + doc.topMargin - 1.2*inch)
-                    except Exception as e:
-                        print(f"Logo error: {e}")
-                canvas.restoreState()
-
-            def add_footer(canvas, doc):
-                canvas.saveState()
-                canvas.setFont("Helvetica", 8)
-                canvas.setFillColor(colors.darkgray)
-
-                page_num = canvas.getPageNumber()
-                y = 0.3*inch
-
-                if page_num == 1:
-                    canvas.drawString(0.4*inch, y, f"{COMPANY_NAME} • {COMPANY_LOCATION} • {COMPANY_PHONE} • {COMPANY_EMAIL}")
-
-                    x = doc.width + doc.rightMargin - 4.5*inch
-                    canvas.drawString(x, y + 0.08*inch, "Follow us:")
-                    x += canvas.stringWidth("Follow us:", "Helvetica", 8) + 0.1*inch
-
-                    icon_size = 0.25*inch
-                    for platform, data in SOCIAL_ICONS.items():
-                        icon_path = data["icon"]
-                        url = data["url"]
-
-                        if os.path.exists(icon_path):
-                            try:
-                                icon = ReportLabImage(icon_path, width=icon_size, height=icon_size)
-                                icon.drawOn(canvas, x, y - 0.04*inch)
-                            except:
-                                canvas.drawString(x, y, platform[:3])
-                        else:
-                            canvas.drawString(x, y, platform[:3])
-
-                        canvas.linkURL(url, (x, y-0.08*inch, x+icon_size, y+icon_size+0.08*inch))
-                        x += icon_size + 0.15*inch
-
-                    canvas.setStrokeColor(colors.lightgrey)
-                    canvas.line(0.4*inch, y-0.15*inch, doc.width + doc.rightMargin - 0.4*inch, y-0.15*inch)
-
-                canvas.setFont("Helvetica-Oblique", 7)
-                canvas.drawCentredString(doc.width/2 + doc.leftMargin, 0.2*inch,
-                                         f"Page {page_num} • Confidential Document")
-
-                canvas.restoreState()
-
-            # Apply templates (no frames needed for full-page default)
-            doc.addPageTemplates([
-                PageTemplate(
-                    id='AllPages',
-                    onPage=add_header,
-                    onPageEnd=add_footer
-                )
-            ])
-
-            # Title Page
-            elements.append(Paragraph("High Prosper Services", title_style))
-            elements.append(Paragraph("Users Management Report", title_style))
-            elements.append(Spacer(1, 0.3*inch))
-            elements.append(Paragraph(f"Generated: {timezone.now().strftime('%B %d, %Y %H:%M')} by {request.user.get_full_name()}", normal_style))
-            elements.append(Spacer(1, 0.6*inch))
-
-            # Summary
-            elements.append(Paragraph("Summary", heading_style))
-            elements.append(Spacer(1, 0.15*inch))
-
-            summary_data = [
-                ["Total Users", total_users],
-                ["Online", total_online],
-                ["New Today", new_today],
-                ["New Month", new_month],
-                ["Inactive", inactive_users],
-            ]
-
-            summary_table = Table(summary_data, colWidths=[2.8*inch, 2.0*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0,0), (-1,0), 10),
-                ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ]))
-            elements.append(summary_table)
-            elements.append(Spacer(1, 0.4*inch))
-
-            # Pie Chart
-            elements.append(Paragraph("Users by Role", heading_style))
-            drawing = Drawing(350, 180)
-            pie = Pie()
-            top_roles = sorted(users_by_role.items(), key=lambda x: x[1], reverse=True)[:8]
-            others = sum(count for _, count in sorted(users_by_role.items())[8:])
-            pie.data = [count for _, count in top_roles] + [others]
-            pie.labels = [role.capitalize()[:12] for role, _ in top_roles] + ['Others']
-            pie.x = 80
-            pie.y = 40
-            pie.width = 160
-            pie.height = 160
-            drawing.add(pie)
-            elements.append(drawing)
-            elements.append(PageBreak())
-
-            # Compact Table
-            elements.append(Paragraph("Users List", heading_style))
-
-            table_data = [[
-                "ID", "User", "Name", "Email", "Phone", "Role", "Company", "Branch", "Login", "Joined", "Online", "Ver.", "Act."
-            ]]
-
-            for user in users:
-                company_name = getattr(user.company, 'name', '—') if user.company else '—'
-                branch_name = user.branch or '—'
-                last_login = user.last_login.strftime("%Y-%m-%d") if user.last_login else "—"
-                date_joined = user.date_joined.strftime("%Y-%m-%d")
-
-                table_data.append([
-                    str(user.id),
-                    user.username[:12] + '…' if len(user.username) > 12 else user.username,
-                    user.get_full_name()[:15] + '…' if len(user.get_full_name()) > 15 else user.get_full_name(),
-                    user.email[:20] + '…' if len(user.email) > 20 else user.email,
-                    user.phone[:12] + '...' if user.phone and len(user.phone) > 12 else (user.phone or "—"),
-                    user.role[:10].capitalize() if user.role else "—",
-                    company_name[:15] + '…' if len(company_name) > 15 else company_name,
-                    branch_name[:12] + '…' if len(branch_name) > 12 else branch_name,
-                    last_login,
-                    date_joined,
-                    "Y" if user.is_online else "N",
-                    "Y" if user.is_verified else "N",
-                    "Y" if user.is_active else "N"
-                ])
-
-            from reportlab.platypus import LongTable
-            table = LongTable(
-                table_data,
-                repeatRows=1,
-                colWidths=[0.5*inch, 1.0*inch, 1.2*inch, 1.5*inch, 0.8*inch, 0.7*inch, 1.0*inch, 0.8*inch, 0.9*inch, 0.8*inch, 0.5*inch, 0.5*inch, 0.5*inch]
-            )
-
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.darkblue),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0,0), (-1,0), 8),
-                ('BOTTOMPADDING', (0,0), (-1,0), 4),
-                ('GRID', (0,0), (-1,-1), 0.4, colors.grey),
-                ('FONTSIZE', (0,1), (-1,-1), 7),
-                ('LEFTPADDING', (0,0), (-1,-1), 2),
-                ('RIGHTPADDING', (0,0), (-1,-1), 2),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('ALIGN', (3,1), (3,-1), 'LEFT'),
-                ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#f8f9fa')]),
-            ]))
-
-            elements.append(table)
-
-            # Build PDF
-            doc.build(elements)
-            print("PDF generated successfully - returning response")
-            return response
-
-        except Exception as e:
-            print("PDF EXPORT FAILED!")
-            print(traceback.format_exc())
-            return JsonResponse({"error": str(e)}, status=500)
-
+        return export_response(request, UserPDFExport.from_request(request), 'pdf')
 
 
 class ExportUsersExcelAPIView(APIView):
@@ -3451,7 +2584,7 @@ class ExportUsersExcelAPIView(APIView):
     GET /api/v1/users/admin/users/export_excel/
 
     Generates professional Excel report with:
-    - Users List sheet (filtered data + conditional formatting + role-based colors)
+    - Users List sheet (filtered data + conditional formatting + alternating rows)
     - Summary Statistics sheet (dashboard with embedded charts)
 
     Supports filtering via query params (same as list view):
@@ -3459,283 +2592,13 @@ class ExportUsersExcelAPIView(APIView):
     - search
     - is_active (true/false)
     - date_from / date_to (YYYY-MM-DD)
+
+    Rows are streamed into a write_only workbook; large exports are queued (?async=true forces it).
     """
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        # ─── Apply Filters (sync with frontend) ─────────────────────────────────
-        queryset = CustomUser.objects.all()
-
-        role = request.query_params.get('role')
-        if role:
-            queryset = queryset.filter(role=role)
-
-        search = request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) |
-                Q(email__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search)
-            )
-
-        is_active_str = request.query_params.get('is_active')
-        if is_active_str is not None:
-            is_active_bool = is_active_str.lower() in ('true', '1', 'yes')
-            queryset = queryset.filter(is_active=is_active_bool)
-
-        date_from = request.query_params.get('date_from')
-        if date_from:
-            try:
-                dt_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(date_joined__date__gte=dt_from)
-            except ValueError:
-                pass
-
-        date_to = request.query_params.get('date_to')
-        if date_to:
-            try:
-                dt_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-                queryset = queryset.filter(date_joined__date__lte=dt_to)
-            except ValueError:
-                pass
-
-        users = queryset.order_by('-date_joined')
-
-        # ─── Calculate Summary Stats ────────────────────────────────────────────
-        total_users = users.count()
-        users_by_role = dict(
-            users.values('role').annotate(count=Count('id')).values_list('role', 'count')
-        )
-        total_online = users.filter(is_online=True).count()
-        total_offline = total_users - total_online
-
-        now = timezone.now()
-        today = now.date()
-        month_start = today.replace(day=1)
-        new_today = users.filter(date_joined__date=today).count()
-        new_month = users.filter(date_joined__gte=month_start).count()
-
-        blocked_users = 0  # Replace with real BlockedUser logic if needed
-        inactive_users = users.filter(is_active=True, last_seen__lt=now - timedelta(days=30)).count()
-        deleted_users = 0  # Add soft-delete later if needed
-
-        active_last_week = users.filter(last_seen__gte=now - timedelta(days=7)).count()
-        performance_percentage = round((active_last_week / total_users * 100), 1) if total_users > 0 else 0
-
-        # Daily new users trend (last 30 days for line chart)
-        daily_new = []
-        for day in range(29, -1, -1):
-            day_date = today - timedelta(days=day)
-            count = users.filter(date_joined__date=day_date).count()
-            daily_new.append((day_date.strftime('%Y-%m-%d'), count))
-
-        # ─── Create Workbook ────────────────────────────────────────────────────
-        wb = Workbook()
-        ws_list = wb.active
-        ws_list.title = "Users List"
-
-        # ─── SHEET 1: Users List ────────────────────────────────────────────────
-        # Title
-        ws_list.merge_cells('A1:O1')
-        ws_list['A1'] = "High Prosper Services - Users List"
-        ws_list['A1'].font = Font(size=10, bold=True, color="FFFFFF")
-        ws_list['A1'].fill = PatternFill(start_color="1F497D", end_color="1F497D", fill_type="solid")
-        ws_list['A1'].alignment = Alignment(horizontal="center", vertical="center")
-
-        ws_list.merge_cells('A2:O2')
-        filter_summary = f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')} | Filtered: {total_users} users"
-        if role: filter_summary += f" | Role: {role}"
-        if search: filter_summary += f" | Search: '{search}'"
-        ws_list['A2'].value = filter_summary
-        ws_list['A2'].alignment = Alignment(horizontal="center")
-
-        # Headers
-        headers = [
-            "ID", "Username", "Full Name", "Email", "Phone", "Role",
-            "Company", "Branch", "Last Login", "Date Joined",
-            "Online", "Verified", "Active"
-        ]
-
-        for col_num, header in enumerate(headers, 1):
-            cell = ws_list.cell(row=4, column=col_num, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="1F497D", end_color="1F497D", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-        # Data rows
-        row_num = 5
-        for user in users:
-            company_name = getattr(user.company, 'name', '—') if user.company else '—'
-            branch_name = user.branch or '—'
-
-            last_login = user.last_login.strftime("%Y-%m-%d %H:%M") if user.last_login else "Never"
-            date_joined = user.date_joined.strftime("%Y-%m-%d")
-
-            online_text = "Yes" if user.is_online else "No"
-            verified_text = "Yes" if user.is_verified else "No"
-            active_text = "Yes" if user.is_active else "No"
-
-            ws_list.append([
-                user.id,
-                user.username,
-                user.get_full_name(),
-                user.email,
-                user.phone or "—",
-                user.role.capitalize(),
-                company_name,
-                branch_name,
-                last_login,
-                date_joined,
-                online_text,
-                verified_text,
-                active_text
-            ])
-
-            # Alternate row color
-            if row_num % 2 == 0:
-                for col in range(1, len(headers) + 1):
-                    ws_list.cell(row=row_num, column=col).fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-
-            row_num += 1
-
-        # Conditional formatting for status columns
-        green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-        red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-        orange_fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
-
-        last_row = row_num - 1
-        ws_list.conditional_formatting.add(f'K5:K{last_row}', CellIsRule(operator='equal', formula=['"Yes"'], fill=green_fill))
-        ws_list.conditional_formatting.add(f'K5:K{last_row}', CellIsRule(operator='equal', formula=['"No"'], fill=red_fill))
-        ws_list.conditional_formatting.add(f'L5:L{last_row}', CellIsRule(operator='equal', formula=['"Yes"'], fill=green_fill))
-        ws_list.conditional_formatting.add(f'L5:L{last_row}', CellIsRule(operator='equal', formula=['"No"'], fill=orange_fill))
-        ws_list.conditional_formatting.add(f'M5:M{last_row}', CellIsRule(operator='equal', formula=['"Yes"'], fill=green_fill))
-        ws_list.conditional_formatting.add(f'M5:M{last_row}', CellIsRule(operator='equal', formula=['"No"'], fill=red_fill))
-
-        # Auto-size columns on list sheet
-        for col in range(1, len(headers) + 1):
-            column_letter = get_column_letter(col)
-            max_length = 0
-            for row in range(4, row_num):
-                cell = ws_list.cell(row=row, column=col)
-                try:
-                    if len(str(cell.value or '')) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            ws_list.column_dimensions[column_letter].width = max_length + 4
-
-        ws_list.freeze_panes = "A5"
-
-        # ─── SHEET 2: Summary Statistics with Charts ────────────────────────────
-        ws_summary = wb.create_sheet(title="Summary Statistics")
-
-        # Title
-        ws_summary.merge_cells('A1:F1')
-        ws_summary['A1'] = "Summary Statistics Dashboard"
-        ws_summary['A1'].font = Font(size=18, bold=True, color="1F497D")
-        ws_summary['A1'].alignment = Alignment(horizontal="center")
-
-        ws_summary.merge_cells('A2:F2')
-        ws_summary['A2'] = f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M')} | Total Users: {total_users}"
-        ws_summary['A2'].alignment = Alignment(horizontal="center")
-
-        # Key Metrics (A4:B12)
-        metrics = [
-            ("Total Users", total_users),
-            ("Online Users", total_online),
-            ("Offline Users", total_offline),
-            ("New Today", new_today),
-            ("New This Month", new_month),
-            ("Blocked/Inactive", blocked_users + inactive_users),
-            ("Performance %", f"{performance_percentage}%"),
-        ]
-
-        for i, (label, value) in enumerate(metrics, start=4):
-            ws_summary[f'A{i}'] = label
-            ws_summary[f'A{i}'].font = Font(bold=True)
-            ws_summary[f'B{i}'] = value
-            ws_summary[f'B{i}'].alignment = Alignment(horizontal="right")
-
-        # Users by Role Pie Chart Data (D4:E12)
-        sorted_roles = sorted(users_by_role.items(), key=lambda x: x[1], reverse=True)
-        top_roles = sorted_roles[:8]
-        others_count = sum(count for _, count in sorted_roles[8:])
-
-        ws_summary['D4'] = "Users by Role"
-        ws_summary['D4'].font = Font(bold=True)
-        row = 5
-        for role, count in top_roles:
-            ws_summary[f'D{row}'] = role.capitalize()
-            ws_summary[f'E{row}'] = count
-            row += 1
-        if others_count > 0:
-            ws_summary[f'D{row}'] = "Others"
-            ws_summary[f'E{row}'] = others_count
-
-        # ─── PIE CHART: Users by Role ───────────────────────────────────────────
-        pie = PieChart()
-        labels = Reference(ws_summary, min_col=4, min_row=5, max_row=row)
-        data = Reference(ws_summary, min_col=5, min_row=5, max_row=row)
-        pie.add_data(data)
-        pie.set_categories(labels)
-        pie.title = "Distribution by Role"
-        pie.dataLabels = DataLabelList()
-        pie.dataLabels.showVal = True
-        pie.dataLabels.showPercent = True
-        pie.legend.position = 'b'
-        ws_summary.add_chart(pie, "G4")
-
-        # ─── BAR CHART: Key Metrics ─────────────────────────────────────────────
-        bar = BarChart()
-        bar.title = "Key User Metrics"
-        bar.y_axis.title = "Count"
-        bar.x_axis.title = "Category"
-        data_ref = Reference(ws_summary, min_col=2, min_row=4, max_row=10)
-        cats = Reference(ws_summary, min_col=1, min_row=5, max_row=10)
-        bar.add_data(data_ref, titles_from_data=True)
-        bar.set_categories(cats)
-        bar.legend = None
-        ws_summary.add_chart(bar, "A15")
-
-        # ─── LINE CHART: New Users Trend (Last 30 Days) ─────────────────────────
-        line = LineChart()
-        line.title = "New Users - Last 30 Days"
-        line.y_axis.title = "New Users"
-        line.x_axis.title = "Date"
-
-        # Write trend data to summary sheet
-        ws_summary['G20'] = "Date"
-        ws_summary['H20'] = "New Users"
-        for i, (date, count) in enumerate(daily_new, start=21):
-            ws_summary[f'G{i}'] = date
-            ws_summary[f'H{i}'] = count
-
-        line_dates = Reference(ws_summary, min_col=7, min_row=20, max_row=len(daily_new)+20)
-        line_data = Reference(ws_summary, min_col=8, min_row=20, max_row=len(daily_new)+20)
-        line.add_data(line_data, titles_from_data=False)
-        line.set_categories(line_dates)
-        ws_summary.add_chart(line, "J20")
-
-        # Auto-size columns on summary sheet
-        for col in ['A', 'B', 'D', 'E', 'G', 'H']:
-            max_length = 0
-            for row in range(1, ws_summary.max_row + 1):
-                cell = ws_summary[f'{col}{row}']
-                try:
-                    if len(str(cell.value or '')) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            ws_summary.column_dimensions[col].width = max_length + 4
-
-        # Final response
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        response['Content-Disposition'] = 'attachment; filename="high_prosper_users_report.xlsx"'
-        wb.save(response)
-        return response
+        return export_response(request, UserExcelExport.from_request(request), 'excel')
 
 class BlockedUserAnalyticsAPIView(APIView):
     """
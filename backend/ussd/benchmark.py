@@ -0,0 +1,84 @@
+# ussd/benchmark.py — USSD replay benchmark
+"""
+Replays USSD sessions hop by hop against ussd_webhook (in process, through RequestFactory)
+and reports latency percentiles and DB queries per hop:
+
+    python manage.py shell -c "from ussd.benchmark import main; main()"
+
+The default sessions only navigate (balance, account, agent, payment and service menus),
+so the benchmark writes nothing. The first hop of a session loads the customer context;
+every later hop should make at most one query.
+"""
+import statistics
+import time
+import uuid
+
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from customers.models import Customer
+from .views import ussd_webhook
+
+DEFAULT_PATHS = [
+    ["", "1"],
+    ["", "5"],
+    ["", "4"],
+    ["", "2", "2*0", "2*0*1"],
+    ["", "6", "6*0", "6*0*5"],
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def replay(phone, paths=DEFAULT_PATHS, rounds=50):
+    """Run every path `rounds` times as separate sessions. Returns the latency/query stats."""
+    factory = RequestFactory()
+    first_hops, later_hops, later_queries = [], [], []
+
+    for _ in range(rounds):
+        for path in paths:
+            session_id = uuid.uuid4().hex
+            for hop, text in enumerate(path):
+                request = factory.post('/ussd/', {'sessionId': session_id, 'phoneNumber': phone, 'text': text})
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    ussd_webhook(request)
+                    elapsed = (time.perf_counter() - started) * 1000
+                if hop == 0:
+                    first_hops.append(elapsed)
+                else:
+                    later_hops.append(elapsed)
+                    later_queries.append(len(queries))
+
+    def summary(values):
+        return {
+            'hops': len(values),
+            'p50_ms': round(statistics.median(values), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'max_ms': round(max(values), 2),
+        }
+
+    return {
+        'first_hop': summary(first_hops),
+        'later_hops': summary(later_hops),
+        'max_queries_after_first_hop': max(later_queries, default=0),
+    }
+
+
+def main(phone=None, rounds=50):
+    phone = phone or Customer.objects.values_list('phone', flat=True).first()
+    if not phone:
+        print("No customer to replay sessions for")
+        return None
+    stats = replay(phone, rounds=rounds)
+    for label in ('first_hop', 'later_hops'):
+        row = stats[label]
+        print(f"{label:>11}: {row['hops']} hops  p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  "
+              f"p99 {row['p99_ms']} ms  max {row['max_ms']} ms")
+    print(f"Max queries on a hop after the first: {stats['max_queries_after_first_hop']}")
+    return stats
@@ -0,0 +1,389 @@
+# ussd/engine.py — USSD session engine
+"""
+Telecom gateways drop USSD hops that take too long, so every hop after the first is
+served from one compact cache entry:
+
+- The first hop of a session loads the customer context once: customer id, account,
+  balance (one annotated query), open service requests with their balance due (one
+  grouped query), the assigned agent and the language.
+- The menus are a declarative state machine (STATES). The session remembers its state and
+  how much of the `text` path it has consumed, so a hop only applies the new input instead
+  of re-parsing the whole path. A session missing from the cache (expired or evicted) is
+  rebuilt by replaying the path from the main menu.
+- Navigation hops make no DB query; only the final actions write (payment, complaint).
+
+ussd.benchmark replays sessions against the webhook and reports p50/p95/p99 latency and
+the queries per hop.
+"""
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from customers.models import Complaint, Customer, ServiceRequest
+from payments.models import Payment, PaymentMethod
+
+SESSION_TIMEOUT = 300
+SESSION_KEY = "ussd:session:{session_id}"
+MAX_SERVICES = 5
+PAYMENT_METHOD = 'momo'
+
+_payment_method_ids = {}
+
+
+# ─── Language ───────────────────────────────────────────────────────────────
+
+LANGUAGE_PREFIXES = {
+    "+250": "rw",   # Rwanda
+    "+255": "sw",   # Tanzania
+    "+254": "sw",   # Kenya
+    "+256": "lg",   # Uganda
+    "+257": "fr",   # Burundi
+    "+243": "fr",   # DRC
+}
+
+
+def detect_language(phone):
+    for prefix, code in LANGUAGE_PREFIXES.items():
+        if phone.startswith(prefix):
+            return code
+    return "en"
+
+
+MENUS = {
+    "rw": {
+        "welcome": "Murakaza neza kuri High Prosper",
+        "balance": "Reba amafaranga wasigaranye",
+        "pay": "Ishyura amafranga",
+        "issue": "Vuga ikibazo",
+        "agent": "Vugana n'umukozi",
+        "account": "Nimero ya konte yawe"
+    },
+    "sw": {
+        "welcome": "Karibu High Prosper",
+        "balance": "Angalia Deni Lako",
+        "pay": "Lipia Sasa",
+        "issue": "Ripoti Tatizo",
+        "agent": "Piga Agent",
+        "account": "Namba Yako ya Malipo"
+    },
+    "lg": {
+        "welcome": "Tukwano ku High Prosper",
+        "balance": "Kebera ssente zo",
+        "pay": "Lipa ssente",
+        "issue": "Lopa ekizibu",
+        "agent": "Yogera n'omukozi",
+        "account": "Namba yo"
+    },
+    "fr": {
+        "welcome": "Bienvenue chez High Prosper",
+        "balance": "Voir votre solde",
+        "pay": "Payer maintenant",
+        "issue": "Signaler un problème",
+        "agent": "Parler à un agent",
+        "account": "Votre numéro de compte"
+    },
+    "en": {
+        "welcome": "Welcome to High Prosper",
+        "balance": "Check Balance",
+        "pay": "Pay Now",
+        "issue": "Report Issue",
+        "agent": "Talk to Agent",
+        "account": "My Account Number"
+    }
+}
+
+MESSAGES = {
+    "no_account": {"sw": "Hakuna akaunti", "rw": "Nta konte", "en": "No account found"},
+    "no_services": {"sw": "Hakuna huduma inayodaiwa", "rw": "Nta serivisi isigaranye", "en": "No pending service payments"},
+    "describe_issue": {"sw": "Andika tatizo lako:", "rw": "Andika ikibazo cyawe:", "en": "Describe your issue:"},
+    "issue_thanks": {"sw": "Asante! Tutakushughulikia", "rw": "Murakoze!", "en": "Thank you! We'll follow up"},
+    "no_agent": {"sw": "Hakuna agent", "rw": "Nta mukozi", "en": "No agent assigned"},
+    "enter_amount": {"sw": "Weka kiasi:", "rw": "Andika amafaranga:", "en": "Enter amount:"},
+}
+
+
+def message(key, lang):
+    texts = MESSAGES[key]
+    return texts.get(lang) or texts["en"]
+
+
+def get_payment_prompt(lang, token, phone):
+    if phone.startswith("+250"):
+        return f"Pay now on MoMo:\n*182*7*1#\nEnter code: {token}"
+    elif phone.startswith("+255"):
+        return f"Pay via M-Pesa/Tigo Pesa:\n*150*00#\nEnter code: {token}"
+    elif phone.startswith("+254"):
+        return f"Pay via M-Pesa:\n*334#\nEnter code: {token}"
+    else:
+        return f"Pay now:\nDial mobile money menu\nReference: {token}"
+
+
+# ─── Customer context ───────────────────────────────────────────────────────
+
+def load_context(phone):
+    """Everything the menus need for one session, loaded on its first hop."""
+    customer = (
+        Customer.objects.filter(phone=phone)
+        .annotate(open_balance=Coalesce(
+            Sum('invoices__amount', filter=Q(invoices__status='Unpaid')),
+            Value(0), output_field=DecimalField(max_digits=14, decimal_places=2),
+        ))
+        .values('id', 'payment_account', 'village_id', 'open_balance')
+        .first()
+    )
+
+    services = (
+        ServiceRequest.objects.filter(
+            requester_phone=phone.replace('+', ''),
+            payment_status__in=['unpaid', 'partially_paid'],
+        )
+        .annotate(paid=Coalesce(
+            Sum('payments__amount', filter=Q(payments__status='Successful')),
+            Value(0), output_field=DecimalField(max_digits=15, decimal_places=2),
+        ))
+        .annotate(due=F('final_amount') - F('paid'))
+        .filter(due__gt=0)
+        .order_by('-created_at')
+        .values_list('id', 'title', 'due')[:MAX_SERVICES]
+    )
+
+    agent = None
+    if customer and customer['village_id']:
+        collector = get_user_model().objects.filter(assigned_villages=customer['village_id']).order_by('pk').first()
+        if collector:
+            agent = (collector.get_full_name() or "Agent", collector.phone)
+
+    return {
+        'phone': phone,
+        'lang': detect_language(phone),
+        'currency': "TSh" if phone.startswith("+255") else "RWF",
+        'customer': customer and {
+            'id': customer['id'],
+            'account': customer['payment_account'],
+            'balance': customer['open_balance'],
+        },
+        'services': [list(service) for service in services],
+        'agent': agent,
+    }
+
+
+def payment_method_id():
+    if PAYMENT_METHOD not in _payment_method_ids:
+        _payment_method_ids[PAYMENT_METHOD] = PaymentMethod.objects.get_or_create(name=PAYMENT_METHOD)[0].pk
+    return _payment_method_ids[PAYMENT_METHOD]
+
+
+# ─── States ─────────────────────────────────────────────────────────────────
+
+class Node:
+    """One menu state. render() → ('CON' | 'END', text); transition() → next state or None."""
+
+    def __init__(self, render, requires_customer=False):
+        self._render = render
+        self.requires_customer = requires_customer
+
+    def render(self, session):
+        ctx = session['ctx']
+        if self.requires_customer and not ctx['customer']:
+            return 'END', message('no_account', ctx['lang'])
+        return self._render(session)
+
+    def transition(self, session, value):
+        return None
+
+
+class Menu(Node):
+    """Numbered options leading to other states."""
+
+    def __init__(self, render, options, requires_customer=False):
+        super().__init__(render, requires_customer)
+        self.options = options
+
+    def transition(self, session, value):
+        return self.options.get(value)
+
+
+class Input(Node):
+    """Free input stored in session['data'][name] before moving to `next_state`."""
+
+    def __init__(self, render, name, next_state, clean=str.strip, requires_customer=False):
+        super().__init__(render, requires_customer)
+        self.name, self.next_state, self.clean = name, next_state, clean
+
+    def transition(self, session, value):
+        try:
+            value = self.clean(value)
+        except (TypeError, ValueError):
+            return None
+        if value in (None, ''):
+            return None
+        session['data'][self.name] = value
+        return self.next_state
+
+
+def _end(render):
+    return lambda session: ('END', render(session))
+
+
+def _main(session):
+    menu = MENUS[session['ctx']['lang']]
+    lines = [menu['welcome']] + [
+        f"{number}. {menu[key]}" for number, key in
+        (("1", 'balance'), ("2", 'pay'), ("3", 'issue'), ("4", 'agent'), ("5", 'account'))
+    ]
+    return 'CON', "\n".join(lines) + "\n6. Pay for Service / Lipa Huduma"
+
+
+def _balance(session):
+    ctx = session['ctx']
+    return f"Outstanding: {ctx['currency']} {abs(ctx['customer']['balance']):,}\n\nAccount: {ctx['customer']['account']}"
+
+
+def _pay(session):
+    ctx = session['ctx']
+    amount = abs(ctx['customer']['balance'])
+    return 'CON', f"Pay {ctx['currency']} {amount:,} now?\n1. Yes\n2. Other amount\n0. Back"
+
+
+def _positive_amount(value):
+    amount = int(value)
+    return amount if amount > 0 else None
+
+
+def _pay_subscription(session):
+    ctx = session['ctx']
+    amount = session['data'].get('amount') or abs(ctx['customer']['balance'])
+    token = str(uuid.uuid4())[:8].upper()
+    Payment.objects.create(
+        customer_id=ctx['customer']['id'],
+        amount=amount,
+        method_id=payment_method_id(),
+        status="Pending",
+        payer_phone=ctx['phone'],
+        reference=f"SUB-{token}"
+    )
+    return f"{get_payment_prompt(ctx['lang'], token, ctx['phone'])}\n\nThank you!"
+
+
+def _submit_issue(session):
+    ctx = session['ctx']
+    Complaint.objects.create(
+        customer_id=ctx['customer']['id'],
+        title="USSD Report",
+        description=f"[USSD {ctx['lang'].upper()}] {ctx['phone']}: {session['data']['issue']}",
+        priority="High"
+    )
+    return message('issue_thanks', ctx['lang'])
+
+
+def _agent(session):
+    ctx = session['ctx']
+    if not ctx['agent']:
+        return message('no_agent', ctx['lang'])
+    name, phone = ctx['agent']
+    return f"{name}: {phone}"
+
+
+def _services(session):
+    ctx = session['ctx']
+    if not ctx['services']:
+        return 'END', message('no_services', ctx['lang'])
+    lines = ["Select service to pay:"] + [
+        f"{index}. #{service_id} {title[:25]}... - {ctx['currency']} {int(due):,}"
+        for index, (service_id, title, due) in enumerate(ctx['services'], 1)
+    ]
+    return 'CON', "\n".join(lines) + "\n0. Back"
+
+
+class ServiceChoice(Menu):
+    def transition(self, session, value):
+        if value == "0":
+            return 'main'
+        if value.isdigit() and 1 <= int(value) <= len(session['ctx']['services']):
+            session['data']['service'] = int(value) - 1
+            return 'service_confirm'
+        return None
+
+
+def _selected_service(session):
+    return session['ctx']['services'][session['data']['service']]
+
+
+def _service_confirm(session):
+    _, title, due = _selected_service(session)
+    return 'CON', f"Pay {session['ctx']['currency']} {int(due):,}?\nService: {title}\n\n1. Yes\n0. Back"
+
+
+def _pay_service(session):
+    ctx = session['ctx']
+    service_id, _, due = _selected_service(session)
+    token = str(uuid.uuid4())[:8].upper()
+    Payment.objects.create(
+        service_request_id=service_id,
+        amount=due,
+        method_id=payment_method_id(),
+        status="Pending",
+        payer_phone=ctx['phone'],
+        reference=f"GIG-{token}"
+    )
+    return f"{get_payment_prompt(ctx['lang'], token, ctx['phone'])}\n\nThank you!"
+
+
+STATES = {
+    'main': Menu(_main, {'1': 'balance', '2': 'pay', '3': 'issue', '4': 'agent', '5': 'account', '6': 'services'}),
+    'balance': Node(_end(_balance), requires_customer=True),
+    'pay': Menu(_pay, {'1': 'pay_confirm', '2': 'pay_amount', '0': 'main'}, requires_customer=True),
+    'pay_amount': Input(
+        lambda session: ('CON', message('enter_amount', session['ctx']['lang'])),
+        'amount', 'pay_confirm', clean=_positive_amount, requires_customer=True,
+    ),
+    'pay_confirm': Node(_end(_pay_subscription), requires_customer=True),
+    'issue': Input(
+        lambda session: ('CON', message('describe_issue', session['ctx']['lang'])),
+        'issue', 'issue_submit', requires_customer=True,
+    ),
+    'issue_submit': Node(_end(_submit_issue), requires_customer=True),
+    'agent': Node(_end(_agent)),
+    'account': Node(_end(lambda session: f"Account: {session['ctx']['customer']['account']}"), requires_customer=True),
+    'services': ServiceChoice(_services, {}),
+    'service_confirm': Menu(_service_confirm, {'1': 'service_pay', '0': 'main'}),
+    'service_pay': Node(_end(_pay_service)),
+}
+
+
+# ─── Sessions ───────────────────────────────────────────────────────────────
+
+def _new_session(phone):
+    return {'state': 'main', 'text': '', 'depth': 0, 'data': {}, 'ctx': load_context(phone)}
+
+
+def respond(session_id, phone, text):
+    """The USSD response ('CON ...' or 'END ...') for one hop of a session."""
+    key = SESSION_KEY.format(session_id=session_id)
+    inputs = text.split('*') if text else []
+
+    session = cache.get(key) if inputs else None
+    if session is None or session['depth'] > len(inputs) or not text.startswith(session['text']):
+        session = _new_session(phone)
+        pending = inputs
+    else:
+        pending = inputs[session['depth']:]
+
+    for value in pending:
+        next_state = STATES[session['state']].transition(session, value.strip())
+        if next_state is None:
+            cache.delete(key)
+            return "END Invalid option"
+        session['state'] = next_state
+    session['depth'] = len(inputs)
+    session['text'] = text
+
+    kind, body = STATES[session['state']].render(session)
+    if kind == 'END':
+        cache.delete(key)
+    else:
+        cache.set(key, session, SESSION_TIMEOUT)
+    return f"{kind} {body}"
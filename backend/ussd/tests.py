@@ -0,0 +1,90 @@
+# ussd/tests.py
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from customers.models import Complaint, Customer
+from payments.models import Invoice, Payment
+from users.models import CustomUser
+from . import engine
+from .views import ussd_webhook
+
+PHONE = "+250788123456"
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+)
+class UssdSessionTestCase(TestCase):
+    def setUp(self):
+        engine._payment_method_ids.clear()  # Ids cached by earlier tests were rolled back
+        # payments.signals notifies the admins of a new payment and broadcasts the latest notification
+        CustomUser.objects.create_user(username="admin", password="password123", role="admin")
+        self.customer = Customer.objects.bulk_create([Customer(
+            name="Aline Mukamana", phone=PHONE, contract_no="C-USSD", payment_account="PA-USSD", monthly_fee=1500,
+        )])[0]
+        Invoice.objects.bulk_create([
+            Invoice(customer=self.customer, amount=1500, due_date=date(2026, month, 5),
+                    status='Unpaid', period_month=month, period_year=2026)
+            for month in (1, 2)
+        ])
+        self.factory = RequestFactory()
+        self.sessions = 0
+
+    def replay(self, path):
+        """Run one session hop by hop; returns [(response text, queries)] per hop"""
+        self.sessions += 1
+        hops = []
+        for text in path:
+            request = self.factory.post('/ussd/', {
+                'sessionId': f"session-{self.sessions}", 'phoneNumber': PHONE.lstrip('+'), 'text': text,
+            })
+            with CaptureQueriesContext(connection) as queries:
+                response = ussd_webhook(request)
+            hops.append((response.content.decode(), len(queries)))
+        return hops
+
+    def test_navigation_hops_after_the_first_make_at_most_one_query(self):
+        for path in (["", "1"], ["", "5"], ["", "4"], ["", "2", "2*0", "2*0*1"], ["", "6"]):
+            hops = self.replay(path)
+            self.assertTrue(hops[0][0].startswith("CON "), hops[0][0])
+            for text, queries in hops[1:]:
+                self.assertLessEqual(queries, 1, f"{path}: {text}")
+
+        balance = self.replay(["", "1"])[-1][0]
+        self.assertTrue(balance.startswith("END Outstanding: RWF 3,000"), balance)
+        self.assertEqual(self.replay(["", "5"])[-1][0], "END Account: PA-USSD")
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(Complaint.objects.exists())
+
+    def test_pay_other_amount_creates_a_pending_payment(self):
+        hops = self.replay(["", "2", "2*2", "2*2*1000"])
+
+        self.assertTrue(hops[-1][0].startswith("END Pay now on MoMo"), hops[-1][0])
+        payment = Payment.objects.get()
+        self.assertEqual(payment.customer_id, self.customer.pk)
+        self.assertEqual(payment.amount, Decimal("1000"))
+        self.assertEqual(payment.status, "Pending")
+        self.assertEqual(payment.payer_phone, PHONE)
+        self.assertTrue(payment.reference.startswith("SUB-"))
+
+    def test_report_issue_creates_a_complaint(self):
+        hops = self.replay(["", "3", "3*Water pipe leaking"])
+
+        self.assertEqual(hops[-1][0], "END Murakoze!")
+        complaint = Complaint.objects.get()
+        self.assertEqual(complaint.customer_id, self.customer.pk)
+        self.assertEqual(complaint.priority, "High")
+        self.assertIn("Water pipe leaking", complaint.description)
+
+    def test_session_lost_from_the_cache_is_replayed(self):
+        self.replay(["", "2"])
+        engine.cache.clear()
+        request = self.factory.post('/ussd/', {
+            'sessionId': f"session-{self.sessions}", 'phoneNumber': PHONE.lstrip('+'), 'text': "2*2",
+        })
+        self.assertEqual(ussd_webhook(request).content.decode(), "CON Andika amafaranga:")